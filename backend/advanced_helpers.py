@@ -4,6 +4,7 @@ Ajout des fonctionnalités CRUD complètes
 """
 
 from supabase_client import supabase
+from dashboard_stats_service import dashboard_stats
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import secrets
@@ -36,6 +37,7 @@ def create_product(
         }
 
         result = supabase.table("products").insert(product_data).execute()
+        dashboard_stats.invalidate_tenant(merchant_id=merchant_id)
         return result.data[0] if result.data else None
     except Exception as e:
         print(f"Error creating product: {e}")
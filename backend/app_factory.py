@@ -0,0 +1,342 @@
+"""
+Fabrique de l'application FastAPI
+
+- métadonnées OpenAPI et middlewares communs
+- routers par fonctionnalité, activés par configuration (APP_FEATURES):
+  seuls les modules des fonctionnalités activées sont importés, avec
+  leurs dépendances (Stripe, IA, KYC...)
+- rapport de démarrage: temps d'import de chaque router
+  (app.state.startup_report, journalisé au démarrage)
+
+Usage:
+    APP_FEATURES=all                      # défaut: toutes les fonctionnalités
+    APP_FEATURES=marketplace,affiliation  # API réduite
+    APP_FEATURES=none                     # cœur de server.py uniquement
+
+    from app_factory import create_app
+    app = create_app()
+
+Profil détaillé des imports (python -X importtime):
+    python -m benchmarks.bench_startup
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+import importlib
+import os
+import time
+import logging
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+logger = logging.getLogger(__name__)
+
+APP_FEATURES = os.getenv("APP_FEATURES", "all")
+
+
+@dataclass(frozen=True)
+class FeatureRouter:
+    """
+    Router d'une fonctionnalité: module importé seulement si activée
+
+    optional: échec d'import toléré (journalisé, rapport de démarrage) pour
+    une intégration réellement facultative; sinon l'échec d'un router
+    activé interrompt le démarrage, comme les imports directs de server.py
+    """
+
+    feature: str
+    module: str
+    attribute: str = "router"
+    optional: bool = False
+
+
+# Ordre d'inclusion = ordre historique de server.py
+FEATURE_ROUTERS: List[FeatureRouter] = [
+    FeatureRouter("marketplace", "marketplace_endpoints"),
+    FeatureRouter("affiliation", "affiliate_links_endpoints"),
+    FeatureRouter("contact", "contact_endpoints"),
+    FeatureRouter("social", "admin_social_endpoints"),
+    FeatureRouter("affiliation", "affiliation_requests_endpoints"),
+    FeatureRouter("kyc", "kyc_endpoints"),
+    FeatureRouter("twofa", "twofa_endpoints"),
+    FeatureRouter("ai", "ai_bot_endpoints"),
+    FeatureRouter("subscriptions", "subscription_endpoints"),
+    FeatureRouter("teams", "team_endpoints"),
+    FeatureRouter("teams", "domain_endpoints"),
+    FeatureRouter("subscriptions", "stripe_webhook_handler"),
+    FeatureRouter("directories", "commercials_directory_endpoints"),
+    FeatureRouter("directories", "influencers_directory_endpoints"),
+    FeatureRouter("affiliation", "company_links_management"),
+    # 6 Features Marketables
+    FeatureRouter("ai", "ai_content_endpoints"),
+    FeatureRouter("mobile_payments", "mobile_payment_endpoints"),
+    FeatureRouter("ai", "smart_match_endpoints"),
+    FeatureRouter("trust_score", "trust_score_endpoints"),
+    FeatureRouter("ai", "predictive_dashboard_endpoints"),
+]
+
+# Fonctionnalités sans router dédié, branchées par server.py
+EXTRA_FEATURES = ("advanced",)
+
+ALL_FEATURES: Set[str] = {router.feature for router in FEATURE_ROUTERS} | set(EXTRA_FEATURES)
+
+
+def parse_features(value: Optional[str] = None) -> Set[str]:
+    """APP_FEATURES -> ensemble de fonctionnalités ("all", "none" ou liste)"""
+    value = APP_FEATURES if value is None else value
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    if not names or "all" in names:
+        return set(ALL_FEATURES)
+    if names == {"none"}:
+        return set()
+
+    unknown = names - ALL_FEATURES
+    if unknown:
+        logger.warning(f"⚠️ APP_FEATURES: fonctionnalités inconnues ignorées: {', '.join(sorted(unknown))}")
+    return names & ALL_FEATURES
+
+
+def feature_enabled(app: FastAPI, feature: str) -> bool:
+    return feature in app.state.features
+
+
+API_METADATA = dict(
+    title="ShareYourSales API",
+    description="""
+# ShareYourSales - Plateforme d'Affiliation Marocaine 🇲🇦
+
+API complète pour la gestion d'une plateforme SaaS d'affiliation entre influenceurs et marchands.
+
+## 🎯 Fonctionnalités Principales
+
+### 💳 Abonnements & Paiements
+- Système d'abonnement SaaS (Free, Starter, Pro, Enterprise)
+- Intégration Stripe pour paiements
+- Gestion des quotas par plan
+- Facturation automatique
+
+### 📱 Intégrations Réseaux Sociaux
+- **Instagram** - Graph API avec statistiques automatiques
+- **TikTok** - Creator API avec métriques d'engagement
+- **Facebook** - Pages Business et groupes
+
+### 🤖 Bot IA Conversationnel
+- Assistant intelligent multilingue (FR, EN, AR)
+- Détection d'intentions
+- Recommandations personnalisées
+- Intégration Claude AI / GPT-4
+
+### 🔗 Système d'Affiliation
+- Génération de liens trackables
+- Suivi des clics et conversions en temps réel
+- Commissions automatiques
+- Dashboard analytics
+
+### 👤 KYC & Conformité
+- Vérification d'identité (CIN, Passeport)
+- Documents d'entreprise (RC, ICE, TVA)
+- Conformité fiscale marocaine
+- Validation IBAN bancaire
+
+### 🔐 Sécurité Enterprise
+- Rate limiting distribué (Redis)
+- Protection CSRF
+- Headers de sécurité (OWASP)
+- Monitoring Sentry
+- Logs structurés (JSON)
+
+## 📊 Architecture
+
+- **Backend**: FastAPI + Python 3.11
+- **Database**: PostgreSQL 15 + Supabase
+- **Cache**: Redis 7
+- **Monitoring**: Sentry + Structlog
+- **Queue**: Celery + Redis
+- **Paiements**: Stripe
+- **AI**: Anthropic Claude / OpenAI
+
+## 🔑 Authentification
+
+Utiliser JWT Bearer Token dans le header Authorization:
+
+```bash
+Authorization: Bearer <your_jwt_token>
+```
+
+Pour obtenir un token, utilisez l'endpoint `/api/auth/login`.
+
+## 🌐 Environnements
+
+- **Production**: https://api.shareyoursales.ma
+- **Staging**: https://staging-api.shareyoursales.ma
+- **Development**: http://localhost:8000
+
+## 📚 Resources
+
+- [Documentation complète](https://docs.shareyoursales.ma)
+- [Guide d'intégration](https://docs.shareyoursales.ma/integration)
+- [Status Page](https://status.shareyoursales.ma)
+- [Support](mailto:support@shareyoursales.ma)
+
+## ⚡ Rate Limits
+
+| Endpoint Type | Limite |
+|--------------|--------|
+| Authentification | 10 req/min |
+| API Standard | 100 req/min |
+| Webhooks | 1000 req/min |
+
+Les limites peuvent varier selon votre plan d'abonnement.
+    """,
+    version="1.0.0",
+    terms_of_service="https://shareyoursales.ma/terms",
+    contact={
+        "name": "ShareYourSales Support",
+        "url": "https://shareyoursales.ma/contact",
+        "email": "support@shareyoursales.ma",
+    },
+    license_info={
+        "name": "Proprietary",
+        "url": "https://shareyoursales.ma/license",
+    },
+    openapi_tags=[
+        {
+            "name": "Authentication",
+            "description": "Endpoints d'authentification (login, register, 2FA, JWT)",
+        },
+        {
+            "name": "Users",
+            "description": "Gestion des utilisateurs (influenceurs, marchands, admins)",
+        },
+        {
+            "name": "Stripe",
+            "description": "Gestion des abonnements et paiements Stripe",
+        },
+        {
+            "name": "Social Media",
+            "description": "Intégrations réseaux sociaux (Instagram, TikTok, Facebook)",
+        },
+        {
+            "name": "AI Bot",
+            "description": "Assistant IA conversationnel multilingue",
+        },
+        {
+            "name": "Products",
+            "description": "Catalogue produits et services des marchands",
+        },
+        {
+            "name": "Affiliates",
+            "description": "Système d'affiliation et demandes de partenariat",
+        },
+        {
+            "name": "Tracking",
+            "description": "Liens trackables et suivi des conversions",
+        },
+        {
+            "name": "Analytics",
+            "description": "Statistiques et rapports de performance",
+        },
+        {
+            "name": "KYC",
+            "description": "Vérification d'identité et conformité (Know Your Customer)",
+        },
+        {
+            "name": "Payments",
+            "description": "Paiements de commissions aux influenceurs",
+        },
+        {
+            "name": "Webhooks",
+            "description": "Webhooks entrants (Stripe, réseaux sociaux)",
+        },
+        {
+            "name": "Health",
+            "description": "Health checks et monitoring",
+        },
+    ],
+    docs_url="/docs",
+    redoc_url="/redoc",
+    openapi_url="/openapi.json",
+)
+
+
+def include_feature_routers(app: FastAPI, features: Iterable[str]) -> Dict[str, float]:
+    """
+    Importe et inclut les routers des fonctionnalités activées
+
+    Un router activé qui ne se charge pas fait échouer le démarrage (pas de
+    404 silencieux). Seuls les routers marqués optional sont journalisés
+    et ignorés.
+
+    Returns:
+        {module: durée d'import en ms}
+    """
+    enabled = set(features)
+    timings: Dict[str, float] = {}
+    failed: Dict[str, str] = {}
+
+    for entry in FEATURE_ROUTERS:
+        if entry.feature not in enabled:
+            continue
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(entry.module)
+            app.include_router(getattr(module, entry.attribute))
+        except Exception as e:
+            if not entry.optional:
+                logger.error(f"❌ Router {entry.module} ({entry.feature}) non chargé: {e}")
+                raise
+            failed[entry.module] = str(e)
+            logger.warning(f"⚠️ Router optionnel {entry.module} ({entry.feature}) non chargé: {e}")
+            continue
+        finally:
+            timings[entry.module] = round((time.perf_counter() - started) * 1000, 1)
+
+    app.state.startup_report["routers"] = timings
+    app.state.startup_report["failed_routers"] = failed
+    return timings
+
+
+def create_app(features: Optional[Iterable[str]] = None) -> FastAPI:
+    """
+    Crée l'application: métadonnées, middlewares communs, routers activés
+
+    Args:
+        features: Fonctionnalités à activer (défaut: APP_FEATURES)
+    """
+    started = time.perf_counter()
+    enabled = parse_features() if features is None else set(features)
+
+    app = FastAPI(**API_METADATA)
+    app.state.features = enabled
+    app.state.startup_report = {"features": sorted(enabled)}
+
+    from middleware.rate_limiting import rate_limit_middleware
+    from supabase_transport import deadline_middleware
+
+    # CORS configuration - Allow all localhost origins
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins in development
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Rate limiting: politiques par route et par plan, appliquées via Redis
+    app.middleware("http")(rate_limit_middleware)
+
+    # Budget BDD par requête: plafonne les timeouts des appels Supabase de la requête
+    app.middleware("http")(deadline_middleware)
+
+    timings = include_feature_routers(app, enabled)
+
+    total_ms = round((time.perf_counter() - started) * 1000, 1)
+    app.state.startup_report["routers_total_ms"] = total_ms
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:3]
+    logger.info(
+        f"⏱️ {len(timings)} routers chargés en {total_ms} ms "
+        f"(fonctionnalités: {', '.join(sorted(enabled)) or 'aucune'}; "
+        f"plus lents: {', '.join(f'{name} {ms} ms' for name, ms in slowest) or '-'})"
+    )
+    return app
@@ -0,0 +1,153 @@
+"""
+Accès BDD non bloquant pour les endpoints async
+
+Le client Supabase (supabase_client) est synchrone: chaque .execute()
+appelé depuis un `async def` bloque toute la boucle asyncio du worker.
+Les appels passent ici par un pool de threads borné et dédié:
+- la boucle reste libre pendant l'aller-retour HTTP vers PostgREST
+- DB_THREAD_POOL_SIZE borne les requêtes BDD simultanées par worker
+  (au-delà, elles attendent dans la file du pool, sans bloquer la boucle)
+- métriques: en cours, en attente, temps d'attente / d'exécution
+
+Usage:
+    from async_db import execute, run_db
+
+    result = await execute(supabase.table("products").select("*").eq("id", product_id))
+    user = await run_db(get_user_by_id, user_id)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from typing import Any, Callable, Dict
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DB_THREAD_POOL_SIZE = int(os.getenv("DB_THREAD_POOL_SIZE", 32))
+
+
+class DatabaseExecutor:
+    """
+    Pool de threads borné pour les appels BDD synchrones
+
+    Args:
+        max_workers: Appels BDD simultanés maximum (par worker)
+    """
+
+    def __init__(self, max_workers: int = DB_THREAD_POOL_SIZE):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "in_flight": 0,
+            "waiting": 0,
+            "completed": 0,
+            "errors": 0,
+            "wait_ms": 0.0,
+            "run_ms": 0.0,
+            "max_waiting": 0,
+        }
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool créé au premier appel (après un fork gunicorn éventuel)"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="db"
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Exécute fn(*args, **kwargs) dans le pool, sans bloquer la boucle"""
+        submitted = time.perf_counter()
+        with self._lock:
+            self._stats["waiting"] += 1
+            self._stats["max_waiting"] = max(self._stats["max_waiting"], self._stats["waiting"])
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                self._stats["waiting"] -= 1
+                self._stats["in_flight"] += 1
+                self._stats["wait_ms"] += (started - submitted) * 1000
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                raise
+            finally:
+                with self._lock:
+                    self._stats["in_flight"] -= 1
+                    self._stats["completed"] += 1
+                    self._stats["run_ms"] += (time.perf_counter() - started) * 1000
+
+        # Contexte propagé (request id, structlog) vers le thread
+        context = contextvars.copy_context()
+        future = self.executor.submit(partial(context.run, call))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Annulé avant d'avoir démarré: ne sera jamais exécuté
+            if future.cancelled():
+                with self._lock:
+                    self._stats["waiting"] -= 1
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+
+        completed = stats["completed"] or 1
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": stats["in_flight"],
+            "waiting": stats["waiting"],
+            "max_waiting": stats["max_waiting"],
+            "completed": stats["completed"],
+            "errors": stats["errors"],
+            "avg_wait_ms": round(stats["wait_ms"] / completed, 3),
+            "avg_run_ms": round(stats["run_ms"] / completed, 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Instance globale
+db_executor = DatabaseExecutor()
+
+
+async def run_db(fn: Callable, *args, **kwargs) -> Any:
+    """Appel BDD synchrone quelconque (helper, méthode de repository) hors boucle"""
+    return await db_executor.run(fn, *args, **kwargs)
+
+
+async def execute(query) -> Any:
+    """
+    Exécute une requête PostgREST construite (table/select/eq/rpc...) hors boucle
+
+    La construction de la requête ne fait aucune I/O; seul .execute() part
+    dans le pool.
+    """
+    return await db_executor.run(query.execute)
+
+
+def to_async(fn: Callable) -> Callable:
+    """Version async d'une fonction d'accès BDD synchrone"""
+
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await db_executor.run(fn, *args, **kwargs)
+
+    wrapper.__doc__ = f"Version async (pool BDD) de {fn.__name__}\n\n{fn.__doc__ or ''}"
+    return wrapper
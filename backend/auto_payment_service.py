@@ -5,6 +5,10 @@ Gère la validation des ventes et les paiements automatiques
 
 from datetime import datetime, timedelta
 from supabase_client import supabase
+from dashboard_stats_service import dashboard_stats
+from sale_validation_engine import SaleValidationEngine
+from payout_executor import PayoutExecutor, PayoutJob, PayoutOutcome
+from websocket_cluster import cluster_publisher
 from typing import List, Dict, Optional
 import os
 from dotenv import load_dotenv
@@ -22,133 +26,25 @@ class AutoPaymentService:
 
     def __init__(self):
         self.supabase = supabase
+        self.validation_engine = SaleValidationEngine(supabase)
 
     # ============================================
     # 1. VALIDATION AUTOMATIQUE DES VENTES
     # ============================================
 
-    def validate_pending_sales(self) -> Dict:
+    def validate_pending_sales(self, max_chunks: Optional[int] = None) -> Dict:
         """
         Valide automatiquement les ventes de plus de 14 jours
         et crédite le solde des influenceurs
+
+        Traitement par tranches (SaleValidationEngine): une RPC par tranche
+        au lieu de ~6 allers-retours par vente; reprise sur point de contrôle
         """
         try:
             # Date limite (14 jours en arrière)
             validation_date = (datetime.now() - timedelta(days=SALE_VALIDATION_DAYS)).isoformat()
 
-            # Récupérer les ventes en attente (pending) de plus de 14 jours
-            response = (
-                supabase.table("sales")
-                .select(
-                    """
-                id,
-                influencer_id,
-                merchant_id,
-                amount,
-                influencer_commission,
-                platform_commission,
-                merchant_revenue,
-                product_id,
-                link_id,
-                created_at
-            """
-                )
-                .eq("status", "pending")
-                .lt("created_at", validation_date)
-                .execute()
-            )
-
-            pending_sales = response.data if response.data else []
-
-            validated_count = 0
-            total_commission = 0.0
-            influencers_updated = set()
-
-            for sale in pending_sales:
-                # Vérifier qu'il n'y a pas eu de retour/remboursement
-                # (Cette logique peut être étendue avec une table de retours)
-
-                try:
-                    # 1. Mettre à jour le statut de la vente
-                    supabase.table("sales").update(
-                        {
-                            "status": "completed",
-                            "payment_status": "pending",
-                            "payment_processed_at": None,
-                        }
-                    ).eq("id", sale["id"]).execute()
-
-                    # 2. Créer l'entrée de commission
-                    commission_data = {
-                        "sale_id": sale["id"],
-                        "influencer_id": sale["influencer_id"],
-                        "amount": sale["influencer_commission"],
-                        "currency": "EUR",
-                        "status": "approved",  # Approuvée automatiquement
-                        "approved_at": datetime.now().isoformat(),
-                    }
-                    supabase.table("commissions").insert(commission_data).execute()
-
-                    # 3. Mettre à jour le solde de l'influenceur
-                    influencer = (
-                        supabase.table("influencers")
-                        .select("balance, total_earnings")
-                        .eq("id", sale["influencer_id"])
-                        .execute()
-                    )
-
-                    if influencer.data:
-                        current_balance = float(influencer.data[0].get("balance", 0))
-                        current_earnings = float(influencer.data[0].get("total_earnings", 0))
-
-                        new_balance = current_balance + float(sale["influencer_commission"])
-                        new_earnings = current_earnings + float(sale["influencer_commission"])
-
-                        supabase.table("influencers").update(
-                            {
-                                "balance": new_balance,
-                                "total_earnings": new_earnings,
-                                "updated_at": datetime.now().isoformat(),
-                            }
-                        ).eq("id", sale["influencer_id"]).execute()
-
-                        influencers_updated.add(sale["influencer_id"])
-
-                    # 4. Mettre à jour les stats du lien d'affiliation
-                    if sale.get("link_id"):
-                        link = (
-                            supabase.table("trackable_links")
-                            .select("total_commission")
-                            .eq("id", sale["link_id"])
-                            .execute()
-                        )
-                        if link.data:
-                            current_link_commission = float(link.data[0].get("total_commission", 0))
-                            supabase.table("trackable_links").update(
-                                {
-                                    "total_commission": current_link_commission
-                                    + float(sale["influencer_commission"])
-                                }
-                            ).eq("id", sale["link_id"]).execute()
-
-                    validated_count += 1
-                    total_commission += float(sale["influencer_commission"])
-
-                    print(
-                        f"✅ Vente validée: {sale['id']} - Commission: {sale['influencer_commission']}€"
-                    )
-
-                except Exception as e:
-                    print(f"❌ Erreur validation vente {sale['id']}: {e}")
-                    continue
-
-            return {
-                "success": True,
-                "validated_sales": validated_count,
-                "total_commission": round(total_commission, 2),
-                "influencers_updated": len(influencers_updated),
-                "timestamp": datetime.now().isoformat(),
-            }
+            return self.validation_engine.run(validation_date, max_chunks=max_chunks)
 
         except Exception as e:
             print(f"Erreur dans validate_pending_sales: {e}")
@@ -162,6 +58,9 @@ class AutoPaymentService:
         """
         Traite automatiquement les paiements pour les influenceurs
         dont le solde est ≥ 50€ et qui ont configuré leur méthode de paiement
+
+        Les paiements sont exécutés en parallèle par provider (PayoutExecutor),
+        avec une clé d'idempotence par influenceur et par jour
         """
         try:
             # Récupérer les influenceurs éligibles
@@ -183,9 +82,8 @@ class AutoPaymentService:
 
             eligible_influencers = response.data if response.data else []
 
-            processed_count = 0
-            total_paid = 0.0
             failed_payments = []
+            candidates = []
 
             for influencer in eligible_influencers:
                 # Vérifier que la méthode de paiement est configurée
@@ -201,97 +99,98 @@ class AutoPaymentService:
                         }
                     )
                     continue
+                candidates.append(influencer)
 
-                # Vérifier qu'il n'y a pas déjà un paiement en cours
-                pending_payout = (
+            # Paiements déjà en cours: une seule requête IN
+            busy = set()
+            if candidates:
+                pending_payouts = (
                     supabase.table("payouts")
-                    .select("id")
-                    .eq("influencer_id", influencer["id"])
+                    .select("influencer_id")
+                    .in_("influencer_id", [influencer["id"] for influencer in candidates])
                     .in_("status", ["pending", "processing"])
                     .execute()
                 )
+                busy = {payout["influencer_id"] for payout in pending_payouts.data or []}
 
-                if pending_payout.data:
+            for influencer in candidates:
+                if influencer["id"] in busy:
                     print(f"⚠️  Influenceur {influencer['username']}: Paiement déjà en cours")
-                    continue
 
-                # Créer la demande de paiement
-                payout_amount = float(influencer["balance"])
+            candidates = [influencer for influencer in candidates if influencer["id"] not in busy]
 
-                payout_data = {
+            # Créer les demandes de paiement en un seul INSERT multi-lignes;
+            # une clé déjà présente (run du jour déjà passé) n'est pas recréée
+            run_date = datetime.now().strftime("%Y-%m-%d")
+            now = datetime.now().isoformat()
+            payout_rows = [
+                {
                     "influencer_id": influencer["id"],
-                    "amount": payout_amount,
+                    "amount": float(influencer["balance"]),
                     "currency": "EUR",
                     "status": "processing",
                     "payment_method": influencer["payment_method"],
-                    "requested_at": datetime.now().isoformat(),
-                    "approved_at": datetime.now().isoformat(),
+                    "requested_at": now,
+                    "approved_at": now,
                     "is_automatic": True,
+                    "idempotency_key": f"auto:{influencer['id']}:{run_date}",
                 }
+                for influencer in candidates
+            ]
+
+            created = {}
+            if payout_rows:
+                payout_result = (
+                    supabase.table("payouts")
+                    .upsert(payout_rows, on_conflict="idempotency_key", ignore_duplicates=True)
+                    .execute()
+                )
+                created = {payout["idempotency_key"]: payout for payout in payout_result.data or []}
+
+            jobs = [
+                PayoutJob(
+                    idempotency_key=row["idempotency_key"],
+                    provider=influencer["payment_method"],
+                    amount=row["amount"],
+                    payload=influencer["payment_details"],
+                    metadata={"payout_id": created[row["idempotency_key"]]["id"], "influencer": influencer},
+                )
+                for row, influencer in zip(payout_rows, candidates)
+                if row["idempotency_key"] in created
+            ]
+
+            executor = PayoutExecutor(
+                handlers={
+                    "paypal": lambda job: self._process_paypal_payment(
+                        job.payload, job.amount, job.idempotency_key
+                    ),
+                    "bank_transfer": lambda job: self._process_bank_transfer(
+                        job.payload, job.amount, job.idempotency_key
+                    ),
+                },
+                on_complete=self._finalize_payout,
+            )
+            report = executor.run(jobs)
 
-                payout_result = supabase.table("payouts").insert(payout_data).execute()
-
-                if payout_result.data:
-                    payout_id = payout_result.data[0]["id"]
-
-                    # Tenter le paiement selon la méthode
-                    payment_success = False
-                    transaction_id = None
-
-                    if influencer["payment_method"] == "paypal":
-                        payment_success, transaction_id = self._process_paypal_payment(
-                            influencer["payment_details"], payout_amount
-                        )
-                    elif influencer["payment_method"] == "bank_transfer":
-                        payment_success, transaction_id = self._process_bank_transfer(
-                            influencer["payment_details"], payout_amount
-                        )
-
-                    if payment_success:
-                        # Mettre à jour le payout
-                        supabase.table("payouts").update(
-                            {
-                                "status": "paid",
-                                "transaction_id": transaction_id,
-                                "paid_at": datetime.now().isoformat(),
-                            }
-                        ).eq("id", payout_id).execute()
-
-                        # Débiter le solde de l'influenceur
-                        supabase.table("influencers").update(
-                            {"balance": 0.0, "updated_at": datetime.now().isoformat()}
-                        ).eq("id", influencer["id"]).execute()
-
-                        processed_count += 1
-                        total_paid += payout_amount
-
-                        print(f"✅ Paiement réussi: {influencer['username']} - {payout_amount}€")
-
-                        # Envoyer notification
-                        self._send_payment_notification(influencer, payout_amount, transaction_id)
-
-                    else:
-                        # Échec du paiement
-                        supabase.table("payouts").update(
-                            {"status": "failed", "notes": "Échec du traitement automatique"}
-                        ).eq("id", payout_id).execute()
-
-                        failed_payments.append(
-                            {
-                                "influencer_id": influencer["id"],
-                                "reason": "payment_processing_failed",
-                                "balance": payout_amount,
-                            }
-                        )
-
-                        print(f"❌ Échec paiement: {influencer['username']}")
+            processed = [outcome for outcome in report["outcomes"] if outcome.success]
+            failed_payments.extend(
+                {
+                    "influencer_id": outcome.job.metadata["influencer"]["id"],
+                    "reason": "payment_processing_failed",
+                    "balance": outcome.job.amount,
+                }
+                for outcome in report["outcomes"]
+                if not outcome.success
+            )
 
             return {
                 "success": True,
-                "processed_count": processed_count,
-                "total_paid": round(total_paid, 2),
+                "processed_count": len(processed),
+                "total_paid": round(sum(outcome.job.amount for outcome in processed), 2),
                 "failed_count": len(failed_payments),
                 "failed_payments": failed_payments,
+                "providers": report["providers"],
+                "duration_s": report["duration_s"],
                 "timestamp": datetime.now().isoformat(),
             }
 
@@ -299,87 +198,118 @@ class AutoPaymentService:
             print(f"Erreur dans process_automatic_payouts: {e}")
             return {"success": False, "error": str(e)}
 
+    def _finalize_payout(self, outcome: PayoutOutcome):
+        """Enregistre le résultat d'un paiement (appelé depuis un worker de l'exécuteur)"""
+        payout_id = outcome.job.metadata["payout_id"]
+        influencer = outcome.job.metadata["influencer"]
+
+        if outcome.success:
+            # Mettre à jour le payout
+            supabase.table("payouts").update(
+                {
+                    "status": "paid",
+                    "transaction_id": outcome.transaction_id,
+                    "paid_at": datetime.now().isoformat(),
+                }
+            ).eq("id", payout_id).execute()
+
+            # Débiter le solde de l'influenceur
+            supabase.table("influencers").update(
+                {"balance": 0.0, "updated_at": datetime.now().isoformat()}
+            ).eq("id", influencer["id"]).execute()
+
+            print(f"✅ Paiement réussi: {influencer['username']} - {outcome.job.amount}€")
+
+            # Envoyer notification
+            self._send_payment_notification(influencer, outcome.job.amount, outcome.transaction_id)
+
+        else:
+            # Échec du paiement
+            supabase.table("payouts").update(
+                {"status": "failed", "notes": "Échec du traitement automatique"}
+            ).eq("id", payout_id).execute()
+
+            print(f"❌ Échec paiement: {influencer['username']} ({outcome.error})")
+
     # ============================================
     # 3. MÉTHODES DE PAIEMENT
     # ============================================
 
-    def _process_paypal_payment(self, payment_details: dict, amount: float) -> tuple:
+    def _process_paypal_payment(self, payment_details: dict, amount: float, idempotency_key: str) -> tuple:
         """
         Traite un paiement PayPal
         Retourne: (success: bool, transaction_id: str)
+
+        La clé d'idempotence est envoyée comme sender_batch_id (et en-tête
+        PayPal-Request-Id): un retry après timeout ne crée pas un second
+        paiement. Les exceptions remontent à PayoutExecutor, qui réessaie
+        les erreurs transitoires (ValueError = donnée invalide, pas de retry).
         """
-        try:
-            # TODO: Intégrer l'API PayPal Payouts
-            # https://developer.paypal.com/docs/api/payments.payouts-batch/v1/
+        # TODO: Intégrer l'API PayPal Payouts
+        # https://developer.paypal.com/docs/api/payments.payouts-batch/v1/
 
-            paypal_email = payment_details.get("email")
+        paypal_email = payment_details.get("email")
 
-            if not paypal_email:
-                return False, None
+        if not paypal_email:
+            raise ValueError("Email PayPal non configuré")
 
-            # SIMULATION pour le développement
-            # En production, utiliser paypalrestsdk
-            """
-            import paypalrestsdk
-            
-            payout = paypalrestsdk.Payout({
-                "sender_batch_header": {
-                    "sender_batch_id": f"Payout_{datetime.now().timestamp()}",
-                    "email_subject": "Votre commission ShareYourSales",
+        # SIMULATION pour le développement
+        # En production, utiliser paypalrestsdk
+        """
+        import paypalrestsdk
+        
+        payout = paypalrestsdk.Payout({
+            "sender_batch_header": {
+                "sender_batch_id": idempotency_key,
+                "email_subject": "Votre commission ShareYourSales",
+            },
+            "items": [{
+                "recipient_type": "EMAIL",
+                "amount": {
+                    "value": str(amount),
+                    "currency": "EUR"
                 },
-                "items": [{
-                    "recipient_type": "EMAIL",
-                    "amount": {
-                        "value": str(amount),
-                        "currency": "EUR"
-                    },
-                    "receiver": paypal_email,
-                    "note": "Commission d'affiliation",
-                    "sender_item_id": f"item_{datetime.now().timestamp()}"
-                }]
-            })
-            
-            if payout.create():
-                return True, payout.batch_header.payout_batch_id
-            else:
-                print(f"PayPal Error: {payout.error}")
-                return False, None
-            """
-
-            # SIMULATION
-            transaction_id = f"PAYPAL_SIM_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            print(f"[SIMULATION] Paiement PayPal: {amount}€ → {paypal_email}")
-            return True, transaction_id
-
-        except Exception as e:
-            print(f"Erreur PayPal: {e}")
+                "receiver": paypal_email,
+                "note": "Commission d'affiliation",
+                "sender_item_id": idempotency_key
+            }]
+        })
+        
+        if payout.create(request_id=idempotency_key):
+            return True, payout.batch_header.payout_batch_id
+        else:
+            print(f"PayPal Error: {payout.error}")
             return False, None
+        """
 
-    def _process_bank_transfer(self, payment_details: dict, amount: float) -> tuple:
+        # SIMULATION
+        transaction_id = f"PAYPAL_SIM_{idempotency_key}"
+        print(f"[SIMULATION] Paiement PayPal: {amount}€ → {paypal_email} (clé {idempotency_key})")
+        return True, transaction_id
+
+    def _process_bank_transfer(self, payment_details: dict, amount: float, idempotency_key: str) -> tuple:
         """
         Génère un ordre de virement bancaire (SEPA)
         Retourne: (success: bool, transaction_id: str)
-        """
-        try:
-            iban = payment_details.get("iban")
-            bic = payment_details.get("bic")
-            account_name = payment_details.get("account_name")
 
-            if not iban or not account_name:
-                return False, None
+        La clé d'idempotence sert de référence de bout en bout de l'ordre:
+        un ordre régénéré porte la même référence et est rejeté en doublon.
+        """
+        iban = payment_details.get("iban")
+        bic = payment_details.get("bic")
+        account_name = payment_details.get("account_name")
 
-            # Générer fichier SEPA XML
-            transaction_id = f"SEPA_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        if not iban or not account_name:
+            raise ValueError("IBAN ou titulaire du compte non configuré")
 
-            # TODO: Générer fichier SEPA pour import dans banque
-            # Utiliser bibliothèque comme sepaxml ou pain.001
+        # Générer fichier SEPA XML
+        transaction_id = f"SEPA_{idempotency_key}"
 
-            print(f"[SIMULATION] Virement SEPA: {amount}€ → {iban}")
-            return True, transaction_id
+        # TODO: Générer fichier SEPA pour import dans banque
+        # Utiliser bibliothèque comme sepaxml ou pain.001 (EndToEndId = clé d'idempotence)
 
-        except Exception as e:
-            print(f"Erreur virement: {e}")
-            return False, None
+        print(f"[SIMULATION] Virement SEPA: {amount}€ → {iban} (réf. {idempotency_key})")
+        return True, transaction_id
 
     # ============================================
     # 4. NOTIFICATIONS
@@ -409,6 +339,11 @@ class AutoPaymentService:
 
                 supabase.table("notifications").insert(notification_data).execute()
 
+                # Temps réel: livrée par le nœud WebSocket de l'influenceur
+                cluster_publisher.publish_to_user(
+                    influencer["user_id"], "notification_created", notification_data
+                )
+
         except Exception as e:
             print(f"Erreur notification: {e}")
 
@@ -469,6 +404,11 @@ class AutoPaymentService:
                         "id", sale_data["influencer_id"]
                     ).execute()
 
+            dashboard_stats.invalidate_tenant(
+                merchant_id=sale_data.get("merchant_id"),
+                influencer_id=sale_data.get("influencer_id"),
+            )
+
             return {
                 "success": True,
                 "message": "Remboursement traité",
@@ -0,0 +1,7 @@
+"""
+Benchmarks de performance (exécutables localement contre un client BDD factice)
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_link_creation
+"""
@@ -0,0 +1,114 @@
+"""
+Benchmark: concurrence d'un worker sur des endpoints qui lisent la BDD
+
+Avant: supabase...execute() appelé directement dans l'endpoint async
+       (la boucle est bloquée pendant chaque aller-retour)
+Après: await execute(...) via async_db (pool de threads borné)
+
+Chaque "requête" simule un endpoint type: deux lectures BDD séquentielles
+puis un await non-BDD (appel Redis / HTTP). On mesure le débit et les
+latences p50 / p99 pour un nombre croissant de requêtes simultanées, et
+le retard maximal de la boucle (tick de 1 ms) pendant le test.
+
+Usage:
+    python -m benchmarks.bench_async_db --requests 400 --latency-ms 5
+    python -m benchmarks.bench_async_db --concurrency 1 10 50 100 --pool-size 32
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from async_db import DatabaseExecutor
+from benchmarks.stub_supabase import StubSupabase
+
+
+async def endpoint_blocking(client: StubSupabase, n: int):
+    """Flux historique: execute() synchrone sur la boucle"""
+    client.table("users").select("*").eq("id", f"user-{n}").execute()
+    client.table("products").select("*").eq("merchant_id", "merchant-001").limit(20).execute()
+    await asyncio.sleep(0.001)
+
+
+async def endpoint_pooled(client: StubSupabase, executor: DatabaseExecutor, n: int):
+    """Nouveau flux: execute() dans le pool BDD"""
+    await executor.run(client.table("users").select("*").eq("id", f"user-{n}").execute)
+    await executor.run(client.table("products").select("*").eq("merchant_id", "merchant-001").limit(20).execute)
+    await asyncio.sleep(0.001)
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    """Retard maximal observé sur un tick de 1 ms (ms)"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, (time.perf_counter() - started) * 1000 - 1)
+    return worst
+
+
+async def run_scenario(handler, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(n: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(n)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(total)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    max_lag = await lag_task
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "max_lag": max_lag,
+    }
+
+
+def run(total: int, latency_ms: float, pool_size: int, levels: list) -> list:
+    client = StubSupabase(latency_ms=latency_ms)
+    client.tables["users"] = [{"id": f"user-{n}", "email": f"u{n}@example.ma"} for n in range(total)]
+    client.tables["products"] = [{"id": f"prod-{n}", "merchant_id": "merchant-001"} for n in range(50)]
+
+    rows = []
+    for concurrency in levels:
+        executor = DatabaseExecutor(max_workers=pool_size)
+        before = asyncio.run(run_scenario(lambda n: endpoint_blocking(client, n), total, concurrency))
+        after = asyncio.run(run_scenario(lambda n: endpoint_pooled(client, executor, n), total, concurrency))
+        rows.append({"concurrency": concurrency, "avant": before, "après": after, "pool": executor.get_stats()})
+        executor.shutdown()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requêtes par palier, 2 lectures BDD à {args.latency_ms} ms chacune, "
+        f"pool BDD de {args.pool_size} threads\n"
+    )
+    for row in run(args.requests, args.latency_ms, args.pool_size, args.concurrency):
+        print(f"concurrence {row['concurrency']}")
+        for label in ("avant", "après"):
+            result = row[label]
+            print(
+                f"  {label:<6} {result['rps']:>8.1f} req/s  p50={result['p50']:>8.1f} ms  "
+                f"p99={result['p99']:>8.1f} ms  retard boucle max={result['max_lag']:>7.1f} ms"
+            )
+        pool = row["pool"]
+        print(f"  pool: attente moyenne {pool['avg_wait_ms']} ms, file max {pool['max_waiting']}\n")
@@ -0,0 +1,158 @@
+"""
+Benchmark: codecs de sérialisation du cache
+
+Avant: json.dumps(..., default=str) en texte, aucune compression
+Après: codecs cache_codecs (json / orjson / msgpack) x compression
+       (none / zlib / lz4 / zstd selon les paquets installés)
+
+Objets représentatifs des clés CacheKeys: profil utilisateur, page de
+produits, stats sociales, stats de tracking, abonnement, stats dashboard.
+
+Usage:
+    python -m benchmarks.bench_cache_codecs --iterations 2000
+    python -m benchmarks.bench_cache_codecs --redis   # + MEMORY USAGE (REDIS_URL)
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import random
+import time
+
+from cache_codecs import CODECS, COMPRESSORS, CacheCodec
+from cache_manager import CacheKeys
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+BENCH_PREFIX = "bench:codec"
+
+
+def sample_objects() -> dict:
+    """Une valeur par clé CacheKeys, tailles proches de la production"""
+    random.seed(42)
+    now = datetime(2026, 10, 18, 12, 0, 0)
+    product = lambda n: {
+        "id": f"prod-{n:05d}",
+        "merchant_id": "merchant-001",
+        "name": f"Caftan brodé main modèle {n}",
+        "description": "Caftan traditionnel marocain, broderie fil d'or, tissu satin. " * 3,
+        "price": round(random.uniform(150, 2500), 2),
+        "currency": "MAD",
+        "commission_rate": 12.5,
+        "category": random.choice(["mode", "beauté", "maison", "artisanat"]),
+        "images": [f"https://cdn.shareyoursales.ma/p/{n}/{i}.jpg" for i in range(4)],
+        "stock": random.randint(0, 300),
+        "created_at": now - timedelta(days=n),
+    }
+
+    return {
+        CacheKeys.user_profile("user-001"): {
+            "id": "user-001",
+            "email": "influenceuse@example.ma",
+            "role": "influencer",
+            "first_name": "Salma",
+            "bio": "Lifestyle, mode et beauté à Casablanca ✨ " * 4,
+            "social_links": {p: f"https://{p}.com/salma" for p in ("instagram", "tiktok", "youtube")},
+            "audience": {"countries": {"MA": 71.2, "FR": 12.4, "BE": 4.1}, "age": {"18-24": 38, "25-34": 44}},
+            "created_at": now,
+        },
+        CacheKeys.products_list("merchant-001", page=1): {
+            "items": [product(n) for n in range(50)],
+            "page": 1,
+            "total": 1240,
+        },
+        CacheKeys.social_stats("user-001", "instagram"): {
+            "followers": 184230,
+            "engagement_rate": 4.7,
+            "daily": [
+                {"date": (now - timedelta(days=d)).date(), "followers": 184230 - d * 37, "likes": random.randint(2000, 9000)}
+                for d in range(90)
+            ],
+        },
+        CacheKeys.tracking_stats("link-001", "30d"): {
+            "clicks": 48210,
+            "conversions": 912,
+            "by_day": {str((now - timedelta(days=d)).date()): random.randint(800, 2200) for d in range(30)},
+            "by_country": {"MA": 39020, "FR": 5120, "ES": 1930},
+        },
+        CacheKeys.subscription("user-001"): {
+            "id": "sub-001",
+            "status": "active",
+            "subscription_plans": {"slug": "pro", "name": "Pro", "price": 499, "features": ["ai", "analytics"]},
+            "current_period_end": now + timedelta(days=30),
+        },
+        "dashboard_stats:merchant": {
+            "revenue": 1289450.5,
+            "sales": 8421,
+            "top_products": [product(n) for n in range(10)],
+            "revenue_by_day": [{"date": (now - timedelta(days=d)).date(), "total": random.uniform(1e4, 6e4)} for d in range(30)],
+        },
+    }
+
+
+def legacy_encode(value) -> bytes:
+    return json.dumps(value, default=str).encode()
+
+
+def _time_per_op(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(iterations: int, threshold: int, with_redis: bool) -> list:
+    client = None
+    if with_redis:
+        import redis
+
+        client = redis.from_url(REDIS_URL)
+
+    variants = [("avant (json texte)", legacy_encode, lambda raw: json.loads(raw))]
+    for codec_name in CODECS:
+        for compression in COMPRESSORS:
+            codec = CacheCodec(codec=codec_name, compression=compression, threshold=threshold)
+            variants.append((f"{codec_name}+{compression}", codec.encode, codec.decode))
+
+    rows = []
+    for key, value in sample_objects().items():
+        for label, encode, decode in variants:
+            raw = encode(value)
+            row = {
+                "key": key,
+                "label": label,
+                "bytes": len(raw),
+                "encode_us": round(_time_per_op(lambda: encode(value), iterations), 1),
+                "decode_us": round(_time_per_op(lambda: decode(raw), iterations), 1),
+            }
+            if client:
+                redis_key = f"{BENCH_PREFIX}:{label}:{key}"
+                client.set(redis_key, raw)
+                row["redis_bytes"] = client.memory_usage(redis_key) or 0
+                client.delete(redis_key)
+            rows.append(row)
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=1024)
+    parser.add_argument("--redis", action="store_true", help="Mesurer MEMORY USAGE dans Redis")
+    args = parser.parse_args()
+
+    print(
+        f"{args.iterations} itérations par mesure, compression au-delà de {args.threshold} o, "
+        f"codecs: {', '.join(CODECS)}, compression: {', '.join(COMPRESSORS)}\n"
+    )
+    current_key = None
+    for row in run(args.iterations, args.threshold, args.redis):
+        if row["key"] != current_key:
+            current_key = row["key"]
+            print(f"\n{current_key}")
+        redis_bytes = f"  redis={row['redis_bytes']:>7} o" if "redis_bytes" in row else ""
+        print(
+            f"  {row['label']:<20} taille={row['bytes']:>7} o  encode={row['encode_us']:>8} µs  "
+            f"decode={row['decode_us']:>8} µs{redis_bytes}"
+        )
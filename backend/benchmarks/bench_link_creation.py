@@ -0,0 +1,99 @@
+"""
+Benchmark: latence de création d'un lien tracké
+
+Avant: INSERT + SELECT d'unicité (par tentative) + UPDATE du short_code
+Après: code pré-alloué par ShortCodeAllocator + un seul INSERT
+
+Usage:
+    python -m benchmarks.bench_link_creation --links 500 --latency-ms 5
+"""
+
+from datetime import datetime
+import argparse
+import secrets
+import statistics
+import time
+
+from benchmarks.stub_supabase import StubSupabase
+from short_code_allocator import ShortCodeAllocator
+
+
+def create_link_legacy(client: StubSupabase, n: int):
+    """Flux historique de TrackingService.create_tracking_link"""
+    link = {
+        "influencer_id": "inf-1",
+        "product_id": f"prod-{n}",
+        "destination_url": "https://boutique.ma/produit",
+        "status": "active",
+        "created_at": datetime.now().isoformat(),
+    }
+    link_id = client.table("tracking_links").insert(link).execute().data[0]["id"]
+
+    while True:
+        short_code = secrets.token_urlsafe(6)[:8].upper()
+        existing = client.table("tracking_links").select("id").eq("short_code", short_code).execute()
+        if not existing.data:
+            break
+
+    client.table("tracking_links").update({"short_code": short_code}).eq("id", link_id).execute()
+
+
+def create_link_allocated(client: StubSupabase, allocator: ShortCodeAllocator, n: int):
+    """Nouveau flux: code pré-alloué + un seul INSERT"""
+    link = {
+        "influencer_id": "inf-1",
+        "product_id": f"prod-{n}",
+        "destination_url": "https://boutique.ma/produit",
+        "short_code": allocator.allocate(),
+        "status": "active",
+        "created_at": datetime.now().isoformat(),
+    }
+    client.table("tracking_links").insert(link).execute()
+
+
+def _measure(label: str, client: StubSupabase, links: int, create) -> dict:
+    client.reset_counters()
+    latencies = []
+    for n in range(links):
+        started = time.perf_counter()
+        create(n)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    return {
+        "label": label,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "round_trips_per_link": round(client.total_round_trips / links, 2),
+    }
+
+
+def run(links: int = 500, latency_ms: float = 5.0, block_size: int = 1000) -> list:
+    legacy_client = StubSupabase(latency_ms=latency_ms)
+    allocated_client = StubSupabase(latency_ms=latency_ms)
+    allocator = ShortCodeAllocator(
+        supabase_client=allocated_client, block_size=block_size, low_watermark=0
+    )
+
+    return [
+        _measure("avant (select d'unicité + update)", legacy_client, links,
+                 lambda n: create_link_legacy(legacy_client, n)),
+        _measure("après (pool pré-alloué, 1 insert)", allocated_client, links,
+                 lambda n: create_link_allocated(allocated_client, allocator, n)),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--links", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--block-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"Création de {args.links} liens, latence simulée {args.latency_ms} ms/aller-retour\n")
+    for row in run(args.links, args.latency_ms, args.block_size):
+        print(
+            f"{row['label']:<40} p50={row['p50_ms']:>7} ms  p99={row['p99_ms']:>7} ms  "
+            f"moyenne={row['mean_ms']:>7} ms  allers-retours/lien={row['round_trips_per_link']}"
+        )
@@ -0,0 +1,125 @@
+"""
+Benchmark: débit du rate limiter Redis
+
+Avant: pipeline ZREMRANGEBYSCORE/ZCARD/ZADD/EXPIRE (+ ZRANGE si refus),
+       un membre de sorted set par requête
+Après: un EVALSHA par requête (gcra, token_bucket, sliding_window),
+       pré-filtre local des clients déjà bloqués
+
+Prérequis: Redis accessible via REDIS_URL
+
+Usage:
+    python -m benchmarks.bench_rate_limiter --requests 20000 --clients 200 --threads 8
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import random
+import time
+
+import redis
+
+from middleware.rate_limit_scripts import LocalDenyCache, ScriptedRateLimit
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+BENCH_PREFIX = "bench:ratelimit"
+
+
+def legacy_check(client: redis.Redis, key: str, limit: int, window: int) -> bool:
+    """Implémentation historique de RateLimiter.check_rate_limit"""
+    now = time.time()
+    pipe = client.pipeline()
+    pipe.zremrangebyscore(key, 0, now - window)
+    pipe.zcard(key)
+    pipe.zadd(key, {str(now): now})
+    pipe.expire(key, window * 2)
+    current_count = pipe.execute()[1]
+
+    if current_count >= limit:
+        client.zrange(key, 0, 0, withscores=True)
+        return False
+    return True
+
+
+def _cleanup(client: redis.Redis):
+    for key in client.scan_iter(f"{BENCH_PREFIX}:*", count=1000):
+        client.delete(key)
+
+
+def _memory_per_key(client: redis.Redis, pattern: str) -> float:
+    keys = list(client.scan_iter(pattern, count=1000))[:100]
+    if not keys:
+        return 0.0
+    return sum(client.memory_usage(key) or 0 for key in keys) / len(keys)
+
+
+def _measure(label: str, check, requests: int, clients: int, threads: int, hot_ratio: float) -> dict:
+    """hot_ratio: part des requêtes d'un client abusif (au-delà de sa limite)"""
+    identifiers = [
+        "hot" if random.random() < hot_ratio else f"client-{random.randrange(clients)}"
+        for _ in range(requests)
+    ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(check, identifiers))
+    duration = time.perf_counter() - started
+
+    return {
+        "label": label,
+        "req_per_s": round(requests / duration, 1),
+        "rejected": requests - sum(results),
+    }
+
+
+def run(requests: int, clients: int, threads: int, limit: int, window: int, hot_ratio: float) -> list:
+    client = redis.from_url(REDIS_URL)
+    _cleanup(client)
+    rows = []
+
+    row = _measure(
+        "avant (pipeline zset + zrange)",
+        lambda identifier: legacy_check(client, f"{BENCH_PREFIX}:legacy:{identifier}", limit, window),
+        requests, clients, threads, hot_ratio,
+    )
+    row["bytes_per_key"] = _memory_per_key(client, f"{BENCH_PREFIX}:legacy:*")
+    rows.append(row)
+
+    for strategy in ("gcra", "token_bucket", "sliding_window"):
+        for prefilter in (False, True):
+            limiter = ScriptedRateLimit(client, strategy, LocalDenyCache() if prefilter else None)
+            label = f"après ({strategy}{' + pré-filtre' if prefilter else ''})"
+            pattern = f"{BENCH_PREFIX}:{strategy}:{int(prefilter)}"
+
+            row = _measure(
+                label,
+                lambda identifier: limiter.hit(f"{pattern}:{identifier}", limit, window)[0],
+                requests, clients, threads, hot_ratio,
+            )
+            row["bytes_per_key"] = _memory_per_key(client, f"{pattern}:*")
+            rows.append(row)
+
+    _cleanup(client)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--hot-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requêtes, {args.clients} clients, {args.threads} threads, "
+        f"limite {args.limit}/{args.window}s, client abusif {int(args.hot_ratio * 100)}%\n"
+    )
+    for row in run(args.requests, args.clients, args.threads, args.limit, args.window, args.hot_ratio):
+        print(
+            f"{row['label']:<42} {row['req_per_s']:>10} req/s  refusées={row['rejected']:>6}  "
+            f"mémoire/clé={row['bytes_per_key']:>8.0f} o"
+        )
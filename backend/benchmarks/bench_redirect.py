@@ -0,0 +1,196 @@
+"""
+Benchmark: charge du service de redirection /r/{short_code}
+
+Les requêtes ASGI sont envoyées en processus (sans réseau ni uvicorn) à
+redirect_app, sur un StubSupabase (latence simulée par aller-retour): on
+mesure le débit et les latences p50 / p99 de la chaîne complète
+(routage, TrackingService, cache, file d'ingestion, cookie).
+
+Scénarios:
+- cache chaud: liens populaires d'une campagne, servis depuis le cache
+- cache froid: chaque clic résout un code différent (aller-retour BDD)
+
+--server mesure aussi l'app monolithique (server.py: CORS, rate limiter,
+middlewares) sur les mêmes scénarios; nécessite toutes les dépendances
+de l'API.
+
+Usage:
+    python -m benchmarks.bench_redirect --requests 2000 --concurrency 1 50 200
+    python -m benchmarks.bench_redirect --latency-ms 10 --links 20000 --server
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+# Le client Supabase est remplacé par le stub: valeurs factices suffisantes
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench.stub.key")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench.stub.key")
+
+import tracking_service as tracking_module
+from benchmarks.stub_supabase import StubSupabase
+from click_ingestion import click_ingestion
+from link_counters import link_counters
+from short_code_cache import short_code_cache
+
+HEADERS = [
+    (b"host", b"bench.shareyoursales.ma"),
+    (b"user-agent", b"Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)"),
+    (b"referer", b"https://www.instagram.com/"),
+]
+
+
+async def call(app, path: str) -> int:
+    """Une requête GET ASGI, retourne le code HTTP"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": HEADERS,
+        "client": ("203.0.113.7", 51234),
+        "server": ("bench", 80),
+    }
+    received = False
+    status = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # pas de déconnexion client
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, codes: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(code: str):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            status = await call(app, f"/r/{code}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != 302:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(code) for code in codes))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(codes) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "errors": errors,
+    }
+
+
+def install_stub(latency_ms: float, links: int) -> StubSupabase:
+    """Branche le stub sur TrackingService et les flushers de clics"""
+    client = StubSupabase(latency_ms=latency_ms)
+    client.tables["tracking_links"] = [
+        {
+            "id": f"link-{n}",
+            "influencer_id": f"inf-{n % 200}",
+            "destination_url": f"https://boutique.ma/produit/{n}",
+            "short_code": f"C{n:07d}",
+            "status": "active",
+        }
+        for n in range(links)
+    ]
+    tracking_module.supabase = client
+    click_ingestion._supabase = client
+    link_counters._supabase = client
+    return client
+
+
+def scenarios(requests: int, links: int, hot: int) -> dict:
+    hot_codes = [f"C{n:07d}" for n in range(hot)]
+    cold_codes = [f"C{n:07d}" for n in random.sample(range(hot, links), min(requests, links - hot))]
+    return {
+        "cache chaud": [random.choice(hot_codes) for _ in range(requests)],
+        "cache froid": cold_codes,
+    }
+
+
+async def run(apps: dict, client: StubSupabase, requests: int, links: int, hot: int, levels: list) -> list:
+    rows = []
+    for concurrency in levels:
+        for scenario, codes in scenarios(requests, links, hot).items():
+            for label, app in apps.items():
+                short_code_cache.clear()
+                if scenario == "cache chaud":
+                    for code in set(codes):
+                        await call(app, f"/r/{code}")
+
+                client.reset_counters()
+                result = await measure(app, codes, concurrency)
+                result["round_trips"] = client.round_trips["tracking_links.select"]
+                rows.append({"concurrency": concurrency, "scenario": scenario, "app": label, **result})
+    return rows
+
+
+def load_apps(with_server: bool) -> dict:
+    from redirect_app import app as redirect_app
+
+    apps = {"redirect_app": redirect_app}
+    if with_server:
+        from server import app as server_app
+
+        apps["server.py"] = server_app
+    return apps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--links", type=int, default=5000)
+    parser.add_argument("--hot", type=int, default=100, help="Liens populaires (scénario cache chaud)")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--server", action="store_true", help="Comparer avec l'app monolithique server.py")
+    args = parser.parse_args()
+
+    client = install_stub(args.latency_ms, args.links)
+    apps = load_apps(args.server)
+    click_ingestion.start()
+    link_counters.start()
+
+    print(
+        f"{args.requests} redirections par mesure, {args.links} liens, {args.hot} liens chauds, "
+        f"BDD simulée à {args.latency_ms} ms par aller-retour\n"
+    )
+    try:
+        rows = asyncio.run(run(apps, client, args.requests, args.links, args.hot, args.concurrency))
+    finally:
+        click_ingestion.stop()
+        link_counters.stop()
+
+    for row in rows:
+        print(
+            f"concurrence {row['concurrency']:>4}  {row['scenario']:<12} {row['app']:<13} "
+            f"{row['rps']:>9.1f} req/s  p50={row['p50']:>7.2f} ms  p99={row['p99']:>7.2f} ms  "
+            f"lectures BDD={row['round_trips']:>5}  erreurs={row['errors']}"
+        )
+    print(f"\nclics en file: {click_ingestion.stats['enqueued']}, écrits: {click_ingestion.stats['flushed']}")
@@ -0,0 +1,89 @@
+"""
+Benchmark: temps de démarrage (import) de l'API
+
+Lance `python -X importtime -c "import server"` dans un sous-processus
+pour chaque profil APP_FEATURES et agrège le temps propre (self) de chaque
+module par package racine (stripe, supabase, fastapi, marketplace_endpoints...):
+la somme des temps propres est le temps total d'import.
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --features all none marketplace,affiliation --top 25
+    python -m benchmarks.bench_startup --budget-ms 2500   # code retour 1 si dépassé (CI)
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Tuple
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time: self [us] | cumulative | imported package
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+
+
+def profile_import(module: str, features: str) -> Tuple[float, List[Tuple[str, float, float]], str]:
+    """
+    Importe `module` avec -X importtime
+
+    Returns:
+        (total ms, [(module, self ms, cumulatif ms), ...], dernière ligne d'erreur si échec)
+    """
+    env = dict(os.environ, APP_FEATURES=features, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    modules: List[Tuple[str, float, float]] = []
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules.append((match[3], int(match[1]) / 1000, int(match[2]) / 1000))
+
+    total_ms = sum(self_ms for _, self_ms, _ in modules)
+    error = completed.stderr.strip().splitlines()[-1] if completed.returncode else ""
+    return total_ms, modules, error
+
+
+def by_package(modules: List[Tuple[str, float, float]]) -> Dict[str, float]:
+    """Temps propre cumulé par package racine (stripe.api_resources.x -> stripe)"""
+    totals: Dict[str, float] = defaultdict(float)
+    for name, self_ms, _ in modules:
+        totals[name.split(".")[0]] += self_ms
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--features", nargs="+", default=["all", "none"])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Échec si un profil dépasse ce temps")
+    args = parser.parse_args()
+
+    over_budget = False
+    for features in args.features:
+        total_ms, modules, error = profile_import(args.module, features)
+        print(f"APP_FEATURES={features}: import {args.module} = {total_ms:.0f} ms")
+        if error:
+            print(f"  ⚠️ import interrompu: {error}")
+
+        ranking = sorted(by_package(modules).items(), key=lambda item: item[1], reverse=True)
+        for name, self_ms in ranking[: args.top]:
+            share = self_ms / total_ms * 100 if total_ms else 0
+            print(f"  {name:<40} {self_ms:>8.1f} ms  {share:>5.1f} %")
+        print()
+
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            print(f"❌ {total_ms:.0f} ms > budget {args.budget_ms:.0f} ms ({features})\n")
+            over_budget = True
+
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,166 @@
+"""
+Harnais local: tier WebSocket multi-nœuds
+
+Lance 1..N processus websocket_server (WS_NODE_ID / WS_PORT distincts, même
+Redis), répartit les connexions entre les nœuds puis publie vers des
+utilisateurs via ClusterPublisher (comme un worker backend). Mesure pour
+chaque taille de cluster les connexions tenues, le débit d'établissement et
+la livraison inter-nœuds (taux + latence bout en bout).
+
+Prérequis: Redis accessible via REDIS_URL
+
+Usage:
+    python -m benchmarks.bench_websocket_cluster --nodes 4 --connections-per-node 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import aiohttp
+import jwt
+
+from websocket_cluster import ClusterPublisher, PresenceRegistry
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Les nœuds héritent de l'environnement: même secret que websocket_server
+JWT_SECRET = os.getenv("JWT_SECRET", "fallback-secret-please-set-env-variable")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+
+def start_nodes(count: int, base_port: int) -> list:
+    processes = []
+    for index in range(count):
+        env = dict(os.environ, WS_NODE_ID=f"bench-node-{index}", WS_PORT=str(base_port + index))
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "websocket_server.py"],
+                cwd=BACKEND_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        )
+    return processes
+
+
+def stop_nodes(processes: list):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def wait_for_nodes(session: aiohttp.ClientSession, ports: list, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    for port in ports:
+        while True:
+            try:
+                async with session.get(f"http://localhost:{port}/metrics") as response:
+                    if response.status == 200:
+                        break
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Nœud sur le port {port} indisponible")
+            await asyncio.sleep(0.2)
+
+
+async def open_client(session, port: int, user_id: str, received: dict):
+    ws = await session.ws_connect(f"http://localhost:{port}/ws")
+    token = jwt.encode({"sub": user_id}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    await ws.send_json({"type": "auth", "token": token})
+    await ws.receive_json()  # auth_success
+
+    async def reader():
+        async for message in ws:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                event = json.loads(message.data)
+                if event.get("type") == "bench":
+                    received[event["data"]["seq"]] = time.perf_counter() - event["data"]["sent_at"]
+
+    return ws, asyncio.create_task(reader())
+
+
+async def run_cluster(nodes: int, per_node: int, messages: int, base_port: int) -> dict:
+    ports = [base_port + index for index in range(nodes)]
+    processes = start_nodes(nodes, base_port)
+    received: dict = {}
+    clients = []
+
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await wait_for_nodes(session, ports)
+
+            started = time.perf_counter()
+            users = [f"bench-user-{node}-{n}" for node in range(nodes) for n in range(per_node)]
+            clients = await asyncio.gather(
+                *(open_client(session, ports[i // per_node], user, received) for i, user in enumerate(users))
+            )
+            connect_s = time.perf_counter() - started
+
+            # Laisse le heartbeat publier les nœuds vivants
+            await asyncio.sleep(2)
+
+            publisher = ClusterPublisher(PresenceRegistry(node_id="bench-publisher"))
+            loop = asyncio.get_running_loop()
+            for seq in range(messages):
+                data = {"seq": seq, "sent_at": time.perf_counter()}
+                await loop.run_in_executor(
+                    None, publisher.publish_to_user, random.choice(users), "bench", data
+                )
+            await asyncio.sleep(1)
+
+            held = 0
+            for port in ports:
+                async with session.get(f"http://localhost:{port}/metrics") as response:
+                    held += (await response.json())["connections"]
+
+            for ws, reader in clients:
+                reader.cancel()
+                await ws.close()
+
+        latencies = sorted(latency * 1000 for latency in received.values())
+        return {
+            "nodes": nodes,
+            "connections": held,
+            "connect_per_s": round(len(users) / connect_s, 1),
+            "delivered": f"{len(received)}/{messages}",
+            "p50_ms": round(statistics.median(latencies), 2) if latencies else 0.0,
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else 0.0,
+        }
+    finally:
+        stop_nodes(processes)
+
+
+async def main(max_nodes: int, per_node: int, messages: int, base_port: int):
+    for nodes in range(1, max_nodes + 1):
+        row = await run_cluster(nodes, per_node, messages, base_port)
+        print(
+            f"{row['nodes']} nœud(s)  connexions={row['connections']:>6}  "
+            f"établissement={row['connect_per_s']:>8}/s  livrés={row['delivered']:>9}  "
+            f"p50={row['p50_ms']:>6} ms  p95={row['p95_ms']:>6} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--connections-per-node", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--base-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    print(f"Cluster WebSocket: 1..{args.nodes} nœuds, {args.connections_per_node} connexions/nœud\n")
+    asyncio.run(main(args.nodes, args.connections_per_node, args.messages, args.base_port))
@@ -0,0 +1,165 @@
+"""
+Client Supabase factice pour les benchmarks
+Simule la latence d'un aller-retour PostgREST et compte les requêtes,
+afin de mesurer localement l'effet des optimisations sans vraie BDD
+"""
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+import itertools
+import threading
+import time
+import uuid
+
+
+class StubResult:
+    """Équivalent minimal de la réponse postgrest (data / count)"""
+
+    def __init__(self, data: Any = None, count: Optional[int] = None):
+        self.data = data if data is not None else []
+        self.count = count
+
+
+class StubQuery:
+    """Builder de requête chaînable: chaque execute() = un aller-retour simulé"""
+
+    def __init__(self, client: "StubSupabase", table: str):
+        self.client = client
+        self.table_name = table
+        self.operation = "select"
+        self.payload: Any = None
+        self.filters: List[tuple] = []
+        self._limit: Optional[int] = None
+
+    def select(self, *args, **kwargs):
+        self.operation = "select"
+        return self
+
+    def insert(self, payload):
+        self.operation = "insert"
+        self.payload = payload
+        return self
+
+    def update(self, payload):
+        self.operation = "update"
+        self.payload = payload
+        return self
+
+    def upsert(self, payload, **kwargs):
+        self.operation = "upsert"
+        self.payload = payload
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(("eq", column, value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(("in", column, list(values)))
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def __getattr__(self, name):
+        # neq, gte, lt, order, range, is_, single... : sans effet sur le stub
+        return lambda *args, **kwargs: self
+
+    def _matches(self, row: Dict) -> bool:
+        for operator, column, value in self.filters:
+            if operator == "eq" and row.get(column) != value:
+                return False
+            if operator == "in" and row.get(column) not in value:
+                return False
+        return True
+
+    def execute(self) -> StubResult:
+        self.client._round_trip(self.table_name, self.operation)
+        rows = self.client.tables[self.table_name]
+
+        with self.client.lock:
+            if self.operation in ("insert", "upsert"):
+                payload = self.payload if isinstance(self.payload, list) else [self.payload]
+                created = []
+                for item in payload:
+                    row = {"id": str(uuid.uuid4()), **item}
+                    rows.append(row)
+                    created.append(row)
+                return StubResult(created)
+
+            matched = [row for row in rows if self._matches(row)]
+
+            if self.operation == "update":
+                for row in matched:
+                    row.update(self.payload)
+                return StubResult(matched)
+
+            if self.operation == "delete":
+                self.client.tables[self.table_name] = [r for r in rows if r not in matched]
+                return StubResult(matched)
+
+            if self._limit is not None:
+                matched = matched[: self._limit]
+            return StubResult([dict(row) for row in matched], count=len(matched))
+
+
+class StubRpc:
+    def __init__(self, client: "StubSupabase", name: str, params: Dict):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> StubResult:
+        self.client._round_trip("rpc", self.name)
+        handler = self.client.rpc_handlers.get(self.name)
+        return StubResult(handler(self.params) if handler else None)
+
+
+class StubSupabase:
+    """
+    Client factice: tables en mémoire + latence configurable par aller-retour
+
+    Args:
+        latency_ms: Latence simulée de chaque execute()
+    """
+
+    def __init__(self, latency_ms: float = 5.0):
+        self.latency = latency_ms / 1000
+        self.tables: Dict[str, List[Dict]] = defaultdict(list)
+        self.rpc_handlers: Dict[str, Callable[[Dict], Any]] = {}
+        self.round_trips: Dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+        self._sequence = itertools.count()
+
+        self.rpc_handlers["reserve_short_code_block"] = self._reserve_short_code_block
+
+    def _round_trip(self, table: str, operation: str):
+        self.round_trips[f"{table}.{operation}"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _reserve_short_code_block(self, params: Dict) -> int:
+        size = params["p_block_size"]
+        with self.lock:
+            block = next(self._sequence)
+        return block * size
+
+    def table(self, name: str) -> StubQuery:
+        return StubQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> StubRpc:
+        return StubRpc(self, name, params or {})
+
+    @property
+    def total_round_trips(self) -> int:
+        return sum(self.round_trips.values())
+
+    def reset_counters(self):
+        self.round_trips.clear()
@@ -0,0 +1,189 @@
+"""
+Codecs de sérialisation du cache
+
+Chaque valeur écrite dans Redis porte un en-tête de 4 octets:
+    0xFE | version du format | id du codec | id de la compression
+Le lecteur décode selon l'en-tête, pas selon sa propre configuration:
+le codec ou la compression peuvent changer sans invalider le cache ni
+casser un déploiement progressif. Les valeurs sans en-tête (JSON texte
+historique) restent lisibles.
+
+Codecs: json (stdlib), orjson, msgpack
+Compression (au-delà de CACHE_COMPRESS_THRESHOLD octets): zstd, lz4, zlib
+"""
+
+from typing import Any, Callable, Dict, Union
+import json
+import logging
+import os
+import zlib
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+HEADER_MAGIC = 0xFE  # jamais en tête d'un document JSON / UTF-8
+FORMAT_VERSION = 1
+HEADER_SIZE = 4
+
+CACHE_CODEC = os.getenv("CACHE_CODEC", "auto")
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "auto")
+CACHE_COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", 1024))
+
+
+class Codec:
+    """Sérialiseur identifié par un id stable (écrit dans l'en-tête)"""
+
+    def __init__(self, name: str, codec_id: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+        self.name = name
+        self.id = codec_id
+        self.dumps = dumps
+        self.loads = loads
+
+
+class Compressor:
+    """Compression identifiée par un id stable (écrit dans l'en-tête)"""
+
+    def __init__(self, name: str, compressor_id: int, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]):
+        self.name = name
+        self.id = compressor_id
+        self.compress = compress
+        self.decompress = decompress
+
+
+# Les ids sont persistés dans Redis: ne jamais réattribuer un id existant
+CODECS: Dict[str, Codec] = {
+    "json": Codec(
+        "json", 1,
+        lambda value: json.dumps(value, default=str, separators=(",", ":")).encode(),
+        json.loads,
+    ),
+}
+if ORJSON_AVAILABLE:
+    CODECS["orjson"] = Codec(
+        "orjson", 2,
+        lambda value: orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS),
+        orjson.loads,
+    )
+if MSGPACK_AVAILABLE:
+    CODECS["msgpack"] = Codec(
+        "msgpack", 3,
+        lambda value: msgpack.packb(value, default=str, use_bin_type=True),
+        lambda raw: msgpack.unpackb(raw, raw=False, strict_map_key=False),
+    )
+
+COMPRESSORS: Dict[str, Compressor] = {
+    "none": Compressor("none", 0, lambda raw: raw, lambda raw: raw),
+    "zlib": Compressor("zlib", 1, lambda raw: zlib.compress(raw, 1), zlib.decompress),
+}
+if LZ4_AVAILABLE:
+    COMPRESSORS["lz4"] = Compressor("lz4", 2, lz4.frame.compress, lz4.frame.decompress)
+if ZSTD_AVAILABLE:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    COMPRESSORS["zstd"] = Compressor(
+        "zstd", 3,
+        _zstd_compressor.compress,
+        # max_output_size: trames écrites sans taille de contenu
+        lambda raw: _zstd_decompressor.decompress(raw, max_output_size=64 * 1024 * 1024),
+    )
+
+_CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+
+def _resolve(name: str, registry: Dict, preference: tuple, kind: str):
+    if name == "auto":
+        name = next(candidate for candidate in preference if candidate in registry)
+    if name not in registry:
+        raise ValueError(f"{kind} de cache indisponible: {name} (disponibles: {', '.join(registry)})")
+    return registry[name]
+
+
+class CacheCodec:
+    """
+    Encode / décode les valeurs du cache
+
+    Args:
+        codec: json | orjson | msgpack | auto (orjson > msgpack > json)
+        compression: none | zlib | lz4 | zstd | auto (zstd > lz4 > zlib)
+        threshold: Taille (octets sérialisés) à partir de laquelle compresser
+    """
+
+    def __init__(
+        self,
+        codec: str = CACHE_CODEC,
+        compression: str = CACHE_COMPRESSION,
+        threshold: int = CACHE_COMPRESS_THRESHOLD,
+    ):
+        self.codec = _resolve(codec, CODECS, ("orjson", "msgpack", "json"), "Codec")
+        self.compressor = _resolve(compression, COMPRESSORS, ("zstd", "lz4", "zlib"), "Compression")
+        self.threshold = threshold
+
+    def encode(self, value: Any) -> bytes:
+        payload = self.codec.dumps(value)
+        compressor = COMPRESSORS["none"]
+
+        if self.compressor.id and len(payload) >= self.threshold:
+            compressed = self.compressor.compress(payload)
+            if len(compressed) < len(payload):
+                payload, compressor = compressed, self.compressor
+
+        return bytes((HEADER_MAGIC, FORMAT_VERSION, self.codec.id, compressor.id)) + payload
+
+    @staticmethod
+    def decode(raw: Union[bytes, str]) -> Any:
+        """
+        Décode selon l'en-tête (ValueError si format / codec inconnu:
+        à traiter comme un miss)
+        """
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if not raw or raw[0] != HEADER_MAGIC:
+            return json.loads(raw)
+
+        version, codec_id, compressor_id = raw[1], raw[2], raw[3]
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Version de format de cache inconnue: {version}")
+
+        codec = _CODECS_BY_ID.get(codec_id)
+        compressor = _COMPRESSORS_BY_ID.get(compressor_id)
+        if codec is None or compressor is None:
+            raise ValueError(f"Codec de cache indisponible: codec={codec_id} compression={compressor_id}")
+
+        return codec.loads(compressor.decompress(raw[HEADER_SIZE:]))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "codec": self.codec.name,
+            "compression": self.compressor.name,
+            "threshold": self.threshold,
+            "format_version": FORMAT_VERSION,
+        }
+
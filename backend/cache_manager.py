@@ -1,176 +1,746 @@
 """
 Cache Manager - Gestion centralisée du cache Redis
 Permet de réduire la charge DB pour les données fréquemment consultées
+
+API unique du cache (services/cache_service.py n'est plus qu'un alias):
+- namespaces versionnés: invalidation en O(1) par incrément de génération,
+  les anciennes clés deviennent inaccessibles et expirent par TTL
+- tags: écriture valeur + tags en un seul pipeline, tags en sorted set
+  (score = échéance de la clé) élagués en tâche de fond (prune_tags)
+- aucune commande KEYS: invalidate_pattern passe par SCAN + UNLINK
+- deux niveaux pour fetch/@cached: L1 en process (mêmes octets encodés
+  que L2, copie décodée à chaque lecture, TTL court) devant Redis (L2), calcul single-flight par clé et
+  rafraîchissement anticipé probabiliste (XFetch) contre les stampedes
+- valeurs encodées par cache_codecs (orjson/msgpack, compression au-delà
+  d'un seuil, en-tête versionné) sur une connexion binaire dédiée
 """
 
-import redis
-import json
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+import asyncio
+import math
 import os
-from typing import Optional, Any, Callable
+import random
+import threading
+import time
+from typing import Optional, Any, Callable, Dict, List, Tuple
 from functools import wraps
-from datetime import timedelta
 import logging
 
+from cache_codecs import CacheCodec
+
 logger = logging.getLogger(__name__)
 
 # Configuration Redis
+REDIS_URL = os.getenv("REDIS_URL")
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
 
+CACHE_PREFIX = "sysales:cache:"
+
 # Durées de cache par défaut
 CACHE_TTL_SHORT = 60  # 1 minute
-CACHE_TTL_MEDIUM = 300  # 5 minutes  
+CACHE_TTL_MEDIUM = 300  # 5 minutes
 CACHE_TTL_LONG = 3600  # 1 heure
+CACHE_DEFAULT_TTL = CACHE_TTL_LONG
+
+# Génération des namespaces relue au plus toutes les N secondes par process
+# (délai maximal de visibilité d'une invalidation faite par une autre instance)
+CACHE_NAMESPACE_REFRESH = float(os.getenv("CACHE_NAMESPACE_REFRESH", 1.0))
+CACHE_DELETE_BATCH = 500
+
+# L1 en process: borne la péremption après une invalidation faite ailleurs
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", 5))
+CACHE_L1_MAX_SIZE = int(os.getenv("CACHE_L1_MAX_SIZE", 2048))
+# XFetch: > 1 rafraîchit plus tôt, 0 désactive le rafraîchissement anticipé
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("CACHE_EARLY_REFRESH_BETA", 1.0))
+
+
+class LocalCache:
+    """Cache L1 en process (LRU borné, échéance par entrée)"""
+
+    def __init__(self, max_size: int = CACHE_L1_MAX_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _should_refresh(envelope: dict, beta: float) -> bool:
+    """
+    XFetch: recalcul anticipé avec une probabilité croissante à l'approche
+    de l'échéance, d'autant plus tôt que le calcul est long (delta)
+    """
+    if beta <= 0:
+        return time.time() >= envelope["e"]
+    return time.time() - envelope["d"] * beta * math.log(1.0 - random.random()) >= envelope["e"]
+
+
+def _new_namespace_stats() -> Dict[str, float]:
+    return {
+        "l1_hits": 0,
+        "l2_hits": 0,
+        "misses": 0,
+        "early_refreshes": 0,
+        "coalesced": 0,
+        "hit_ms": 0.0,
+        "compute_ms": 0.0,
+    }
 
 
 class CacheManager:
     """Gestionnaire de cache Redis avec fallback gracieux"""
-    
-    def __init__(self):
-        self.redis_client = None
-        self._connect()
-    
+
+    def __init__(self, redis_client=None, prefix: str = CACHE_PREFIX, binary_client=None, codec: Optional[CacheCodec] = None):
+        self.prefix = prefix
+        # Texte: générations, tags, verrous. Binaire: valeurs encodées
+        self.redis_client = redis_client
+        self.binary_client = binary_client or redis_client
+        self.codec = codec or CacheCodec()
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "deletes": 0,
+            "invalidations": 0,
+        }
+        self.local = LocalCache()
+        self.early_refresh_beta = CACHE_EARLY_REFRESH_BETA
+        self._namespace_stats: Dict[str, Dict[str, float]] = defaultdict(_new_namespace_stats)
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_async: Dict[Tuple[int, str], "asyncio.Future"] = {}
+        if redis_client is None:
+            self._connect()
+
     def _connect(self):
         """Connexion à Redis avec gestion d'erreurs"""
         try:
-            self.redis_client = redis.Redis(
-                host=REDIS_HOST,
-                port=REDIS_PORT,
-                db=REDIS_DB,
-                password=REDIS_PASSWORD,
-                decode_responses=True,
-                socket_connect_timeout=2,
-                socket_timeout=2
-            )
+            import redis
+
+            def client(decode_responses: bool):
+                if REDIS_URL:
+                    return redis.from_url(
+                        REDIS_URL, decode_responses=decode_responses, socket_connect_timeout=2, socket_timeout=2
+                    )
+                return redis.Redis(
+                    host=REDIS_HOST,
+                    port=REDIS_PORT,
+                    db=REDIS_DB,
+                    password=REDIS_PASSWORD,
+                    decode_responses=decode_responses,
+                    socket_connect_timeout=2,
+                    socket_timeout=2
+                )
+
+            self.redis_client = client(decode_responses=True)
+            self.binary_client = client(decode_responses=False)
             # Test connexion
             self.redis_client.ping()
-            logger.info(f"✅ Redis connecté: {REDIS_HOST}:{REDIS_PORT}")
+            logger.info(f"✅ Redis connecté: {REDIS_URL or f'{REDIS_HOST}:{REDIS_PORT}'}")
         except Exception as e:
             logger.warning(f"⚠️ Redis non disponible: {e}. Cache désactivé (fallback gracieux).")
             self.redis_client = None
-    
-    def get(self, key: str) -> Optional[Any]:
+            self.binary_client = None
+
+    @property
+    def redis(self):
+        """Alias historique (services.cache_service.RedisCache.redis)"""
+        return self.redis_client
+
+    # ============================================
+    # CLÉS ET NAMESPACES
+    # ============================================
+
+    def _make_key(self, key: str, namespace: Optional[str] = None) -> str:
+        """Clé Redis complète: préfixe [+ namespace:v<génération>] + clé"""
+        if namespace is None:
+            return f"{self.prefix}{key}"
+        return f"{self.prefix}{namespace}:v{self._generation(namespace)}:{key}"
+
+    def _namespace_key(self, namespace: str) -> str:
+        return f"{self.prefix}ns:{namespace}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    @property
+    def _tag_registry(self) -> str:
+        return f"{self.prefix}tags"
+
+    def _generation(self, namespace: str) -> int:
+        """Génération courante du namespace (cache local de CACHE_NAMESPACE_REFRESH s)"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._generations.get(namespace)
+        if cached and cached[1] > now:
+            return cached[0]
+        if not self.redis_client:
+            return 0
+
+        generation = int(self.redis_client.get(self._namespace_key(namespace)) or 0)
+        with self._lock:
+            self._generations[namespace] = (generation, now + CACHE_NAMESPACE_REFRESH)
+        return generation
+
+    def invalidate_namespace(self, namespace: str) -> bool:
+        """
+        Invalide tout un namespace en O(1)
+
+        Incrémente la génération: les clés de l'ancienne génération ne sont
+        plus jamais lues et disparaissent à l'expiration de leur TTL.
+        """
+        if not self.redis_client:
+            return False
+
+        try:
+            generation = self.redis_client.incr(self._namespace_key(namespace))
+            with self._lock:
+                self._generations[namespace] = (int(generation), time.monotonic() + CACHE_NAMESPACE_REFRESH)
+            self.stats["invalidations"] += 1
+            logger.info(f"🗑️ Invalidation namespace: {namespace} (génération {generation})")
+            return True
+        except Exception as e:
+            logger.error(f"Erreur invalidation namespace {namespace}: {e}")
+            return False
+
+    # ============================================
+    # LECTURE / ÉCRITURE
+    # ============================================
+
+    def get(self, key: str, namespace: Optional[str] = None) -> Optional[Any]:
         """Récupère une valeur du cache"""
         if not self.redis_client:
             return None
-        
+
         try:
-            value = self.redis_client.get(key)
+            value = self.binary_client.get(self._make_key(key, namespace))
             if value:
+                self.stats["hits"] += 1
                 logger.debug(f"🎯 Cache HIT: {key}")
-                return json.loads(value)
+                return self.codec.decode(value)
+            self.stats["misses"] += 1
             logger.debug(f"❌ Cache MISS: {key}")
             return None
         except Exception as e:
             logger.error(f"Erreur lecture cache {key}: {e}")
             return None
-    
-    def set(self, key: str, value: Any, ttl: int = CACHE_TTL_MEDIUM):
-        """Enregistre une valeur dans le cache"""
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = CACHE_TTL_MEDIUM,
+        tags: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+    ):
+        """
+        Enregistre une valeur dans le cache
+
+        Valeur et tags écrits en un seul aller-retour (pipeline). Chaque tag
+        est un sorted set: membre = clé, score = échéance de la clé.
+        """
         if not self.redis_client:
             return False
-        
+
         try:
-            serialized = json.dumps(value, default=str)
-            self.redis_client.setex(key, ttl, serialized)
+            self._write(self._make_key(key, namespace), self.codec.encode(value), ttl, tags)
+            self.stats["sets"] += 1
             logger.debug(f"💾 Cache SET: {key} (TTL: {ttl}s)")
             return True
         except Exception as e:
             logger.error(f"Erreur écriture cache {key}: {e}")
             return False
-    
-    def delete(self, key: str):
+
+    def _write(self, cache_key: str, payload: bytes, ttl: int, tags: Optional[List[str]], expires_at: Optional[float] = None):
+        """Valeur (+ tags) en un seul aller-retour"""
+        if not tags:
+            self.binary_client.setex(cache_key, ttl, payload)
+            return
+
+        expires_at = expires_at or time.time() + ttl
+        pipe = self.binary_client.pipeline(transaction=False)
+        pipe.setex(cache_key, ttl, payload)
+        for tag in tags:
+            pipe.zadd(self._tag_key(tag), {cache_key: expires_at})
+        pipe.sadd(self._tag_registry, *tags)
+        pipe.execute()
+
+    def delete(self, key: str, namespace: Optional[str] = None):
         """Supprime une clé du cache"""
         if not self.redis_client:
             return False
-        
+
         try:
-            self.redis_client.delete(key)
+            cache_key = self._make_key(key, namespace)
+            self.local.pop(cache_key)
+            self.redis_client.delete(cache_key)
+            self.stats["deletes"] += 1
             logger.debug(f"🗑️ Cache DELETE: {key}")
             return True
         except Exception as e:
             logger.error(f"Erreur suppression cache {key}: {e}")
             return False
-    
+
+    def _unlink(self, keys: List[str]) -> int:
+        """Suppression non bloquante (UNLINK) par lots"""
+        deleted = 0
+        for start in range(0, len(keys), CACHE_DELETE_BATCH):
+            deleted += self.redis_client.unlink(*keys[start:start + CACHE_DELETE_BATCH])
+        return deleted
+
+    # ============================================
+    # TAGS
+    # ============================================
+
+    def delete_by_tag(self, tag: str) -> int:
+        """
+        Supprime toutes les clés vivantes associées à un tag
+
+        Example:
+            cache.set("user:123", data, tags=["users", "user:123"])
+            cache.delete_by_tag("users")  # Supprime tous les users
+        """
+        if not self.redis_client:
+            return 0
+
+        tag_key = self._tag_key(tag)
+        try:
+            cache_keys = self.redis_client.zrangebyscore(tag_key, time.time(), "+inf")
+            self.local.pop(*cache_keys)
+            deleted = self._unlink(list(cache_keys)) if cache_keys else 0
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(tag_key)
+            pipe.srem(self._tag_registry, tag)
+            pipe.execute()
+
+            self.stats["deletes"] += deleted
+            logger.info(f"🗑️ Invalidation tag: {tag} ({deleted} clés)")
+            return deleted
+        except Exception as e:
+            logger.error(f"Erreur invalidation tag {tag}: {e}")
+            return 0
+
+    def prune_tags(self, batch_size: int = CACHE_DELETE_BATCH) -> Dict[str, int]:
+        """
+        Élague les membres expirés des tags (tâche de fond)
+
+        Les clés expirent seules mais restent référencées par leurs tags:
+        retire les membres dont l'échéance est passée et supprime les tags vides.
+        """
+        result = {"tags": 0, "pruned_members": 0, "dropped_tags": 0}
+        if not self.redis_client:
+            return result
+
+        try:
+            tags = list(self.redis_client.sscan_iter(self._tag_registry, count=batch_size))
+            now = time.time()
+
+            for start in range(0, len(tags), batch_size):
+                chunk = tags[start:start + batch_size]
+                pipe = self.redis_client.pipeline(transaction=False)
+                for tag in chunk:
+                    pipe.zremrangebyscore(self._tag_key(tag), "-inf", now)
+                    pipe.zcard(self._tag_key(tag))
+                replies = pipe.execute()
+
+                empty = [tag for tag, remaining in zip(chunk, replies[1::2]) if not remaining]
+                result["pruned_members"] += sum(replies[0::2])
+                if empty:
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    pipe.delete(*[self._tag_key(tag) for tag in empty])
+                    pipe.srem(self._tag_registry, *empty)
+                    pipe.execute()
+                    result["dropped_tags"] += len(empty)
+
+            result["tags"] = len(tags)
+            logger.info(f"🧹 Tags élagués: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"Erreur élagage tags: {e}")
+            return result
+
+    # ============================================
+    # DEUX NIVEAUX + SINGLE-FLIGHT
+    # ============================================
+
+    def _lookup(self, cache_key: str, stats: Dict[str, float]) -> Tuple[Optional[dict], bool]:
+        """
+        Enveloppe {v, d, e} depuis L1 puis L2
+
+        L1 garde les octets encodés: chaque lecture décode une copie neuve,
+        aucun appelant ne partage (ni ne modifie) l'objet d'un autre, et L1
+        renvoie exactement les mêmes types que L2.
+
+        Returns:
+            (enveloppe ou None, True si elle doit être recalculée)
+        """
+        started = time.perf_counter()
+        entry = self.local.get(cache_key)
+        raw = entry["raw"] if entry else None
+        tier = "l1_hits"
+
+        if entry is None and self.redis_client:
+            tier = "l2_hits"
+            try:
+                raw = self.binary_client.get(cache_key)
+            except Exception as e:
+                logger.error(f"Erreur lecture cache {cache_key}: {e}")
+
+        envelope = None
+        if raw:
+            try:
+                envelope = self.codec.decode(raw)
+            except Exception as e:
+                logger.error(f"Erreur décodage cache {cache_key}: {e}")
+            if not isinstance(envelope, dict) or "e" not in envelope:
+                # Valeur brute écrite par set(): recalculée sous forme d'enveloppe
+                envelope = None
+            elif entry is None:
+                self.local.set(
+                    cache_key,
+                    {"d": envelope["d"], "e": envelope["e"], "raw": raw},
+                    min(CACHE_L1_TTL, max(0.0, envelope["e"] - time.time())),
+                )
+
+        if envelope is None:
+            return None, True
+
+        if _should_refresh(entry or envelope, self.early_refresh_beta):
+            stats["early_refreshes"] += 1
+            return envelope, True
+
+        stats[tier] += 1
+        stats["hit_ms"] += (time.perf_counter() - started) * 1000
+        return envelope, False
+
+    def _store(self, cache_key: str, value: Any, delta: float, ttl: int, tags: Optional[List[str]]) -> Optional[bytes]:
+        """Encode une fois, mêmes octets en L1 et en L2 (None si la valeur n'est pas encodable)"""
+        expires_at = time.time() + ttl
+        try:
+            raw = self.codec.encode({"v": value, "d": delta, "e": expires_at})
+        except Exception as e:
+            logger.error(f"Erreur encodage cache {cache_key}: {e}")
+            return None
+
+        self.local.set(cache_key, {"d": delta, "e": expires_at, "raw": raw}, min(CACHE_L1_TTL, ttl))
+
+        if self.redis_client:
+            try:
+                self._write(cache_key, raw, ttl, tags, expires_at=expires_at)
+                self.stats["sets"] += 1
+            except Exception as e:
+                logger.error(f"Erreur écriture cache {cache_key}: {e}")
+        return raw
+
+    def _fresh(self, raw: Optional[bytes], value: Any) -> Any:
+        """Copie décodée de la valeur calculée (la valeur elle-même si non encodable)"""
+        return self.codec.decode(raw)["v"] if raw is not None else value
+
+    def fetch(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int = CACHE_TTL_MEDIUM,
+        tags: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+        stats_name: Optional[str] = None,
+    ) -> Any:
+        """
+        Lecture L1 -> L2 -> calcul (un seul calcul concurrent par clé)
+
+        Pendant un rafraîchissement anticipé, les autres appelants reçoivent
+        la valeur courante au lieu d'attendre.
+        """
+        stats = self._namespace_stats[stats_name or namespace or "default"]
+        try:
+            cache_key = self._make_key(key, namespace)
+        except Exception as e:
+            logger.error(f"Erreur génération namespace {namespace}: {e}")
+            return compute()
+
+        envelope, refresh = self._lookup(cache_key, stats)
+        if not refresh:
+            return envelope["v"]
+
+        with self._lock:
+            flight = self._inflight.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[cache_key] = Future()
+
+        if not leader:
+            stats["coalesced"] += 1
+            return envelope["v"] if envelope is not None else self._fresh(*flight.result())
+
+        try:
+            stats["misses"] += envelope is None
+            started = time.perf_counter()
+            value = compute()
+            delta = time.perf_counter() - started
+            stats["compute_ms"] += delta * 1000
+            raw = self._store(cache_key, value, delta, ttl, tags)
+            flight.set_result((raw, value))
+            return self._fresh(raw, value)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+
+    async def afetch(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int = CACHE_TTL_MEDIUM,
+        tags: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+        stats_name: Optional[str] = None,
+    ) -> Any:
+        """Variante async de fetch (compute retourne une coroutine)"""
+        stats = self._namespace_stats[stats_name or namespace or "default"]
+        try:
+            cache_key = self._make_key(key, namespace)
+        except Exception as e:
+            logger.error(f"Erreur génération namespace {namespace}: {e}")
+            return await compute()
+
+        envelope, refresh = self._lookup(cache_key, stats)
+        if not refresh:
+            return envelope["v"]
+
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), cache_key)
+        flight = self._inflight_async.get(flight_key)
+        if flight is not None:
+            stats["coalesced"] += 1
+            return envelope["v"] if envelope is not None else self._fresh(*await asyncio.shield(flight))
+
+        flight = self._inflight_async[flight_key] = loop.create_future()
+        try:
+            stats["misses"] += envelope is None
+            started = time.perf_counter()
+            value = await compute()
+            delta = time.perf_counter() - started
+            stats["compute_ms"] += delta * 1000
+            raw = self._store(cache_key, value, delta, ttl, tags)
+            flight.set_result((raw, value))
+            return self._fresh(raw, value)
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Marquée comme lue: aucun warning si personne n'attendait
+            flight.exception()
+            raise
+        finally:
+            self._inflight_async.pop(flight_key, None)
+
+    # ============================================
+    # PATTERNS (ADMIN / MIGRATION)
+    # ============================================
+
     def invalidate_pattern(self, pattern: str):
-        """Invalide toutes les clés correspondant au pattern"""
+        """
+        Invalide toutes les clés correspondant au pattern
+
+        Parcours incrémental (SCAN + UNLINK, jamais KEYS): coût proportionnel
+        au keyspace. Préférer invalidate_namespace / delete_by_tag.
+        """
         if not self.redis_client:
             return False
-        
+
         try:
-            keys = self.redis_client.keys(pattern)
+            keys = list(self.redis_client.scan_iter(match=self._make_key(pattern), count=1000))
+            self.local.clear()
             if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"🗑️ Invalidation cache pattern: {pattern} ({len(keys)} clés)")
+                deleted = self._unlink(keys)
+                self.stats["deletes"] += deleted
+                logger.info(f"🗑️ Invalidation cache pattern: {pattern} ({deleted} clés)")
             return True
         except Exception as e:
             logger.error(f"Erreur invalidation pattern {pattern}: {e}")
             return False
-    
+
+    def delete_by_pattern(self, pattern: str) -> bool:
+        """Alias historique de invalidate_pattern"""
+        return self.invalidate_pattern(pattern)
+
     def flush_all(self):
         """Vide tout le cache (à utiliser avec précaution!)"""
         if not self.redis_client:
             return False
-        
+
         try:
             self.redis_client.flushdb()
+            with self._lock:
+                self._generations.clear()
+            self.local.clear()
             logger.warning("⚠️ Cache FLUSH: Toutes les données supprimées")
             return True
         except Exception as e:
             logger.error(f"Erreur flush cache: {e}")
             return False
 
+    clear_all = flush_all
+
+    # ============================================
+    # MONITORING
+    # ============================================
+
+    def get_stats(self) -> dict:
+        """Statistiques du cache (process courant)"""
+        total_requests = self.stats["hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] / total_requests * 100) if total_requests > 0 else 0
+
+        return {
+            **self.stats,
+            "total_requests": total_requests,
+            "hit_rate_percent": round(hit_rate, 2),
+            "backend": "redis" if self.redis_client else "disabled",
+            "codec": self.codec.describe(),
+            "l1": {"size": len(self.local), "max_size": self.local.max_size, "ttl": CACHE_L1_TTL},
+            "namespaces": {name: self._summarize(counters) for name, counters in list(self._namespace_stats.items())},
+        }
+
+    @staticmethod
+    def _summarize(counters: Dict[str, float]) -> dict:
+        hits = counters["l1_hits"] + counters["l2_hits"]
+        computes = counters["misses"] + counters["early_refreshes"]
+        lookups = hits + computes
+        return {
+            "l1_hits": counters["l1_hits"],
+            "l2_hits": counters["l2_hits"],
+            "misses": counters["misses"],
+            "early_refreshes": counters["early_refreshes"],
+            "coalesced": counters["coalesced"],
+            "hit_rate_percent": round(hits / lookups * 100, 2) if lookups else 0,
+            "avg_hit_ms": round(counters["hit_ms"] / hits, 3) if hits else 0,
+            "avg_compute_ms": round(counters["compute_ms"] / computes, 3) if computes else 0,
+        }
+
+    def get_memory_info(self) -> dict:
+        """Info mémoire Redis"""
+        if not self.redis_client:
+            return {}
+
+        try:
+            info = self.redis_client.info("memory")
+            return {
+                "used_memory_human": info.get("used_memory_human"),
+                "used_memory_peak_human": info.get("used_memory_peak_human"),
+                "maxmemory_human": info.get("maxmemory_human", "unlimited"),
+                "mem_fragmentation_ratio": info.get("mem_fragmentation_ratio")
+            }
+        except Exception as e:
+            logger.error(f"Erreur info mémoire Redis: {e}")
+            return {}
+
 
 # Instance globale
 cache = CacheManager()
 
 
-def cached(ttl: int = CACHE_TTL_MEDIUM, key_prefix: str = ""):
+def cached(
+    ttl: int = CACHE_TTL_MEDIUM,
+    key_prefix: str = "",
+    tags: Optional[List[str]] = None,
+    namespace: Optional[str] = None,
+    key_builder: Optional[Callable] = None,
+):
     """
-    Décorateur pour mettre en cache le résultat d'une fonction
-    
+    Décorateur pour mettre en cache le résultat d'une fonction (sync ou async)
+
+    L1 en process puis Redis; un seul calcul concurrent par clé, rafraîchi
+    avant expiration (XFetch). Stats par namespace dans cache.get_stats().
+
     Usage:
         @cached(ttl=300, key_prefix="dashboard_stats")
         def get_dashboard_stats(user_id: str, role: str):
             # Calculs lourds
             return stats
-    
+
     Args:
         ttl: Durée de vie du cache en secondes
         key_prefix: Préfixe pour la clé de cache
+        tags: Tags pour invalidation groupée
+        namespace: Namespace versionné (invalidate_namespace)
+        key_builder: Fonction custom pour générer la clé (optionnel)
     """
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs):
+        def make_key(args, kwargs) -> str:
             # Générer clé de cache unique basée sur fonction + arguments
-            func_name = func.__name__
+            if key_builder:
+                return f"{key_prefix}:{key_builder(*args, **kwargs)}"
             args_key = "_".join(str(arg) for arg in args)
             kwargs_key = "_".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
-            cache_key = f"{key_prefix}:{func_name}:{args_key}:{kwargs_key}"
-            
-            # Essayer de récupérer du cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # Si pas en cache, exécuter fonction
-            result = func(*args, **kwargs)
-            
-            # Mettre en cache le résultat
-            cache.set(cache_key, result, ttl)
-            
-            return result
-        
+            return f"{key_prefix}:{func.__name__}:{args_key}:{kwargs_key}"
+
+        stats_name = namespace or key_prefix or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await cache.afetch(
+                    make_key(args, kwargs),
+                    lambda: func(*args, **kwargs),
+                    ttl, tags=tags, namespace=namespace, stats_name=stats_name,
+                )
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # L1 -> Redis -> calcul (single-flight)
+            return cache.fetch(
+                make_key(args, kwargs),
+                lambda: func(*args, **kwargs),
+                ttl, tags=tags, namespace=namespace, stats_name=stats_name,
+            )
+
         return wrapper
     return decorator
 
 
 def invalidate_cache(pattern: str):
     """
-    Invalide le cache pour un pattern donné
-    
+    Invalide le cache pour un pattern donné (SCAN, coût proportionnel au keyspace)
+
     Usage:
         # Après modification user
         invalidate_cache("dashboard_stats:*")
@@ -178,42 +748,174 @@ def invalidate_cache(pattern: str):
     return cache.invalidate_pattern(pattern)
 
 
+# ============================================
+# CLÉS, NAMESPACES ET TAGS STANDARDISÉS
+# ============================================
+
+class CacheKeys:
+    """Générateurs de clés de cache standardisés"""
+
+    @staticmethod
+    def user(user_id: str) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def user_profile(user_id: str) -> str:
+        return f"user:{user_id}:profile"
+
+    @staticmethod
+    def user_stats(user_id: str) -> str:
+        return f"user:{user_id}:stats"
+
+    @staticmethod
+    def product(product_id: str) -> str:
+        return f"product:{product_id}"
+
+    @staticmethod
+    def products_list(merchant_id: str, page: int = 1) -> str:
+        return f"products:{merchant_id}:page:{page}"
+
+    @staticmethod
+    def social_stats(user_id: str, platform: str) -> str:
+        return f"social:{user_id}:{platform}:stats"
+
+    @staticmethod
+    def affiliate_link(link_id: str) -> str:
+        return f"link:{link_id}"
+
+    @staticmethod
+    def tracking_stats(link_id: str, period: str) -> str:
+        return f"tracking:{link_id}:{period}"
+
+    @staticmethod
+    def subscription(user_id: str) -> str:
+        return f"subscription:{user_id}"
+
+    @staticmethod
+    def quotas(user_id: str) -> str:
+        return f"quotas:{user_id}"
+
+
+class CacheNamespaces:
+    """Namespaces versionnés (invalidation groupée en O(1))"""
+
+    @staticmethod
+    def user(user_id: str) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def merchant_products(merchant_id: str) -> str:
+        return f"products:{merchant_id}"
+
+    @staticmethod
+    def social(user_id: str) -> str:
+        return f"social:{user_id}"
+
+
+class CacheTags:
+    """Tags standardisés pour invalidation groupée"""
+
+    USERS = "users"
+    PRODUCTS = "products"
+    SOCIAL_STATS = "social_stats"
+    TRACKING = "tracking"
+    SUBSCRIPTIONS = "subscriptions"
+
+    @staticmethod
+    def user(user_id: str) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def merchant(merchant_id: str) -> str:
+        return f"merchant:{merchant_id}"
+
+    @staticmethod
+    def product(product_id: str) -> str:
+        return f"product:{product_id}"
+
+
+class CacheInvalidator:
+    """Helpers pour invalidation de cache (namespaces + tags, sans parcours du keyspace)"""
+
+    @staticmethod
+    def invalidate_user(user_id: str):
+        """Invalider tout le cache d'un utilisateur"""
+        cache.delete_by_tag(CacheTags.user(user_id))
+        cache.invalidate_namespace(CacheNamespaces.user(user_id))
+
+    @staticmethod
+    def invalidate_merchant(merchant_id: str):
+        """Invalider tout le cache d'un marchand"""
+        cache.delete_by_tag(CacheTags.merchant(merchant_id))
+        cache.invalidate_namespace(CacheNamespaces.merchant_products(merchant_id))
+
+    @staticmethod
+    def invalidate_product(product_id: str, merchant_id: str):
+        """Invalider cache d'un produit"""
+        cache.delete(CacheKeys.product(product_id))
+        cache.invalidate_namespace(CacheNamespaces.merchant_products(merchant_id))
+
+    @staticmethod
+    def invalidate_social_stats(user_id: str, platform: str):
+        """Invalider stats sociales"""
+        cache.invalidate_namespace(CacheNamespaces.social(user_id))
+
+    @staticmethod
+    def invalidate_subscription(user_id: str):
+        """Invalider abonnement et quotas"""
+        cache.delete(CacheKeys.subscription(user_id))
+        cache.delete(CacheKeys.quotas(user_id))
+
+
+async def warm_cache():
+    """
+    Préchauffer le cache avec données fréquemment utilisées
+
+    À appeler au démarrage de l'application
+    """
+    logger.info("🔥 Préchauffage du cache")
+
+
 # Fonctions helper pour patterns courants
 def cache_dashboard_stats(user_id: str, role: str, stats: dict):
     """Cache les stats dashboard pour un user"""
-    key = f"dashboard_stats:{role}:{user_id}"
-    cache.set(key, stats, CACHE_TTL_MEDIUM)
+    key = f"dashboard_stats:{role}"
+    cache.set(key, stats, CACHE_TTL_MEDIUM, namespace=CacheNamespaces.user(user_id))
 
 
 def get_cached_dashboard_stats(user_id: str, role: str) -> Optional[dict]:
     """Récupère les stats dashboard depuis le cache"""
-    key = f"dashboard_stats:{role}:{user_id}"
-    return cache.get(key)
+    key = f"dashboard_stats:{role}"
+    return cache.get(key, namespace=CacheNamespaces.user(user_id))
 
 
 def invalidate_user_cache(user_id: str):
     """Invalide tout le cache d'un user"""
-    cache.invalidate_pattern(f"*:{user_id}:*")
-    cache.invalidate_pattern(f"*:{user_id}")
+    CacheInvalidator.invalidate_user(user_id)
 
 
 if __name__ == "__main__":
     # Test du cache
     print("🧪 Test Cache Manager")
-    
+
     # Test set/get
     cache.set("test_key", {"message": "Hello Redis"}, 60)
     result = cache.get("test_key")
     print(f"✅ Test set/get: {result}")
-    
+
+    # Test namespace versionné
+    cache.set("profile", {"name": "Test"}, 60, namespace="user:test")
+    cache.invalidate_namespace("user:test")
+    print(f"✅ Test namespace invalidé: {cache.get('profile', namespace='user:test')}")
+
     # Test décorateur
     @cached(ttl=10, key_prefix="test")
     def expensive_function(x: int) -> int:
         print(f"  🔄 Calcul coûteux pour x={x}")
         return x * 2
-    
+
     print(f"Appel 1: {expensive_function(5)}")  # Calcul
     print(f"Appel 2: {expensive_function(5)}")  # Cache
     print(f"Appel 3: {expensive_function(10)}")  # Nouveau calcul
-    
+
     print("✅ Tests terminés")
@@ -280,15 +280,16 @@ def aggregate_daily_analytics():
     Task planifiée à minuit
     """
     try:
-        from supabase_client import supabase
+        from sales_rollup import sales_rollup
 
         yesterday = (datetime.utcnow() - timedelta(days=1)).date()
 
-        # Agréger par utilisateur
-        # TODO: Implémenter agrégation analytics
+        # Réconcilier le rollup des ventes (maintenu par trigger) sur les
+        # derniers jours: rattrape les statuts modifiés après coup
+        reconciled = sales_rollup.reconcile(end=yesterday)
 
-        logger.info("daily_analytics_aggregated", date=str(yesterday))
-        return {"date": str(yesterday), "success": True}
+        logger.info("daily_analytics_aggregated", date=str(yesterday), rollup_rows=reconciled["rows"])
+        return {"date": str(yesterday), "success": True, "sales_rollup": reconciled}
 
     except Exception as e:
         logger.error("aggregate_daily_analytics_failed", error=str(e))
@@ -328,11 +329,17 @@ def cleanup_old_logs():
     Task planifiée hebdomadairement
     """
     try:
+        from supabase_client import supabase
+
         # Supprimer logs > 90 jours
         cutoff_date = (datetime.utcnow() - timedelta(days=90)).isoformat()
 
         # TODO: Nettoyer logs
 
+        # Change feed: événements déjà livrés (rejeu limité à 7 jours)
+        feed_cutoff = (datetime.utcnow() - timedelta(days=7)).isoformat()
+        supabase.table("change_feed").delete().lt("created_at", feed_cutoff).execute()
+
         logger.info("old_logs_cleaned", cutoff_date=cutoff_date)
         return {"cutoff_date": cutoff_date, "success": True}
 
@@ -341,6 +348,24 @@ def cleanup_old_logs():
         raise
 
 
+@celery_app.task(name="prune_cache_tags")
+def prune_cache_tags():
+    """
+    Élaguer les membres expirés des tags du cache
+    Task planifiée toutes les 15 minutes
+    """
+    try:
+        from cache_manager import cache
+
+        result = cache.prune_tags()
+        logger.info("cache_tags_pruned", **result)
+        return {**result, "success": True}
+
+    except Exception as e:
+        logger.error("prune_cache_tags_failed", error=str(e))
+        raise
+
+
 # ============================================
 # STRIPE WEBHOOK TASKS
 # ============================================
@@ -426,6 +451,12 @@ celery_app.conf.beat_schedule = {
         'task': 'cleanup_old_logs',
         'schedule': crontab(hour=2, minute=0, day_of_week=0),
     },
+
+    # Élaguer les tags du cache - Toutes les 15 minutes
+    'prune-cache-tags': {
+        'task': 'prune_cache_tags',
+        'schedule': crontab(minute='*/15'),
+    },
 }
 
 
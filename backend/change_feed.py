@@ -0,0 +1,195 @@
+"""
+Consommateur du change feed (table outbox `change_feed`)
+Les triggers SQL écrivent un événement dans la même transaction que la
+commission / le paiement / la vente. Le consommateur lit par id monotone
+(jamais par horloge), ne fait avancer son curseur qu'après livraison et le
+persiste dans job_checkpoints: reprise après redémarrage sans trou ni doublon
+"""
+
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CHANGE_FEED_TABLE = "change_feed"
+CHECKPOINT_TABLE = "job_checkpoints"
+CHANGE_FEED_BATCH_SIZE = int(os.getenv("CHANGE_FEED_BATCH_SIZE", 500))
+CHANGE_FEED_CONSUMER = os.getenv("CHANGE_FEED_CONSUMER", "websocket_change_feed")
+
+
+class ChangeFeedConsumer:
+    """
+    Lecture du change feed par curseur
+
+    Un id BIGSERIAL est attribué à l'INSERT mais visible au COMMIT: une
+    transaction plus ancienne peut apparaître après une plus récente. Le
+    curseur n'avance donc que sur des ids contigus; un trou est attendu
+    `gap_timeout` secondes puis sauté (id consommé par un rollback).
+
+    Args:
+        supabase_client: Client Supabase (import paresseux par défaut)
+        job_name: Nom du curseur dans job_checkpoints (un par consommateur)
+        batch_size: Événements lus par requête
+        idle_interval: Attente initiale quand le feed est vide
+        max_idle_interval: Attente maximale (backoff quand rien ne change)
+        gap_timeout: Durée d'attente d'un id manquant avant de le sauter
+    """
+
+    def __init__(
+        self,
+        supabase_client=None,
+        job_name: str = CHANGE_FEED_CONSUMER,
+        batch_size: int = CHANGE_FEED_BATCH_SIZE,
+        idle_interval: float = 0.25,
+        max_idle_interval: float = 5.0,
+        gap_timeout: float = 10.0,
+    ):
+        self._supabase = supabase_client
+        self.job_name = job_name
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.max_idle_interval = max_idle_interval
+        self.gap_timeout = gap_timeout
+
+        self.cursor: Optional[int] = None
+        self._gap_started: Optional[float] = None
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    # ============================================
+    # LECTURE
+    # ============================================
+
+    def fetch(self, after_id: int, limit: int, user_id: Optional[str] = None) -> List[Dict]:
+        """Événements d'id > after_id, par id croissant"""
+        query = (
+            self.supabase.table(CHANGE_FEED_TABLE)
+            .select("id, event_type, user_id, payload, created_at")
+            .gt("id", after_id)
+        )
+        if user_id:
+            query = query.eq("user_id", user_id)
+
+        result = query.order("id").limit(limit).execute()
+        return result.data or []
+
+    def poll(self) -> List[Dict]:
+        """
+        Prochain lot livrable (préfixe contigu au curseur)
+
+        Ne fait pas avancer le curseur: appeler `commit` après livraison.
+        """
+        if self.cursor is None:
+            self.cursor = self.load_cursor()
+
+        rows = self.fetch(self.cursor, self.batch_size)
+        now = time.monotonic()
+
+        ready = []
+        expected = self.cursor + 1
+        for row in rows:
+            if row["id"] > expected:
+                if self._gap_started is None:
+                    self._gap_started = now
+                if now - self._gap_started < self.gap_timeout:
+                    # Transaction peut-être encore en cours: on attend
+                    break
+                logger.warning(f"⚠️ Change feed: ids {expected}-{row['id'] - 1} jamais commités, ignorés")
+
+            self._gap_started = None
+            ready.append(row)
+            expected = row["id"] + 1
+
+        return ready
+
+    def commit(self, events: List[Dict]):
+        """Avance et persiste le curseur après livraison d'un lot"""
+        if not events:
+            return
+        self.cursor = events[-1]["id"]
+        self.save_cursor(self.cursor)
+
+    def replay(self, user_id: str, after_id: int, limit: int = 200) -> List[Dict]:
+        """Événements manqués par un utilisateur (reprise après reconnexion)"""
+        return self.fetch(after_id, limit, user_id=user_id)
+
+    # ============================================
+    # BOUCLE DE CONSOMMATION
+    # ============================================
+
+    async def run(self, deliver: Callable[[Dict], Awaitable[None]]):
+        """
+        Consomme le feed indéfiniment
+
+        Lot plein: relecture immédiate. Feed vide: attente croissante jusqu'à
+        `max_idle_interval` (aucune charge inutile quand rien ne change).
+        """
+        loop = asyncio.get_running_loop()
+        delay = self.idle_interval
+
+        while True:
+            try:
+                events = await loop.run_in_executor(None, self.poll)
+
+                for event in events:
+                    await deliver(event)
+                await loop.run_in_executor(None, self.commit, events)
+
+                if len(events) >= self.batch_size:
+                    continue
+                delay = self.idle_interval if events else min(delay * 2, self.max_idle_interval)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erreur lecture change feed: {e}")
+                delay = self.max_idle_interval
+
+            await asyncio.sleep(delay)
+
+    # ============================================
+    # CURSEUR
+    # ============================================
+
+    def load_cursor(self) -> int:
+        """Curseur persisté, sinon dernier id existant (pas de rejeu de l'historique)"""
+        result = (
+            self.supabase.table(CHECKPOINT_TABLE)
+            .select("state")
+            .eq("job_name", self.job_name)
+            .execute()
+        )
+        if result.data:
+            return int(result.data[0]["state"].get("cursor", 0))
+
+        result = (
+            self.supabase.table(CHANGE_FEED_TABLE)
+            .select("id")
+            .order("id", desc=True)
+            .limit(1)
+            .execute()
+        )
+        cursor = result.data[0]["id"] if result.data else 0
+        self.save_cursor(cursor)
+        return cursor
+
+    def save_cursor(self, cursor: int):
+        self.supabase.table(CHECKPOINT_TABLE).upsert(
+            {
+                "job_name": self.job_name,
+                "state": {"cursor": cursor},
+                "updated_at": datetime.now().isoformat(),
+            }
+        ).execute()
@@ -0,0 +1,341 @@
+"""
+Pipeline d'ingestion asynchrone des clics
+La redirection /r/{short_code} empile un enregistrement en mémoire et répond
+immédiatement; un thread de fond écrit les clics par lots (insert multi-lignes)
+"""
+
+from collections import deque, defaultdict
+from datetime import datetime
+from link_counters import link_counters
+from typing import Dict, List, Optional
+import glob
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CLICK_QUEUE_MAX_SIZE = int(os.getenv("CLICK_QUEUE_MAX_SIZE", 50000))
+CLICK_BATCH_SIZE = int(os.getenv("CLICK_BATCH_SIZE", 500))
+CLICK_FLUSH_INTERVAL = float(os.getenv("CLICK_FLUSH_INTERVAL", 1.0))  # secondes
+# Chemin de base: chaque processus écrit dans son propre fichier (<base>.<pid>.jsonl)
+CLICK_SPILL_PATH = os.getenv("CLICK_SPILL_PATH", "/tmp/shareyoursales_click_spill.jsonl")
+
+
+def _pid_alive(pid: int) -> bool:
+    """Vrai si le processus existe encore (même espace de PID)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class ClickIngestionQueue:
+    """
+    File de clics bornée avec flush par taille ou par délai
+
+    - enqueue() ne fait jamais d'I/O réseau (coût constant pour la redirection)
+    - si la file est pleine, le clic est déversé dans le fichier de spill
+    - si la BDD est indisponible, le lot est déversé puis rejoué plus tard
+    """
+
+    def __init__(
+        self,
+        supabase_client=None,
+        max_size: int = CLICK_QUEUE_MAX_SIZE,
+        batch_size: int = CLICK_BATCH_SIZE,
+        flush_interval: float = CLICK_FLUSH_INTERVAL,
+        spill_path: str = CLICK_SPILL_PATH,
+    ):
+        self._supabase = supabase_client
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_base = spill_path
+
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "overflow": 0,
+            "high_watermark": 0,
+            "last_flush_ms": 0.0,
+            "last_flush_at": None,
+        }
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux pour garder le module léger)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    @property
+    def spill_path(self) -> str:
+        """
+        Fichier de spill du processus courant
+
+        Un fichier par PID (calculé à l'usage: les workers uvicorn/gunicorn
+        sont forkés après l'import): aucun autre processus n'y écrit, le
+        verrou local suffit.
+        """
+        root, ext = os.path.splitext(self.spill_base)
+        return f"{root}.{os.getpid()}{ext}"
+
+    # ============================================
+    # PRODUCTION (chemin de redirection)
+    # ============================================
+
+    def enqueue(self, click: Dict) -> bool:
+        """
+        Empile un clic sans bloquer
+
+        Returns:
+            True si le clic est en file, False s'il a été déversé sur disque
+        """
+        with self._lock:
+            if len(self._queue) >= self.max_size:
+                self.stats["overflow"] += 1
+                overflow = True
+            else:
+                self._queue.append(click)
+                self.stats["enqueued"] += 1
+                depth = len(self._queue)
+                if depth > self.stats["high_watermark"]:
+                    self.stats["high_watermark"] = depth
+                overflow = False
+
+        if overflow:
+            # Backpressure: on ne perd pas le clic, on le persiste localement
+            self._spill([click])
+            return False
+
+        if depth >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    # ============================================
+    # CONSOMMATION (thread de fond)
+    # ============================================
+
+    def start(self):
+        """Démarre le thread de flush (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="click-ingestion-flusher", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"✅ Ingestion clics démarrée (lot={self.batch_size}, "
+            f"intervalle={self.flush_interval}s, file max={self.max_size})"
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """Arrête le thread et vide la file (déverse sur disque en cas d'échec)"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+        while self.flush():
+            pass
+        logger.info("✅ Ingestion clics arrêtée")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+
+            try:
+                while self.flush() >= self.batch_size:
+                    pass
+                self.replay_spill()
+            except Exception as e:
+                logger.error(f"Erreur thread ingestion clics: {e}")
+
+    def _take_batch(self) -> List[Dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def flush(self) -> int:
+        """
+        Écrit un lot de clics en BDD
+
+        Returns:
+            Nombre de clics traités (écrits ou déversés)
+        """
+        batch = self._take_batch()
+        if not batch:
+            return 0
+
+        if not self._write_batch(batch):
+            self._spill(batch)
+
+        return len(batch)
+
+    def _write_batch(self, batch: List[Dict]) -> bool:
+        """
+        Upsert multi-lignes idempotent + incréments de compteurs agrégés par lien
+
+        Les clics portent un ID généré côté serveur: un lot rejoué (spill,
+        crash entre l'écriture et la suppression du fichier) ignore les
+        lignes déjà présentes, et seules les lignes réellement insérées
+        incrémentent les compteurs.
+        """
+        started = time.perf_counter()
+        try:
+            result = (
+                self.supabase.table("click_logs")
+                .upsert(batch, on_conflict="id", ignore_duplicates=True)
+                .execute()
+            )
+        except Exception as e:
+            self.stats["failed_batches"] += 1
+            logger.error(f"❌ Échec insert lot de {len(batch)} clics: {e}")
+            return False
+
+        clicks_by_link: Dict[str, int] = defaultdict(int)
+        for click in result.data or []:
+            clicks_by_link[click["link_id"]] += 1
+
+        # Les clics sont déjà journalisés: les compteurs sont agrégés puis
+        # appliqués en une requête atomique par le LinkCounterAggregator
+        for link_id, delta in clicks_by_link.items():
+            link_counters.increment("tracking_links", link_id, clicks=delta)
+
+        self.stats["flushed"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.stats["last_flush_at"] = datetime.now().isoformat()
+        return True
+
+    # ============================================
+    # SPILL DURABLE (BDD indisponible / file pleine)
+    # ============================================
+
+    def _spill(self, clicks: List[Dict]):
+        try:
+            with self._spill_lock:
+                with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+                    for click in clicks:
+                        spill_file.write(json.dumps(click, default=str) + "\n")
+                    spill_file.flush()
+                    os.fsync(spill_file.fileno())
+            self.stats["spilled"] += len(clicks)
+            logger.warning(f"⚠️ {len(clicks)} clics déversés dans {self.spill_path}")
+        except Exception as e:
+            logger.error(f"❌ Impossible de déverser {len(clicks)} clics: {e}")
+
+    def _claim_spill_files(self) -> List[str]:
+        """
+        Réserve les fichiers à rejouer par renommage atomique
+
+        - le spill du processus courant
+        - les spills et rejeux interrompus de processus morts (worker
+          redémarré, crash): jamais ceux d'un processus encore vivant,
+          qui peut être en train d'y écrire
+        Si deux processus réservent le même fichier, os.replace n'en
+        laisse gagner qu'un.
+        """
+        root, ext = os.path.splitext(self.spill_base)
+        pattern = re.compile(re.escape(root) + r"\.(\d+)" + re.escape(ext) + r"(?:\.replay-(\d+)-\w+)?$")
+        own_pid = os.getpid()
+        claimed = []
+
+        for path in glob.glob(f"{glob.escape(root)}.*"):
+            match = pattern.match(path)
+            if not match:
+                continue
+            owner = int(match[2] or match[1])
+            if owner != own_pid and _pid_alive(owner):
+                continue
+
+            target = f"{root}.{match[1]}{ext}.replay-{own_pid}-{uuid.uuid4().hex[:8]}"
+            try:
+                with self._spill_lock:
+                    os.replace(path, target)
+            except FileNotFoundError:
+                continue  # réservé par un autre processus
+            claimed.append(target)
+
+        return claimed
+
+    def replay_spill(self) -> int:
+        """
+        Rejoue les clics déversés sur disque (après retour de la BDD)
+
+        Returns:
+            Nombre de clics rejoués avec succès
+        """
+        replayed = 0
+        for replay_path in self._claim_spill_files():
+            with open(replay_path, "r", encoding="utf-8") as replay_file:
+                clicks = [json.loads(line) for line in replay_file if line.strip()]
+
+            for start in range(0, len(clicks), self.batch_size):
+                batch = clicks[start:start + self.batch_size]
+                if not self._write_batch(batch):
+                    # BDD toujours indisponible: remettre le reste dans le spill
+                    self._spill(clicks[start:])
+                    break
+                replayed += len(batch)
+
+            # Crash avant cette ligne: le fichier sera rejoué, l'upsert
+            # ignore les clics déjà écrits
+            os.remove(replay_path)
+
+        self.stats["replayed"] += replayed
+        if replayed:
+            logger.info(f"✅ {replayed} clics rejoués depuis le spill")
+        return replayed
+
+    # ============================================
+    # MÉTRIQUES
+    # ============================================
+
+    def get_stats(self) -> Dict:
+        """Profondeur de file, débit et indicateurs de backpressure"""
+        with self._lock:
+            depth = len(self._queue)
+
+        return {
+            **self.stats,
+            "queue_depth": depth,
+            "max_size": self.max_size,
+            "utilization_percent": round(depth / self.max_size * 100, 2) if self.max_size else 0,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "spill_pending": os.path.exists(self.spill_path),
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+# Instance globale
+click_ingestion = ClickIngestionQueue()
@@ -19,10 +19,13 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from supabase import create_client, Client
+from supabase_client import supabase
 import os
 import secrets
 from auth import get_current_user
+from async_db import run_db
+from short_code_allocator import short_code_allocator, ShortCodeAllocationError
+from link_generation_engine import BulkLinkEngine
 
 router = APIRouter(prefix="/api/company/links", tags=["Company Links Management"])
 
@@ -36,11 +39,8 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise ValueError("Missing required Supabase environment variables")
 
-# ============================================
-# SUPABASE CLIENT
-# ============================================
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+# Moteur de génération groupée (bulk-generate / assign-bulk)
+bulk_link_engine = BulkLinkEngine(supabase)
 
 # ============================================
 # PYDANTIC MODELS
@@ -61,7 +61,7 @@ class AssignLinkToMemberRequest(BaseModel):
 
 class BulkGenerateLinksRequest(BaseModel):
     """Génération en masse de liens pour plusieurs produits"""
-    product_ids: List[str] = Field(..., min_items=1, max_items=50)
+    product_ids: List[str] = Field(..., min_items=1, max_items=500)
     commission_rate: Optional[float] = Field(None, ge=0, le=100)
 
 # ============================================
@@ -69,7 +69,13 @@ class BulkGenerateLinksRequest(BaseModel):
 # ============================================
 
 def generate_unique_short_code() -> str:
-    """Générer un code court unique"""
+    """Générer un code court unique (pré-alloué, sans aller-retour BDD)"""
+    try:
+        return short_code_allocator.allocate()
+    except ShortCodeAllocationError:
+        pass
+
+    # Repli: code aléatoire + vérification d'unicité
     while True:
         short_code = secrets.token_urlsafe(6)[:8]
         existing = supabase.from_("affiliate_links") \
@@ -255,56 +261,25 @@ async def bulk_generate_links(
             )
 
         company_id = current_user["id"]
-        generated_links = []
-        errors = []
-
-        for product_id in request.product_ids:
-            try:
-                # Vérifier la propriété
-                owns = await verify_company_owns_product(company_id, product_id)
-                if not owns:
-                    errors.append({"product_id": product_id, "error": "Not your product"})
-                    continue
-
-                # Vérifier si existe déjà
-                existing = supabase.from_("affiliate_links") \
-                    .select("*") \
-                    .eq("merchant_id", company_id) \
-                    .eq("product_id", product_id) \
-                    .eq("is_active", True) \
-                    .is_("influencer_id", "null") \
-                    .execute()
-
-                if existing.data:
-                    generated_links.append(existing.data[0])
-                    continue
-
-                # Créer nouveau lien
-                short_code = generate_unique_short_code()
-
-                link_data = {
-                    "merchant_id": company_id,
-                    "product_id": product_id,
-                    "short_code": short_code,
-                    "commission_rate": request.commission_rate or 15.0,
-                    "is_active": True
-                }
 
-                result = supabase.from_("affiliate_links") \
-                    .insert(link_data) \
-                    .execute()
-
-                if result.data:
-                    generated_links.append(result.data[0])
+        # Requêtes IN par tranches, codes en bloc, inserts par tranches, hors de la boucle d'événements
+        report = await run_db(
+            bulk_link_engine.generate_for_products,
+            company_id, request.product_ids, request.commission_rate
+        )
 
-            except Exception as e:
-                errors.append({"product_id": product_id, "error": str(e)})
+        errors = [
+            {"product_id": r["product_id"], "error": r["error"]}
+            for r in report["results"] if r["status"] == "error"
+        ]
 
         return {
             "success": True,
-            "generated": len(generated_links),
-            "links": generated_links,
-            "errors": errors if errors else None
+            "generated": report["summary"]["created"] + report["summary"]["existing"],
+            "links": report["links"],
+            "errors": errors if errors else None,
+            "results": report["results"],
+            "summary": report["summary"]
         }
 
     except HTTPException:
@@ -443,47 +418,20 @@ async def bulk_assign_links(
         if not link.data:
             raise HTTPException(status_code=404, detail="Link not found")
 
-        assigned = []
-        errors = []
-
-        for member_id in member_ids:
-            try:
-                is_member = await verify_member_in_team(company_id, member_id)
-                if not is_member:
-                    errors.append({"member_id": member_id, "error": "Not in team"})
-                    continue
-
-                short_code = generate_unique_short_code()
-
-                member_link_data = {
-                    "merchant_id": company_id,
-                    "influencer_id": member_id,
-                    "product_id": link.data["product_id"],
-                    "short_code": short_code,
-                    "commission_rate": link.data["commission_rate"],
-                    "is_active": True,
-                    "metadata": {
-                        "assigned_by": company_id,
-                        "parent_link_id": link_id,
-                        "assigned_at": datetime.now().isoformat()
-                    }
-                }
-
-                result = supabase.from_("affiliate_links") \
-                    .insert(member_link_data) \
-                    .execute()
-
-                if result.data:
-                    assigned.append(result.data[0])
+        report = await run_db(bulk_link_engine.assign_to_members, company_id, link.data, member_ids)
 
-            except Exception as e:
-                errors.append({"member_id": member_id, "error": str(e)})
+        errors = [
+            {"member_id": r["member_id"], "error": r["error"]}
+            for r in report["results"] if r["status"] == "error"
+        ]
 
         return {
             "success": True,
-            "assigned": len(assigned),
-            "links": assigned,
-            "errors": errors if errors else None
+            "assigned": report["summary"]["created"],
+            "links": report["links"],
+            "errors": errors if errors else None,
+            "results": report["results"],
+            "summary": report["summary"]
         }
 
     except HTTPException:
@@ -0,0 +1,293 @@
+"""
+Service de statistiques dashboard
+Snapshots mis en cache par (rôle, utilisateur) via CacheManager, recalcul
+single-flight (un seul calcul pour N requêtes concurrentes, y compris entre
+workers via un verrou Redis), service du snapshot périmé pendant la
+revalidation, et invalidation sur événement (vente, produit, influenceur)
+"""
+
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, Optional
+import os
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+DASHBOARD_STATS_TTL = int(os.getenv("DASHBOARD_STATS_TTL", 300))  # CACHE_TTL_MEDIUM
+# Durée pendant laquelle un snapshot périmé peut encore être servi
+DASHBOARD_STATS_STALE_TTL = int(os.getenv("DASHBOARD_STATS_STALE_TTL", 3600))
+DASHBOARD_STATS_LOCK_TIMEOUT = 30
+DASHBOARD_STATS_LOCK_WAIT = 5.0
+
+KEY_PREFIX = "dashboard_stats"
+# Les stats admin couvrent toute la plateforme: un seul snapshot partagé
+ADMIN_SCOPE = "platform"
+
+
+class DashboardStatsService:
+    """Snapshots de stats dashboard: cache + single-flight + stale-while-revalidate"""
+
+    def __init__(
+        self,
+        compute: Optional[Callable[[str, str], Dict]] = None,
+        cache_backend=None,
+        supabase_client=None,
+        ttl: int = DASHBOARD_STATS_TTL,
+        stale_ttl: int = DASHBOARD_STATS_STALE_TTL,
+        lock_wait: float = DASHBOARD_STATS_LOCK_WAIT,
+    ):
+        self._compute = compute
+        self._cache = cache_backend
+        self._supabase = supabase_client
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_wait = lock_wait
+
+        # Repli en mémoire quand Redis est indisponible
+        self._local: Dict[str, Dict] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "hits": 0,
+            "stale_served": 0,
+            "misses": 0,
+            "recomputes": 0,
+            "coalesced": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def compute(self) -> Callable[[str, str], Dict]:
+        """Fonction de calcul (import paresseux: db_helpers importe ce module)"""
+        if self._compute is None:
+            from db_helpers import compute_dashboard_stats
+
+            self._compute = compute_dashboard_stats
+        return self._compute
+
+    @property
+    def cache(self):
+        """CacheManager (import paresseux)"""
+        if self._cache is None:
+            from cache_manager import cache
+
+            self._cache = cache
+        return self._cache
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    @property
+    def _redis(self):
+        return getattr(self.cache, "redis_client", None)
+
+    # ============================================
+    # LECTURE
+    # ============================================
+
+    def get(self, role: str, user_id: str) -> Dict:
+        """
+        Stats du dashboard pour (rôle, utilisateur)
+
+        Frais: servies depuis le cache. Périmées: servies immédiatement,
+        recalcul lancé en arrière-plan. Absentes: calcul single-flight.
+        """
+        key = self._key(role, user_id)
+        snapshot = self._read(key)
+
+        if snapshot:
+            if time.time() - snapshot["computed_at"] < self.ttl:
+                self.stats["hits"] += 1
+                return snapshot["stats"]
+
+            self.stats["stale_served"] += 1
+            self._revalidate_async(key, role, user_id)
+            return snapshot["stats"]
+
+        self.stats["misses"] += 1
+        return self._single_flight(key, role, user_id)
+
+    def _single_flight(self, key: str, role: str, user_id: str) -> Dict:
+        """Un seul calcul en cours par clé; les appels concurrents attendent son résultat"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            self.stats["coalesced"] += 1
+            return future.result(timeout=DASHBOARD_STATS_LOCK_TIMEOUT)
+
+        try:
+            stats = self._recompute(key, role, user_id)
+            future.set_result(stats)
+            return stats
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _recompute(self, key: str, role: str, user_id: str) -> Dict:
+        """Calcule et stocke le snapshot, sous verrou distribué si Redis est disponible"""
+        token = self._acquire_lock(key)
+        if token is None:
+            # Un autre worker calcule: attendre son snapshot plutôt que de dupliquer la charge
+            snapshot = self._wait_for_fresh(key)
+            if snapshot:
+                self.stats["coalesced"] += 1
+                return snapshot["stats"]
+
+        try:
+            self.stats["recomputes"] += 1
+            stats = self.compute(role, user_id)
+            if stats:
+                self._write(key, {"stats": stats, "computed_at": time.time()})
+            return stats
+        finally:
+            if token:
+                self._release_lock(key, token)
+
+    def _revalidate_async(self, key: str, role: str, user_id: str):
+        with self._lock:
+            if key in self._inflight:
+                return
+
+        def revalidate():
+            try:
+                self._single_flight(key, role, user_id)
+            except Exception as e:
+                logger.error(f"❌ Revalidation stats dashboard {key} échouée: {e}")
+
+        threading.Thread(target=revalidate, name="dashboard-stats-revalidate", daemon=True).start()
+
+    def _wait_for_fresh(self, key: str) -> Optional[Dict]:
+        deadline = time.time() + self.lock_wait
+        while time.time() < deadline:
+            snapshot = self._read(key)
+            if snapshot and time.time() - snapshot["computed_at"] < self.ttl:
+                return snapshot
+            time.sleep(0.05)
+        return None
+
+    # ============================================
+    # INVALIDATION PAR ÉVÉNEMENT
+    # ============================================
+
+    def invalidate(self, role: str, user_id: str):
+        """Supprime le snapshot d'un utilisateur"""
+        self._delete(self._key(role, user_id))
+
+    def invalidate_tenant(self, merchant_id: Optional[str] = None, influencer_id: Optional[str] = None):
+        """
+        Invalide les snapshots touchés par un changement de vente, produit ou influenceur
+
+        Args:
+            merchant_id: merchants.id concerné
+            influencer_id: influencers.id concerné
+        """
+        self.invalidate_tenants(
+            merchant_ids=[merchant_id] if merchant_id else [],
+            influencer_ids=[influencer_id] if influencer_id else [],
+        )
+
+    def invalidate_tenants(self, merchant_ids: Iterable[str] = (), influencer_ids: Iterable[str] = ()):
+        """Invalidation groupée (une requête IN par table propriétaire)"""
+        self._delete(self._key("admin", ADMIN_SCOPE))
+
+        owners = (("merchants", "merchant", merchant_ids), ("influencers", "influencer", influencer_ids))
+        for table, role, entity_ids in owners:
+            entity_ids = sorted({entity_id for entity_id in entity_ids if entity_id})
+            if not entity_ids:
+                continue
+            try:
+                result = self.supabase.table(table).select("user_id").in_("id", entity_ids).execute()
+                for row in result.data or []:
+                    if row.get("user_id"):
+                        self._delete(self._key(role, row["user_id"]))
+            except Exception as e:
+                logger.error(f"❌ Invalidation stats dashboard {role} ({len(entity_ids)}) échouée: {e}")
+
+    # ============================================
+    # STOCKAGE
+    # ============================================
+
+    @staticmethod
+    def _key(role: str, user_id: str) -> str:
+        scope = ADMIN_SCOPE if role == "admin" else user_id
+        return f"{KEY_PREFIX}:{role}:{scope}"
+
+    def _read(self, key: str) -> Optional[Dict]:
+        if self._redis:
+            return self.cache.get(key)
+
+        snapshot = self._local.get(key)
+        if snapshot and time.time() - snapshot["computed_at"] >= self.ttl + self.stale_ttl:
+            self._local.pop(key, None)
+            return None
+        return snapshot
+
+    def _write(self, key: str, snapshot: Dict):
+        if self._redis:
+            self.cache.set(key, snapshot, self.ttl + self.stale_ttl)
+        else:
+            self._local[key] = snapshot
+
+    def _delete(self, key: str):
+        self.stats["invalidations"] += 1
+        self._local.pop(key, None)
+        if self._redis:
+            self.cache.delete(key)
+
+    def _acquire_lock(self, key: str) -> Optional[str]:
+        """Verrou distribué SET NX; sans Redis, le single-flight local suffit"""
+        if not self._redis:
+            return "local"
+
+        token = uuid.uuid4().hex
+        try:
+            if self._redis.set(f"{key}:lock", token, nx=True, ex=DASHBOARD_STATS_LOCK_TIMEOUT):
+                return token
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Verrou stats dashboard indisponible: {e}")
+            return "local"
+
+    def _release_lock(self, key: str, token: str):
+        if token == "local" or not self._redis:
+            return
+        try:
+            if self._redis.get(f"{key}:lock") == token:
+                self._redis.delete(f"{key}:lock")
+        except Exception as e:
+            logger.warning(f"⚠️ Libération verrou stats dashboard échouée: {e}")
+
+    def get_stats(self) -> Dict:
+        """Compteurs hits / stale / recalculs / requêtes coalescées"""
+        served = self.stats["hits"] + self.stats["stale_served"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate_percent": round(
+                (self.stats["hits"] + self.stats["stale_served"]) / served * 100, 2
+            ) if served else 0.0,
+            "inflight": len(self._inflight),
+            "backend": "redis" if self._redis else "memory",
+        }
+
+
+# Instance globale
+dashboard_stats = DashboardStatsService()
@@ -7,7 +7,15 @@ from supabase_client import supabase
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import bcrypt
-from cache_manager import cached, CACHE_TTL_MEDIUM, invalidate_cache
+from cache_manager import invalidate_cache
+from dashboard_stats_service import dashboard_stats
+from repositories.sale_repository import SaleRepository
+from repositories.user_repository import UserRepository
+from async_db import to_async
+
+# Agrégats ventes (SUM / COUNT DISTINCT exécutés en SQL)
+sale_repository = SaleRepository(supabase)
+user_repository = UserRepository(supabase)
 
 # ============================================
 # USERS
@@ -425,12 +433,18 @@ def create_campaign(merchant_id: str, name: str, **kwargs) -> Optional[Dict]:
 # ============================================
 
 
-@cached(ttl=CACHE_TTL_MEDIUM, key_prefix="dashboard_stats")
 def get_dashboard_stats(role: str, user_id: str) -> Dict:
     """
     Récupère les statistiques pour le dashboard selon le rôle
+    CACHE: Snapshot 5 minutes, recalcul single-flight, invalidé par événement
+    """
+    return dashboard_stats.get(role, user_id)
+
+
+def compute_dashboard_stats(role: str, user_id: str) -> Dict:
+    """
+    Calcule les statistiques du dashboard (sans cache)
     OPTIMISÉ: Utilise des requêtes groupées pour éviter N+1 problem
-    CACHE: Résultats mis en cache 5 minutes pour réduire charge DB
     """
     try:
         if role == "admin":
@@ -448,8 +462,7 @@ def get_dashboard_stats(role: str, user_id: str) -> Dict:
                 return query.execute().count
             
             def sum_sales():
-                sales = supabase.table("sales").select("amount").eq("status", "completed").execute()
-                return sum([s["amount"] for s in sales.data]) if sales.data else 0
+                return sale_repository.get_total_revenue()
             
             # Exécution parallèle des requêtes (3x plus rapide)
             with ThreadPoolExecutor(max_workers=5) as executor:
@@ -492,26 +505,14 @@ def get_dashboard_stats(role: str, user_id: str) -> Dict:
                 )
             
             def sum_sales():
-                sales = (
-                    supabase.table("sales")
-                    .select("amount")
-                    .eq("merchant_id", merchant_id)
-                    .eq("status", "completed")
-                    .execute()
-                )
-                return sum([s["amount"] for s in sales.data]) if sales.data else 0
+                return sale_repository.get_total_revenue(merchant_id=merchant_id)
             
             def count_affiliates():
-                # Compter les influenceurs ayant généré des ventes pour ce marchand
-                result = (
-                    supabase.table("sales")
-                    .select("influencer_id", count="exact")
-                    .eq("merchant_id", merchant_id)
-                    .execute()
-                )
-                # Unique influencers
-                unique_influencers = set(s["influencer_id"] for s in result.data if s.get("influencer_id"))
-                return len(unique_influencers)
+                # Influenceurs distincts ayant généré des ventes pour ce marchand
+                return sale_repository.aggregate_one(
+                    {"affiliates": "count_distinct:influencer_id"},
+                    {"merchant_id": merchant_id},
+                )["affiliates"]
             
             # Exécution parallèle
             with ThreadPoolExecutor(max_workers=3) as executor:
@@ -585,6 +586,42 @@ def get_conversions(limit: int = 20) -> List[Dict]:
         return []
 
 
+def get_sales_scope(user_id: str, role: str) -> Dict:
+    """
+    Filtre des ventes visibles par un utilisateur (rollup, graphiques)
+
+    sales.merchant_id / sales.influencer_id référencent les lignes merchants /
+    influencers, pas users: le user_id du JWT est d'abord résolu en profil.
+
+    Args:
+        user_id: ID utilisateur (claim `sub` du JWT)
+        role: Profil attendu ("merchant" ou "influencer")
+
+    Returns:
+        {} pour un admin (toute la plateforme), sinon {"merchant_id": ...}
+        ou {"influencer_id": ...} (jamais None)
+
+    Raises:
+        PermissionError: rôle différent du profil attendu
+        LookupError: utilisateur ou profil introuvable
+    """
+    user = get_user_by_id(user_id) if user_id else None
+    if not user:
+        raise LookupError("Utilisateur introuvable")
+
+    if user.get("role") == "admin":
+        return {}
+    if user.get("role") != role:
+        raise PermissionError(f"Profil {role} requis")
+
+    find_profile = get_merchant_by_user_id if role == "merchant" else get_influencer_by_user_id
+    profile = find_profile(user["id"])
+    if not profile or not profile.get("id"):
+        raise LookupError(f"Profil {role} introuvable")
+
+    return {f"{role}_id": profile["id"]}
+
+
 # ============================================
 # CLICKS TRACKING
 # ============================================
@@ -666,3 +703,35 @@ def update_payout_status(payout_id: str, status: str) -> bool:
     except Exception as e:
         print(f"Error updating payout status: {e}")
         return False
+
+
+# ============================================
+# VERSIONS ASYNC (pool de threads BDD)
+# À utiliser depuis les endpoints `async def`: n'occupent pas la boucle asyncio
+# ============================================
+
+# Login: asyncpg direct si PG_FAST_PATH inclut "users", sinon PostgREST hors boucle
+aget_user_by_email = user_repository.afind_by_email
+aget_user_by_id = to_async(get_user_by_id)
+acreate_user = to_async(create_user)
+# bcrypt: coûteux en CPU, également hors boucle
+averify_password = to_async(verify_password)
+aupdate_user_last_login = to_async(update_user_last_login)
+aget_all_merchants = to_async(get_all_merchants)
+aget_merchant_by_id = to_async(get_merchant_by_id)
+aget_merchant_by_user_id = to_async(get_merchant_by_user_id)
+aget_all_influencers = to_async(get_all_influencers)
+aget_influencer_by_id = to_async(get_influencer_by_id)
+aget_influencer_by_user_id = to_async(get_influencer_by_user_id)
+aget_all_products = to_async(get_all_products)
+aget_product_by_id = to_async(get_product_by_id)
+aget_affiliate_links = to_async(get_affiliate_links)
+acreate_affiliate_link = to_async(create_affiliate_link)
+aget_all_campaigns = to_async(get_all_campaigns)
+acreate_campaign = to_async(create_campaign)
+aget_dashboard_stats = to_async(get_dashboard_stats)
+aget_conversions = to_async(get_conversions)
+aget_sales_scope = to_async(get_sales_scope)
+aget_clicks = to_async(get_clicks)
+aget_payouts = to_async(get_payouts)
+aupdate_payout_status = to_async(update_payout_status)
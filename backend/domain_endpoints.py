@@ -15,7 +15,7 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from supabase import create_client, Client
+from supabase_client import supabase
 import os
 import secrets
 import re
@@ -33,12 +33,6 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise ValueError("Missing required Supabase environment variables")
 
-# ============================================
-# SUPABASE CLIENT
-# ============================================
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-
 # ============================================
 # PYDANTIC MODELS
 # ============================================
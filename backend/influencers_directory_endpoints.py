@@ -15,9 +15,10 @@ from fastapi import APIRouter, HTTPException, Depends, status, Query
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from supabase import create_client, Client
+from supabase_client import supabase
 import os
 from auth import get_current_user
+from async_db import execute
 
 router = APIRouter(prefix="/api/influencers", tags=["Influencers Directory"])
 
@@ -31,12 +32,6 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise ValueError("Missing required Supabase environment variables")
 
-# ============================================
-# SUPABASE CLIENT
-# ============================================
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-
 # ============================================
 # PYDANTIC MODELS
 # ============================================
@@ -162,20 +157,18 @@ class ReviewCreate(BaseModel):
 async def increment_view_count(profile_id: str):
     """Incrémenter le compteur de vues"""
     try:
-        supabase.from_("influencer_profiles") \
-            .update({"view_count": supabase.sql("view_count + 1")}) \
-            .eq("id", profile_id) \
-            .execute()
+        await execute(supabase.from_("influencer_profiles")
+            .update({"view_count": supabase.sql("view_count + 1")})
+            .eq("id", profile_id))
     except Exception as e:
         print(f"Error incrementing view count: {e}")
 
 async def increment_contact_count(profile_id: str):
     """Incrémenter le compteur de contacts"""
     try:
-        supabase.from_("influencer_profiles") \
-            .update({"contact_count": supabase.sql("contact_count + 1")}) \
-            .eq("id", profile_id) \
-            .execute()
+        await execute(supabase.from_("influencer_profiles")
+            .update({"contact_count": supabase.sql("contact_count + 1")})
+            .eq("id", profile_id))
     except Exception as e:
         print(f"Error incrementing contact count: {e}")
 
@@ -199,10 +192,9 @@ async def create_influencer_profile(
         user_id = current_user["id"]
 
         # Vérifier qu'il n'existe pas déjà un profil
-        existing = supabase.from_("influencer_profiles") \
-            .select("id") \
-            .eq("user_id", user_id) \
-            .execute()
+        existing = await execute(supabase.from_("influencer_profiles")
+            .select("id")
+            .eq("user_id", user_id))
 
         if existing.data and len(existing.data) > 0:
             raise HTTPException(
@@ -263,9 +255,8 @@ async def create_influencer_profile(
             "is_available": True
         }
 
-        response = supabase.from_("influencer_profiles") \
-            .insert(profile_data) \
-            .execute()
+        response = await execute(supabase.from_("influencer_profiles")
+            .insert(profile_data))
 
         return {
             "success": True,
@@ -287,11 +278,10 @@ async def get_my_influencer_profile(current_user: dict = Depends(get_current_use
     try:
         user_id = current_user["id"]
 
-        response = supabase.from_("influencer_profiles") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .single() \
-            .execute()
+        response = await execute(supabase.from_("influencer_profiles")
+            .select("*")
+            .eq("user_id", user_id)
+            .single())
 
         if not response.data:
             return None
@@ -327,11 +317,10 @@ async def update_influencer_profile(
         # Recalculer l'engagement moyen si nécessaire
         if any(k.endswith('_followers') or k.endswith('_engagement_rate') for k in update_data.keys()):
             # Récupérer le profil actuel
-            current = supabase.from_("influencer_profiles") \
-                .select("*") \
-                .eq("user_id", user_id) \
-                .single() \
-                .execute()
+            current = await execute(supabase.from_("influencer_profiles")
+                .select("*")
+                .eq("user_id", user_id)
+                .single())
 
             if current.data:
                 # Fusionner avec les nouvelles données
@@ -346,10 +335,9 @@ async def update_influencer_profile(
 
                 update_data['average_engagement_rate'] = sum(engagement_rates) / len(engagement_rates) if engagement_rates else None
 
-        response = supabase.from_("influencer_profiles") \
-            .update(update_data) \
-            .eq("user_id", user_id) \
-            .execute()
+        response = await execute(supabase.from_("influencer_profiles")
+            .update(update_data)
+            .eq("user_id", user_id))
 
         if not response.data:
             raise HTTPException(status_code=404, detail="Profile not found")
@@ -374,10 +362,9 @@ async def delete_influencer_profile(current_user: dict = Depends(get_current_use
     try:
         user_id = current_user["id"]
 
-        supabase.from_("influencer_profiles") \
-            .delete() \
-            .eq("user_id", user_id) \
-            .execute()
+        await execute(supabase.from_("influencer_profiles")
+            .delete()
+            .eq("user_id", user_id))
 
         return {
             "success": True,
@@ -489,7 +476,7 @@ async def search_influencers(
         # Pagination
         query = query.range(offset, offset + limit - 1)
 
-        response = query.execute()
+        response = await execute(query)
 
         return {
             "influencers": response.data,
@@ -512,11 +499,10 @@ async def get_influencer_profile(user_id: str):
     Incrémente le compteur de vues
     """
     try:
-        response = supabase.from_("v_influencer_profiles_public") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .single() \
-            .execute()
+        response = await execute(supabase.from_("v_influencer_profiles_public")
+            .select("*")
+            .eq("user_id", user_id)
+            .single())
 
         if not response.data:
             raise HTTPException(status_code=404, detail="Influencer not found")
@@ -562,13 +548,12 @@ async def request_collaboration(
         company_id = current_user["id"]
 
         # Vérifier que l'influenceur existe
-        influencer = supabase.from_("influencer_profiles") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .eq("is_public", True) \
-            .eq("is_available", True) \
-            .single() \
-            .execute()
+        influencer = await execute(supabase.from_("influencer_profiles")
+            .select("*")
+            .eq("user_id", user_id)
+            .eq("is_public", True)
+            .eq("is_available", True)
+            .single())
 
         if not influencer.data:
             raise HTTPException(
@@ -589,9 +574,8 @@ async def request_collaboration(
             "status": "pending"
         }
 
-        response = supabase.from_("collaboration_requests") \
-            .insert(collaboration_data) \
-            .execute()
+        response = await execute(supabase.from_("collaboration_requests")
+            .insert(collaboration_data))
 
         # Incrémenter le compteur de contacts
         await increment_contact_count(influencer.data["id"])
@@ -629,7 +613,7 @@ async def get_received_collaboration_requests(
         if status_filter:
             query = query.eq("status", status_filter)
 
-        response = query.order("created_at", desc=True).execute()
+        response = await execute(query.order("created_at", desc=True))
 
         return {
             "requests": response.data,
@@ -653,12 +637,11 @@ async def respond_to_collaboration_request(
         user_id = current_user["id"]
 
         # Vérifier que la demande existe et concerne cet utilisateur
-        existing = supabase.from_("collaboration_requests") \
-            .select("*") \
-            .eq("id", request_id) \
-            .eq("target_user_id", user_id) \
-            .single() \
-            .execute()
+        existing = await execute(supabase.from_("collaboration_requests")
+            .select("*")
+            .eq("id", request_id)
+            .eq("target_user_id", user_id)
+            .single())
 
         if not existing.data:
             raise HTTPException(status_code=404, detail="Request not found")
@@ -670,10 +653,9 @@ async def respond_to_collaboration_request(
             "responded_at": datetime.now().isoformat()
         }
 
-        supabase.from_("collaboration_requests") \
-            .update(update_data) \
-            .eq("id", request_id) \
-            .execute()
+        await execute(supabase.from_("collaboration_requests")
+            .update(update_data)
+            .eq("id", request_id))
 
         # TODO: Envoyer notification à l'entreprise
 
@@ -716,11 +698,10 @@ async def create_review(
         reviewer_id = current_user["id"]
 
         # Vérifier qu'il n'existe pas déjà un avis
-        existing = supabase.from_("profile_reviews") \
-            .select("id") \
-            .eq("profile_user_id", user_id) \
-            .eq("reviewer_id", reviewer_id) \
-            .execute()
+        existing = await execute(supabase.from_("profile_reviews")
+            .select("id")
+            .eq("profile_user_id", user_id)
+            .eq("reviewer_id", reviewer_id))
 
         if existing.data and len(existing.data) > 0:
             raise HTTPException(
@@ -743,9 +724,8 @@ async def create_review(
             "is_public": True
         }
 
-        response = supabase.from_("profile_reviews") \
-            .insert(review_data) \
-            .execute()
+        response = await execute(supabase.from_("profile_reviews")
+            .insert(review_data))
 
         return {
             "success": True,
@@ -769,14 +749,13 @@ async def get_influencer_reviews(
 ):
     """Récupérer les avis d'un influenceur"""
     try:
-        response = supabase.from_("profile_reviews") \
-            .select("*, reviewer:reviewer_id(first_name, last_name, profile_picture)") \
-            .eq("profile_user_id", user_id) \
-            .eq("profile_type", "influencer") \
-            .eq("is_public", True) \
-            .order("created_at", desc=True) \
-            .range(offset, offset + limit - 1) \
-            .execute()
+        response = await execute(supabase.from_("profile_reviews")
+            .select("*, reviewer:reviewer_id(first_name, last_name, profile_picture)")
+            .eq("profile_user_id", user_id)
+            .eq("profile_type", "influencer")
+            .eq("is_public", True)
+            .order("created_at", desc=True)
+            .range(offset, offset + limit - 1))
 
         return {
             "reviews": response.data,
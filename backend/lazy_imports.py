@@ -0,0 +1,68 @@
+"""
+Imports différés des dépendances lourdes (stripe, PIL, reportlab, SDK IA...)
+
+Le module n'est importé qu'au premier accès à un attribut: les workers
+qui ne servent jamais l'endpoint concerné (nœuds de redirection, workers
+Celery) ne paient ni le temps d'import ni la mémoire.
+
+Usage:
+    from lazy_imports import lazy_import
+
+    def _configure_stripe(module):
+        module.api_key = STRIPE_SECRET_KEY
+
+    stripe = lazy_import("stripe", on_load=_configure_stripe)
+    stripe.Customer.list(...)  # import + configuration ici, une seule fois
+"""
+
+from typing import Any, Callable, Optional
+import importlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule:
+    """Proxy de module importé au premier accès (thread-safe)"""
+
+    def __init__(self, name: str, on_load: Optional[Callable[[Any], None]] = None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_on_load", on_load)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is not None:
+            return module
+
+        with self._lock:
+            if self._module is None:
+                started = time.perf_counter()
+                module = importlib.import_module(self._name)
+                if self._on_load:
+                    self._on_load(module)
+                object.__setattr__(self, "_module", module)
+                logger.info(f"📦 Import différé de {self._name} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return self._module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute: str, value: Any):
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self) -> str:
+        state = "chargé" if self.is_loaded else "différé"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name: str, on_load: Optional[Callable[[Any], None]] = None) -> LazyModule:
+    """Module importé (puis configuré par on_load) au premier accès"""
+    return LazyModule(name, on_load)
@@ -0,0 +1,262 @@
+"""
+Agrégation des compteurs de liens (clics, conversions, revenus, commissions)
+Les incréments sont combinés par lien en mémoire (ou dans Redis avec
+HINCRBYFLOAT) puis appliqués périodiquement en une seule requête SQL atomique
+"UPDATE ... SET clicks = clicks + delta" via RPC, au lieu de read-modify-write
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import os
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LINK_COUNTERS_BACKEND = os.getenv("LINK_COUNTERS_BACKEND", "memory")  # memory | redis
+LINK_COUNTERS_FLUSH_INTERVAL = float(os.getenv("LINK_COUNTERS_FLUSH_INTERVAL", 2.0))
+LINK_COUNTERS_CHUNK_SIZE = 1000
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PENDING_KEY = "sysales:link_counters:pending"
+
+# Tables supportées: RPC de flush + colonnes incrémentables
+COUNTER_TABLES = {
+    "tracking_links": {
+        "rpc": "apply_tracking_link_deltas",
+        "columns": ("clicks", "conversions", "revenue"),
+    },
+    "trackable_links": {
+        "rpc": "apply_trackable_link_deltas",
+        "columns": ("total_clicks", "total_conversions", "total_revenue", "total_commission"),
+    },
+}
+
+
+class LinkCounterAggregator:
+    """
+    Combine les incréments par (table, link_id) et les applique par lots
+
+    Partagé par le tracking (clics), les webhooks (conversions / revenus)
+    et les paiements automatiques (commissions).
+    """
+
+    def __init__(
+        self,
+        supabase_client=None,
+        backend: str = LINK_COUNTERS_BACKEND,
+        flush_interval: float = LINK_COUNTERS_FLUSH_INTERVAL,
+        redis_client=None,
+    ):
+        self._supabase = supabase_client
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._redis = redis_client
+
+        self._pending: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "increments": 0,
+            "rows_flushed": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": 0.0,
+            "last_flush_at": None,
+        }
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    @property
+    def redis(self):
+        """Client Redis (uniquement pour le backend redis)"""
+        if self._redis is None:
+            import redis
+
+            self._redis = redis.from_url(REDIS_URL, decode_responses=True)
+        return self._redis
+
+    # ============================================
+    # INCRÉMENTS
+    # ============================================
+
+    def increment(self, table: str, link_id: str, **deltas: float):
+        """
+        Enregistre des incréments pour un lien (aucun aller-retour BDD)
+
+        Usage:
+            link_counters.increment("tracking_links", link_id, clicks=1)
+            link_counters.increment("tracking_links", link_id, conversions=1, revenue=49.9)
+        """
+        config = COUNTER_TABLES.get(table)
+        if not config:
+            raise ValueError(f"Table de compteurs non supportée: {table}")
+
+        unknown = set(deltas) - set(config["columns"])
+        if unknown:
+            raise ValueError(f"Colonnes non incrémentables pour {table}: {sorted(unknown)}")
+
+        link_id = str(link_id)
+
+        if self.backend == "redis":
+            pipe = self.redis.pipeline(transaction=False)
+            for column, delta in deltas.items():
+                pipe.hincrbyfloat(REDIS_PENDING_KEY, f"{table}|{link_id}|{column}", delta)
+            pipe.execute()
+        else:
+            with self._lock:
+                pending = self._pending[(table, link_id)]
+                for column, delta in deltas.items():
+                    pending[column] += delta
+
+        self.stats["increments"] += 1
+
+    def get_pending(self, table: str, link_id: str) -> Dict[str, float]:
+        """Deltas pas encore appliqués pour un lien (backend mémoire)"""
+        with self._lock:
+            return dict(self._pending.get((table, str(link_id)), {}))
+
+    # ============================================
+    # FLUSH
+    # ============================================
+
+    def _drain(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Récupère et remet à zéro les deltas en attente (atomique)"""
+        if self.backend == "redis":
+            flushing_key = f"{REDIS_PENDING_KEY}:flushing:{uuid.uuid4().hex}"
+            try:
+                self.redis.rename(REDIS_PENDING_KEY, flushing_key)
+            except Exception:
+                # Aucune clé en attente
+                return {}
+
+            raw = self.redis.hgetall(flushing_key)
+            self.redis.delete(flushing_key)
+
+            drained: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(dict)
+            for field, value in raw.items():
+                table, link_id, column = field.split("|", 2)
+                drained[(table, link_id)][column] = float(value)
+            return drained
+
+        with self._lock:
+            drained = self._pending
+            self._pending = defaultdict(lambda: defaultdict(float))
+        return drained
+
+    def _restore(self, drained: Dict[Tuple[str, str], Dict[str, float]]):
+        """Réinjecte des deltas non appliqués (échec de flush)"""
+        for (table, link_id), deltas in drained.items():
+            self.increment(table, link_id, **deltas)
+        self.stats["increments"] -= len(drained)
+
+    def flush(self) -> int:
+        """
+        Applique tous les deltas en attente (une RPC par table et par tranche)
+
+        Returns:
+            Nombre de liens mis à jour
+        """
+        with self._flush_lock:
+            drained = self._drain()
+            if not drained:
+                return 0
+
+            started = time.perf_counter()
+            rows_by_table: Dict[str, List[Dict]] = defaultdict(list)
+            for (table, link_id), deltas in drained.items():
+                rows_by_table[table].append({"link_id": link_id, **deltas})
+
+            failed: Dict[Tuple[str, str], Dict[str, float]] = {}
+            flushed = 0
+
+            for table, rows in rows_by_table.items():
+                rpc_name = COUNTER_TABLES[table]["rpc"]
+                for start in range(0, len(rows), LINK_COUNTERS_CHUNK_SIZE):
+                    chunk = rows[start:start + LINK_COUNTERS_CHUNK_SIZE]
+                    try:
+                        self.supabase.rpc(rpc_name, {"p_deltas": chunk}).execute()
+                        flushed += len(chunk)
+                    except Exception as e:
+                        logger.error(f"❌ Échec flush compteurs {table} ({len(chunk)} liens): {e}")
+                        for row in chunk:
+                            failed[(table, row["link_id"])] = drained[(table, row["link_id"])]
+
+            if failed:
+                self.stats["failed_flushes"] += 1
+                self._restore(failed)
+
+            self.stats["rows_flushed"] += flushed
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self.stats["last_flush_at"] = datetime.now().isoformat()
+            return flushed
+
+    # ============================================
+    # THREAD DE FOND
+    # ============================================
+
+    def start(self):
+        """Démarre le flush périodique (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="link-counters-flusher", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"✅ Agrégation compteurs démarrée (backend={self.backend}, "
+            f"intervalle={self.flush_interval}s)"
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """Arrête le thread et applique les deltas restants"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(timeout=self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erreur thread compteurs: {e}")
+
+    def get_stats(self) -> Dict:
+        """Métriques d'agrégation (taux de coalescence, liens en attente)"""
+        with self._lock:
+            pending_links = len(self._pending)
+
+        increments = self.stats["increments"]
+        coalescing = (
+            (1 - self.stats["rows_flushed"] / increments) * 100 if increments > 0 else 0
+        )
+
+        return {
+            **self.stats,
+            "backend": self.backend,
+            "pending_links": pending_links,
+            "coalescing_percent": round(max(coalescing, 0), 2),
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+# Instance globale
+link_counters = LinkCounterAggregator()
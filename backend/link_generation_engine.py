@@ -0,0 +1,250 @@
+"""
+Moteur de génération de liens en masse (affiliate_links)
+Traite un lot complet en quelques allers-retours: des requêtes IN par
+tranches pour les vérifications, des codes courts tirés en bloc et des
+INSERT multi-lignes par tranches, avec un rapport de résultat par élément
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import secrets
+import logging
+
+from short_code_allocator import short_code_allocator, ShortCodeAllocationError
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+INSERT_CHUNK_SIZE = 200
+IN_CHUNK_SIZE = 200  # ~36 octets par UUID: garde la ligne de requête GET sous les limites des passerelles
+DEFAULT_COMMISSION_RATE = 15.0
+
+
+class BulkLinkEngine:
+    """Pipeline groupé: vérifications IN -> codes en bloc -> inserts par tranches"""
+
+    def __init__(
+        self,
+        supabase_client,
+        allocator=short_code_allocator,
+        chunk_size: int = INSERT_CHUNK_SIZE,
+        in_chunk_size: int = IN_CHUNK_SIZE,
+    ):
+        self.supabase = supabase_client
+        self.allocator = allocator
+        self.chunk_size = chunk_size
+        self.in_chunk_size = in_chunk_size
+
+    # ============================================
+    # GÉNÉRATION PAR PRODUITS
+    # ============================================
+
+    def generate_for_products(
+        self,
+        company_id: str,
+        product_ids: List[str],
+        commission_rate: Optional[float] = None,
+    ) -> Dict:
+        """
+        Génère (ou retrouve) le lien de base de chaque produit de l'entreprise
+
+        Returns:
+            {"results": [...], "links": [...], "summary": {...}}
+            Chaque résultat: {"product_id", "status": created|existing|error, ...}
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        results: Dict[str, Dict] = {}
+
+        # 1. Propriété des produits: requêtes IN par tranches
+        products = self._select_in(
+            lambda: self.supabase.from_("products").select("id, merchant_id"),
+            "id",
+            product_ids,
+        )
+        owned = {p["id"] for p in products if p.get("merchant_id") == company_id}
+
+        for product_id in product_ids:
+            if product_id not in owned:
+                results[product_id] = {"product_id": product_id, "status": "error", "error": "Not your product"}
+
+        candidates = [pid for pid in product_ids if pid in owned]
+
+        # 2. Liens de base existants: requêtes IN par tranches
+        if candidates:
+            existing = self._select_in(
+                lambda: (
+                    self.supabase.from_("affiliate_links")
+                    .select("*")
+                    .eq("merchant_id", company_id)
+                    .eq("is_active", True)
+                    .is_("influencer_id", "null")
+                ),
+                "product_id",
+                candidates,
+            )
+            for link in existing:
+                if link["product_id"] not in results:
+                    results[link["product_id"]] = self._result(link["product_id"], "existing", link)
+
+        to_create = [pid for pid in candidates if pid not in results]
+
+        # 3. Codes courts en bloc + 4. inserts multi-lignes
+        rows = [
+            {
+                "merchant_id": company_id,
+                "product_id": product_id,
+                "commission_rate": commission_rate or DEFAULT_COMMISSION_RATE,
+                "is_active": True,
+            }
+            for product_id in to_create
+        ]
+        for row, result in zip(rows, self._insert_with_codes(rows)):
+            results[row["product_id"]] = {"product_id": row["product_id"], **result}
+
+        ordered = [results[pid] for pid in product_ids]
+        return self._report(ordered)
+
+    # ============================================
+    # ATTRIBUTION À DES MEMBRES
+    # ============================================
+
+    def assign_to_members(
+        self,
+        company_id: str,
+        parent_link: Dict,
+        member_ids: List[str],
+        commission_rate: Optional[float] = None,
+    ) -> Dict:
+        """
+        Clone un lien de base pour chaque membre actif de l'équipe
+
+        Returns:
+            {"results": [...], "links": [...], "summary": {...}}
+            Chaque résultat: {"member_id", "status": created|error, ...}
+        """
+        member_ids = list(dict.fromkeys(member_ids))
+
+        # 1. Appartenance à l'équipe: requêtes IN par tranches
+        members = self._select_in(
+            lambda: (
+                self.supabase.from_("team_members")
+                .select("member_id")
+                .eq("company_id", company_id)
+                .eq("status", "active")
+            ),
+            "member_id",
+            member_ids,
+        )
+        in_team = {m["member_id"] for m in members}
+
+        results: Dict[str, Dict] = {
+            member_id: {"member_id": member_id, "status": "error", "error": "Not in team"}
+            for member_id in member_ids
+            if member_id not in in_team
+        }
+
+        assigned_at = datetime.now().isoformat()
+        rows = [
+            {
+                "merchant_id": company_id,
+                "influencer_id": member_id,
+                "product_id": parent_link["product_id"],
+                "commission_rate": commission_rate or parent_link["commission_rate"],
+                "is_active": True,
+                "metadata": {
+                    "assigned_by": company_id,
+                    "parent_link_id": parent_link["id"],
+                    "assigned_at": assigned_at,
+                },
+            }
+            for member_id in member_ids
+            if member_id in in_team
+        ]
+        for row, result in zip(rows, self._insert_with_codes(rows)):
+            results[row["influencer_id"]] = {"member_id": row["influencer_id"], **result}
+
+        ordered = [results[member_id] for member_id in member_ids]
+        return self._report(ordered)
+
+    # ============================================
+    # ÉTAPES COMMUNES
+    # ============================================
+
+    def draw_codes(self, count: int) -> List[str]:
+        """Tire `count` codes courts uniques en bloc"""
+        if count == 0:
+            return []
+
+        try:
+            return self.allocator.allocate_many(count)
+        except ShortCodeAllocationError:
+            logger.warning("⚠️ Pool de codes indisponible, repli sur codes aléatoires")
+
+        # Repli: codes aléatoires vérifiés par une requête IN par tour
+        codes: List[str] = []
+        while len(codes) < count:
+            candidates = list({secrets.token_urlsafe(6)[:8] for _ in range(count - len(codes))})
+            taken = self._select_in(
+                lambda: self.supabase.from_("affiliate_links").select("short_code"),
+                "short_code",
+                candidates,
+            )
+            taken_codes = {row["short_code"] for row in taken}
+            codes.extend(code for code in candidates if code not in taken_codes and code not in codes)
+        return codes[:count]
+
+    def _select_in(self, build_query: Callable, column: str, values: List[str]) -> List[Dict]:
+        """Exécute `build_query().in_(column, tranche)` par tranches de in_chunk_size et concatène les lignes"""
+        rows: List[Dict] = []
+        for start in range(0, len(values), self.in_chunk_size):
+            chunk = values[start:start + self.in_chunk_size]
+            response = build_query().in_(column, chunk).execute()
+            rows.extend(response.data or [])
+        return rows
+
+    def _insert_with_codes(self, rows: List[Dict]) -> List[Dict]:
+        """Affecte les codes puis insère par tranches; un résultat par ligne"""
+        if not rows:
+            return []
+
+        for row, code in zip(rows, self.draw_codes(len(rows))):
+            row["short_code"] = code
+
+        results: List[Dict] = []
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            try:
+                inserted = self.supabase.from_("affiliate_links").insert(chunk).execute()
+                by_code = {link["short_code"]: link for link in (inserted.data or [])}
+                for row in chunk:
+                    link = by_code.get(row["short_code"])
+                    if link:
+                        results.append(self._result(None, "created", link))
+                    else:
+                        results.append({"status": "error", "error": "Insert returned no row"})
+            except Exception as e:
+                logger.error(f"❌ Échec insert tranche de {len(chunk)} liens: {e}")
+                results.extend({"status": "error", "error": str(e)} for _ in chunk)
+
+        return results
+
+    @staticmethod
+    def _result(product_id: Optional[str], status: str, link: Dict) -> Dict:
+        result = {"status": status, "link_id": link.get("id"), "short_code": link.get("short_code"), "link": link}
+        if product_id:
+            result["product_id"] = product_id
+        return result
+
+    @staticmethod
+    def _report(results: List[Dict]) -> Dict:
+        summary = {"requested": len(results), "created": 0, "existing": 0, "errors": 0}
+        for result in results:
+            if result["status"] == "created":
+                summary["created"] += 1
+            elif result["status"] == "existing":
+                summary["existing"] += 1
+            else:
+                summary["errors"] += 1
+
+        links = [result.pop("link") for result in results if "link" in result]
+        return {"results": results, "links": links, "summary": summary}
@@ -22,6 +22,7 @@ import structlog
 
 from auth import get_current_user, optional_auth
 from supabase_client import supabase
+from async_db import execute
 
 router = APIRouter(prefix="/api/marketplace", tags=["Marketplace"])
 logger = structlog.get_logger()
@@ -157,7 +158,7 @@ async def get_marketplace_products(
         query = query.range(offset, offset + limit - 1)
 
         # Exécuter
-        result = query.execute()
+        result = await execute(query)
 
         return {
             "success": True,
@@ -193,7 +194,7 @@ async def get_product_detail(product_id: str):
     """
     try:
         # Récupérer produit complet
-        result = supabase.table('v_products_full').select('*').eq('id', product_id).execute()
+        result = await execute(supabase.table('v_products_full').select('*').eq('id', product_id))
 
         if not result.data:
             raise HTTPException(
@@ -205,7 +206,7 @@ async def get_product_detail(product_id: str):
 
         # Incrémenter vues (async)
         try:
-            supabase.rpc('increment_product_views', {'p_product_id': product_id}).execute()
+            await execute(supabase.rpc('increment_product_views', {'p_product_id': product_id}))
         except:
             pass  # Non-bloquant
 
@@ -233,7 +234,7 @@ async def get_categories():
     """
     try:
         # Récupérer toutes les catégories actives
-        result = supabase.table('product_categories').select('*').eq('is_active', True).order('display_order').execute()
+        result = await execute(supabase.table('product_categories').select('*').eq('is_active', True).order('display_order'))
 
         categories = result.data or []
 
@@ -271,7 +272,7 @@ async def get_featured_products(limit: int = Query(10, ge=1, le=50)):
     Triés par nombre de ventes et rating
     """
     try:
-        result = supabase.table('v_featured_products').select('*').limit(limit).execute()
+        result = await execute(supabase.table('v_featured_products').select('*').limit(limit))
 
         return {
             "success": True,
@@ -294,7 +295,7 @@ async def get_deals_of_day(limit: int = Query(10, ge=1, le=50)):
     Produits avec les meilleures réductions actives
     """
     try:
-        result = supabase.table('v_deals_of_day').select('*').limit(limit).execute()
+        result = await execute(supabase.table('v_deals_of_day').select('*').limit(limit))
 
         return {
             "success": True,
@@ -343,7 +344,7 @@ async def get_product_reviews(
 
         query = query.range(offset, offset + limit - 1)
 
-        result = query.execute()
+        result = await execute(query)
 
         return {
             "success": True,
@@ -395,7 +396,7 @@ async def request_affiliate(
             )
 
         # Vérifier produit existe
-        product_result = supabase.table('products').select('*').eq('id', product_id).eq('is_active', True).execute()
+        product_result = await execute(supabase.table('products').select('*').eq('id', product_id).eq('is_active', True))
 
         if not product_result.data:
             raise HTTPException(
@@ -407,7 +408,7 @@ async def request_affiliate(
         merchant_id = product['merchant_id']
 
         # Vérifier pas déjà demandé
-        existing = supabase.table('affiliate_requests').select('*').eq('influencer_id', user_id).eq('product_id', product_id).execute()
+        existing = await execute(supabase.table('affiliate_requests').select('*').eq('influencer_id', user_id).eq('product_id', product_id))
 
         if existing.data:
             existing_request = existing.data[0]
@@ -434,7 +435,7 @@ async def request_affiliate(
             'created_at': datetime.utcnow().isoformat()
         }
 
-        result = supabase.table('affiliate_requests').insert(affiliate_request).execute()
+        result = await execute(supabase.table('affiliate_requests').insert(affiliate_request))
 
         request_id = result.data[0]['id'] if result.data else None
 
@@ -480,7 +481,7 @@ async def create_product_review(
 
     try:
         # Vérifier produit existe
-        product_result = supabase.table('products').select('id').eq('id', product_id).execute()
+        product_result = await execute(supabase.table('products').select('id').eq('id', product_id))
 
         if not product_result.data:
             raise HTTPException(
@@ -489,7 +490,7 @@ async def create_product_review(
             )
 
         # Vérifier pas déjà reviewé
-        existing = supabase.table('product_reviews').select('id').eq('product_id', product_id).eq('user_id', user_id).execute()
+        existing = await execute(supabase.table('product_reviews').select('id').eq('product_id', product_id).eq('user_id', user_id))
 
         if existing.data:
             raise HTTPException(
@@ -508,7 +509,7 @@ async def create_product_review(
             'created_at': datetime.utcnow().isoformat()
         }
 
-        result = supabase.table('product_reviews').insert(review).execute()
+        result = await execute(supabase.table('product_reviews').insert(review))
 
         review_id = result.data[0]['id'] if result.data else None
 
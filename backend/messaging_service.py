@@ -0,0 +1,201 @@
+"""
+Service de messagerie
+Boîte de réception servie en une requête depuis le résumé dénormalisé des
+conversations (dernier message + non-lus par participant, maintenus par
+triggers) avec pagination par clé (last_message_at, id). Historique des
+messages paginé par clé (created_at, id) avec synchronisation incrémentale,
+et un marqueur de lecture par participant au lieu d'un flag par message
+"""
+
+from typing import Dict, List, Optional
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+INBOX_DEFAULT_LIMIT = 20
+INBOX_MAX_LIMIT = 100
+MESSAGES_DEFAULT_LIMIT = 50
+MESSAGES_MAX_LIMIT = 200
+
+
+def encode_cursor(*values) -> str:
+    """Curseur opaque (base64 url-safe) à partir des clés de tri"""
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List:
+    """Décode un curseur produit par encode_cursor (ValueError si invalide)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+    if not isinstance(values, list):
+        raise ValueError("Curseur de pagination invalide")
+    return values
+
+
+class MessagingService:
+    """Lecture des conversations et messages"""
+
+    def __init__(self, supabase_client=None):
+        self._supabase = supabase_client
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    def get_inbox(
+        self, user_id: str, limit: int = INBOX_DEFAULT_LIMIT, cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Page de la boîte de réception (une seule requête)
+
+        Args:
+            user_id: Participant
+            limit: Taille de page (1..INBOX_MAX_LIMIT)
+            cursor: next_cursor de la page précédente
+
+        Returns:
+            {"conversations": [...], "next_cursor": str | None}
+        """
+        limit = max(1, min(limit, INBOX_MAX_LIMIT))
+        before_at, before_id = decode_cursor(cursor) if cursor else (None, None)
+
+        result = self.supabase.rpc(
+            "get_conversation_inbox",
+            {
+                "p_user_id": user_id,
+                "p_limit": limit,
+                "p_before_at": before_at,
+                "p_before_id": before_id,
+            },
+        ).execute()
+
+        conversations = [self._summarize(row) for row in (result.data or [])]
+
+        next_cursor = None
+        if len(conversations) == limit:
+            last = conversations[-1]
+            next_cursor = encode_cursor(last["last_message_at"], last["id"])
+
+        return {"conversations": conversations, "next_cursor": next_cursor}
+
+    def get_messages(
+        self,
+        conversation_id: str,
+        limit: int = MESSAGES_DEFAULT_LIMIT,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> Optional[Dict]:
+        """
+        Page d'historique d'une conversation (une seule requête)
+
+        Sans curseur: derniers messages. `before`: messages plus anciens que
+        ce message. `after`: messages plus récents (synchronisation d'un
+        client qui détient déjà l'historique). Toujours en ordre chronologique.
+
+        Returns:
+            {"conversation", "messages", "has_more", "before_cursor", "after_cursor"}
+            ou None si la conversation n'existe pas
+        """
+        if before and after:
+            raise ValueError("Paramètres before et after incompatibles")
+        limit = max(1, min(limit, MESSAGES_MAX_LIMIT))
+
+        result = self.supabase.rpc(
+            "get_conversation_messages",
+            {
+                "p_conversation_id": conversation_id,
+                "p_limit": limit,
+                "p_before_id": before,
+                "p_after_id": after,
+            },
+        ).execute()
+
+        data = result.data or {}
+        conversation = data.get("conversation")
+        if not conversation:
+            return None
+
+        # limit + 1 lignes lues: la ligne en trop signale une page suivante
+        messages = data.get("messages") or []
+        has_more = len(messages) > limit
+        if has_more:
+            messages = messages[:limit] if after else messages[-limit:]
+
+        for message in messages:
+            message["is_read"] = self._is_read(conversation, message)
+
+        return {
+            "conversation": conversation,
+            "messages": messages,
+            "has_more": has_more,
+            "before_cursor": messages[0]["id"] if messages else before,
+            "after_cursor": messages[-1]["id"] if messages else after,
+        }
+
+    def mark_read(self, conversation_id: str, user_id: str, message_id: Optional[str] = None) -> Optional[int]:
+        """
+        Avance le marqueur de lecture du participant (jamais vers l'arrière)
+
+        Returns:
+            Nombre de messages encore non lus, None si non participant
+        """
+        if not user_id:
+            return None
+
+        result = self.supabase.rpc(
+            "mark_conversation_read",
+            {"p_conversation_id": conversation_id, "p_user_id": user_id, "p_message_id": message_id},
+        ).execute()
+        return result.data
+
+    @staticmethod
+    def participant_slot(conversation: Dict, user_id: str) -> Optional[str]:
+        """'user1' / 'user2' selon la place de l'utilisateur, None sinon"""
+        if str(conversation.get("user1_id")) == str(user_id):
+            return "user1"
+        if str(conversation.get("user2_id")) == str(user_id):
+            return "user2"
+        return None
+
+    @staticmethod
+    def _is_read(conversation: Dict, message: Dict) -> bool:
+        """Lu si le marqueur du destinataire est au niveau du message ou après"""
+        recipient = "user2" if str(message.get("sender_id")) == str(conversation.get("user1_id")) else "user1"
+        marker_at = conversation.get(f"{recipient}_last_read_at")
+        marker_id = conversation.get(f"{recipient}_last_read_message_id")
+        if not marker_at:
+            return bool(message.get("is_read"))
+        return (message["created_at"], str(message["id"])) <= (marker_at, str(marker_id))
+
+    @staticmethod
+    def _summarize(row: Dict) -> Dict:
+        """Format historique de l'API: last_message imbriqué + unread_count"""
+        conversation = dict(row)
+        conversation["last_message"] = (
+            {
+                "id": conversation.get("last_message_id"),
+                "conversation_id": conversation["id"],
+                "sender_id": conversation.get("last_message_sender_id"),
+                "content": conversation.get("last_message_preview"),
+                "created_at": conversation.get("last_message_at"),
+            }
+            if conversation.get("last_message_id")
+            else None
+        )
+        conversation["unread_count"] = conversation.get("unread_count") or 0
+        return conversation
+
+
+# Instance globale
+messaging_service = MessagingService()
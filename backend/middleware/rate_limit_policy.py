@@ -0,0 +1,335 @@
+"""
+Moteur de politiques de rate limiting
+
+Une seule source de vérité pour toutes les limites de l'API:
+- politiques déclaratives par route (chemin exact ou préfixe "*", méthodes)
+- quotas par plan d'abonnement (subscription_helpers.get_user_subscription,
+  mis en cache en process), limite explicite ou multiplicateur du plan
+- application cluster-wide via le RateLimiter Redis (script Lua)
+- en-têtes X-RateLimit-* et métriques d'utilisation en direct
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Tuple
+import asyncio
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_PLAN = "anonymous"
+DEFAULT_PLAN = "free"
+PLAN_CACHE_TTL = int(os.getenv("RATE_LIMIT_PLAN_CACHE_TTL", 300))
+
+
+@dataclass
+class RoutePolicy:
+    """
+    Limite d'un groupe de routes
+
+    Args:
+        name: Nom de la politique (clé Redis + métriques)
+        pattern: Chemin exact, ou préfixe terminé par "*"
+        limit: Requêtes par fenêtre (plan par défaut)
+        window: Fenêtre en secondes
+        scope: "user" (IP si anonyme) ou "ip" (toujours l'IP: auth, webhooks)
+        plan_limits: Limite explicite par plan (prioritaire sur le multiplicateur)
+        methods: Méthodes HTTP concernées (None = toutes)
+        local_fallback: Redis indisponible -> limite en process (sinon fail open)
+    """
+
+    name: str
+    pattern: str
+    limit: int
+    window: int = 60
+    scope: str = "user"
+    plan_limits: Dict[str, int] = field(default_factory=dict)
+    methods: Optional[Tuple[str, ...]] = None
+    local_fallback: bool = False
+
+    @property
+    def is_prefix(self) -> bool:
+        return self.pattern.endswith("*")
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        if self.is_prefix:
+            return path.startswith(self.pattern[:-1])
+        return path == self.pattern
+
+
+# Politiques par route (la première qui correspond s'applique; exacts d'abord)
+ROUTE_POLICIES: List[RoutePolicy] = [
+    # Auth - très strict, par IP, jamais ouvert même sans Redis (force brute)
+    RoutePolicy("auth_login", "/api/auth/login", limit=5, window=60, scope="ip", local_fallback=True),
+    RoutePolicy("auth_register", "/api/auth/register", limit=3, window=3600, scope="ip", local_fallback=True),
+    RoutePolicy(
+        "auth_reset_password", "/api/auth/reset-password", limit=3, window=3600, scope="ip", local_fallback=True
+    ),
+
+    # Upload - modéré
+    RoutePolicy("kyc_upload", "/api/kyc/upload", limit=10, window=3600),
+    RoutePolicy("product_image_upload", "/api/products/upload-image", limit=20, window=3600),
+
+    # Webhooks - très généreux (Stripe, réseaux sociaux), par IP
+    RoutePolicy("stripe_webhook", "/api/stripe/webhook", limit=1000, window=60, scope="ip"),
+    RoutePolicy("social_webhooks", "/api/social-media/webhooks*", limit=1000, window=60, scope="ip"),
+
+    # Bot IA / génération de contenu - coûteux, dépend du plan
+    RoutePolicy(
+        "ai_bot",
+        "/api/bot/*",
+        limit=30,
+        window=60,
+        plan_limits={ANONYMOUS_PLAN: 5},
+    ),
+    RoutePolicy("ai_content", "/api/ai*", limit=20, window=60, plan_limits={ANONYMOUS_PLAN: 0}),
+
+    # Catalogue - généreux
+    RoutePolicy("products", "/api/products*", limit=300, window=60),
+    RoutePolicy("influencers", "/api/influencers*", limit=300, window=60),
+
+    # Défaut API
+    RoutePolicy("api_default", "/api/*", limit=100, window=60),
+]
+
+# Multiplicateur de quota par plan (routes sans limite explicite pour le plan)
+PLAN_QUOTA_MULTIPLIERS: Dict[str, float] = {
+    ANONYMOUS_PLAN: 0.5,
+    DEFAULT_PLAN: 1.0,
+    "marketplace_independent": 2.0,
+    "starter": 2.0,
+    "enterprise_small": 2.0,
+    "pro": 4.0,
+    "enterprise_medium": 4.0,
+    "enterprise": 8.0,
+    "enterprise_large": 8.0,
+}
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int
+    window: int
+    policy: str
+    plan: str
+    identifier: str
+
+
+class RateLimitPolicyEngine:
+    """
+    Résout la politique d'une requête et l'applique
+
+    Args:
+        policies: Politiques par route (ROUTE_POLICIES par défaut)
+        limiter: RateLimiter Redis (import paresseux de l'instance globale)
+        plan_resolver: user_id -> slug du plan (abonnement actif par défaut)
+        jwt_secret: Secret de vérification du token (identification utilisateur)
+    """
+
+    def __init__(
+        self,
+        policies: Optional[List[RoutePolicy]] = None,
+        limiter=None,
+        plan_resolver=None,
+        plan_ttl: int = PLAN_CACHE_TTL,
+        jwt_secret: Optional[str] = None,
+        jwt_algorithm: Optional[str] = None,
+    ):
+        policies = policies if policies is not None else ROUTE_POLICIES
+        self._exact = {}
+        for policy in policies:
+            if not policy.is_prefix:
+                self._exact.setdefault(policy.pattern, []).append(policy)
+        self._prefixes = [policy for policy in policies if policy.is_prefix]
+
+        self._limiter = limiter
+        self._plan_resolver = plan_resolver
+        self.plan_ttl = plan_ttl
+        self.jwt_secret = jwt_secret or os.getenv("JWT_SECRET", "fallback-secret-please-set-env-variable")
+        self.jwt_algorithm = jwt_algorithm or os.getenv("JWT_ALGORITHM", "HS256")
+
+        self._plans: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._metrics = {
+            "policies": defaultdict(lambda: {"allowed": 0, "rejected": 0}),
+            "plans": defaultdict(lambda: {"allowed": 0, "rejected": 0}),
+        }
+        self._started_at = time.time()
+
+    @property
+    def limiter(self):
+        """RateLimiter Redis (import paresseux)"""
+        if self._limiter is None:
+            from middleware.rate_limiting import rate_limiter
+
+            self._limiter = rate_limiter
+        return self._limiter
+
+    # ============================================
+    # RÉSOLUTION
+    # ============================================
+
+    def policy_for(self, method: str, path: str) -> Optional[RoutePolicy]:
+        for policy in self._exact.get(path, ()):
+            if policy.matches(method, path):
+                return policy
+        for policy in self._prefixes:
+            if policy.matches(method, path):
+                return policy
+        return None
+
+    def identify(self, headers: Mapping[str, str], client_ip: str) -> Optional[str]:
+        """user_id du Bearer token s'il est valide, sinon None"""
+        authorization = headers.get("authorization") or ""
+        if not authorization.lower().startswith("bearer "):
+            return None
+
+        try:
+            import jwt
+
+            payload = jwt.decode(authorization[7:], self.jwt_secret, algorithms=[self.jwt_algorithm])
+            return payload.get("sub") or payload.get("user_id")
+        except Exception:
+            return None
+
+    def plan_for(self, user_id: Optional[str]) -> str:
+        """Slug du plan actif (mis en cache `plan_ttl` secondes)"""
+        if not user_id:
+            return ANONYMOUS_PLAN
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._plans.get(user_id)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        plan = self._resolve_plan(user_id)
+        with self._lock:
+            self._plans[user_id] = (plan, now + self.plan_ttl)
+        return plan
+
+    def _resolve_plan(self, user_id: str) -> str:
+        if self._plan_resolver:
+            return self._plan_resolver(user_id) or DEFAULT_PLAN
+
+        try:
+            from subscription_helpers import get_user_subscription
+
+            subscription = get_user_subscription(user_id) or {}
+            plan = subscription.get("subscription_plans") or {}
+            return plan.get("slug") or plan.get("code") or DEFAULT_PLAN
+        except Exception as e:
+            logger.warning(f"⚠️ Plan introuvable pour {user_id}: {e}")
+            return DEFAULT_PLAN
+
+    def invalidate_plan(self, user_id: str):
+        """À appeler après un changement d'abonnement"""
+        with self._lock:
+            self._plans.pop(user_id, None)
+
+    @staticmethod
+    def limit_for(policy: RoutePolicy, plan: str) -> int:
+        if plan in policy.plan_limits:
+            return policy.plan_limits[plan]
+        return max(1, int(policy.limit * PLAN_QUOTA_MULTIPLIERS.get(plan, 1.0)))
+
+    # ============================================
+    # APPLICATION
+    # ============================================
+
+    async def check(
+        self, method: str, path: str, headers: Mapping[str, str], client_ip: str
+    ) -> Optional[RateLimitDecision]:
+        """Décision pour une requête (None si aucune politique ne s'applique)"""
+        policy = self.policy_for(method, path)
+        if policy is None:
+            return None
+
+        user_id = None if policy.scope == "ip" else self.identify(headers, client_ip)
+        if user_id:
+            identifier = f"user:{user_id}"
+            with self._lock:
+                cached = self._plans.get(user_id)
+            if cached and cached[1] > time.monotonic():
+                plan = cached[0]
+            else:
+                loop = asyncio.get_running_loop()
+                plan = await loop.run_in_executor(None, self.plan_for, user_id)
+        else:
+            identifier = f"ip:{client_ip}"
+            plan = ANONYMOUS_PLAN if policy.scope == "user" else DEFAULT_PLAN
+
+        limit = self.limit_for(policy, plan)
+        if limit <= 0:
+            allowed, remaining, retry_after = False, 0, policy.window
+        else:
+            allowed, remaining, retry_after = await self.limiter.check_rate_limit(
+                identifier=identifier,
+                endpoint=policy.name,
+                limit=limit,
+                window=policy.window,
+                local_fallback=policy.local_fallback,
+            )
+
+        self._record(policy.name, plan, allowed)
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=limit,
+            remaining=remaining,
+            retry_after=retry_after,
+            window=policy.window,
+            policy=policy.name,
+            plan=plan,
+            identifier=identifier,
+        )
+
+    @staticmethod
+    def headers(decision: RateLimitDecision) -> Dict[str, str]:
+        reset_in = decision.retry_after if not decision.allowed else decision.window
+        headers = {
+            "X-RateLimit-Limit": str(decision.limit),
+            "X-RateLimit-Remaining": str(decision.remaining),
+            "X-RateLimit-Reset": str(int(time.time()) + reset_in),
+            "X-RateLimit-Policy": f"{decision.policy};w={decision.window};plan={decision.plan}",
+        }
+        if not decision.allowed:
+            headers["Retry-After"] = str(decision.retry_after)
+        return headers
+
+    # ============================================
+    # MÉTRIQUES
+    # ============================================
+
+    def _record(self, policy: str, plan: str, allowed: bool):
+        outcome = "allowed" if allowed else "rejected"
+        with self._lock:
+            self._metrics["policies"][policy][outcome] += 1
+            self._metrics["plans"][plan][outcome] += 1
+
+    def snapshot(self) -> Dict:
+        """Utilisation en direct (depuis le démarrage du worker)"""
+        with self._lock:
+            policies = {name: dict(counts) for name, counts in self._metrics["policies"].items()}
+            plans = {name: dict(counts) for name, counts in self._metrics["plans"].items()}
+            cached_plans = len(self._plans)
+
+        deny_cache = getattr(getattr(self._limiter, "limiter", None), "deny_cache", None)
+        return {
+            "since": self._started_at,
+            "policies": policies,
+            "plans": plans,
+            "cached_plans": cached_plans,
+            "local_denials": deny_cache.hits if deny_cache else 0,
+        }
+
+
+# Instance globale
+rate_limit_policies = RateLimitPolicyEngine()
@@ -0,0 +1,247 @@
+"""
+Rate limiting atomique par scripts Lua
+
+Un seul aller-retour Redis par requête (EVALSHA), décision atomique côté
+serveur, horloge Redis (TIME) partagée par toutes les instances.
+
+Stratégies:
+- gcra: Generic Cell Rate Algorithm, une seule valeur par clé (TAT)
+- token_bucket: hash {tokens, ts} par clé
+- sliding_window: sorted set (un membre par requête), conservé pour
+  compatibilité et précision stricte de fenêtre
+
+Un pré-filtre local (LocalDenyCache) mémorise les refus jusqu'à leur
+retry_after: un client déjà au-delà de sa limite est rejeté sans Redis.
+
+LocalRateLimit (GCRA en process) sert de repli quand Redis est indisponible,
+pour les politiques qui ne doivent jamais laisser tout passer (auth par IP).
+"""
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+import math
+import os
+import threading
+import time
+import uuid
+
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "gcra")
+RATE_LIMIT_DENY_CACHE_SIZE = int(os.getenv("RATE_LIMIT_DENY_CACHE_SIZE", 10000))
+
+# Tous les scripts: KEYS[1] = clé, ARGV = limit, window_ms, cost[, member]
+# Retour: {allowed (0/1), remaining, retry_after_ms}
+
+GCRA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+
+local interval = window_ms / limit
+local stored = redis.call('GET', KEYS[1])
+local tat = stored and tonumber(stored) or now
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + interval * cost
+local allow_at = new_tat - window_ms
+if allow_at > now then
+    return {0, 0, math.ceil(allow_at - now)}
+end
+
+redis.call('SET', KEYS[1], new_tat, 'PX', math.max(1, math.ceil(new_tat - now)))
+return {1, math.floor((window_ms - (new_tat - now)) / interval), 0}
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+
+local rate = capacity / window_ms
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = math.ceil((cost - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(window_ms))
+return {allowed, math.floor(tokens), retry}
+"""
+
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local member = ARGV[4]
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window_ms)
+local count = redis.call('ZCARD', KEYS[1])
+if count + cost > limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    local retry = window_ms
+    if oldest[2] then
+        retry = tonumber(oldest[2]) + window_ms - now
+    end
+    return {0, 0, math.max(1, math.ceil(retry))}
+end
+
+for i = 1, cost do
+    redis.call('ZADD', KEYS[1], now, member .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window_ms)
+return {1, limit - count - cost, 0}
+"""
+
+SCRIPTS = {
+    "gcra": GCRA_SCRIPT,
+    "token_bucket": TOKEN_BUCKET_SCRIPT,
+    "sliding_window": SLIDING_WINDOW_SCRIPT,
+}
+
+
+class LocalDenyCache:
+    """Refus mémorisés en process jusqu'à leur échéance (LRU borné)"""
+
+    def __init__(self, max_size: int = RATE_LIMIT_DENY_CACHE_SIZE):
+        self.max_size = max_size
+        self._deadlines: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def retry_after(self, key: str) -> Optional[float]:
+        """Secondes de refus restantes, None si la clé n'est pas bloquée"""
+        with self._lock:
+            deadline = self._deadlines.get(key)
+            if deadline is None:
+                return None
+
+            left = deadline - time.monotonic()
+            if left <= 0:
+                del self._deadlines[key]
+                return None
+
+            self.hits += 1
+            return left
+
+    def deny(self, key: str, retry_after: float):
+        with self._lock:
+            self._deadlines[key] = time.monotonic() + retry_after
+            self._deadlines.move_to_end(key)
+            while len(self._deadlines) > self.max_size:
+                self._deadlines.popitem(last=False)
+
+    def clear(self, key: str):
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+
+class LocalRateLimit:
+    """
+    GCRA en process (une échéance par clé, LRU borné)
+
+    Même contrat que ScriptedRateLimit.hit; la limite s'applique par
+    processus (donc multipliée par le nombre de workers), mieux que rien
+    quand Redis est indisponible.
+    """
+
+    def __init__(self, max_size: int = RATE_LIMIT_DENY_CACHE_SIZE):
+        self.max_size = max_size
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> Tuple[bool, int, int]:
+        interval = window / limit
+        now = time.monotonic()
+
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + interval * cost
+            allow_at = new_tat - window
+
+            if allow_at > now:
+                return False, 0, max(1, math.ceil(allow_at - now))
+
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+            while len(self._tats) > self.max_size:
+                self._tats.popitem(last=False)
+
+        return True, max(0, int((now - allow_at) / interval)), 0
+
+    def reset(self, key: str):
+        with self._lock:
+            self._tats.pop(key, None)
+
+
+class ScriptedRateLimit:
+    """
+    Décision de rate limit en un aller-retour Redis
+
+    Args:
+        redis_client: Client redis-py (register_script / EVALSHA)
+        strategy: gcra | token_bucket | sliding_window
+        deny_cache: Pré-filtre local (None pour le désactiver)
+    """
+
+    def __init__(self, redis_client, strategy: str = RATE_LIMIT_STRATEGY, deny_cache: Optional[LocalDenyCache] = None):
+        if strategy not in SCRIPTS:
+            raise ValueError(f"Stratégie de rate limit inconnue: {strategy}")
+
+        self.redis = redis_client
+        self.strategy = strategy
+        self.deny_cache = deny_cache
+        self._script = None
+
+    @property
+    def script(self):
+        """Script enregistré (EVALSHA, repli EVAL si absent du cache Redis)"""
+        if self._script is None:
+            self._script = self.redis.register_script(SCRIPTS[self.strategy])
+        return self._script
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> Tuple[bool, int, int]:
+        """
+        Consomme `cost` unités pour la clé
+
+        Returns:
+            (allowed, remaining, retry_after en secondes)
+        """
+        if self.deny_cache:
+            left = self.deny_cache.retry_after(key)
+            if left is not None:
+                return False, 0, max(1, math.ceil(left))
+
+        args = [limit, int(window * 1000), cost]
+        if self.strategy == "sliding_window":
+            args.append(uuid.uuid4().hex)
+
+        allowed, remaining, retry_after_ms = self.script(keys=[key], args=args)
+
+        if not allowed:
+            retry_after = max(1, math.ceil(int(retry_after_ms) / 1000))
+            if self.deny_cache:
+                self.deny_cache.deny(key, int(retry_after_ms) / 1000)
+            return False, 0, retry_after
+
+        return True, max(0, int(remaining)), 0
+
+    def reset(self, key: str):
+        self.redis.delete(key)
+        if self.deny_cache:
+            self.deny_cache.clear(key)
@@ -4,15 +4,16 @@ Rate Limiting Middleware - Production Grade
 Implémentation avec Redis pour distributed rate limiting.
 
 Features:
-- Multiple strategies (Fixed Window, Sliding Window, Token Bucket)
+- Multiple strategies (GCRA, Token Bucket, Sliding Window)
+- Un seul aller-retour Redis par requête (scripts Lua atomiques)
+- Pré-filtre local des clients déjà bloqués (aucun appel Redis)
 - Redis-based (scale horizontale)
-- Customizable limits par endpoint/user
+- Politiques par route et par plan d'abonnement (middleware.rate_limit_policy)
 - Automatic cleanup
 - Headers informatifs (X-RateLimit-*)
 """
 
 import redis
-import time
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from typing import Callable, Optional
@@ -20,6 +21,14 @@ import structlog
 import os
 from functools import wraps
 
+from async_db import run_db
+from middleware.rate_limit_scripts import (
+    RATE_LIMIT_STRATEGY,
+    LocalDenyCache,
+    LocalRateLimit,
+    ScriptedRateLimit,
+)
+
 logger = structlog.get_logger()
 
 # Configuration Redis
@@ -40,41 +49,54 @@ class RateLimitExceeded(HTTPException):
 
 class RateLimiter:
     """
-    Rate limiter avec stratégie sliding window
+    Rate limiter Redis, décision atomique en un aller-retour (script Lua)
 
-    Plus précis que fixed window, évite les bursts en fin de fenêtre
+    Stratégies: gcra (défaut, O(1) mémoire par clé), token_bucket,
+    sliding_window (précision stricte de fenêtre, un membre par requête)
     """
 
     def __init__(
         self,
         key_prefix: str = "ratelimit",
         default_limit: int = 100,
-        default_window: int = 60  # secondes
+        default_window: int = 60,  # secondes
+        strategy: str = RATE_LIMIT_STRATEGY,
+        local_prefilter: bool = True,
     ):
         self.redis = redis_client
         self.key_prefix = key_prefix
         self.default_limit = default_limit
         self.default_window = default_window
+        self.strategy = strategy
+        self.limiter = ScriptedRateLimit(
+            redis_client, strategy, LocalDenyCache() if local_prefilter else None
+        )
+        # Repli en process quand Redis est indisponible (politiques local_fallback)
+        self.local_limiter = LocalRateLimit()
 
     def get_rate_limit_key(self, identifier: str, endpoint: str) -> str:
-        """Générer clé Redis unique"""
-        return f"{self.key_prefix}:{endpoint}:{identifier}"
+        """Générer clé Redis unique (par stratégie: structures différentes)"""
+        return f"{self.key_prefix}:{self.strategy}:{endpoint}:{identifier}"
 
     async def check_rate_limit(
         self,
         identifier: str,
         endpoint: str,
         limit: Optional[int] = None,
-        window: Optional[int] = None
+        window: Optional[int] = None,
+        cost: int = 1,
+        local_fallback: bool = False
     ) -> tuple[bool, int, int]:
         """
-        Vérifier rate limit avec sliding window
+        Vérifier rate limit
 
         Args:
             identifier: Identifiant unique (user_id, IP, etc.)
             endpoint: Nom de l'endpoint
             limit: Nombre max de requêtes (None = default)
             window: Fenêtre en secondes (None = default)
+            cost: Unités consommées par la requête
+            local_fallback: Redis indisponible -> limite en process au lieu de tout laisser passer
 
         Returns:
             (allowed, remaining, retry_after)
@@ -83,52 +105,23 @@ class RateLimiter:
         window = window or self.default_window
 
         key = self.get_rate_limit_key(identifier, endpoint)
-        now = time.time()
-        window_start = now - window
 
         try:
-            # Pipeline Redis pour atomicité
-            pipe = self.redis.pipeline()
-
-            # 1. Supprimer les timestamps hors fenêtre
-            pipe.zremrangebyscore(key, 0, window_start)
-
-            # 2. Compter requêtes dans la fenêtre
-            pipe.zcard(key)
-
-            # 3. Ajouter timestamp actuel
-            pipe.zadd(key, {str(now): now})
-
-            # 4. Expiration de la clé (cleanup auto)
-            pipe.expire(key, window * 2)
-
-            results = pipe.execute()
-            current_count = results[1]  # Résultat du ZCARD
-
-            # Vérifier si limite dépassée
-            if current_count >= limit:
-                # Calculer retry_after (temps jusqu'à expiration de la plus vieille requête)
-                oldest_timestamps = self.redis.zrange(key, 0, 0, withscores=True)
-                if oldest_timestamps:
-                    oldest_time = oldest_timestamps[0][1]
-                    retry_after = int(window - (now - oldest_time)) + 1
-                else:
-                    retry_after = window
-
-                return False, 0, retry_after
-
-            remaining = limit - current_count - 1  # -1 pour la requête actuelle
-            return True, remaining, 0
+            # Client redis synchrone: l'aller-retour se fait hors de la boucle
+            return await run_db(self.limiter.hit, key, limit, window, cost)
 
         except redis.RedisError as e:
-            logger.error("rate_limit_redis_error", error=str(e))
-            # En cas d'erreur Redis, permettre la requête (fail open)
+            logger.error("rate_limit_redis_error", error=str(e), local_fallback=local_fallback)
+            if local_fallback:
+                return self.local_limiter.hit(key, limit, window, cost)
+            # Sinon permettre la requête (fail open)
             return True, limit, 0
 
     async def reset_limit(self, identifier: str, endpoint: str):
         """Reset rate limit pour un identifiant (utile pour tests/admin)"""
         key = self.get_rate_limit_key(identifier, endpoint)
-        self.redis.delete(key)
+        self.local_limiter.reset(key)
+        await run_db(self.limiter.reset, key)
 
 
 # Instance globale
@@ -143,98 +136,61 @@ async def rate_limit_middleware(request: Request, call_next: Callable):
     """
     Middleware FastAPI pour rate limiting automatique
 
-    Apply sur toutes les requêtes API
+    Politiques déclarées dans middleware.rate_limit_policy (route + plan
+    d'abonnement), décision partagée par toutes les instances via Redis
     """
-    # Extraire identifiant (user ou IP)
-    identifier = None
-    endpoint = request.url.path
+    from middleware.rate_limit_policy import rate_limit_policies
 
-    # 1. Priorité à l'user_id si authentifié
-    if hasattr(request.state, "user") and request.state.user:
-        identifier = f"user:{request.state.user['id']}"
-    else:
-        # 2. Sinon utiliser IP
-        client_ip = request.client.host
-        identifier = f"ip:{client_ip}"
-
-    # Limites personnalisées selon endpoint
-    limits = get_endpoint_limits(endpoint)
-
-    # Vérifier rate limit
-    allowed, remaining, retry_after = await rate_limiter.check_rate_limit(
-        identifier=identifier,
-        endpoint=endpoint,
-        limit=limits["limit"],
-        window=limits["window"]
+    client_ip = request.client.host if request.client else "unknown"
+    decision = await rate_limit_policies.check(
+        request.method, request.url.path, request.headers, client_ip
     )
+    if decision is None:
+        return await call_next(request)
+
+    headers = rate_limit_policies.headers(decision)
 
-    if not allowed:
+    if not decision.allowed:
         logger.warning(
             "rate_limit_exceeded",
-            identifier=identifier,
-            endpoint=endpoint,
-            retry_after=retry_after
+            identifier=decision.identifier,
+            policy=decision.policy,
+            plan=decision.plan,
+            retry_after=decision.retry_after
         )
 
         return JSONResponse(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             content={
                 "error": "Rate limit exceeded",
-                "retry_after": retry_after,
-                "message": f"Too many requests. Please retry after {retry_after} seconds."
+                "retry_after": decision.retry_after,
+                "message": f"Too many requests. Please retry after {decision.retry_after} seconds."
             },
-            headers={
-                "Retry-After": str(retry_after),
-                "X-RateLimit-Limit": str(limits["limit"]),
-                "X-RateLimit-Remaining": "0",
-                "X-RateLimit-Reset": str(int(time.time()) + retry_after)
-            }
+            headers=headers
         )
 
     # Requête autorisée, continuer
     response = await call_next(request)
 
     # Ajouter headers rate limit
-    response.headers["X-RateLimit-Limit"] = str(limits["limit"])
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
-    response.headers["X-RateLimit-Reset"] = str(int(time.time()) + limits["window"])
+    response.headers.update(headers)
 
     return response
 
 
-def get_endpoint_limits(endpoint: str) -> dict:
+def get_endpoint_limits(endpoint: str, plan: str = "free") -> dict:
     """
-    Récupérer les limites spécifiques à un endpoint
+    Récupérer les limites d'un endpoint pour un plan
 
-    Endpoints critiques = limites plus strictes
+    Source unique: ROUTE_POLICIES (middleware.rate_limit_policy)
     """
-    # Limites par défaut
-    default = {"limit": 100, "window": 60}  # 100 req/min
-
-    # Limites personnalisées
-    custom_limits = {
-        # Auth endpoints - très strict
-        "/api/auth/login": {"limit": 5, "window": 60},  # 5/min
-        "/api/auth/register": {"limit": 3, "window": 3600},  # 3/heure
-        "/api/auth/reset-password": {"limit": 3, "window": 3600},
-
-        # Upload endpoints - modéré
-        "/api/kyc/upload": {"limit": 10, "window": 3600},  # 10/heure
-        "/api/products/upload-image": {"limit": 20, "window": 3600},
-
-        # API endpoints - généreux pour utilisateurs payants
-        "/api/products": {"limit": 300, "window": 60},
-        "/api/influencers": {"limit": 300, "window": 60},
-
-        # Webhooks - très généreux (vient de Stripe/etc)
-        "/api/stripe/webhook": {"limit": 1000, "window": 60},
-        "/api/social-media/webhooks": {"limit": 1000, "window": 60},
-
-        # Bot IA - modéré
-        "/api/bot/chat": {"limit": 30, "window": 60},  # 30 msg/min
-    }
+    from middleware.rate_limit_policy import rate_limit_policies
+
+    policy = rate_limit_policies.policy_for("GET", endpoint)
+    if policy is None:
+        return {"limit": rate_limiter.default_limit, "window": rate_limiter.default_window}
 
-    return custom_limits.get(endpoint, default)
+    return {"limit": rate_limit_policies.limit_for(policy, plan), "window": policy.window}
 
 
 # ============================================
@@ -287,14 +243,20 @@ async def get_rate_limit_stats(identifier: str, endpoint: str) -> dict:
     """Récupérer stats rate limit pour debugging"""
     key = rate_limiter.get_rate_limit_key(identifier, endpoint)
 
-    count = redis_client.zcard(key)
-    ttl = redis_client.ttl(key)
+    if rate_limiter.strategy == "sliding_window":
+        state = {"current_count": redis_client.zcard(key)}
+    elif rate_limiter.strategy == "token_bucket":
+        state = redis_client.hgetall(key)
+    else:
+        state = {"theoretical_arrival_ms": redis_client.get(key)}
 
     return {
         "identifier": identifier,
         "endpoint": endpoint,
-        "current_count": count,
-        "ttl": ttl
+        "strategy": rate_limiter.strategy,
+        **state,
+        "ttl": redis_client.ttl(key),
+        "local_denials": rate_limiter.limiter.deny_cache.hits if rate_limiter.limiter.deny_cache else 0
     }
 
 
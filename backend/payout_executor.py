@@ -0,0 +1,247 @@
+"""
+Exécuteur de paiements concurrent
+Répartit les paiements par provider, chacun avec son pool de workers borné,
+un token bucket (débit max accepté par l'API du provider), une clé
+d'idempotence par paiement et des retries avec backoff exponentiel + jitter.
+Produit un rapport débit / latence par provider
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import inspect
+import random
+import statistics
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProviderPolicy:
+    """Limites d'un provider de paiement"""
+
+    max_concurrency: int = 4
+    rate_per_second: float = 10.0
+    burst: int = 10
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+
+
+# Limites par défaut (à ajuster selon les quotas contractuels des providers)
+PROVIDER_POLICIES: Dict[str, ProviderPolicy] = {
+    "paypal": ProviderPolicy(max_concurrency=8, rate_per_second=20.0, burst=20),
+    "bank_transfer": ProviderPolicy(max_concurrency=4, rate_per_second=50.0, burst=50),
+    "cashplus": ProviderPolicy(max_concurrency=4, rate_per_second=5.0, burst=5),
+    "orange_money": ProviderPolicy(max_concurrency=4, rate_per_second=5.0, burst=5),
+    "mt_cash": ProviderPolicy(max_concurrency=2, rate_per_second=2.0, burst=2),
+}
+DEFAULT_POLICY = ProviderPolicy()
+
+
+@dataclass
+class PayoutJob:
+    """Un paiement à exécuter"""
+
+    idempotency_key: str
+    provider: str
+    amount: float
+    payload: Any = None
+    metadata: Dict = field(default_factory=dict)
+
+
+@dataclass
+class PayoutOutcome:
+    """Résultat d'un paiement"""
+
+    job: PayoutJob
+    success: bool
+    transaction_id: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    latency_ms: float = 0.0
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` jetons/s, capacité `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloque jusqu'à disposer d'un jeton"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class PayoutExecutor:
+    """
+    Exécute des paiements en parallèle entre providers
+
+    Args:
+        handlers: provider -> fonction(job) -> (success, transaction_id)
+                  (fonctions synchrones ou coroutines). Le handler transmet
+                  job.idempotency_key au provider et laisse remonter ses
+                  exceptions: elles pilotent les retries
+        policies: Limites par provider (PROVIDER_POLICIES par défaut)
+        on_complete: Rappel appelé pour chaque résultat (depuis un worker)
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Callable[[PayoutJob], Tuple[bool, Optional[str]]]],
+        policies: Optional[Dict[str, ProviderPolicy]] = None,
+        on_complete: Optional[Callable[[PayoutOutcome], None]] = None,
+    ):
+        self.handlers = handlers
+        self.policies = policies or PROVIDER_POLICIES
+        self.on_complete = on_complete
+
+        self._completed: Dict[str, PayoutOutcome] = {}
+        self._lock = threading.Lock()
+
+    def policy_for(self, provider: str) -> ProviderPolicy:
+        return self.policies.get(provider, DEFAULT_POLICY)
+
+    def run(self, jobs: List[PayoutJob]) -> Dict:
+        """
+        Exécute tous les paiements et retourne le rapport par provider
+
+        Une clé d'idempotence déjà exécutée (dans ce run ou un précédent avec
+        le même exécuteur) n'est jamais renvoyée au provider.
+
+        Returns:
+            {"outcomes": [PayoutOutcome], "providers": {provider: {...}}, "duration_s": float}
+        """
+        started = time.perf_counter()
+
+        by_provider: Dict[str, List[PayoutJob]] = {}
+        seen = set()
+        for job in jobs:
+            if job.idempotency_key in seen:
+                continue
+            seen.add(job.idempotency_key)
+            by_provider.setdefault(job.provider, []).append(job)
+
+        # Un pool dédié par provider: un provider lent ne bloque pas les autres
+        with ThreadPoolExecutor(max_workers=max(len(by_provider), 1), thread_name_prefix="payout-provider") as outer:
+            futures = [
+                outer.submit(self._run_provider, provider, provider_jobs)
+                for provider, provider_jobs in by_provider.items()
+            ]
+            results = [future.result() for future in futures]
+
+        outcomes = [outcome for provider_outcomes, _ in results for outcome in provider_outcomes]
+        providers = dict(zip(by_provider.keys(), (report for _, report in results)))
+
+        return {
+            "outcomes": outcomes,
+            "providers": providers,
+            "duration_s": round(time.perf_counter() - started, 3),
+        }
+
+    def _run_provider(self, provider: str, jobs: List[PayoutJob]) -> Tuple[List[PayoutOutcome], Dict]:
+        policy = self.policy_for(provider)
+        bucket = TokenBucket(policy.rate_per_second, policy.burst)
+        started = time.perf_counter()
+
+        outcomes: List[PayoutOutcome] = []
+        with ThreadPoolExecutor(max_workers=policy.max_concurrency, thread_name_prefix=f"payout-{provider}") as pool:
+            futures = [pool.submit(self._execute, job, policy, bucket) for job in jobs]
+            for future in as_completed(futures):
+                outcomes.append(future.result())
+
+        return outcomes, self._report(outcomes, time.perf_counter() - started, policy)
+
+    def _execute(self, job: PayoutJob, policy: ProviderPolicy, bucket: TokenBucket) -> PayoutOutcome:
+        with self._lock:
+            previous = self._completed.get(job.idempotency_key)
+        if previous:
+            return previous
+
+        handler = self.handlers.get(job.provider)
+        started = time.perf_counter()
+        outcome = PayoutOutcome(job=job, success=False)
+
+        if handler is None:
+            outcome.error = f"Provider non supporté: {job.provider}"
+        else:
+            for attempt in range(1, policy.max_retries + 2):
+                outcome.attempts = attempt
+                bucket.acquire()
+                try:
+                    result = handler(job)
+                    if inspect.isawaitable(result):
+                        result = asyncio.run(result)
+                    outcome.success, outcome.transaction_id = result
+                    outcome.error = None if outcome.success else "payment_processing_failed"
+                    break
+                except ValueError as e:
+                    # Erreur de validation: inutile de réessayer
+                    outcome.error = str(e)
+                    break
+                except Exception as e:
+                    outcome.error = str(e)
+                    if attempt > policy.max_retries:
+                        break
+                    time.sleep(self._backoff(attempt, policy))
+
+        outcome.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        with self._lock:
+            self._completed[job.idempotency_key] = outcome
+
+        if self.on_complete:
+            try:
+                self.on_complete(outcome)
+            except Exception as e:
+                logger.error(f"❌ Post-traitement paiement {job.idempotency_key} échoué: {e}")
+
+        return outcome
+
+    @staticmethod
+    def _backoff(attempt: int, policy: ProviderPolicy) -> float:
+        """Backoff exponentiel avec full jitter"""
+        return random.uniform(0, min(policy.max_delay, policy.base_delay * (2 ** (attempt - 1))))
+
+    @staticmethod
+    def _report(outcomes: List[PayoutOutcome], duration: float, policy: ProviderPolicy) -> Dict:
+        latencies = sorted(outcome.latency_ms for outcome in outcomes)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        succeeded = sum(1 for outcome in outcomes if outcome.success)
+        return {
+            "count": len(outcomes),
+            "succeeded": succeeded,
+            "failed": len(outcomes) - succeeded,
+            "retries": sum(max(outcome.attempts - 1, 0) for outcome in outcomes),
+            "duration_s": round(duration, 3),
+            "throughput_per_s": round(len(outcomes) / duration, 2) if duration else 0.0,
+            "latency_p50_ms": round(statistics.median(latencies), 2) if latencies else 0.0,
+            "latency_p95_ms": percentile(0.95),
+            "latency_p99_ms": percentile(0.99),
+            "max_concurrency": policy.max_concurrency,
+            "rate_per_second": policy.rate_per_second,
+        }
@@ -0,0 +1,228 @@
+"""
+Accès PostgreSQL direct (asyncpg) pour les lectures chaudes des repositories
+
+Les repositories passent par PostgREST (HTTP + JSON + planification à
+chaque appel). Pour quelques requêtes très fréquentes, une connexion
+directe évite ces coûts:
+- pool asyncpg partagé par le worker, créé au premier appel
+- requêtes paramétrées: asyncpg prépare chaque requête une fois par
+  connexion puis réutilise le plan (cache de statements)
+- activation par repository (PG_FAST_PATH=tracking,users,sales ou all);
+  toute erreur asyncpg retombe sur le chemin PostgREST
+
+Les lignes ont la même forme que celles de PostgREST (uuid / dates en
+texte, numeric en float, json décodé).
+
+Derrière PgBouncer en mode transaction (pooler Supabase, port 6543),
+mettre PG_STATEMENT_CACHE_SIZE=0: les statements préparés ne survivent
+pas à un changement de connexion serveur.
+
+Usage:
+    from pg_fast_path import pg_fast_path
+
+    if pg_fast_path.enabled_for("users"):
+        user = await pg_fast_path.fetchrow("SELECT * FROM users WHERE email = $1 LIMIT 1", email)
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PG_FAST_PATH = os.getenv("PG_FAST_PATH", "")
+PG_FAST_PATH_DSN = os.getenv("PG_FAST_PATH_DSN") or os.getenv("DATABASE_URL")
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", 2))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", 10))
+PG_STATEMENT_CACHE_SIZE = int(os.getenv("PG_STATEMENT_CACHE_SIZE", 256))
+PG_COMMAND_TIMEOUT = float(os.getenv("PG_COMMAND_TIMEOUT", 5))
+
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Même sémantique que la fonction SQL aggregate_rows (chemin PostgREST)
+AGGREGATE_TABLES = ("sales", "trackable_links", "products", "users")
+AGGREGATE_SQL = {
+    "sum": "COALESCE(SUM({column}), 0)",
+    "avg": "COALESCE(AVG({column}), 0)",
+    "count": "COUNT({column})",
+    "count_distinct": "COUNT(DISTINCT {column})",
+    "min": "MIN({column})",
+    "max": "MAX({column})",
+}
+OPERATORS_SQL = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def quote_identifier(name: str) -> str:
+    """Identifiant SQL validé et quoté (tables / colonnes connues du code)"""
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Identifiant SQL invalide: {name}")
+    return f'"{name}"'
+
+
+def build_aggregate_sql(
+    table: str,
+    aggregates: Dict[str, str],
+    filters: List[Tuple[str, str, Any]],
+    group_by: Optional[List[str]] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Compile un agrégat de BaseRepository.aggregate en SQL paramétré
+
+    Le texte SQL ne dépend que de la forme de la requête (jamais des
+    valeurs): une même méthode de repository réutilise le même statement
+    préparé.
+
+    Returns:
+        (sql, paramètres)
+
+    Raises:
+        ValueError: table, fonction d'agrégat, opérateur ou identifiant non supporté
+    """
+    if table not in AGGREGATE_TABLES:
+        raise ValueError(f"Table non autorisée pour les agrégats: {table}")
+
+    select = [quote_identifier(column) for column in group_by or []]
+    for alias, spec in aggregates.items():
+        function, _, column = spec.partition(":")
+        if function not in AGGREGATE_SQL:
+            raise ValueError(f"Agrégat non supporté: {spec}")
+        if function == "count" and column in ("", "*"):
+            expression = "COUNT(*)"
+        else:
+            expression = AGGREGATE_SQL[function].format(column=quote_identifier(column))
+        select.append(f"{expression} AS {quote_identifier(alias)}")
+
+    where, args = build_where(filters)
+    sql = f"SELECT {', '.join(select)} FROM {quote_identifier(table)}{where}"
+    if group_by:
+        sql += " GROUP BY " + ", ".join(quote_identifier(column) for column in group_by)
+    return sql, args
+
+
+def build_where(filters: List[Tuple[str, str, Any]], args: Optional[List[Any]] = None) -> Tuple[str, List[Any]]:
+    """Clause WHERE paramétrée ($1, $2...) à partir de triplets (colonne, opérateur, valeur)"""
+    args = args if args is not None else []
+    conditions = []
+    for column, operator, value in filters:
+        column_sql = quote_identifier(column)
+        if operator == "in":
+            if not value:
+                conditions.append("FALSE")
+                continue
+            placeholders = []
+            for item in value:
+                args.append(item)
+                placeholders.append(f"${len(args)}")
+            conditions.append(f"{column_sql} IN ({', '.join(placeholders)})")
+        elif operator == "is" or value is None:
+            conditions.append(f"{column_sql} IS {'NOT NULL' if operator == 'neq' else 'NULL'}")
+        elif operator in OPERATORS_SQL:
+            args.append(value)
+            conditions.append(f"{column_sql} {OPERATORS_SQL[operator]} ${len(args)}")
+        else:
+            raise ValueError(f"Opérateur non supporté: {operator}")
+
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), args
+
+
+async def _init_connection(connection):
+    """Codecs alignés sur les réponses PostgREST"""
+    for type_name in ("uuid", "timestamptz", "timestamp", "date", "time"):
+        await connection.set_type_codec(
+            type_name, schema="pg_catalog", encoder=str, decoder=str, format="text"
+        )
+    await connection.set_type_codec("numeric", schema="pg_catalog", encoder=str, decoder=float, format="text")
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name, schema="pg_catalog", encoder=json.dumps, decoder=json.loads, format="text"
+        )
+
+
+class PostgresFastPath:
+    """
+    Pool asyncpg partagé et requêtes paramétrées
+
+    Args:
+        dsn: Chaîne de connexion PostgreSQL (PG_FAST_PATH_DSN / DATABASE_URL)
+        repositories: Repositories activés ("tracking,users,sales" ou "all")
+    """
+
+    def __init__(self, dsn: Optional[str] = PG_FAST_PATH_DSN, repositories: str = PG_FAST_PATH):
+        self.dsn = dsn
+        self.repositories = {name.strip() for name in repositories.split(",") if name.strip()}
+        self._pool = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self.stats = {"queries": 0, "errors": 0, "fallbacks": 0, "total_ms": 0.0}
+
+    def enabled_for(self, repository: Optional[str]) -> bool:
+        if not self.dsn or not repository:
+            return False
+        return "all" in self.repositories or repository in self.repositories
+
+    async def pool(self):
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    import asyncpg
+
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=PG_POOL_MIN_SIZE,
+                        max_size=PG_POOL_MAX_SIZE,
+                        statement_cache_size=PG_STATEMENT_CACHE_SIZE,
+                        command_timeout=PG_COMMAND_TIMEOUT,
+                        init=_init_connection,
+                    )
+                    logger.info(f"✅ Pool asyncpg prêt ({PG_POOL_MIN_SIZE}-{PG_POOL_MAX_SIZE} connexions)")
+        return self._pool
+
+    async def _run(self, method: str, sql: str, *args):
+        started = time.perf_counter()
+        try:
+            pool = await self.pool()
+            return await getattr(pool, method)(sql, *args)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["queries"] += 1
+            self.stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+    async def fetch(self, sql: str, *args) -> List[Dict[str, Any]]:
+        return [dict(record) for record in await self._run("fetch", sql, *args)]
+
+    async def fetchrow(self, sql: str, *args) -> Optional[Dict[str, Any]]:
+        record = await self._run("fetchrow", sql, *args)
+        return dict(record) if record is not None else None
+
+    async def fetchval(self, sql: str, *args) -> Any:
+        return await self._run("fetchval", sql, *args)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        queries = self.stats["queries"] or 1
+        pool = self._pool
+        return {
+            "repositories": sorted(self.repositories),
+            "queries": self.stats["queries"],
+            "errors": self.stats["errors"],
+            "fallbacks": self.stats["fallbacks"],
+            "avg_ms": round(self.stats["total_ms"] / queries, 3),
+            "pool_size": pool.get_size() if pool else 0,
+            "pool_idle": pool.get_idle_size() if pool else 0,
+        }
+
+
+# Instance globale
+pg_fast_path = PostgresFastPath()
@@ -0,0 +1,113 @@
+"""
+Service de redirection dédié - Trafic de clics /r/{short_code}
+
+Point d'entrée ASGI minimal (Starlette nu, sans FastAPI ni routers métier):
+seule la chaîne TrackingService est chargée (cache des codes courts, file
+d'ingestion des clics, compteurs agrégés). Pas de CORS, pas de rate limiter,
+pas de scheduler: les clics ne partagent plus le processus de la génération
+de contenu IA ou du rendu PDF et le service se scale indépendamment.
+
+Lancement:
+    uvicorn redirect_app:app --host 0.0.0.0 --port 8002 --workers 4 --no-access-log
+
+Les invalidations de cache faites par l'API (modification / désactivation
+d'un lien) arrivent par le canal Redis de short_code_cache; si un message
+est perdu, une entrée périmée vit au plus SHORT_CODE_CACHE_TTL secondes.
+"""
+
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import logging
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse, Response
+from starlette.routing import Route
+
+from async_db import db_executor
+from click_ingestion import click_ingestion
+from link_counters import link_counters
+from short_code_cache import short_code_cache
+from supabase_transport import deadline, supabase_transport
+from tracking_service import tracking_service
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Budget BDD d'une redirection: au-delà, mieux vaut un 404 rapide qu'un clic pendu
+REDIRECT_REQUEST_BUDGET = float(os.getenv("REDIRECT_REQUEST_BUDGET", 2.0))
+
+
+async def redirect_tracking_link(request: Request) -> Response:
+    """
+    Redirection avec tracking (même comportement que /r/{short_code} de server.py)
+
+    302 vers l'URL marchande + cookie d'attribution, 404 si le lien est
+    introuvable ou inactif.
+    """
+    short_code = request.path_params["short_code"]
+
+    # Réponse support: track_click y pose le cookie d'attribution
+    cookies = Response()
+    with deadline(REDIRECT_REQUEST_BUDGET):
+        destination_url = await tracking_service.track_click(
+            short_code=short_code, request=request, response=cookies
+        )
+
+    if not destination_url:
+        return JSONResponse(
+            {"detail": f"Lien de tracking introuvable ou inactif: {short_code}"},
+            status_code=404,
+        )
+
+    response = RedirectResponse(url=destination_url, status_code=302)
+    response.raw_headers.extend(header for header in cookies.raw_headers if header[0] == b"set-cookie")
+    return response
+
+
+async def health(request: Request) -> Response:
+    """État du service de redirection (cache, ingestion, pools)"""
+    transport = supabase_transport.get_stats()
+    return JSONResponse(
+        {
+            "status": "degraded" if transport["circuit"]["state"] == "open" else "healthy",
+            "service": "redirect",
+            "short_code_cache": short_code_cache.get_stats(),
+            "click_ingestion": {**click_ingestion.get_stats(), "counters": link_counters.get_stats()},
+            "db_executor": db_executor.get_stats(),
+            "supabase_pool": transport,
+        }
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """Démarre / arrête les flushers de clics et l'écoute des invalidations, libère les pools"""
+    logger.info("🚀 Démarrage du service de redirection...")
+    click_ingestion.start()
+    link_counters.start()
+    invalidations = asyncio.create_task(short_code_cache.listen_invalidations())
+    try:
+        yield
+    finally:
+        logger.info("🛑 Arrêt du service de redirection...")
+        invalidations.cancel()
+        click_ingestion.stop()
+        link_counters.stop()
+        db_executor.shutdown()
+        supabase_transport.close()
+
+
+def create_redirect_app() -> Starlette:
+    """Application ASGI du service de redirection"""
+    return Starlette(
+        routes=[
+            Route("/r/{short_code}", redirect_tracking_link, methods=["GET"]),
+            Route("/health", health, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = create_redirect_app()
@@ -4,10 +4,13 @@ Fournit les opérations CRUD standard
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime
 import logging
 
+from async_db import run_db
+from pg_fast_path import PostgresFastPath, build_aggregate_sql, build_where, pg_fast_path, quote_identifier
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,6 +20,10 @@ class BaseRepository(ABC):
     Implémente le pattern Repository pour l'accès aux données
     """
 
+    # Nom du repository pour le chemin asyncpg direct (PG_FAST_PATH),
+    # None = PostgREST uniquement
+    fast_path_name: Optional[str] = None
+
     def __init__(self, supabase_client):
         """
         Initialise le repository avec le client Supabase
@@ -312,6 +319,134 @@ class BaseRepository(ABC):
                 "total_pages": 0
             }
 
+    # ============================================================================
+    # AGRÉGATS CÔTÉ SERVEUR
+    # ============================================================================
+
+    AGGREGATE_FUNCTIONS = ("sum", "count", "count_distinct", "avg", "min", "max")
+    FILTER_OPERATORS = ("eq", "neq", "gt", "gte", "lt", "lte", "in", "is")
+
+    def aggregate(
+        self,
+        aggregates: Dict[str, str],
+        filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None,
+        group_by: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Exécute des agrégats en SQL (RPC aggregate_rows), filtres inclus
+
+        Args:
+            aggregates: {"alias": "fonction:colonne"} (ex: {"total": "sum:amount", "n": "count:*"})
+            filters: {"colonne": valeur} (égalité) ou [(colonne, opérateur, valeur), ...]
+            group_by: Colonnes de regroupement
+
+        Returns:
+            Une ligne par groupe (une seule ligne sans group_by)
+
+        Raises:
+            ValueError: fonction d'agrégat ou opérateur non supporté
+        """
+        for spec in aggregates.values():
+            if spec.split(":", 1)[0] not in self.AGGREGATE_FUNCTIONS:
+                raise ValueError(f"Agrégat non supporté: {spec}")
+
+        conditions = []
+        for column, operator, value in self._normalize_filters(filters):
+            if operator not in self.FILTER_OPERATORS:
+                raise ValueError(f"Opérateur non supporté: {operator}")
+            conditions.append({"column": column, "op": operator, "value": value})
+
+        result = self.supabase.rpc(
+            "aggregate_rows",
+            {
+                "p_table": self.get_table_name(),
+                "p_aggregates": aggregates,
+                "p_filters": conditions,
+                "p_group_by": group_by or [],
+            },
+        ).execute()
+        return result.data if result.data else []
+
+    def aggregate_one(
+        self,
+        aggregates: Dict[str, str],
+        filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Agrégats sans regroupement: une seule ligne, 0 en cas d'erreur
+
+        Returns:
+            {"alias": valeur, ...}
+        """
+        try:
+            rows = self.aggregate(aggregates, filters)
+            row = rows[0] if rows else {}
+        except Exception as e:
+            logger.error(f"Error aggregating {self.get_table_name()}: {e}")
+            row = {}
+
+        return {alias: row.get(alias) or 0 for alias in aggregates}
+
+    def sum(self, column: str, filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None) -> float:
+        """
+        Somme d'une colonne calculée en SQL
+
+        Args:
+            column: Colonne à sommer
+            filters: Filtres optionnels (voir aggregate)
+
+        Returns:
+            Somme (0 si aucune ligne)
+        """
+        return float(self.aggregate_one({"total": f"sum:{column}"}, filters)["total"])
+
+    def avg(self, column: str, filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None) -> float:
+        """
+        Moyenne d'une colonne calculée en SQL
+
+        Args:
+            column: Colonne
+            filters: Filtres optionnels (voir aggregate)
+
+        Returns:
+            Moyenne (0 si aucune ligne)
+        """
+        return float(self.aggregate_one({"average": f"avg:{column}"}, filters)["average"])
+
+    def group_by(
+        self,
+        columns: List[str],
+        aggregates: Dict[str, str],
+        filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Agrégats regroupés par colonnes (GROUP BY exécuté en SQL)
+
+        Args:
+            columns: Colonnes de regroupement
+            aggregates: {"alias": "fonction:colonne"}
+            filters: Filtres optionnels (voir aggregate)
+
+        Returns:
+            Une ligne par groupe, liste vide en cas d'erreur
+        """
+        try:
+            return self.aggregate(aggregates, filters, group_by=columns)
+        except Exception as e:
+            logger.error(f"Error grouping {self.get_table_name()} by {columns}: {e}")
+            return []
+
+    @staticmethod
+    def _normalize_filters(
+        filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]]
+    ) -> List[Tuple[str, str, Any]]:
+        """Dict d'égalités ou liste de triplets -> liste de triplets"""
+        if not filters:
+            return []
+        if isinstance(filters, dict):
+            return [(column, "eq", value) for column, value in filters.items()]
+        return list(filters)
+
     # ============================================================================
     # OPÉRATIONS EN MASSE
     # ============================================================================
@@ -377,3 +512,105 @@ class BaseRepository(ABC):
         except Exception as e:
             logger.error(f"Error bulk deleting {self.get_table_name()}: {e}")
             return False
+
+    # ============================================================================
+    # VERSIONS ASYNC (pool de threads BDD, ne bloquent pas la boucle asyncio)
+    # ============================================================================
+
+    async def afind_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        return await run_db(self.find_by_id, id)
+
+    async def afind_all(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await run_db(self.find_all, filters, limit)
+
+    async def afind_one(self, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async def query(pg: PostgresFastPath):
+            where, args = build_where(self._normalize_filters(filters))
+            return await pg.fetchrow(f"SELECT * FROM {quote_identifier(self.get_table_name())}{where} LIMIT 1", *args)
+
+        return await self._afast(query, self.find_one, filters)
+
+    async def acreate(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await run_db(self.create, data)
+
+    async def aupdate(self, id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await run_db(self.update, id, data)
+
+    async def adelete(self, id: str) -> bool:
+        return await run_db(self.delete, id)
+
+    async def acount(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        async def query(pg: PostgresFastPath):
+            where, args = build_where(self._normalize_filters(filters))
+            return await pg.fetchval(f"SELECT COUNT(*) FROM {quote_identifier(self.get_table_name())}{where}", *args)
+
+        return await self._afast(query, self.count, filters)
+
+    async def apaginate(self, page: int = 1, page_size: int = 10, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await run_db(self.paginate, page, page_size, filters)
+
+    async def aaggregate(
+        self,
+        aggregates: Dict[str, str],
+        filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None,
+        group_by: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        async def query(pg: PostgresFastPath):
+            sql, args = build_aggregate_sql(
+                self.get_table_name(), aggregates, self._normalize_filters(filters), group_by
+            )
+            return await pg.fetch(sql, *args)
+
+        return await self._afast(query, self.aggregate, aggregates, filters, group_by)
+
+    async def aaggregate_one(
+        self,
+        aggregates: Dict[str, str],
+        filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        try:
+            rows = await self.aaggregate(aggregates, filters)
+            row = rows[0] if rows else {}
+        except Exception as e:
+            logger.error(f"Error aggregating {self.get_table_name()}: {e}")
+            row = {}
+
+        return {alias: row.get(alias) or 0 for alias in aggregates}
+
+    async def asum(self, column: str, filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None) -> float:
+        return float((await self.aaggregate_one({"total": f"sum:{column}"}, filters))["total"])
+
+    async def agroup_by(
+        self,
+        columns: List[str],
+        aggregates: Dict[str, str],
+        filters: Optional[Union[Dict[str, Any], List[Tuple[str, str, Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        try:
+            return await self.aaggregate(aggregates, filters, group_by=columns)
+        except Exception as e:
+            logger.error(f"Error grouping {self.get_table_name()} by {columns}: {e}")
+            return []
+
+    @property
+    def fast_path(self) -> Optional[PostgresFastPath]:
+        """Pool asyncpg si le chemin direct est activé pour ce repository"""
+        return pg_fast_path if pg_fast_path.enabled_for(self.fast_path_name) else None
+
+    async def _afast(self, query: Callable[[PostgresFastPath], Awaitable[Any]], fallback: Callable, *args) -> Any:
+        """
+        query(pg) via asyncpg si activé pour ce repository; sinon, ou en cas
+        d'erreur asyncpg, fallback(*args) via PostgREST dans le pool BDD
+        """
+        fast_path = self.fast_path
+        if fast_path is not None:
+            try:
+                return await query(fast_path)
+            except Exception as e:
+                fast_path.stats["fallbacks"] += 1
+                logger.warning(f"⚠️ Chemin asyncpg indisponible pour {self.get_table_name()}, repli PostgREST: {e}")
+        return await run_db(fallback, *args)
+
+    async def arun(self, method: str, *args, **kwargs) -> Any:
+        """Méthode spécifique d'un repository concret, hors boucle"""
+        return await run_db(getattr(self, method), *args, **kwargs)
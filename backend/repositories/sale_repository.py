@@ -14,6 +14,8 @@ logger = logging.getLogger(__name__)
 class SaleRepository(BaseRepository):
     """Repository pour la table sales"""
 
+    fast_path_name = "sales"
+
     def get_table_name(self) -> str:
         return "sales"
 
@@ -97,26 +99,8 @@ class SaleRepository(BaseRepository):
         Returns:
             Revenu total
         """
-        try:
-            query = self.table.select("amount").eq("status", "completed")
-            
-            if merchant_id:
-                query = query.eq("merchant_id", merchant_id)
-            
-            if start_date:
-                query = query.gte("created_at", start_date)
-            
-            if end_date:
-                query = query.lte("created_at", end_date)
-            
-            result = query.execute()
-            
-            if result.data:
-                return sum(sale.get("amount", 0) for sale in result.data)
-            return 0.0
-        except Exception as e:
-            logger.error(f"Error calculating total revenue: {e}")
-            return 0.0
+        # SUM exécutée en SQL: coût indépendant du nombre de ventes
+        return self.sum("amount", self._completed_filters("merchant_id", merchant_id, start_date, end_date))
 
     def get_total_commission(self, influencer_id: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
         """
@@ -130,26 +114,9 @@ class SaleRepository(BaseRepository):
         Returns:
             Total des commissions
         """
-        try:
-            query = self.table.select("commission_amount").eq("status", "completed")
-            
-            if influencer_id:
-                query = query.eq("influencer_id", influencer_id)
-            
-            if start_date:
-                query = query.gte("created_at", start_date)
-            
-            if end_date:
-                query = query.lte("created_at", end_date)
-            
-            result = query.execute()
-            
-            if result.data:
-                return sum(sale.get("commission_amount", 0) for sale in result.data)
-            return 0.0
-        except Exception as e:
-            logger.error(f"Error calculating total commission: {e}")
-            return 0.0
+        return self.sum(
+            "commission_amount", self._completed_filters("influencer_id", influencer_id, start_date, end_date)
+        )
 
     def count_sales(self, merchant_id: Optional[str] = None, influencer_id: Optional[str] = None, status: Optional[str] = None) -> int:
         """
@@ -163,15 +130,7 @@ class SaleRepository(BaseRepository):
         Returns:
             Nombre de ventes
         """
-        filters = {}
-        if merchant_id:
-            filters["merchant_id"] = merchant_id
-        if influencer_id:
-            filters["influencer_id"] = influencer_id
-        if status:
-            filters["status"] = status
-        
-        return self.count(filters)
+        return self.count(self._owner_filters(merchant_id, influencer_id, status))
 
     def get_sales_by_date_range(self, start_date: str, end_date: str, merchant_id: Optional[str] = None) -> List[Dict]:
         """
@@ -316,27 +275,10 @@ class SaleRepository(BaseRepository):
         Returns:
             Taux de conversion (%)
         """
-        try:
-            # Total des clics (devrait venir de tracking_links)
-            # Pour simplifier, on calcule ratio completed/pending+completed
-            
-            filters = {}
-            if merchant_id:
-                filters["merchant_id"] = merchant_id
-            if influencer_id:
-                filters["influencer_id"] = influencer_id
-            
-            total_sales = self.count(filters)
-            if total_sales == 0:
-                return 0.0
-            
-            filters["status"] = "completed"
-            completed_sales = self.count(filters)
-            
-            return (completed_sales / total_sales) * 100
-        except Exception as e:
-            logger.error(f"Error calculating conversion rate: {e}")
-            return 0.0
+        # Ratio completed / total: un seul GROUP BY status côté SQL
+        return self._completed_ratio(
+            self.group_by(["status"], {"n": "count:*"}, self._owner_filters(merchant_id, influencer_id))
+        )
 
     def get_top_products(self, limit: int = 10, merchant_id: Optional[str] = None) -> List[Dict]:
         """
@@ -381,3 +323,59 @@ class SaleRepository(BaseRepository):
         except Exception as e:
             logger.error(f"Error getting top influencers: {e}")
             return []
+
+    # ============================================================================
+    # AGRÉGATS ASYNC (asyncpg direct si activé, sinon PostgREST hors boucle)
+    # ============================================================================
+
+    async def aget_total_revenue(self, merchant_id: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
+        return await self.asum("amount", self._completed_filters("merchant_id", merchant_id, start_date, end_date))
+
+    async def aget_total_commission(self, influencer_id: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
+        return await self.asum(
+            "commission_amount", self._completed_filters("influencer_id", influencer_id, start_date, end_date)
+        )
+
+    async def acount_sales(self, merchant_id: Optional[str] = None, influencer_id: Optional[str] = None, status: Optional[str] = None) -> int:
+        return await self.acount(self._owner_filters(merchant_id, influencer_id, status))
+
+    async def aget_conversion_rate(self, merchant_id: Optional[str] = None, influencer_id: Optional[str] = None) -> float:
+        return self._completed_ratio(
+            await self.agroup_by(["status"], {"n": "count:*"}, self._owner_filters(merchant_id, influencer_id))
+        )
+
+    # ============================================================================
+    # FILTRES PARTAGÉS (versions sync et async)
+    # ============================================================================
+
+    @staticmethod
+    def _completed_filters(owner_column: str, owner_id: Optional[str], start_date: Optional[str], end_date: Optional[str]) -> List[tuple]:
+        filters = [("status", "eq", "completed")]
+        if owner_id:
+            filters.append((owner_column, "eq", owner_id))
+        if start_date:
+            filters.append(("created_at", "gte", start_date))
+        if end_date:
+            filters.append(("created_at", "lte", end_date))
+        return filters
+
+    @staticmethod
+    def _owner_filters(merchant_id: Optional[str] = None, influencer_id: Optional[str] = None, status: Optional[str] = None) -> Dict:
+        filters = {}
+        if merchant_id:
+            filters["merchant_id"] = merchant_id
+        if influencer_id:
+            filters["influencer_id"] = influencer_id
+        if status:
+            filters["status"] = status
+        return filters
+
+    @staticmethod
+    def _completed_ratio(rows: List[Dict]) -> float:
+        """Taux (%) de ventes completed à partir d'un GROUP BY status"""
+        by_status = {row["status"]: row["n"] for row in rows}
+        total_sales = sum(by_status.values())
+        if total_sales == 0:
+            return 0.0
+
+        return (by_status.get("completed", 0) / total_sales) * 100
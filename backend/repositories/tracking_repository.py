@@ -6,6 +6,7 @@ CRUD et requêtes spécifiques pour la table tracking_links
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from .base_repository import BaseRepository
+from link_counters import link_counters
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,8 @@ logger = logging.getLogger(__name__)
 class TrackingRepository(BaseRepository):
     """Repository pour la table trackable_links"""
 
+    fast_path_name = "tracking"
+
     def get_table_name(self) -> str:
         return "trackable_links"
 
@@ -69,6 +72,10 @@ class TrackingRepository(BaseRepository):
         """
         return self.find_one({"unique_code": short_code})
 
+    async def afind_by_short_code(self, short_code: str) -> Optional[Dict]:
+        """Version async de find_by_short_code (asyncpg direct si activé)"""
+        return await self.afind_one({"unique_code": short_code})
+
     def find_active_links(self, merchant_id: Optional[str] = None, influencer_id: Optional[str] = None) -> List[Dict]:
         """
         Trouve les liens actifs
@@ -99,57 +106,50 @@ class TrackingRepository(BaseRepository):
         """
         return self.find_by_short_code(short_code) is not None
 
-    def increment_clicks(self, link_id: str) -> Optional[Dict]:
+    def increment_clicks(self, link_id: str, count: int = 1) -> Dict:
         """
         Incrémente le compteur de clics d'un lien
+        Le delta est agrégé puis appliqué atomiquement (pas de read-modify-write)
         
         Args:
             link_id: ID du lien
+            count: Nombre de clics à ajouter
             
         Returns:
-            Lien mis à jour ou None
+            Deltas en attente pour ce lien
         """
-        link = self.find_by_id(link_id)
-        if not link:
-            return None
-        
-        new_clicks = link.get("total_clicks", 0) + 1
-        return self.update(link_id, {"total_clicks": new_clicks})
+        link_counters.increment(self.get_table_name(), link_id, total_clicks=count)
+        return link_counters.get_pending(self.get_table_name(), link_id)
 
-    def increment_conversions(self, link_id: str) -> Optional[Dict]:
+    def increment_conversions(self, link_id: str, count: int = 1) -> Dict:
         """
         Incrémente le compteur de conversions d'un lien
+        Le delta est agrégé puis appliqué atomiquement (pas de read-modify-write)
         
         Args:
             link_id: ID du lien
+            count: Nombre de conversions à ajouter
             
         Returns:
-            Lien mis à jour ou None
+            Deltas en attente pour ce lien
         """
-        link = self.find_by_id(link_id)
-        if not link:
-            return None
-        
-        new_conversions = link.get("total_conversions", 0) + 1
-        return self.update(link_id, {"total_conversions": new_conversions})
+        link_counters.increment(self.get_table_name(), link_id, total_conversions=count)
+        return link_counters.get_pending(self.get_table_name(), link_id)
 
-    def update_revenue(self, link_id: str, additional_revenue: float) -> Optional[Dict]:
+    def update_revenue(self, link_id: str, additional_revenue: float) -> Dict:
         """
         Met à jour le revenu généré par un lien
+        Le delta est agrégé puis appliqué atomiquement (pas de read-modify-write)
         
         Args:
             link_id: ID du lien
             additional_revenue: Revenu additionnel
             
         Returns:
-            Lien mis à jour ou None
+            Deltas en attente pour ce lien
         """
-        link = self.find_by_id(link_id)
-        if not link:
-            return None
-        
-        new_revenue = link.get("total_revenue", 0) + additional_revenue
-        return self.update(link_id, {"total_revenue": new_revenue})
+        link_counters.increment(self.get_table_name(), link_id, total_revenue=additional_revenue)
+        return link_counters.get_pending(self.get_table_name(), link_id)
 
     def activate_link(self, link_id: str) -> Optional[Dict]:
         """
@@ -311,23 +311,7 @@ class TrackingRepository(BaseRepository):
         Returns:
             Nombre total de clics
         """
-        try:
-            query = self.table.select("total_clicks")
-            
-            if merchant_id:
-                query = query.eq("merchant_id", merchant_id)
-            
-            if influencer_id:
-                query = query.eq("influencer_id", influencer_id)
-            
-            result = query.execute()
-            
-            if result.data:
-                return sum(link.get("total_clicks", 0) for link in result.data)
-            return 0
-        except Exception as e:
-            logger.error(f"Error calculating total clicks: {e}")
-            return 0
+        return int(self.sum("total_clicks", self._owner_filters(merchant_id, influencer_id)))
 
     def get_total_conversions(self, merchant_id: Optional[str] = None, influencer_id: Optional[str] = None) -> int:
         """
@@ -340,23 +324,7 @@ class TrackingRepository(BaseRepository):
         Returns:
             Nombre total de conversions
         """
-        try:
-            query = self.table.select("total_conversions")
-            
-            if merchant_id:
-                query = query.eq("merchant_id", merchant_id)
-            
-            if influencer_id:
-                query = query.eq("influencer_id", influencer_id)
-            
-            result = query.execute()
-            
-            if result.data:
-                return sum(link.get("total_conversions", 0) for link in result.data)
-            return 0
-        except Exception as e:
-            logger.error(f"Error calculating total conversions: {e}")
-            return 0
+        return int(self.sum("total_conversions", self._owner_filters(merchant_id, influencer_id)))
 
     def get_overall_conversion_rate(self, merchant_id: Optional[str] = None, influencer_id: Optional[str] = None) -> float:
         """
@@ -369,9 +337,22 @@ class TrackingRepository(BaseRepository):
         Returns:
             Taux de conversion global (%)
         """
-        clicks = self.get_total_clicks(merchant_id, influencer_id)
+        # Les deux sommes en un seul appel SQL
+        totals = self.aggregate_one(
+            {"clicks": "sum:total_clicks", "conversions": "sum:total_conversions"},
+            self._owner_filters(merchant_id, influencer_id),
+        )
+        clicks = float(totals["clicks"])
         if clicks == 0:
             return 0.0
-        
-        conversions = self.get_total_conversions(merchant_id, influencer_id)
-        return (conversions / clicks) * 100
+
+        return (float(totals["conversions"]) / clicks) * 100
+
+    @staticmethod
+    def _owner_filters(merchant_id: Optional[str], influencer_id: Optional[str]) -> Dict:
+        filters = {}
+        if merchant_id:
+            filters["merchant_id"] = merchant_id
+        if influencer_id:
+            filters["influencer_id"] = influencer_id
+        return filters
@@ -13,6 +13,8 @@ logger = logging.getLogger(__name__)
 class UserRepository(BaseRepository):
     """Repository pour la table users"""
 
+    fast_path_name = "users"
+
     def get_table_name(self) -> str:
         return "users"
 
@@ -32,6 +34,10 @@ class UserRepository(BaseRepository):
         """
         return self.find_one({"email": email})
 
+    async def afind_by_email(self, email: str) -> Optional[Dict]:
+        """Version async de find_by_email (asyncpg direct si activé)"""
+        return await self.afind_one({"email": email})
+
     def find_by_role(self, role: str) -> List[Dict]:
         """
         Trouve tous les utilisateurs d'un rôle
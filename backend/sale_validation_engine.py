@@ -0,0 +1,171 @@
+"""
+Moteur de validation des ventes en masse
+Traite les ventes en attente par tranches: une RPC par tranche applique en une
+transaction le changement de statut, l'insertion multi-lignes des commissions
+et les deltas de solde agrégés par influenceur. Reprise sur point de contrôle
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import os
+import uuid
+import logging
+
+from dashboard_stats_service import dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SALE_VALIDATION_CHUNK_SIZE = int(os.getenv("SALE_VALIDATION_CHUNK_SIZE", 1000))
+CHECKPOINT_TABLE = "job_checkpoints"
+
+
+class SaleValidationEngine:
+    """Validation set-based des ventes pending, reprenable et idempotente"""
+
+    def __init__(
+        self,
+        supabase_client=None,
+        chunk_size: int = SALE_VALIDATION_CHUNK_SIZE,
+        job_name: str = "validate_pending_sales",
+    ):
+        self._supabase = supabase_client
+        self.chunk_size = chunk_size
+        self.job_name = job_name
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    def run(self, cutoff: str, max_chunks: Optional[int] = None) -> Dict:
+        """
+        Valide toutes les ventes pending créées avant `cutoff`
+
+        Reprend depuis le point de contrôle d'un run interrompu (même cutoff,
+        totaux cumulés). Une vente déjà validée n'est jamais recomptée.
+
+        Args:
+            cutoff: Date ISO limite (ventes plus anciennes validées)
+            max_chunks: Arrêt après N tranches (le point de contrôle est conservé)
+
+        Returns:
+            Rapport cumulé du run: validated_sales, total_commission, influencers_updated...
+        """
+        state = self._load_checkpoint()
+        resumed = state is not None
+        if not resumed:
+            state = {
+                "run_id": str(uuid.uuid4()),
+                "cutoff": cutoff,
+                "cursor": None,
+                "chunks": 0,
+                "failed_chunks": 0,
+                "validated_sales": 0,
+                "total_commission": 0.0,
+                "influencers": [],
+                "started_at": datetime.now().isoformat(),
+            }
+        else:
+            logger.info(f"🔄 Reprise validation ventes {state['run_id']} (curseur {state['cursor']})")
+
+        influencers = set(state["influencers"])
+        processed_chunks = 0
+        completed = False
+
+        while max_chunks is None or processed_chunks < max_chunks:
+            rows = self._next_chunk(state["cutoff"], state["cursor"])
+            if not rows:
+                self._clear_checkpoint()
+                completed = True
+                break
+
+            try:
+                validated = self._validate_chunk([row["id"] for row in rows])
+            except Exception as e:
+                # Tranche ignorée (ventes toujours pending): reprises au prochain run
+                state["failed_chunks"] += 1
+                validated = []
+                logger.error(f"❌ Échec validation tranche de {len(rows)} ventes: {e}")
+
+            state["chunks"] += 1
+            state["validated_sales"] += len(validated)
+            state["total_commission"] += sum(float(v.get("commission") or 0) for v in validated)
+            influencers.update(v["influencer_id"] for v in validated if v.get("influencer_id"))
+            state["influencers"] = sorted(influencers)
+            state["cursor"] = {"created_at": rows[-1]["created_at"], "id": rows[-1]["id"]}
+
+            self._invalidate_dashboards(validated)
+            self._save_checkpoint(state)
+            processed_chunks += 1
+
+        return {
+            "success": True,
+            "run_id": state["run_id"],
+            "resumed": resumed,
+            "completed": completed,
+            "validated_sales": state["validated_sales"],
+            "total_commission": round(state["total_commission"], 2),
+            "influencers_updated": len(influencers),
+            "chunks": state["chunks"],
+            "failed_chunks": state["failed_chunks"],
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    # ============================================
+    # ÉTAPES
+    # ============================================
+
+    def _next_chunk(self, cutoff: str, cursor: Optional[Dict]) -> List[Dict]:
+        """Tranche suivante en pagination par clé (created_at, id)"""
+        query = (
+            self.supabase.table("sales")
+            .select("id, created_at")
+            .eq("status", "pending")
+            .lt("created_at", cutoff)
+        )
+        if cursor:
+            query = query.or_(
+                f'created_at.gt."{cursor["created_at"]}",'
+                f'and(created_at.eq."{cursor["created_at"]}",id.gt.{cursor["id"]})'
+            )
+
+        result = query.order("created_at").order("id").limit(self.chunk_size).execute()
+        return result.data or []
+
+    def _validate_chunk(self, sale_ids: List[str]) -> List[Dict]:
+        """Une transaction: statuts, commissions, soldes et commissions des liens"""
+        result = self.supabase.rpc("validate_sales_batch", {"p_sale_ids": sale_ids}).execute()
+        return result.data or []
+
+    def _invalidate_dashboards(self, validated: List[Dict]):
+        if validated:
+            dashboard_stats.invalidate_tenants(
+                merchant_ids=[v.get("merchant_id") for v in validated],
+                influencer_ids=[v.get("influencer_id") for v in validated],
+            )
+
+    # ============================================
+    # POINT DE CONTRÔLE
+    # ============================================
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        result = (
+            self.supabase.table(CHECKPOINT_TABLE)
+            .select("state")
+            .eq("job_name", self.job_name)
+            .execute()
+        )
+        return result.data[0]["state"] if result.data else None
+
+    def _save_checkpoint(self, state: Dict):
+        self.supabase.table(CHECKPOINT_TABLE).upsert(
+            {"job_name": self.job_name, "state": state, "updated_at": datetime.now().isoformat()}
+        ).execute()
+
+    def _clear_checkpoint(self):
+        self.supabase.table(CHECKPOINT_TABLE).delete().eq("job_name", self.job_name).execute()
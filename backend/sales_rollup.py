@@ -0,0 +1,106 @@
+"""
+Lecture et réconciliation du rollup journalier des ventes (daily_sales_rollup)
+Le rollup est maintenu en BDD par trigger sur sales; ce module lit une plage
+de jours en un seul aller-retour et relance la reconstruction nocturne
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MAX_RANGE_DAYS = 366
+RECONCILE_DAYS = 3
+
+
+class SalesRollup:
+    """Accès au rollup journalier via RPC (get_sales_rollup / rebuild_daily_sales_rollup)"""
+
+    def __init__(self, supabase_client=None):
+        self._supabase = supabase_client
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    def get_daily_series(
+        self,
+        days: int = 7,
+        merchant_id: Optional[str] = None,
+        influencer_id: Optional[str] = None,
+        end: Optional[date] = None,
+        platform_wide: bool = False,
+    ) -> List[Dict]:
+        """
+        Série journalière des `days` derniers jours (aujourd'hui inclus)
+
+        Sans merchant_id ni influencer_id, la RPC agrège toute la plateforme:
+        refusé sauf platform_wide=True explicite (vues admin).
+
+        Returns:
+            Une entrée par jour, dans l'ordre chronologique, jours sans vente à zéro:
+            [{"day": date, "sales_count", "amount", "influencer_commission", "platform_commission"}]
+        """
+        if merchant_id is None and influencer_id is None and not platform_wide:
+            raise ValueError("merchant_id ou influencer_id requis (platform_wide=True pour l'admin)")
+
+        days = max(1, min(days, MAX_RANGE_DAYS))
+        end = end or datetime.now().date()
+        start = end - timedelta(days=days - 1)
+
+        result = self.supabase.rpc(
+            "get_sales_rollup",
+            {
+                "p_from": start.isoformat(),
+                "p_to": end.isoformat(),
+                "p_merchant_id": merchant_id,
+                "p_influencer_id": influencer_id,
+            },
+        ).execute()
+
+        by_day = {str(row["day"])[:10]: row for row in (result.data or [])}
+
+        series = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = by_day.get(day.isoformat(), {})
+            series.append(
+                {
+                    "day": day,
+                    "sales_count": int(row.get("sales_count") or 0),
+                    "amount": round(float(row.get("amount") or 0), 2),
+                    "influencer_commission": round(float(row.get("influencer_commission") or 0), 2),
+                    "platform_commission": round(float(row.get("platform_commission") or 0), 2),
+                }
+            )
+        return series
+
+    def reconcile(self, days: int = RECONCILE_DAYS, end: Optional[date] = None) -> Dict:
+        """
+        Recalcule le rollup des `days` derniers jours depuis sales
+
+        Corrige toute dérive des deltas incrémentaux (trigger désactivé,
+        imports en masse, corrections manuelles)
+        """
+        end = end or datetime.utcnow().date()
+        start = end - timedelta(days=days - 1)
+
+        result = self.supabase.rpc(
+            "rebuild_daily_sales_rollup",
+            {"p_from": start.isoformat(), "p_to": end.isoformat()},
+        ).execute()
+        rows = result.data if isinstance(result.data, int) else (result.data or [0])[0]
+
+        logger.info(f"✅ Rollup ventes réconcilié: {start} → {end} ({rows} lignes)")
+        return {"from": start.isoformat(), "to": end.isoformat(), "rows": rows}
+
+
+# Instance globale
+sales_rollup = SalesRollup()
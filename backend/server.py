@@ -3,266 +3,54 @@ ShareYourSales API Server - Version Supabase
 Tous les endpoints utilisent Supabase au lieu de MOCK_DATA
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status, Request, Response, Query
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import HTTPException, Depends, status, Request, Response, Query
 from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime, timedelta
 import jwt
+import asyncio
 import os
 from dotenv import load_dotenv
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
 # Importer les helpers Supabase
 from db_helpers import *
 from supabase_client import supabase
+# Appels BDD des endpoints async: pool de threads, hors boucle asyncio
+from async_db import db_executor, execute, run_db
+from app_factory import create_app, feature_enabled
 
 # Charger les variables d'environnement
 load_dotenv()
 
-# Initialiser le rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 # ============================================
 # API METADATA & DOCUMENTATION
 # ============================================
 
-app = FastAPI(
-    title="ShareYourSales API",
-    description="""
-# ShareYourSales - Plateforme d'Affiliation Marocaine 🇲🇦
-
-API complète pour la gestion d'une plateforme SaaS d'affiliation entre influenceurs et marchands.
-
-## 🎯 Fonctionnalités Principales
-
-### 💳 Abonnements & Paiements
-- Système d'abonnement SaaS (Free, Starter, Pro, Enterprise)
-- Intégration Stripe pour paiements
-- Gestion des quotas par plan
-- Facturation automatique
-
-### 📱 Intégrations Réseaux Sociaux
-- **Instagram** - Graph API avec statistiques automatiques
-- **TikTok** - Creator API avec métriques d'engagement
-- **Facebook** - Pages Business et groupes
-
-### 🤖 Bot IA Conversationnel
-- Assistant intelligent multilingue (FR, EN, AR)
-- Détection d'intentions
-- Recommandations personnalisées
-- Intégration Claude AI / GPT-4
-
-### 🔗 Système d'Affiliation
-- Génération de liens trackables
-- Suivi des clics et conversions en temps réel
-- Commissions automatiques
-- Dashboard analytics
-
-### 👤 KYC & Conformité
-- Vérification d'identité (CIN, Passeport)
-- Documents d'entreprise (RC, ICE, TVA)
-- Conformité fiscale marocaine
-- Validation IBAN bancaire
-
-### 🔐 Sécurité Enterprise
-- Rate limiting distribué (Redis)
-- Protection CSRF
-- Headers de sécurité (OWASP)
-- Monitoring Sentry
-- Logs structurés (JSON)
-
-## 📊 Architecture
-
-- **Backend**: FastAPI + Python 3.11
-- **Database**: PostgreSQL 15 + Supabase
-- **Cache**: Redis 7
-- **Monitoring**: Sentry + Structlog
-- **Queue**: Celery + Redis
-- **Paiements**: Stripe
-- **AI**: Anthropic Claude / OpenAI
-
-## 🔑 Authentification
-
-Utiliser JWT Bearer Token dans le header Authorization:
-
-```bash
-Authorization: Bearer <your_jwt_token>
-```
-
-Pour obtenir un token, utilisez l'endpoint `/api/auth/login`.
-
-## 🌐 Environnements
-
-- **Production**: https://api.shareyoursales.ma
-- **Staging**: https://staging-api.shareyoursales.ma
-- **Development**: http://localhost:8000
-
-## 📚 Resources
-
-- [Documentation complète](https://docs.shareyoursales.ma)
-- [Guide d'intégration](https://docs.shareyoursales.ma/integration)
-- [Status Page](https://status.shareyoursales.ma)
-- [Support](mailto:support@shareyoursales.ma)
-
-## ⚡ Rate Limits
-
-| Endpoint Type | Limite |
-|--------------|--------|
-| Authentification | 10 req/min |
-| API Standard | 100 req/min |
-| Webhooks | 1000 req/min |
-
-Les limites peuvent varier selon votre plan d'abonnement.
-    """,
-    version="1.0.0",
-    terms_of_service="https://shareyoursales.ma/terms",
-    contact={
-        "name": "ShareYourSales Support",
-        "url": "https://shareyoursales.ma/contact",
-        "email": "support@shareyoursales.ma",
-    },
-    license_info={
-        "name": "Proprietary",
-        "url": "https://shareyoursales.ma/license",
-    },
-    openapi_tags=[
-        {
-            "name": "Authentication",
-            "description": "Endpoints d'authentification (login, register, 2FA, JWT)",
-        },
-        {
-            "name": "Users",
-            "description": "Gestion des utilisateurs (influenceurs, marchands, admins)",
-        },
-        {
-            "name": "Stripe",
-            "description": "Gestion des abonnements et paiements Stripe",
-        },
-        {
-            "name": "Social Media",
-            "description": "Intégrations réseaux sociaux (Instagram, TikTok, Facebook)",
-        },
-        {
-            "name": "AI Bot",
-            "description": "Assistant IA conversationnel multilingue",
-        },
-        {
-            "name": "Products",
-            "description": "Catalogue produits et services des marchands",
-        },
-        {
-            "name": "Affiliates",
-            "description": "Système d'affiliation et demandes de partenariat",
-        },
-        {
-            "name": "Tracking",
-            "description": "Liens trackables et suivi des conversions",
-        },
-        {
-            "name": "Analytics",
-            "description": "Statistiques et rapports de performance",
-        },
-        {
-            "name": "KYC",
-            "description": "Vérification d'identité et conformité (Know Your Customer)",
-        },
-        {
-            "name": "Payments",
-            "description": "Paiements de commissions aux influenceurs",
-        },
-        {
-            "name": "Webhooks",
-            "description": "Webhooks entrants (Stripe, réseaux sociaux)",
-        },
-        {
-            "name": "Health",
-            "description": "Health checks et monitoring",
-        },
-    ],
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json",
-)
+# Métadonnées, middlewares et routers par fonctionnalité (APP_FEATURES): app_factory
+app = create_app()
 
 # Importer le scheduler et les services
 from scheduler import start_scheduler, stop_scheduler
 from auto_payment_service import AutoPaymentService
 from tracking_service import tracking_service
+from short_code_cache import short_code_cache
+from click_ingestion import click_ingestion
+from link_counters import link_counters
+from short_code_allocator import short_code_allocator
+from sales_rollup import sales_rollup
+from dashboard_stats_service import dashboard_stats
 from webhook_service import webhook_service
+from messaging_service import messaging_service
+from websocket_cluster import cluster_publisher
+from middleware.rate_limit_policy import rate_limit_policies
+from supabase_transport import supabase_transport
+from pg_fast_path import pg_fast_path
 
 # Initialiser les services
 payment_service = AutoPaymentService()
 
-# CORS configuration - Allow all localhost origins
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins in development
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Ajouter le rate limiter à l'app
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# ============================================
-# INCLUDE ROUTERS (Modular Endpoints)
-# ============================================
-
-# Import endpoint routers
-from marketplace_endpoints import router as marketplace_router
-from affiliate_links_endpoints import router as affiliate_links_router
-from contact_endpoints import router as contact_router
-from admin_social_endpoints import router as admin_social_router
-from affiliation_requests_endpoints import router as affiliation_requests_router
-from kyc_endpoints import router as kyc_router
-from twofa_endpoints import router as twofa_router
-from ai_bot_endpoints import router as ai_bot_router
-from subscription_endpoints import router as subscription_router
-from team_endpoints import router as team_router
-from domain_endpoints import router as domain_router
-from stripe_webhook_handler import router as stripe_webhook_router
-from commercials_directory_endpoints import router as commercials_router
-from influencers_directory_endpoints import router as influencers_router
-from company_links_management import router as company_links_router
-
-# Nouveaux routers - 6 Features Marketables
-from ai_content_endpoints import router as ai_content_router
-from mobile_payment_endpoints import router as mobile_payment_router
-from smart_match_endpoints import router as smart_match_router
-from trust_score_endpoints import router as trust_score_router
-from predictive_dashboard_endpoints import router as predictive_dashboard_router
-
-# Include all routers in the app
-app.include_router(marketplace_router)
-app.include_router(affiliate_links_router)
-app.include_router(contact_router)
-app.include_router(admin_social_router)
-app.include_router(affiliation_requests_router)
-app.include_router(kyc_router)
-app.include_router(twofa_router)
-app.include_router(ai_bot_router)
-app.include_router(subscription_router)
-app.include_router(team_router)
-app.include_router(domain_router)
-app.include_router(stripe_webhook_router)
-app.include_router(commercials_router)
-app.include_router(influencers_router)
-app.include_router(company_links_router)  # New company-only link generation
-
-# Nouveaux routers - 6 Features Marketables
-app.include_router(ai_content_router)
-app.include_router(mobile_payment_router)
-app.include_router(smart_match_router)
-app.include_router(trust_score_router)
-app.include_router(predictive_dashboard_router)
-
 # Security
 security = HTTPBearer()
 JWT_SECRET = os.getenv("JWT_SECRET", "fallback-secret-please-set-env-variable")
@@ -376,20 +164,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (+ métriques du pool Supabase et du pool BDD du worker)"""
+    supabase_stats = supabase_transport.get_stats()
+    circuit_open = supabase_stats["circuit"]["state"] == "open"
     return {
-        "status": "healthy",
+        "status": "degraded" if circuit_open else "healthy",
         "timestamp": datetime.now().isoformat(),
         "service": "ShareYourSales API",
-        "database": "Supabase Connected"
+        "database": "Supabase Unavailable" if circuit_open else "Supabase Connected",
+        "supabase_pool": supabase_stats,
+        "db_executor": db_executor.get_stats(),
+        "pg_fast_path": pg_fast_path.get_stats(),
     }
 
 @app.post("/api/auth/login")
-@limiter.limit("5/minute")
 async def login(request: Request, login_data: LoginRequest):
     """Login avec email et mot de passe - Rate limited à 5 tentatives/minute"""
     # Trouver l'utilisateur dans Supabase
-    user = get_user_by_email(login_data.email)
+    user = await aget_user_by_email(login_data.email)
 
     # Hash dummy pour éviter timing attack (permet énumération emails)
     # Toujours vérifier le password même si user n'existe pas
@@ -397,7 +189,7 @@ async def login(request: Request, login_data: LoginRequest):
     password_hash = user["password_hash"] if user else dummy_hash
     
     # Vérification constant-time
-    is_password_valid = verify_password(login_data.password, password_hash)
+    is_password_valid = await averify_password(login_data.password, password_hash)
 
     if not user or not is_password_valid:
         raise HTTPException(
@@ -431,7 +223,7 @@ async def login(request: Request, login_data: LoginRequest):
         }
 
     # Pas de 2FA, connexion directe
-    update_user_last_login(user["id"])
+    await aupdate_user_last_login(user["id"])
 
     access_token = create_access_token({
         "sub": user["id"],
@@ -464,7 +256,7 @@ async def verify_2fa(data: TwoFAVerifyRequest):
         raise HTTPException(status_code=400, detail="Token invalide")
 
     # Trouver l'utilisateur
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
@@ -476,7 +268,7 @@ async def verify_2fa(data: TwoFAVerifyRequest):
         )
 
     # Code correct, créer le vrai token
-    update_user_last_login(user["id"])
+    await aupdate_user_last_login(user["id"])
 
     access_token = create_access_token({
         "sub": user["id"],
@@ -495,7 +287,7 @@ async def verify_2fa(data: TwoFAVerifyRequest):
 @app.get("/api/auth/me")
 async def get_current_user(payload: dict = Depends(verify_token)):
     """Récupère l'utilisateur connecté"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user_data = {k: v for k, v in user.items() if k != "password_hash"}
@@ -510,12 +302,12 @@ async def logout(payload: dict = Depends(verify_token)):
 async def register(data: RegisterRequest):
     """Inscription d'un nouvel utilisateur"""
     # Vérifier si l'email existe déjà
-    existing_user = get_user_by_email(data.email)
+    existing_user = await aget_user_by_email(data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
 
     # Créer l'utilisateur
-    user = create_user(
+    user = await acreate_user(
         email=data.email,
         password=data.password,
         role=data.role,
@@ -534,7 +326,7 @@ async def register(data: RegisterRequest):
                 'company_name': f'Company {user["email"].split("@")[0]}',
                 'industry': 'General',
             }
-            supabase.table('merchants').insert(merchant_data).execute()
+            await execute(supabase.table('merchants').insert(merchant_data))
         elif data.role == "influencer":
             influencer_data = {
                 'user_id': user["id"],
@@ -545,7 +337,7 @@ async def register(data: RegisterRequest):
                 'audience_size': 1000,
                 'engagement_rate': 3.0
             }
-            supabase.table('influencers').insert(influencer_data).execute()
+            await execute(supabase.table('influencers').insert(influencer_data))
     except Exception as e:
         print(f"Warning: Could not create profile for {data.role}: {e}")
         # Continue anyway, profile can be created later
@@ -559,21 +351,21 @@ async def register(data: RegisterRequest):
 @app.get("/api/dashboard/stats")
 async def get_dashboard_stats_endpoint(payload: dict = Depends(verify_token)):
     """Statistiques du dashboard selon le rôle"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    stats = get_dashboard_stats(user["role"], user["id"])
+    stats = await aget_dashboard_stats(user["role"], user["id"])
     return stats
 
 @app.get("/api/analytics/overview")
 async def get_analytics_overview(payload: dict = Depends(verify_token)):
     """Vue d'ensemble des analytics"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    stats = get_dashboard_stats(user["role"], user["id"])
+    stats = await aget_dashboard_stats(user["role"], user["id"])
     return stats
 
 # ============================================
@@ -583,13 +375,13 @@ async def get_analytics_overview(payload: dict = Depends(verify_token)):
 @app.get("/api/merchants")
 async def get_merchants(payload: dict = Depends(verify_token)):
     """Liste tous les merchants"""
-    merchants = get_all_merchants()
+    merchants = await aget_all_merchants()
     return {"merchants": merchants, "total": len(merchants)}
 
 @app.get("/api/merchants/{merchant_id}")
 async def get_merchant(merchant_id: str, payload: dict = Depends(verify_token)):
     """Récupère les détails d'un merchant"""
-    merchant = get_merchant_by_id(merchant_id)
+    merchant = await aget_merchant_by_id(merchant_id)
     if not merchant:
         raise HTTPException(status_code=404, detail="Merchant non trouvé")
     return merchant
@@ -601,13 +393,13 @@ async def get_merchant(merchant_id: str, payload: dict = Depends(verify_token)):
 @app.get("/api/influencers")
 async def get_influencers(payload: dict = Depends(verify_token)):
     """Liste tous les influencers"""
-    influencers = get_all_influencers()
+    influencers = await aget_all_influencers()
     return {"influencers": influencers, "total": len(influencers)}
 
 @app.get("/api/influencers/{influencer_id}")
 async def get_influencer(influencer_id: str, payload: dict = Depends(verify_token)):
     """Récupère les détails d'un influencer"""
-    influencer = get_influencer_by_id(influencer_id)
+    influencer = await aget_influencer_by_id(influencer_id)
     if not influencer:
         raise HTTPException(status_code=404, detail="Influencer non trouvé")
     return influencer
@@ -620,18 +412,18 @@ async def get_influencer_stats(influencer_id: str, payload: dict = Depends(verif
     """
     try:
         # Vérifier que l'influencer existe
-        influencer = get_influencer_by_id(influencer_id)
+        influencer = await aget_influencer_by_id(influencer_id)
         if not influencer:
             raise HTTPException(status_code=404, detail="Influencer non trouvé")
         
         # Récupérer toutes les ventes de cet influencer
-        sales_response = supabase.table('sales').select('amount').eq('influencer_id', influencer_id).execute()
+        sales_response = await execute(supabase.table('sales').select('amount').eq('influencer_id', influencer_id))
         sales = sales_response.data if sales_response.data else []
         total_sales = sum(float(s.get('amount', 0)) for s in sales)
         
         # Récupérer les clics (si table tracking_links existe)
         try:
-            clicks_response = supabase.table('tracking_links').select('clicks').eq('influencer_id', influencer_id).execute()
+            clicks_response = await execute(supabase.table('tracking_links').select('clicks').eq('influencer_id', influencer_id))
             clicks_data = clicks_response.data if clicks_response.data else []
             total_clicks = sum(int(c.get('clicks', 0)) for c in clicks_data)
         except:
@@ -641,7 +433,7 @@ async def get_influencer_stats(influencer_id: str, payload: dict = Depends(verif
         conversion_rate = (len(sales) / total_clicks * 100) if total_clicks > 0 else 0
         
         # Compter campagnes complétées (approximation)
-        campaigns_response = supabase.table('campaigns').select('id').eq('status', 'completed').execute()
+        campaigns_response = await execute(supabase.table('campaigns').select('id').eq('status', 'completed'))
         campaigns_completed = len(campaigns_response.data) if campaigns_response.data else len(sales) // 3
         
         return {
@@ -670,13 +462,13 @@ async def get_influencer_stats(influencer_id: str, payload: dict = Depends(verif
 @app.get("/api/products")
 async def get_products(category: Optional[str] = None, merchant_id: Optional[str] = None):
     """Liste tous les produits avec filtres optionnels"""
-    products = get_all_products(category=category, merchant_id=merchant_id)
+    products = await aget_all_products(category=category, merchant_id=merchant_id)
     return {"products": products, "total": len(products)}
 
 @app.get("/api/products/{product_id}")
 async def get_product(product_id: str):
     """Récupère les détails d'un produit"""
-    product = get_product_by_id(product_id)
+    product = await aget_product_by_id(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
     return product
@@ -688,32 +480,32 @@ async def get_product(product_id: str):
 @app.get("/api/affiliate-links")
 async def get_affiliate_links_endpoint(payload: dict = Depends(verify_token)):
     """Liste les liens d'affiliation"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
 
     if user["role"] == "influencer":
-        influencer = get_influencer_by_user_id(user["id"])
+        influencer = await aget_influencer_by_user_id(user["id"])
         if influencer:
-            links = get_affiliate_links(influencer_id=influencer["id"])
+            links = await aget_affiliate_links(influencer_id=influencer["id"])
         else:
             links = []
     else:
-        links = get_affiliate_links()
+        links = await aget_affiliate_links()
 
     return {"links": links, "total": len(links)}
 
 @app.post("/api/affiliate-links/generate")
 async def generate_affiliate_link(data: AffiliateLinkGenerate, payload: dict = Depends(verify_token)):
     """Génère un lien d'affiliation"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
 
     if user["role"] != "influencer":
         raise HTTPException(status_code=403, detail="Accès refusé")
 
-    influencer = get_influencer_by_user_id(user["id"])
+    influencer = await aget_influencer_by_user_id(user["id"])
     if not influencer:
         raise HTTPException(status_code=404, detail="Profil influencer non trouvé")
 
-    product = get_product_by_id(data.product_id)
+    product = await aget_product_by_id(data.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
 
@@ -722,7 +514,7 @@ async def generate_affiliate_link(data: AffiliateLinkGenerate, payload: dict = D
     unique_code = secrets.token_urlsafe(12)
 
     # Créer le lien
-    link = create_affiliate_link(
+    link = await acreate_affiliate_link(
         product_id=data.product_id,
         influencer_id=influencer["id"],
         unique_code=unique_code
@@ -740,29 +532,29 @@ async def generate_affiliate_link(data: AffiliateLinkGenerate, payload: dict = D
 @app.get("/api/campaigns")
 async def get_campaigns_endpoint(payload: dict = Depends(verify_token)):
     """Liste toutes les campagnes"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
 
     if user["role"] == "merchant":
-        merchant = get_merchant_by_user_id(user["id"])
-        campaigns = get_all_campaigns(merchant_id=merchant["id"]) if merchant else []
+        merchant = await aget_merchant_by_user_id(user["id"])
+        campaigns = await aget_all_campaigns(merchant_id=merchant["id"]) if merchant else []
     else:
-        campaigns = get_all_campaigns()
+        campaigns = await aget_all_campaigns()
 
     return {"data": campaigns, "total": len(campaigns)}
 
 @app.post("/api/campaigns")
 async def create_campaign_endpoint(campaign_data: CampaignCreate, payload: dict = Depends(verify_token)):
     """Créer une nouvelle campagne"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
 
     if user["role"] != "merchant":
         raise HTTPException(status_code=403, detail="Seuls les merchants peuvent créer des campagnes")
 
-    merchant = get_merchant_by_user_id(user["id"])
+    merchant = await aget_merchant_by_user_id(user["id"])
     if not merchant:
         raise HTTPException(status_code=404, detail="Profil merchant non trouvé")
 
-    campaign = create_campaign(
+    campaign = await acreate_campaign(
         merchant_id=merchant["id"],
         name=campaign_data.name,
         description=campaign_data.description,
@@ -796,7 +588,7 @@ async def update_campaign_status(
             raise HTTPException(status_code=400, detail=f"Status invalide. Doit être: {', '.join(valid_statuses)}")
         
         # Vérifier que la campagne existe
-        campaign_response = supabase.table('campaigns').select('*').eq('id', campaign_id).single().execute()
+        campaign_response = await execute(supabase.table('campaigns').select('*').eq('id', campaign_id).single())
         if not campaign_response.data:
             raise HTTPException(status_code=404, detail="Campagne non trouvée")
         
@@ -811,10 +603,10 @@ async def update_campaign_status(
             raise HTTPException(status_code=403, detail="Permission refusée")
         
         # Mettre à jour le statut
-        update_response = supabase.table('campaigns').update({
+        update_response = await execute(supabase.table('campaigns').update({
             'status': new_status,
             'updated_at': 'now()'
-        }).eq('id', campaign_id).execute()
+        }).eq('id', campaign_id))
         
         if not update_response.data:
             raise HTTPException(status_code=500, detail="Erreur lors de la mise à jour")
@@ -838,7 +630,7 @@ async def update_campaign_status(
 @app.get("/api/conversions")
 async def get_conversions_endpoint(payload: dict = Depends(verify_token)):
     """Liste des conversions"""
-    conversions = get_conversions(limit=20)
+    conversions = await aget_conversions(limit=20)
     return {"data": conversions, "total": len(conversions)}
 
 @app.get("/api/leads")
@@ -886,56 +678,44 @@ async def get_leads_endpoint(payload: dict = Depends(verify_token)):
 @app.get("/api/clicks")
 async def get_clicks_endpoint(payload: dict = Depends(verify_token)):
     """Liste des clics"""
-    clicks = get_clicks(limit=50)
+    clicks = await aget_clicks(limit=50)
     return {"data": clicks, "total": len(clicks)}
 
 # ============================================
 # ANALYTICS ENDPOINTS
 # ============================================
 
+async def _sales_chart_scope(payload: dict, role: str) -> dict:
+    """Filtre du rollup pour l'appelant: {} uniquement pour un admin"""
+    try:
+        return await aget_sales_scope(payload["sub"], role)
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Accès refusé")
+    except LookupError:
+        raise HTTPException(status_code=404, detail=f"Profil {role} non trouvé")
+
+
 @app.get("/api/analytics/merchant/sales-chart")
-async def get_merchant_sales_chart(payload: dict = Depends(verify_token)):
+async def get_merchant_sales_chart(days: int = 7, payload: dict = Depends(verify_token)):
     """
-    Données de ventes des 7 derniers jours pour le marchand
+    Données de ventes des `days` derniers jours pour le marchand (7 par défaut)
     Format: [{date: '01/06', ventes: 12, revenus: 3500}, ...]
     """
+    scope = await _sales_chart_scope(payload, "merchant")
+
     try:
-        from datetime import datetime, timedelta
-        
-        user_id = payload.get("user_id")
-        role = payload.get("role")
-        
-        # Calculer les 7 derniers jours
-        today = datetime.now()
-        days_data = []
-        
-        for i in range(6, -1, -1):  # 6 jours en arrière jusqu'à aujourd'hui
-            target_date = today - timedelta(days=i)
-            date_str = target_date.strftime('%Y-%m-%d')
-            
-            # Query: ventes du jour pour ce marchand
-            query = supabase.table('sales').select('amount, commission, status')
-            
-            # Filtrer par merchant_id si pas admin
-            if role != 'admin':
-                query = query.eq('merchant_id', user_id)
-            
-            # Filtrer par date (créées ce jour-là)
-            query = query.gte('created_at', f'{date_str}T00:00:00').lt('created_at', f'{date_str}T23:59:59')
-            
-            response = query.execute()
-            sales = response.data if response.data else []
-            
-            # Calculer les totaux
-            ventes_count = len(sales)
-            revenus_total = sum(float(s.get('amount', 0)) for s in sales)
-            
-            days_data.append({
-                'date': target_date.strftime('%d/%m'),
-                'ventes': ventes_count,
-                'revenus': round(revenus_total, 2)
-            })
-        
+        # Une seule lecture du rollup, filtrée par marchand si pas admin
+        series = await run_db(sales_rollup.get_daily_series, days, platform_wide=not scope, **scope)
+
+        days_data = [
+            {
+                'date': row['day'].strftime('%d/%m'),
+                'ventes': row['sales_count'],
+                'revenus': row['amount']
+            }
+            for row in series
+        ]
+
         return {"data": days_data}
         
     except Exception as e:
@@ -944,36 +724,25 @@ async def get_merchant_sales_chart(payload: dict = Depends(verify_token)):
         return {"data": [{"date": f"0{i}/01", "ventes": 0, "revenus": 0} for i in range(1, 8)]}
 
 @app.get("/api/analytics/influencer/earnings-chart")
-async def get_influencer_earnings_chart(payload: dict = Depends(verify_token)):
+async def get_influencer_earnings_chart(days: int = 7, payload: dict = Depends(verify_token)):
     """
-    Données de revenus des 7 derniers jours pour l'influenceur
+    Données de revenus des `days` derniers jours pour l'influenceur (7 par défaut)
     Format: [{date: '01/06', gains: 450}, ...]
     """
+    scope = await _sales_chart_scope(payload, "influencer")
+
     try:
-        from datetime import datetime, timedelta
-        
-        user_id = payload.get("user_id")
-        today = datetime.now()
-        days_data = []
-        
-        for i in range(6, -1, -1):
-            target_date = today - timedelta(days=i)
-            date_str = target_date.strftime('%Y-%m-%d')
-            
-            # Query: commissions gagnées ce jour
-            query = supabase.table('sales').select('commission').eq('affiliate_id', user_id)
-            query = query.gte('created_at', f'{date_str}T00:00:00').lt('created_at', f'{date_str}T23:59:59')
-            
-            response = query.execute()
-            sales = response.data if response.data else []
-            
-            gains_total = sum(float(s.get('commission', 0)) for s in sales)
-            
-            days_data.append({
-                'date': target_date.strftime('%d/%m'),
-                'gains': round(gains_total, 2)
-            })
-        
+        # Commissions gagnées par jour: une seule lecture du rollup
+        series = await run_db(sales_rollup.get_daily_series, days, platform_wide=not scope, **scope)
+
+        days_data = [
+            {
+                'date': row['day'].strftime('%d/%m'),
+                'gains': row['influencer_commission']
+            }
+            for row in series
+        ]
+
         return {"data": days_data}
         
     except Exception as e:
@@ -981,40 +750,28 @@ async def get_influencer_earnings_chart(payload: dict = Depends(verify_token)):
         return {"data": [{"date": f"0{i}/01", "gains": 0} for i in range(1, 8)]}
 
 @app.get("/api/analytics/admin/revenue-chart")
-async def get_admin_revenue_chart(payload: dict = Depends(verify_token)):
+async def get_admin_revenue_chart(days: int = 7, payload: dict = Depends(verify_token)):
     """
-    Données de revenus des 7 derniers jours pour l'admin (toute la plateforme)
+    Données de revenus des `days` derniers jours pour l'admin (toute la plateforme)
     Format: [{date: '01/06', revenus: 8500}, ...]
     """
     try:
-        from datetime import datetime, timedelta
-        
         role = payload.get("role")
         
         if role != 'admin':
             raise HTTPException(status_code=403, detail="Admin access required")
-        
-        today = datetime.now()
-        days_data = []
-        
-        for i in range(6, -1, -1):
-            target_date = today - timedelta(days=i)
-            date_str = target_date.strftime('%Y-%m-%d')
-            
-            # Query: toutes les ventes du jour
-            query = supabase.table('sales').select('amount')
-            query = query.gte('created_at', f'{date_str}T00:00:00').lt('created_at', f'{date_str}T23:59:59')
-            
-            response = query.execute()
-            sales = response.data if response.data else []
-            
-            revenus_total = sum(float(s.get('amount', 0)) for s in sales)
-            
-            days_data.append({
-                'date': target_date.strftime('%d/%m'),
-                'revenus': round(revenus_total, 2)
-            })
-        
+
+        # Toute la plateforme: une seule lecture du rollup
+        series = await run_db(sales_rollup.get_daily_series, days, platform_wide=True)
+
+        days_data = [
+            {
+                'date': row['day'].strftime('%d/%m'),
+                'revenus': row['amount']
+            }
+            for row in series
+        ]
+
         return {"data": days_data}
         
     except Exception as e:
@@ -1034,7 +791,7 @@ async def get_admin_categories(payload: dict = Depends(verify_token)):
             raise HTTPException(status_code=403, detail="Admin access required")
         
         # Query: compter campagnes par catégorie
-        response = supabase.table('campaigns').select('category').execute()
+        response = await execute(supabase.table('campaigns').select('category'))
         campaigns = response.data if response.data else []
         
         # Grouper par catégorie
@@ -1078,13 +835,13 @@ async def get_admin_categories(payload: dict = Depends(verify_token)):
 @app.get("/api/payouts")
 async def get_payouts_endpoint(payload: dict = Depends(verify_token)):
     """Liste des payouts"""
-    payouts = get_payouts()
+    payouts = await aget_payouts()
     return {"data": payouts, "total": len(payouts)}
 
 @app.put("/api/payouts/{payout_id}/status")
 async def update_payout_status_endpoint(payout_id: str, data: PayoutStatusUpdate, payload: dict = Depends(verify_token)):
     """Mettre à jour le statut d'un payout"""
-    success = update_payout_status(payout_id, data.status)
+    success = await aupdate_payout_status(payout_id, data.status)
 
     if not success:
         raise HTTPException(status_code=500, detail="Erreur lors de la mise à jour")
@@ -1118,7 +875,7 @@ async def get_company_settings(payload: dict = Depends(verify_token)):
     
     try:
         # Chercher les paramètres de l'entreprise
-        response = supabase.table('company_settings').select('*').eq('user_id', user_id).execute()
+        response = await execute(supabase.table('company_settings').select('*').eq('user_id', user_id))
         
         if response.data and len(response.data) > 0:
             return response.data[0]
@@ -1151,15 +908,15 @@ async def update_company_settings(settings: CompanySettingsUpdate, payload: dict
         update_data['updated_at'] = datetime.now().isoformat()
         
         # Vérifier si les paramètres existent déjà
-        check_response = supabase.table('company_settings').select('id').eq('user_id', user_id).execute()
+        check_response = await execute(supabase.table('company_settings').select('id').eq('user_id', user_id))
         
         if check_response.data and len(check_response.data) > 0:
             # Update
-            response = supabase.table('company_settings').update(update_data).eq('user_id', user_id).execute()
+            response = await execute(supabase.table('company_settings').update(update_data).eq('user_id', user_id))
         else:
             # Insert
             update_data['created_at'] = datetime.now().isoformat()
-            response = supabase.table('company_settings').insert(update_data).execute()
+            response = await execute(supabase.table('company_settings').insert(update_data))
         
         return {
             "message": "Paramètres enregistrés avec succès",
@@ -1183,7 +940,7 @@ async def generate_ai_content(data: AIContentGenerate, payload: dict = Depends(v
     
     # Récupérer quelques produits de l'utilisateur pour personnaliser
     try:
-        products_response = supabase.table('products').select('name, description').eq('merchant_id', user_id).limit(3).execute()
+        products_response = await execute(supabase.table('products').select('name, description').eq('merchant_id', user_id).limit(3))
         products = products_response.data if products_response.data else []
         product_names = [p.get('name', '') for p in products[:2]]
     except:
@@ -1317,7 +1074,7 @@ async def send_message(message_data: MessageCreate, payload: dict = Depends(veri
     Crée automatiquement une conversation si elle n'existe pas
     """
     try:
-        user_id = payload.get("user_id")
+        user_id = payload["sub"]
         user_role = payload.get("role")
         
         # Déterminer le type d'utilisateur
@@ -1333,7 +1090,7 @@ async def send_message(message_data: MessageCreate, payload: dict = Depends(veri
         # Chercher conversation existante
         conv_query = supabase.table('conversations').select('*')
         conv_query = conv_query.eq('user1_id', user1_id).eq('user2_id', user2_id)
-        conv_response = conv_query.execute()
+        conv_response = await execute(conv_query)
         
         if conv_response.data and len(conv_response.data) > 0:
             conversation_id = conv_response.data[0]['id']
@@ -1347,7 +1104,7 @@ async def send_message(message_data: MessageCreate, payload: dict = Depends(veri
                 'subject': message_data.subject or 'Nouvelle conversation',
                 'campaign_id': message_data.campaign_id
             }
-            conv_create = supabase.table('conversations').insert(new_conv).execute()
+            conv_create = await execute(supabase.table('conversations').insert(new_conv))
             conversation_id = conv_create.data[0]['id']
         
         # Créer le message
@@ -1357,7 +1114,7 @@ async def send_message(message_data: MessageCreate, payload: dict = Depends(veri
             'sender_type': sender_type,
             'content': message_data.content
         }
-        message_create = supabase.table('messages').insert(new_message).execute()
+        message_create = await execute(supabase.table('messages').insert(new_message))
         
         # Créer notification pour le destinataire
         notification = {
@@ -1369,7 +1126,15 @@ async def send_message(message_data: MessageCreate, payload: dict = Depends(veri
             'link': f'/messages/{conversation_id}',
             'data': {'conversation_id': conversation_id, 'sender_id': user_id}
         }
-        supabase.table('notifications').insert(notification).execute()
+        await execute(supabase.table('notifications').insert(notification))
+
+        # Temps réel: le destinataire reçoit le message sur son nœud WebSocket
+        await run_db(
+            cluster_publisher.publish_to_user,
+            message_data.recipient_id,
+            'new_message',
+            {'conversation_id': conversation_id, 'message': message_create.data[0]},
+        )
         
         return {
             "success": True,
@@ -1382,78 +1147,89 @@ async def send_message(message_data: MessageCreate, payload: dict = Depends(veri
         raise HTTPException(status_code=500, detail=f"Error sending message: {str(e)}")
 
 @app.get("/api/messages/conversations")
-async def get_conversations(payload: dict = Depends(verify_token)):
+async def get_conversations(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    payload: dict = Depends(verify_token),
+):
     """
-    Récupère toutes les conversations de l'utilisateur
+    Récupère les conversations de l'utilisateur (dernière activité d'abord)
+    Une requête par page; passer next_cursor pour la page suivante
     """
     try:
-        user_id = payload.get("user_id")
-        
-        # Chercher conversations où user est participant
-        query1 = supabase.table('conversations').select('*').eq('user1_id', user_id)
-        query2 = supabase.table('conversations').select('*').eq('user2_id', user_id)
-        
-        conv1 = query1.execute()
-        conv2 = query2.execute()
-        
-        conversations = (conv1.data or []) + (conv2.data or [])
-        
-        # Enrichir avec derniers messages
-        for conv in conversations:
-            # Récupérer dernier message
-            msg_query = supabase.table('messages').select('*').eq('conversation_id', conv['id']).order('created_at', desc=True).limit(1)
-            msg_response = msg_query.execute()
-            conv['last_message'] = msg_response.data[0] if msg_response.data else None
-            
-            # Compter messages non lus
-            unread_query = supabase.table('messages').select('id', count='exact').eq('conversation_id', conv['id']).eq('is_read', False).neq('sender_id', user_id)
-            unread_response = unread_query.execute()
-            conv['unread_count'] = unread_response.count if hasattr(unread_response, 'count') else 0
-        
-        # Trier par dernière activité
-        conversations.sort(key=lambda x: x.get('last_message_at', ''), reverse=True)
-        
-        return {"conversations": conversations}
-        
+        user_id = payload["sub"]
+        return await run_db(messaging_service.get_inbox, user_id, limit=limit, cursor=cursor)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error fetching conversations: {e}")
-        return {"conversations": []}
+        return {"conversations": [], "next_cursor": None}
 
 @app.get("/api/messages/{conversation_id}")
-async def get_messages(conversation_id: str, payload: dict = Depends(verify_token)):
+async def get_messages(
+    conversation_id: str,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    payload: dict = Depends(verify_token),
+):
     """
-    Récupère tous les messages d'une conversation
+    Récupère une page de messages d'une conversation (ordre chronologique)
+    - sans curseur: derniers messages
+    - before=<message_id>: historique plus ancien (défilement)
+    - after=<message_id>: nouveaux messages (synchronisation incrémentale)
     """
     try:
-        user_id = payload.get("user_id")
-        
-        # Vérifier que l'utilisateur fait partie de la conversation
-        conv = supabase.table('conversations').select('*').eq('id', conversation_id).execute()
-        if not conv.data:
+        user_id = payload["sub"]
+
+        page = await run_db(messaging_service.get_messages, conversation_id, limit=limit, before=before, after=after)
+        if page is None:
             raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        conversation = conv.data[0]
-        if conversation['user1_id'] != user_id and conversation['user2_id'] != user_id:
+
+        # Vérifier que l'utilisateur fait partie de la conversation
+        conversation = page["conversation"]
+        slot = messaging_service.participant_slot(conversation, user_id)
+        if slot is None:
             raise HTTPException(status_code=403, detail="Access denied")
-        
-        # Récupérer les messages
-        messages_query = supabase.table('messages').select('*').eq('conversation_id', conversation_id).order('created_at', desc=False)
-        messages_response = messages_query.execute()
-        
-        # Marquer comme lu les messages reçus
-        supabase.table('messages').update({'is_read': True, 'read_at': datetime.utcnow().isoformat()}).eq('conversation_id', conversation_id).neq('sender_id', user_id).eq('is_read', False).execute()
-        
-        return {
-            "conversation": conversation,
-            "messages": messages_response.data or []
-        }
-        
+
+        # Marqueur de lecture avancé jusqu'au dernier message affiché
+        if not before and page["messages"] and conversation.get(f"{slot}_unread_count", 0) > 0:
+            conversation[f"{slot}_unread_count"] = await run_db(
+                messaging_service.mark_read,
+                conversation_id, user_id, page["messages"][-1]["id"]
+            )
+
+        return page
+
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error fetching messages: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching messages: {str(e)}")
 
+@app.post("/api/messages/{conversation_id}/read")
+async def mark_conversation_read(
+    conversation_id: str,
+    message_id: Optional[str] = None,
+    payload: dict = Depends(verify_token),
+):
+    """Marque la conversation comme lue jusqu'à message_id (ou le dernier message)"""
+    try:
+        unread_count = await run_db(messaging_service.mark_read, conversation_id, payload["sub"], message_id)
+        if unread_count is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        return {"success": True, "unread_count": unread_count}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error marking conversation as read: {e}")
+        raise HTTPException(status_code=500, detail="Error updating conversation")
+
 @app.get("/api/notifications")
 async def get_notifications(limit: int = 20, payload: dict = Depends(verify_token)):
     """
@@ -1463,11 +1239,11 @@ async def get_notifications(limit: int = 20, payload: dict = Depends(verify_toke
         user_id = payload.get("user_id")
         
         query = supabase.table('notifications').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(limit)
-        response = query.execute()
+        response = await execute(query)
         
         # Compter non lues
         unread_query = supabase.table('notifications').select('id', count='exact').eq('user_id', user_id).eq('is_read', False)
-        unread_response = unread_query.execute()
+        unread_response = await execute(unread_query)
         unread_count = unread_response.count if hasattr(unread_response, 'count') else 0
         
         return {
@@ -1485,10 +1261,10 @@ async def mark_notification_read(notification_id: str, payload: dict = Depends(v
     try:
         user_id = payload.get("user_id")
         
-        update = supabase.table('notifications').update({
+        update = await execute(supabase.table('notifications').update({
             'is_read': True,
             'read_at': datetime.utcnow().isoformat()
-        }).eq('id', notification_id).eq('user_id', user_id).execute()
+        }).eq('id', notification_id).eq('user_id', user_id))
         
         return {"success": True}
         
@@ -1533,13 +1309,13 @@ async def get_subscription_plans():
 @app.get("/api/advertisers")
 async def get_advertisers(payload: dict = Depends(verify_token)):
     """Liste des advertisers (alias pour merchants)"""
-    merchants = get_all_merchants()
+    merchants = await aget_all_merchants()
     return {"data": merchants, "total": len(merchants)}
 
 @app.get("/api/affiliates")
 async def get_affiliates(payload: dict = Depends(verify_token)):
     """Liste des affiliés (alias pour influencers)"""
-    influencers = get_all_influencers()
+    influencers = await aget_all_influencers()
     return {"data": influencers, "total": len(influencers)}
 
 # ============================================
@@ -1570,9 +1346,6 @@ async def get_coupons(payload: dict = Depends(verify_token)):
     """Liste des coupons"""
     return {"data": [], "total": 0}
 
-# ============================================
-# INTÉGRATION DES ENDPOINTS AVANCÉS
-
 # ============================================
 # ADVANCED ANALYTICS ENDPOINTS
 # ============================================
@@ -1581,11 +1354,11 @@ async def get_coupons(payload: dict = Depends(verify_token)):
 async def get_merchant_performance(payload: dict = Depends(verify_token)):
     """Métriques de performance réelles pour merchants"""
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "merchant":
             raise HTTPException(status_code=403, detail="Accès refusé")
         
-        merchant = get_merchant_by_user_id(user["id"])
+        merchant = await aget_merchant_by_user_id(user["id"])
         if not merchant:
             return {
                 "conversion_rate": 14.2,
@@ -1598,10 +1371,10 @@ async def get_merchant_performance(payload: dict = Depends(verify_token)):
         merchant_id = merchant["id"]
         
         # Taux de conversion: ventes / clics
-        sales_result = supabase.table("sales").select("id", count="exact").eq("merchant_id", merchant_id).execute()
+        sales_result = await execute(supabase.table("sales").select("id", count="exact").eq("merchant_id", merchant_id))
         total_sales = sales_result.count or 0
         
-        links_result = supabase.table("trackable_links").select("clicks", count="exact").execute()
+        links_result = await execute(supabase.table("trackable_links").select("clicks", count="exact"))
         total_clicks = sum(link.get("clicks", 0) for link in links_result.data) or 1
         
         conversion_rate = (total_sales / total_clicks * 100) if total_clicks > 0 else 0
@@ -1625,11 +1398,11 @@ async def get_merchant_performance(payload: dict = Depends(verify_token)):
 async def get_influencer_performance(payload: dict = Depends(verify_token)):
     """Métriques de performance réelles pour influencers"""
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "influencer":
             raise HTTPException(status_code=403, detail="Accès refusé")
         
-        influencer = get_influencer_by_user_id(user["id"])
+        influencer = await aget_influencer_by_user_id(user["id"])
         if not influencer:
             return {
                 "clicks": [],
@@ -1639,9 +1412,9 @@ async def get_influencer_performance(payload: dict = Depends(verify_token)):
             }
         
         # Récupérer les vraies données des liens
-        links_result = supabase.table("trackable_links").select(
+        links_result = await execute(supabase.table("trackable_links").select(
             "*, products(name, price)"
-        ).eq("influencer_id", influencer["id"]).execute()
+        ).eq("influencer_id", influencer["id"]))
         
         # Calculer best performing product
         best_product = None
@@ -1671,14 +1444,14 @@ async def get_influencer_performance(payload: dict = Depends(verify_token)):
 async def get_platform_metrics(payload: dict = Depends(verify_token)):
     """Métriques plateforme réelles pour admin"""
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Accès refusé")
         
         # Taux de conversion moyen plateforme
-        sales_count = supabase.table("sales").select("id", count="exact").execute().count or 0
+        sales_count = (await execute(supabase.table("sales").select("id", count="exact"))).count or 0
         
-        links_result = supabase.table("trackable_links").select("clicks").execute()
+        links_result = await execute(supabase.table("trackable_links").select("clicks"))
         total_clicks = sum(link.get("clicks", 0) for link in links_result.data) or 1
         
         avg_conversion_rate = (sales_count / total_clicks * 100) if total_clicks > 0 else 0
@@ -1718,7 +1491,7 @@ async def get_platform_revenue(
     - Statistiques détaillées
     """
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin uniquement")
         
@@ -1733,7 +1506,7 @@ async def get_platform_revenue(
         if end_date:
             query = query.lte('created_at', end_date)
         
-        sales = query.execute()
+        sales = await execute(query)
         
         if not sales.data:
             return {
@@ -1819,29 +1592,17 @@ async def get_platform_revenue(
 # ============================================
 # INTÉGRATION DES ENDPOINTS AVANCÉS
 # ============================================
-try:
-    from advanced_endpoints import integrate_all_endpoints
-    integrate_all_endpoints(app, verify_token)
-    print("✅ Endpoints avancés chargés avec succès")
-except ImportError as e:
-    print(f"⚠️  Les endpoints avancés n'ont pas pu être chargés: {e}")
-except Exception as e:
-    print(f"⚠️  Erreur lors du chargement des endpoints avancés: {e}")
+if feature_enabled(app, "advanced"):
+    try:
+        from advanced_endpoints import integrate_all_endpoints
+        integrate_all_endpoints(app, verify_token)
+        print("✅ Endpoints avancés chargés avec succès")
+    except ImportError as e:
+        print(f"⚠️  Les endpoints avancés n'ont pas pu être chargés: {e}")
+    except Exception as e:
+        print(f"⚠️  Erreur lors du chargement des endpoints avancés: {e}")
 
-# ============================================
-# INTÉGRATION DU SYSTÈME D'ABONNEMENT SaaS
-# ============================================
-try:
-    from subscription_endpoints import router as subscription_router
-    app.include_router(subscription_router)
-    print("✅ Système d'abonnement SaaS chargé avec succès")
-    print("   📦 Plans d'abonnement disponibles")
-    print("   💳 Paiements récurrents activés")
-    print("   📄 Facturation automatique configurée")
-except ImportError as e:
-    print(f"⚠️  Le système d'abonnement n'a pas pu être chargé: {e}")
-except Exception as e:
-    print(f"⚠️  Erreur lors du chargement du système d'abonnement: {e}")
+# Système d'abonnement SaaS: router "subscriptions" inclus par app_factory
 
 # ============================================
 # ÉVÉNEMENTS STARTUP/SHUTDOWN
@@ -1855,6 +1616,10 @@ async def startup_event():
     print("⏰ Lancement du scheduler de paiements automatiques...")
     start_scheduler()
     print("✅ Scheduler actif")
+    click_ingestion.start()
+    link_counters.start()
+    # Invalidations du cache des codes courts publiées par les autres workers
+    app.state.short_code_listener = asyncio.create_task(short_code_cache.listen_invalidations())
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -1862,6 +1627,12 @@ async def shutdown_event():
     print("🛑 Arrêt du serveur...")
     stop_scheduler()
     print("✅ Scheduler arrêté")
+    app.state.short_code_listener.cancel()
+    click_ingestion.stop()
+    link_counters.stop()
+    db_executor.shutdown()
+    supabase_transport.close()
+    await pg_fast_path.close()
 
 # ============================================
 # ENDPOINTS PAIEMENTS AUTOMATIQUES
@@ -1870,7 +1641,7 @@ async def shutdown_event():
 @app.post("/api/admin/validate-sales")
 async def manual_validate_sales(payload: dict = Depends(verify_token)):
     """Déclenche manuellement la validation des ventes (admin only)"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin uniquement")
@@ -1881,7 +1652,7 @@ async def manual_validate_sales(payload: dict = Depends(verify_token)):
 @app.post("/api/admin/process-payouts")
 async def manual_process_payouts(payload: dict = Depends(verify_token)):
     """Déclenche manuellement les paiements automatiques (admin only)"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin uniquement")
@@ -1892,7 +1663,7 @@ async def manual_process_payouts(payload: dict = Depends(verify_token)):
 @app.post("/api/sales/{sale_id}/refund")
 async def refund_sale(sale_id: str, reason: str = "customer_return", payload: dict = Depends(verify_token)):
     """Traite un remboursement de vente"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     
     if user["role"] not in ["admin", "merchant"]:
         raise HTTPException(status_code=403, detail="Accès refusé")
@@ -1910,12 +1681,12 @@ async def update_payment_method(
     payload: dict = Depends(verify_token)
 ):
     """Met à jour la méthode de paiement de l'influenceur"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     
     if user["role"] != "influencer":
         raise HTTPException(status_code=403, detail="Influenceurs uniquement")
     
-    influencer = get_influencer_by_user_id(user["id"])
+    influencer = await aget_influencer_by_user_id(user["id"])
     if not influencer:
         raise HTTPException(status_code=404, detail="Profil influenceur non trouvé")
     
@@ -1933,11 +1704,11 @@ async def update_payment_method(
         raise HTTPException(status_code=400, detail="Méthode de paiement invalide")
     
     # Mettre à jour dans la base
-    update_response = supabase.table('influencers').update({
+    update_response = await execute(supabase.table('influencers').update({
         'payment_method': payment_method,
         'payment_details': payment_details,
         'updated_at': datetime.now().isoformat()
-    }).eq('id', influencer["id"]).execute()
+    }).eq('id', influencer["id"]))
     
     if not update_response.data:
         raise HTTPException(status_code=500, detail="Erreur lors de la mise à jour")
@@ -1951,19 +1722,19 @@ async def update_payment_method(
 @app.get("/api/influencer/payment-status")
 async def get_payment_status(payload: dict = Depends(verify_token)):
     """Récupère le statut de paiement de l'influenceur"""
-    user = get_user_by_id(payload["sub"])
+    user = await aget_user_by_id(payload["sub"])
     
     if user["role"] != "influencer":
         raise HTTPException(status_code=403, detail="Influenceurs uniquement")
     
-    influencer = get_influencer_by_user_id(user["id"])
+    influencer = await aget_influencer_by_user_id(user["id"])
     if not influencer:
         raise HTTPException(status_code=404, detail="Profil influenceur non trouvé")
     
     # Récupérer les ventes en attente
-    pending_sales = supabase.table('sales').select('influencer_commission').eq(
+    pending_sales = await execute(supabase.table('sales').select('influencer_commission').eq(
         'influencer_id', influencer["id"]
-    ).eq('status', 'pending').execute()
+    ).eq('status', 'pending'))
     
     pending_amount = sum(float(sale.get('influencer_commission', 0)) for sale in (pending_sales.data or []))
     
@@ -2005,6 +1776,8 @@ async def redirect_tracking_link(short_code: str, request: Request, response: Re
     3. Redirige vers l'URL marchande
     
     Exemple: http://localhost:8000/r/ABC12345 → https://boutique.com/produit
+
+    En production, /r/ est servi par le service dédié redirect_app (Nginx)
     """
     try:
         # Tracker le clic et récupérer l'URL de destination
@@ -2033,6 +1806,161 @@ async def redirect_tracking_link(short_code: str, request: Request, response: Re
         raise HTTPException(status_code=500, detail="Erreur lors du tracking")
 
 
+@app.get("/api/admin/tracking/cache-stats")
+async def get_tracking_cache_stats(payload: dict = Depends(verify_token)):
+    """
+    Statistiques du cache de résolution des codes courts (Admin uniquement)
+
+    Returns:
+    {
+        "hits": 15230,
+        "misses": 412,
+        "hit_rate_percent": 97.37,
+        "size": 398,
+        "max_size": 10000
+    }
+    """
+    user = await aget_user_by_id(payload["sub"])
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+
+    return short_code_cache.get_stats()
+
+
+@app.get("/api/admin/dashboard/stats-cache")
+async def get_dashboard_stats_cache(payload: dict = Depends(verify_token)):
+    """
+    Statistiques du cache des stats dashboard (Admin uniquement)
+
+    Returns:
+    {
+        "hits": 5210,
+        "stale_served": 48,
+        "misses": 73,
+        "recomputes": 75,
+        "coalesced": 310,
+        "backend": "redis"
+    }
+    """
+    user = await aget_user_by_id(payload["sub"])
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+
+    return dashboard_stats.get_stats()
+
+
+@app.get("/api/admin/rate-limits")
+async def get_rate_limit_usage(payload: dict = Depends(verify_token)):
+    """
+    Utilisation du rate limiting par politique et par plan (Admin uniquement)
+
+    Compteurs du worker courant; les limites elles-mêmes sont partagées
+    par toutes les instances (Redis).
+
+    Returns:
+    {
+        "policies": {"auth_login": {"allowed": 120, "rejected": 4}, ...},
+        "plans": {"free": {"allowed": 5300, "rejected": 12}, ...},
+        "cached_plans": 210,
+        "local_denials": 37
+    }
+    """
+    user = await aget_user_by_id(payload["sub"])
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+
+    return rate_limit_policies.snapshot()
+
+
+@app.get("/api/admin/db-pool")
+async def get_db_pool_stats(payload: dict = Depends(verify_token)):
+    """
+    Métriques du pool BDD du worker courant (Admin uniquement)
+
+    Returns:
+    {
+        "max_workers": 32,
+        "in_flight": 5,
+        "waiting": 0,
+        "max_waiting": 14,
+        "completed": 48210,
+        "errors": 3,
+        "avg_wait_ms": 0.4,
+        "avg_run_ms": 11.2
+    }
+    """
+    user = await aget_user_by_id(payload["sub"])
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+
+    return db_executor.get_stats()
+
+
+@app.get("/api/admin/startup-report")
+async def get_startup_report(payload: dict = Depends(verify_token)):
+    """
+    Fonctionnalités activées et temps d'import des routers du worker (Admin uniquement)
+
+    Détail par module (python -X importtime): python -m benchmarks.bench_startup
+
+    Returns:
+    {
+        "features": ["affiliation", "ai", ...],
+        "routers": {"marketplace_endpoints": 41.2, ...},
+        "failed_routers": {},
+        "routers_total_ms": 820.4
+    }
+    """
+    user = await aget_user_by_id(payload["sub"])
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+
+    return app.state.startup_report
+
+
+@app.get("/api/admin/tracking/ingestion-stats")
+async def get_click_ingestion_stats(payload: dict = Depends(verify_token)):
+    """
+    Métriques du pipeline d'ingestion des clics (Admin uniquement)
+
+    Returns:
+    {
+        "queue_depth": 120,
+        "utilization_percent": 0.24,
+        "flushed": 98000,
+        "spilled": 0,
+        "overflow": 0,
+        "last_flush_ms": 35.2
+    }
+    """
+    user = await aget_user_by_id(payload["sub"])
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+
+    return {**click_ingestion.get_stats(), "counters": link_counters.get_stats()}
+
+
+@app.get("/api/admin/tracking/short-code-pool")
+async def get_short_code_pool_stats(payload: dict = Depends(verify_token)):
+    """
+    Profondeur du pool de codes courts pré-alloués (Admin uniquement)
+
+    Returns:
+    {
+        "pool_depth": 742,
+        "block_size": 1000,
+        "codes_issued": 2258,
+        "blocks_reserved": 3,
+        "last_refill_ms": 18.4
+    }
+    """
+    user = await aget_user_by_id(payload["sub"])
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+
+    return short_code_allocator.get_stats()
+
+
 @app.post("/api/tracking-links/generate")
 async def generate_tracking_link(data: AffiliateLinkGenerate, payload: dict = Depends(verify_token)):
     """
@@ -2055,7 +1983,7 @@ async def generate_tracking_link(data: AffiliateLinkGenerate, payload: dict = De
         user_id = payload.get("user_id")
         
         # Récupérer l'influenceur
-        influencer = supabase.table('influencers').select('id').eq('user_id', user_id).execute()
+        influencer = await execute(supabase.table('influencers').select('id').eq('user_id', user_id))
         
         if not influencer.data:
             raise HTTPException(status_code=404, detail="Influenceur introuvable")
@@ -2063,7 +1991,7 @@ async def generate_tracking_link(data: AffiliateLinkGenerate, payload: dict = De
         influencer_id = influencer.data[0]['id']
         
         # Récupérer le produit
-        product = supabase.table('products').select('*').eq('id', data.product_id).execute()
+        product = await execute(supabase.table('products').select('*').eq('id', data.product_id))
         
         if not product.data:
             raise HTTPException(status_code=404, detail="Produit introuvable")
@@ -2570,17 +2498,16 @@ async def get_gateway_statistics(payload: dict = Depends(verify_token)):
     """
     try:
         # Vérifier admin
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin uniquement")
         
         # Rafraîchir vue matérialisée
-        supabase.rpc('refresh_materialized_view', {'view_name': 'gateway_statistics'}).execute()
+        await execute(supabase.rpc('refresh_materialized_view', {'view_name': 'gateway_statistics'}))
         
         # Récupérer stats
-        result = supabase.table('gateway_statistics')\
-            .select('*')\
-            .execute()
+        result = await execute(supabase.table('gateway_statistics')
+            .select('*'))
         
         return result.data
         
@@ -2609,17 +2536,16 @@ async def get_merchant_payment_config(payload: dict = Depends(verify_token)):
     }
     """
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         
         if user["role"] != "merchant":
             raise HTTPException(status_code=403, detail="Merchants uniquement")
         
         # Récupérer config
-        result = supabase.table('merchants')\
-            .select('payment_gateway, auto_debit_enabled, gateway_activated_at, gateway_config')\
-            .eq('id', user['id'])\
-            .single()\
-            .execute()
+        result = await execute(supabase.table('merchants')
+            .select('payment_gateway, auto_debit_enabled, gateway_activated_at, gateway_config')
+            .eq('id', user['id'])
+            .single())
         
         if result.data:
             # Masquer clés sensibles
@@ -2668,7 +2594,7 @@ async def update_merchant_payment_config(
     }
     """
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         
         if user["role"] != "merchant":
             raise HTTPException(status_code=403, detail="Merchants uniquement")
@@ -2690,10 +2616,9 @@ async def update_merchant_payment_config(
             'gateway_activated_at': datetime.now().isoformat()
         }
         
-        result = supabase.table('merchants')\
-            .update(update_data)\
-            .eq('id', user['id'])\
-            .execute()
+        result = await execute(supabase.table('merchants')
+            .update(update_data)
+            .eq('id', user['id']))
         
         return {
             "success": True,
@@ -2736,7 +2661,7 @@ async def generate_monthly_invoices(
     """
     try:
         # Vérifier admin
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin uniquement")
         
@@ -2780,7 +2705,7 @@ async def get_all_invoices(
     """
     try:
         # Vérifier admin
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin uniquement")
         
@@ -2809,7 +2734,7 @@ async def get_invoice_details_admin(
     """Récupère les détails complets d'une facture (Admin)"""
     
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin uniquement")
         
@@ -2843,7 +2768,7 @@ async def mark_invoice_paid_admin(
     }
     """
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin uniquement")
         
@@ -2882,7 +2807,7 @@ async def get_merchant_invoices(payload: dict = Depends(verify_token)):
     ]
     """
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         
         if user["role"] != "merchant":
             raise HTTPException(status_code=403, detail="Merchants uniquement")
@@ -2906,7 +2831,7 @@ async def get_invoice_details_merchant(
     """Récupère les détails d'une facture (Merchant)"""
     
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         
         if user["role"] != "merchant":
             raise HTTPException(status_code=403, detail="Merchants uniquement")
@@ -2946,7 +2871,7 @@ async def pay_invoice_merchant(
     }
     """
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         
         if user["role"] != "merchant":
             raise HTTPException(status_code=403, detail="Merchants uniquement")
@@ -2985,7 +2910,7 @@ async def send_payment_reminders(payload: dict = Depends(verify_token)):
     """Envoie des rappels pour toutes les factures en retard (Admin)"""
     
     try:
-        user = get_user_by_id(payload["sub"])
+        user = await aget_user_by_id(payload["sub"])
         if user["role"] != "admin":
             raise HTTPException(status_code=403, detail="Admin uniquement")
         
@@ -13,7 +13,6 @@ Features:
 
 import os
 import pyotp
-import qrcode
 import io
 import base64
 import secrets
@@ -98,6 +97,9 @@ class TwoFactorAuthService:
         Returns:
             Image QR code en base64 (data:image/png;base64,...)
         """
+        # qrcode (+ Pillow) importé uniquement lors d'une activation 2FA
+        import qrcode
+
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
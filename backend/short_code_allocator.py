@@ -0,0 +1,162 @@
+"""
+Allocateur de codes courts par blocs
+Réserve des plages de numéros de séquence en BDD (une RPC par bloc), puis
+encode chaque numéro en code court sans collision possible: la création
+d'un lien devient un simple INSERT, sans boucle de vérification d'unicité
+"""
+
+from collections import deque
+from typing import Dict, List
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SHORT_CODE_BLOCK_SIZE = int(os.getenv("SHORT_CODE_BLOCK_SIZE", 1000))
+SHORT_CODE_LOW_WATERMARK = int(os.getenv("SHORT_CODE_LOW_WATERMARK", 100))
+
+# Alphabet Base32 Crockford (sans I, L, O, U: pas d'ambiguïté à la lecture)
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# 9 caractères: les anciens codes aléatoires en font 8, aucune collision possible
+CODE_LENGTH = 9
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH  # 2^45
+
+# Permutation affine bijective sur [0, 2^45): les codes consécutifs ne se
+# ressemblent pas et ne révèlent pas le volume de liens créés
+_MULTIPLIER = 0x1B8735935  # impair => inversible modulo 2^45
+_OFFSET = 0xC2B2AE35D
+
+
+class ShortCodeAllocationError(Exception):
+    """Impossible de réserver un bloc de codes courts"""
+
+
+def encode_sequence(value: int) -> str:
+    """Encode un numéro de séquence en code court (bijection)"""
+    if not 0 <= value < CODE_SPACE:
+        raise ValueError(f"Numéro de séquence hors plage: {value}")
+
+    permuted = (value * _MULTIPLIER + _OFFSET) % CODE_SPACE
+
+    chars = []
+    for _ in range(CODE_LENGTH):
+        permuted, index = divmod(permuted, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+class ShortCodeAllocator:
+    """Pool local de codes réservés, rempli par blocs via RPC"""
+
+    def __init__(
+        self,
+        supabase_client=None,
+        block_size: int = SHORT_CODE_BLOCK_SIZE,
+        low_watermark: int = SHORT_CODE_LOW_WATERMARK,
+    ):
+        self._supabase = supabase_client
+        self.block_size = block_size
+        self.low_watermark = low_watermark
+
+        self._pool: deque = deque()
+        self._lock = threading.Lock()
+        self._refilling = threading.Lock()
+
+        self.stats = {
+            "codes_issued": 0,
+            "blocks_reserved": 0,
+            "refill_failures": 0,
+            "last_refill_ms": 0.0,
+        }
+
+    @property
+    def supabase(self):
+        """Client Supabase (import paresseux)"""
+        if self._supabase is None:
+            from supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    def allocate(self) -> str:
+        """
+        Retourne un code court garanti unique
+
+        Raises:
+            ShortCodeAllocationError: si aucun bloc ne peut être réservé
+        """
+        with self._lock:
+            if not self._pool:
+                self._pool.extend(self._reserve_block())
+            value = self._pool.popleft()
+            self.stats["codes_issued"] += 1
+            depth = len(self._pool)
+
+        if depth < self.low_watermark and self._refilling.acquire(blocking=False):
+            # Pré-remplissage hors du chemin critique
+            threading.Thread(target=self._prefetch, name="short-code-prefetch", daemon=True).start()
+
+        return encode_sequence(value)
+
+    def allocate_many(self, count: int) -> List[str]:
+        """
+        Retourne `count` codes courts uniques (réservation groupée si nécessaire)
+
+        Raises:
+            ShortCodeAllocationError: si aucun bloc ne peut être réservé
+        """
+        with self._lock:
+            while len(self._pool) < count:
+                self._pool.extend(self._reserve_block())
+            values = [self._pool.popleft() for _ in range(count)]
+            self.stats["codes_issued"] += count
+
+        return [encode_sequence(value) for value in values]
+
+    def _prefetch(self):
+        try:
+            block = self._reserve_block()
+            with self._lock:
+                self._pool.extend(block)
+        except ShortCodeAllocationError:
+            pass
+        finally:
+            self._refilling.release()
+
+    def _reserve_block(self) -> range:
+        """Réserve un bloc de numéros de séquence (une RPC)"""
+        started = time.perf_counter()
+        try:
+            result = self.supabase.rpc(
+                "reserve_short_code_block", {"p_block_size": self.block_size}
+            ).execute()
+            data = result.data
+            start = int(data[0] if isinstance(data, list) else data)
+        except Exception as e:
+            self.stats["refill_failures"] += 1
+            logger.error(f"❌ Réservation bloc de codes courts impossible: {e}")
+            raise ShortCodeAllocationError(str(e)) from e
+
+        self.stats["blocks_reserved"] += 1
+        self.stats["last_refill_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"✅ Bloc de codes courts réservé: [{start}, {start + self.block_size})")
+        return range(start, start + self.block_size)
+
+    def get_stats(self) -> Dict:
+        """Profondeur du pool et compteurs de réservation"""
+        with self._lock:
+            depth = len(self._pool)
+
+        return {
+            **self.stats,
+            "pool_depth": depth,
+            "block_size": self.block_size,
+            "low_watermark": self.low_watermark,
+        }
+
+
+# Instance globale
+short_code_allocator = ShortCodeAllocator()
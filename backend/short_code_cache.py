@@ -0,0 +1,222 @@
+"""
+Cache de résolution des codes courts - Redirections /r/{short_code}
+LRU en mémoire (par processus) pour éviter un aller-retour BDD par clic
+sur les liens les plus sollicités pendant une campagne
+
+Les invalidations (lien modifié / désactivé par l'API) sont publiées sur un
+canal Redis: chaque processus qui écoute (service de redirection, workers
+de l'API) purge aussitôt sa copie. Le TTL reste le filet de sécurité si un
+message est perdu (Redis indisponible, reconnexion).
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+import asyncio
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SHORT_CODE_CACHE_SIZE = int(os.getenv("SHORT_CODE_CACHE_SIZE", 10000))
+# TTL de sécurité: borne la durée de vie d'une entrée si une invalidation
+# publiée n'a pas été reçue
+SHORT_CODE_CACHE_TTL = int(os.getenv("SHORT_CODE_CACHE_TTL", 300))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+INVALIDATION_CHANNEL = "sysales:short_code:invalidate"
+
+
+@dataclass
+class ResolvedLink:
+    """Sous-ensemble minimal d'un lien nécessaire à la redirection"""
+
+    id: str
+    influencer_id: str
+    destination_url: str
+    status: str
+    expires_at: float = 0.0
+
+    @property
+    def is_active(self) -> bool:
+        return self.status == "active"
+
+
+class ShortCodeCache:
+    """LRU borné, thread-safe, indexé par short_code (avec index inverse par link_id)"""
+
+    def __init__(self, max_size: int = SHORT_CODE_CACHE_SIZE, ttl: int = SHORT_CODE_CACHE_TTL, redis_client=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._redis = redis_client
+        self._entries: "OrderedDict[str, ResolvedLink]" = OrderedDict()
+        self._codes_by_link: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "remote_invalidations": 0,
+            "publish_errors": 0,
+        }
+
+    @property
+    def redis(self):
+        """Client Redis (import paresseux)"""
+        if self._redis is None:
+            import redis
+
+            self._redis = redis.from_url(REDIS_URL, decode_responses=True, socket_connect_timeout=1)
+        return self._redis
+
+    def get(self, short_code: str) -> Optional[ResolvedLink]:
+        """Retourne le lien en cache ou None (miss / entrée expirée)"""
+        with self._lock:
+            entry = self._entries.get(short_code)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            if entry.expires_at and entry.expires_at < time.monotonic():
+                self._remove(short_code)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(short_code)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, short_code: str, link: Dict) -> ResolvedLink:
+        """Enregistre un lien (ligne BDD) dans le cache et retourne l'entrée"""
+        entry = ResolvedLink(
+            id=str(link["id"]),
+            influencer_id=str(link.get("influencer_id") or ""),
+            destination_url=link.get("destination_url") or "",
+            status=link.get("status") or "",
+            expires_at=time.monotonic() + self.ttl if self.ttl else 0.0,
+        )
+
+        with self._lock:
+            if short_code in self._entries:
+                self._remove(short_code)
+
+            self._entries[short_code] = entry
+            self._codes_by_link[entry.id] = short_code
+
+            while len(self._entries) > self.max_size:
+                oldest_code, oldest = self._entries.popitem(last=False)
+                self._codes_by_link.pop(oldest.id, None)
+                self.stats["evictions"] += 1
+
+        return entry
+
+    def invalidate(self, short_code: str, publish: bool = True) -> bool:
+        """Supprime un code court du cache (et des autres processus si publish)"""
+        if publish:
+            self._publish({"short_code": short_code})
+
+        with self._lock:
+            if short_code not in self._entries:
+                return False
+            self._remove(short_code)
+            self.stats["invalidations"] += 1
+
+        logger.info(f"🗑️ Cache short_code invalidé: {short_code}")
+        return True
+
+    def invalidate_link(self, link_id: str, publish: bool = True) -> bool:
+        """Supprime du cache le code court associé à un link_id"""
+        if publish:
+            self._publish({"link_id": str(link_id)})
+
+        with self._lock:
+            short_code = self._codes_by_link.get(str(link_id))
+
+        if not short_code:
+            return False
+        return self.invalidate(short_code, publish=False)
+
+    # ============================================
+    # PROPAGATION ENTRE PROCESSUS
+    # ============================================
+
+    def _publish(self, message: Dict):
+        """Publie une invalidation (échec journalisé: le TTL prend le relais)"""
+        try:
+            self.redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            self.stats["publish_errors"] += 1
+            logger.warning(f"⚠️ Invalidation short_code non publiée ({message}): {e}")
+
+    def apply_invalidation(self, raw: str) -> bool:
+        """Applique localement une invalidation reçue d'un autre processus"""
+        message = json.loads(raw)
+        self.stats["remote_invalidations"] += 1
+        if message.get("link_id"):
+            return self.invalidate_link(message["link_id"], publish=False)
+        return self.invalidate(message["short_code"], publish=False)
+
+    async def listen_invalidations(self):
+        """Abonnement au canal d'invalidation, reconnexion automatique"""
+        import redis.asyncio as aioredis
+
+        while True:
+            client = aioredis.from_url(REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                logger.info("✅ Cache short_code abonné aux invalidations")
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        self.apply_invalidation(message["data"])
+                    except Exception as e:
+                        logger.error(f"❌ Invalidation short_code invalide: {e}")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Abonnement aux invalidations interrompu: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+    def clear(self):
+        """Vide complètement le cache"""
+        with self._lock:
+            self._entries.clear()
+            self._codes_by_link.clear()
+
+    def get_stats(self) -> Dict:
+        """Statistiques hit/miss du cache"""
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            hit_rate = (self.stats["hits"] / total * 100) if total > 0 else 0
+
+            return {
+                **self.stats,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "total_lookups": total,
+                "hit_rate_percent": round(hit_rate, 2),
+            }
+
+    def _remove(self, short_code: str):
+        """Suppression interne (verrou déjà acquis)"""
+        entry = self._entries.pop(short_code, None)
+        if entry and self._codes_by_link.get(entry.id) == short_code:
+            del self._codes_by_link[entry.id]
+
+
+# Instance globale
+short_code_cache = ShortCodeCache()
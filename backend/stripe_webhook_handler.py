@@ -15,9 +15,9 @@ Gestion des webhooks Stripe pour:
 from fastapi import APIRouter, HTTPException, Request, Header
 from typing import Optional
 from datetime import datetime
-from supabase import create_client, Client
+from supabase_client import supabase
 import os
-import stripe
+from lazy_imports import lazy_import
 
 router = APIRouter(prefix="/api/webhooks", tags=["Webhooks"])
 
@@ -31,12 +31,6 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise ValueError("Missing required Supabase environment variables")
 
-# ============================================
-# SUPABASE CLIENT
-# ============================================
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-
 # ============================================
 # STRIPE CONFIGURATION
 # ============================================
@@ -50,8 +44,13 @@ if not STRIPE_SECRET_KEY or not STRIPE_SECRET_KEY.startswith("sk_"):
 if not STRIPE_WEBHOOK_SECRET or not STRIPE_WEBHOOK_SECRET.startswith("whsec_"):
     raise ValueError("Missing or invalid STRIPE_WEBHOOK_SECRET")
 
-stripe.api_key = STRIPE_SECRET_KEY
-stripe.max_network_retries = 2
+def _configure_stripe(module):
+    module.api_key = STRIPE_SECRET_KEY
+    module.max_network_retries = 2
+
+
+# SDK Stripe importé au premier webhook (hors du démarrage de l'API)
+stripe = lazy_import("stripe", on_load=_configure_stripe)
 
 # ============================================
 # WEBHOOK EVENT HANDLERS
@@ -15,9 +15,9 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
-from supabase import create_client, Client
+from supabase_client import supabase
 import os
-import stripe
+from lazy_imports import lazy_import
 from auth import get_current_user, get_current_admin
 
 router = APIRouter(prefix="/api/subscriptions", tags=["Subscriptions"])
@@ -37,17 +37,16 @@ if not STRIPE_SECRET_KEY or not STRIPE_SECRET_KEY.startswith("sk_"):
     raise ValueError("Missing or invalid STRIPE_SECRET_KEY")
 
 # ============================================
-# SUPABASE CLIENT
+# STRIPE CONFIGURATION
 # ============================================
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+def _configure_stripe(module):
+    module.api_key = STRIPE_SECRET_KEY
+    module.max_network_retries = 2
 
-# ============================================
-# STRIPE CONFIGURATION
-# ============================================
 
-stripe.api_key = STRIPE_SECRET_KEY
-stripe.max_network_retries = 2
+# SDK Stripe importé au premier appel (hors du démarrage de l'API)
+stripe = lazy_import("stripe", on_load=_configure_stripe)
 
 # ============================================
 # PYDANTIC MODELS
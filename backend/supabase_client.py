@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 from typing import Optional
 
+from supabase_transport import supabase_transport
+
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -14,11 +16,35 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
+
+def _use_pooled_transport(client: Client) -> Client:
+    """
+    Branche le client PostgREST (table / rpc) sur le transport partagé
+
+    Chaque client PostgREST reçoit son propre httpx.Client (en-têtes apikey /
+    Authorization distincts) mais tous partagent le pool de connexions,
+    les timeouts, le budget par requête et le circuit breaker de
+    supabase_transport. Appliqué aussi aux clients PostgREST recréés par
+    supabase-py (changement de session auth). Storage et auth gardent leur
+    transport par défaut.
+    """
+    init_postgrest = type(client)._init_postgrest_client
+
+    def init_pooled_postgrest(*args, **kwargs):
+        kwargs["http_client"] = supabase_transport.client()
+        return init_postgrest(*args, **kwargs)
+
+    client._init_postgrest_client = init_pooled_postgrest
+    client._postgrest = None
+    return client
+
+
 # Client avec service_role (admin - pour backend)
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+supabase_admin: Client = _use_pooled_transport(create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY))
 
-# Client avec anon key (pour frontend si nécessaire)
-supabase_anon: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+# Client avec anon key (pour frontend si nécessaire): créé au premier usage,
+# le backend n'en a presque jamais besoin
+_supabase_anon: Optional[Client] = None
 
 
 def get_supabase_client(admin=True) -> Client:
@@ -29,7 +55,19 @@ def get_supabase_client(admin=True) -> Client:
         admin: Si True, retourne le client avec droits admin (service_role)
                Si False, retourne le client avec droits anonymes
     """
-    return supabase_admin if admin else supabase_anon
+    global _supabase_anon
+    if admin:
+        return supabase_admin
+    if _supabase_anon is None:
+        _supabase_anon = _use_pooled_transport(create_client(SUPABASE_URL, SUPABASE_ANON_KEY))
+    return _supabase_anon
+
+
+def __getattr__(name: str):
+    # `from supabase_client import supabase_anon` reste possible (création différée)
+    if name == "supabase_anon":
+        return get_supabase_client(admin=False)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Export du client par défaut (admin)
@@ -0,0 +1,354 @@
+"""
+Transport HTTP du client Supabase (PostgREST)
+
+Remplace le transport httpx par défaut de supabase-py:
+- pool de connexions dimensionné, keep-alive, multiplexage HTTP/2 (paquet h2)
+- timeouts connect / read / write / pool configurables
+- budget par requête: une échéance posée par le middleware FastAPI
+  (contextvar, propagée aux threads du pool BDD par async_db) plafonne
+  les timeouts de chaque appel; échéance dépassée = pas d'appel
+- circuit breaker: après N échecs consécutifs (réseau / 5xx), les appels
+  échouent immédiatement pendant SUPABASE_CIRCUIT_RESET secondes
+- métriques: requêtes en cours / en attente d'un slot, histogramme de latence
+
+Usage:
+    from supabase_transport import supabase_transport, request_deadline
+
+    http_client = supabase_transport.client()  # httpx.Client sur le pool partagé
+    stats = supabase_transport.get_stats()     # exposé par /health
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", 50))
+SUPABASE_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_KEEPALIVE_CONNECTIONS", 20))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", 30))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", 3))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", 10))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", 5))
+# Requêtes HTTP simultanées max (avec HTTP/2, plusieurs par connexion)
+SUPABASE_MAX_IN_FLIGHT = int(os.getenv("SUPABASE_MAX_IN_FLIGHT", 100))
+# Budget BDD total d'une requête API (toutes requêtes PostgREST confondues)
+SUPABASE_REQUEST_BUDGET = float(os.getenv("SUPABASE_REQUEST_BUDGET", 15))
+SUPABASE_CIRCUIT_THRESHOLD = int(os.getenv("SUPABASE_CIRCUIT_THRESHOLD", 5))
+SUPABASE_CIRCUIT_RESET = float(os.getenv("SUPABASE_CIRCUIT_RESET", 30))
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Échéance (time.monotonic()) de la requête API en cours, None = pas de budget
+request_deadline: ContextVar[Optional[float]] = ContextVar("supabase_request_deadline", default=None)
+
+
+class SupabaseDeadlineExceeded(TimeoutError):
+    """Budget de la requête API épuisé avant ou pendant l'appel PostgREST"""
+
+
+class SupabaseCircuitOpen(ConnectionError):
+    """Circuit ouvert: Supabase considéré indisponible, appel non tenté"""
+
+
+@contextmanager
+def deadline(budget: float = SUPABASE_REQUEST_BUDGET):
+    """
+    Pose une échéance pour les appels Supabase du bloc (ne l'allonge jamais)
+
+    Usage:
+        with deadline(2.0):
+            supabase.table("users").select("*").execute()
+    """
+    target = time.monotonic() + budget
+    current = request_deadline.get()
+    token = request_deadline.set(min(target, current) if current else target)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Secondes restantes avant l'échéance courante (None = pas d'échéance)"""
+    target = request_deadline.get()
+    return None if target is None else target - time.monotonic()
+
+
+async def deadline_middleware(request, call_next):
+    """Middleware HTTP: budget SUPABASE_REQUEST_BUDGET pour chaque requête API"""
+    with deadline(SUPABASE_REQUEST_BUDGET):
+        return await call_next(request)
+
+
+class LatencyHistogram:
+    """Histogramme cumulatif (style Prometheus) des latences en ms"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float):
+        self.total += 1
+        self.sum_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        for index, bound in enumerate(self.buckets):
+            if duration_ms <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def percentile(self, ratio: float) -> Optional[float]:
+        """Borne supérieure du bucket contenant le percentile (max observé au-delà du dernier)"""
+        if not self.total:
+            return None
+        rank, seen = ratio * self.total, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return round(self.max_ms, 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[f"le_{bound}"] = cumulative
+        buckets["le_inf"] = self.total
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 3) if self.total else None,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker à trois états (closed / open / half_open)
+
+    Args:
+        threshold: Échecs consécutifs avant ouverture
+        reset_timeout: Durée d'ouverture avant un appel d'essai (secondes)
+    """
+
+    def __init__(self, threshold: int = SUPABASE_CIRCUIT_THRESHOLD, reset_timeout: float = SUPABASE_CIRCUIT_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True si l'appel peut être tenté (un seul appel d'essai en half_open)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("✅ Supabase: circuit refermé")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opened_count += 1
+                    logger.error(f"🔌 Supabase: circuit ouvert après {self.failures} échecs")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class SupabaseTransport:
+    """
+    Transport httpx instrumenté, partagé par les clients Supabase du process
+
+    Implémente l'interface transport de httpx (handle_request / close) en
+    déléguant à httpx.HTTPTransport, créé à la demande.
+
+    Args:
+        transport: Transport sous-jacent (tests); par défaut httpx.HTTPTransport
+            configuré depuis les variables SUPABASE_*
+    """
+
+    # Réponses comptées comme indisponibilité de Supabase / PostgREST
+    FAILURE_STATUSES = (502, 503, 504)
+
+    def __init__(self, transport=None, max_in_flight: int = SUPABASE_MAX_IN_FLIGHT):
+        self._transport = transport
+        self.max_in_flight = max_in_flight
+        self.http2 = SUPABASE_HTTP2
+        self.circuit = CircuitBreaker()
+        self.latency = LatencyHistogram()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._stats = {
+            "in_flight": 0,
+            "waiting": 0,
+            "max_in_flight": 0,
+            "requests": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "deadline_exceeded": 0,
+            "circuit_rejected": 0,
+            "pool_exhausted": 0,
+        }
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            import httpx
+
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("⚠️ Paquet h2 absent: transport Supabase en HTTP/1.1")
+                    http2 = False
+            self.http2 = http2
+            self._transport = httpx.HTTPTransport(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=SUPABASE_POOL_SIZE,
+                    max_keepalive_connections=SUPABASE_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+                ),
+                retries=1,  # nouvelle tentative de connexion uniquement
+            )
+        return self._transport
+
+    def client(self, **kwargs):
+        """Nouveau httpx.Client branché sur le pool partagé"""
+        import httpx
+
+        return httpx.Client(
+            transport=self,
+            timeout=httpx.Timeout(
+                SUPABASE_READ_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT, pool=SUPABASE_POOL_TIMEOUT
+            ),
+            **kwargs,
+        )
+
+    def _incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _apply_budget(self, request):
+        """Plafonne les timeouts de la requête par le budget restant"""
+        remaining = remaining_budget()
+        if remaining is None:
+            return
+        if remaining <= 0:
+            self._incr("deadline_exceeded")
+            raise SupabaseDeadlineExceeded("Budget BDD de la requête épuisé")
+
+        timeouts = dict(request.extensions.get("timeout") or {})
+        for phase in ("connect", "read", "write", "pool"):
+            configured = timeouts.get(phase)
+            timeouts[phase] = remaining if configured is None else min(configured, remaining)
+        request.extensions["timeout"] = timeouts
+
+    def handle_request(self, request):
+        # Budget et slot d'abord: en half_open, allow() réserve l'unique appel
+        # d'essai, qui doit ensuite toujours aboutir à record_success/failure
+        self._apply_budget(request)
+
+        self._incr("waiting")
+        wait_timeout = remaining_budget()
+        acquired = self._slots.acquire(
+            timeout=SUPABASE_POOL_TIMEOUT if wait_timeout is None else max(0.0, min(SUPABASE_POOL_TIMEOUT, wait_timeout))
+        )
+        with self._lock:
+            self._stats["waiting"] -= 1
+            if acquired:
+                self._stats["in_flight"] += 1
+                self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+            else:
+                self._stats["pool_exhausted"] += 1
+        if not acquired:
+            raise SupabaseDeadlineExceeded("Aucun slot Supabase disponible avant l'échéance")
+
+        if not self.circuit.allow():
+            with self._lock:
+                self._stats["in_flight"] -= 1
+                self._stats["circuit_rejected"] += 1
+            self._slots.release()
+            raise SupabaseCircuitOpen("Supabase indisponible (circuit ouvert)")
+
+        started = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except Exception as exc:
+            self._incr("errors")
+            if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+                self._incr("timeouts")
+            self.circuit.record_failure()
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.latency.observe(duration_ms)
+                self._stats["in_flight"] -= 1
+                self._stats["requests"] += 1
+            self._slots.release()
+
+        if response.status_code in self.FAILURE_STATUSES:
+            self.circuit.record_failure()
+        else:
+            self.circuit.record_success()
+        return response
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            latency = self.latency.snapshot()
+
+        return {
+            **stats,
+            "pool_size": SUPABASE_POOL_SIZE,
+            "max_concurrent": self.max_in_flight,
+            "http2": self.http2,
+            "circuit": {
+                "state": self.circuit.state,
+                "consecutive_failures": self.circuit.failures,
+                "opened_count": self.circuit.opened_count,
+            },
+            "latency": latency,
+        }
+
+
+# Instance globale
+supabase_transport = SupabaseTransport()
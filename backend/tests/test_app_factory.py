@@ -0,0 +1,68 @@
+"""
+Tests pour la fabrique d'application (app_factory)
+
+Tests couvrant:
+- Lecture de APP_FEATURES (all / none / liste)
+- Seuls les routers des fonctionnalités activées sont importés
+- Router activé en échec: démarrage interrompu
+- Router optionnel en échec ignoré et reporté dans le rapport de démarrage
+"""
+
+import sys
+import types
+
+import pytest
+from fastapi import APIRouter
+
+import app_factory
+from app_factory import ALL_FEATURES, FeatureRouter, create_app, parse_features
+
+
+def _router_module(monkeypatch, name, path):
+    module = types.ModuleType(name)
+    module.router = APIRouter()
+    module.router.add_api_route(path, lambda: {"ok": True})
+    monkeypatch.setitem(sys.modules, name, module)
+
+
+class TestFeatures:
+    """Tests de la configuration des fonctionnalités"""
+
+    def test_parse_features(self):
+        """Test: all, none, liste avec inconnues ignorées"""
+        assert parse_features("all") == ALL_FEATURES
+        assert parse_features("none") == set()
+        assert parse_features("marketplace, ai, inconnue") == {"marketplace", "ai"}
+
+    def test_only_enabled_routers_imported(self, monkeypatch):
+        """Test: fonctionnalité désactivée = module jamais importé"""
+        _router_module(monkeypatch, "fake_shop_endpoints", "/api/shop")
+        monkeypatch.setattr(
+            app_factory,
+            "FEATURE_ROUTERS",
+            [FeatureRouter("shop", "fake_shop_endpoints"), FeatureRouter("heavy", "fake_heavy_endpoints")],
+        )
+
+        app = create_app(features={"shop"})
+
+        paths = {route.path for route in app.routes}
+        assert "/api/shop" in paths
+        assert "fake_heavy_endpoints" not in sys.modules
+        assert list(app.state.startup_report["routers"]) == ["fake_shop_endpoints"]
+
+    def test_failing_router_aborts_startup(self, monkeypatch):
+        """Test: module introuvable pour une fonctionnalité activée, erreur remontée"""
+        monkeypatch.setattr(app_factory, "FEATURE_ROUTERS", [FeatureRouter("broken", "module_inexistant_xyz")])
+
+        with pytest.raises(ImportError):
+            create_app(features={"broken"})
+
+    def test_failing_optional_router_reported(self, monkeypatch):
+        """Test: router optionnel introuvable, application créée quand même"""
+        monkeypatch.setattr(
+            app_factory, "FEATURE_ROUTERS", [FeatureRouter("broken", "module_inexistant_xyz", optional=True)]
+        )
+
+        app = create_app(features={"broken"})
+
+        assert "module_inexistant_xyz" in app.state.startup_report["failed_routers"]
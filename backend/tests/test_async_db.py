@@ -0,0 +1,122 @@
+"""
+Tests pour l'accès BDD non bloquant (async_db)
+
+Tests couvrant:
+- La boucle asyncio reste libre pendant un appel BDD
+- Concurrence bornée par la taille du pool
+- Propagation des exceptions et des contextvars
+- Métriques du pool
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from async_db import DatabaseExecutor, to_async
+
+
+@pytest.fixture
+def executor():
+    pool = DatabaseExecutor(max_workers=4)
+    yield pool
+    pool.shutdown()
+
+
+class SlowQuery:
+    """Requête PostgREST factice: execute() bloque comme un aller-retour HTTP"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def execute(self):
+        time.sleep(self.delay)
+        return threading.current_thread().name
+
+
+class TestDatabaseExecutor:
+    """Tests du pool BDD"""
+
+    def test_loop_not_blocked(self, executor):
+        """Test: des ticks de la boucle continuent pendant un appel BDD lent"""
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            thread_name = await executor.run(SlowQuery(0.1).execute)
+            task.cancel()
+            return ticks, thread_name
+
+        ticks, thread_name = asyncio.run(scenario())
+        assert ticks >= 5
+        assert thread_name.startswith("db")
+
+    def test_concurrency_bounded_by_pool_size(self, executor):
+        """Test: jamais plus de max_workers appels simultanés, le reste en file"""
+        active, peak = 0, 0
+        lock = threading.Lock()
+
+        def query():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+        async def scenario():
+            await asyncio.gather(*(executor.run(query) for _ in range(12)))
+
+        asyncio.run(scenario())
+        stats = executor.get_stats()
+
+        assert peak == 4
+        assert stats["completed"] == 12
+        assert stats["in_flight"] == 0 and stats["waiting"] == 0
+        assert stats["max_waiting"] >= 8
+
+    def test_exception_propagates_and_counted(self, executor):
+        """Test: l'exception BDD remonte à l'appelant et est comptée"""
+
+        def failing():
+            raise RuntimeError("PostgREST indisponible")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(executor.run(failing))
+        assert executor.get_stats()["errors"] == 1
+
+    def test_context_propagated_to_thread(self, executor):
+        """Test: les contextvars (request id) sont visibles dans le thread BDD"""
+        request_id = contextvars.ContextVar("request_id", default=None)
+
+        async def scenario():
+            request_id.set("req-42")
+            return await executor.run(request_id.get)
+
+        assert asyncio.run(scenario()) == "req-42"
+
+
+class TestToAsync:
+    """Tests du wrapper to_async"""
+
+    def test_wraps_sync_helper(self):
+        """Test: même résultat et même nom que la fonction synchrone"""
+
+        def get_user_by_id(user_id):
+            """Récupère un utilisateur"""
+            return {"id": user_id}
+
+        aget_user_by_id = to_async(get_user_by_id)
+
+        assert aget_user_by_id.__name__ == "get_user_by_id"
+        assert asyncio.run(aget_user_by_id("U1")) == {"id": "U1"}
@@ -0,0 +1,84 @@
+"""
+Tests pour les handlers de paiement automatique (PayPal / SEPA)
+
+Tests couvrant:
+- Clé d'idempotence transmise au provider
+- Exceptions remontées à PayoutExecutor (retries / validation)
+- Notification de paiement publiée vers le tier WebSocket
+"""
+
+from unittest.mock import MagicMock
+
+import auto_payment_service
+from auto_payment_service import AutoPaymentService
+from payout_executor import PayoutExecutor, PayoutJob, ProviderPolicy
+
+POLICY = ProviderPolicy(max_retries=2, base_delay=0.001, rate_per_second=1000, burst=1000)
+
+
+class TestAutoPaymentHandlers:
+    """Tests des handlers branchés sur l'exécuteur"""
+
+    def test_idempotency_key_reaches_provider(self):
+        """Test: La clé du payout sert de référence côté provider"""
+        service = AutoPaymentService()
+
+        _, paypal_tx = service._process_paypal_payment({"email": "inf@example.ma"}, 80.0, "auto:I1:2026-10-18")
+        _, sepa_tx = service._process_bank_transfer(
+            {"iban": "MA64011519000001205000534921", "account_name": "Inf"}, 80.0, "auto:I2:2026-10-18"
+        )
+
+        assert paypal_tx == "PAYPAL_SIM_auto:I1:2026-10-18"
+        assert sepa_tx == "SEPA_auto:I2:2026-10-18"
+
+    def test_invalid_details_not_retried(self):
+        """Test: Email manquant -> ValueError remontée, un seul essai"""
+        service = AutoPaymentService()
+        executor = PayoutExecutor(
+            {"paypal": lambda job: service._process_paypal_payment(job.payload, job.amount, job.idempotency_key)},
+            {"paypal": POLICY},
+        )
+
+        report = executor.run([PayoutJob(idempotency_key="K1", provider="paypal", amount=80.0, payload={})])
+
+        outcome = report["outcomes"][0]
+        assert not outcome.success
+        assert outcome.attempts == 1
+        assert "PayPal" in outcome.error
+
+    def test_transient_error_retried(self, monkeypatch):
+        """Test: Erreur réseau du provider -> retry par l'exécuteur"""
+        service = AutoPaymentService()
+        calls = []
+
+        def flaky(details, amount, key):
+            calls.append(key)
+            if len(calls) == 1:
+                raise ConnectionError("timeout PayPal")
+            return True, f"TX-{key}"
+
+        monkeypatch.setattr(service, "_process_paypal_payment", flaky)
+        executor = PayoutExecutor(
+            {"paypal": lambda job: service._process_paypal_payment(job.payload, job.amount, job.idempotency_key)},
+            {"paypal": POLICY},
+        )
+
+        report = executor.run([PayoutJob(idempotency_key="K1", provider="paypal", amount=80.0, payload={})])
+
+        assert report["outcomes"][0].success
+        assert calls == ["K1", "K1"]
+
+    def test_payment_notification_published(self, monkeypatch):
+        """Test: La notification in-app est aussi routée vers le nœud WebSocket de l'influenceur"""
+        client, publisher = MagicMock(), MagicMock()
+        client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {"email": "inf@example.ma"}
+        ]
+        monkeypatch.setattr(auto_payment_service, "supabase", client)
+        monkeypatch.setattr(auto_payment_service, "cluster_publisher", publisher)
+
+        AutoPaymentService()._send_payment_notification({"user_id": "U1"}, 80.0, "TX-1")
+
+        user_id, event_type, data = publisher.publish_to_user.call_args.args
+        assert (user_id, event_type) == ("U1", "notification_created")
+        assert data["type"] == "payout_completed"
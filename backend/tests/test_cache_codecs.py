@@ -0,0 +1,54 @@
+"""
+Tests pour les codecs du cache
+
+Tests couvrant:
+- Aller-retour pour chaque codec disponible
+- Compression au-delà du seuil (et seulement si elle réduit la taille)
+- En-tête versionné: lecture indépendante de la configuration du lecteur
+- Valeurs JSON historiques sans en-tête
+"""
+
+import pytest
+
+from cache_codecs import CODECS, COMPRESSORS, FORMAT_VERSION, HEADER_MAGIC, CacheCodec
+
+PRODUCTS = [{"id": f"P{n}", "name": f"Produit {n}", "price": 199.5, "tags": ["mode", "maroc"]} for n in range(100)]
+
+
+class TestCacheCodec:
+    """Tests du codec de cache"""
+
+    @pytest.mark.parametrize("name", sorted(CODECS))
+    def test_round_trip(self, name):
+        """Test: encode puis decode restitue la valeur"""
+        codec = CacheCodec(codec=name, compression="none")
+        assert codec.decode(codec.encode(PRODUCTS)) == PRODUCTS
+
+    def test_large_payload_is_compressed(self):
+        """Test: au-delà du seuil, compression indiquée dans l'en-tête"""
+        codec = CacheCodec(codec="json", compression="zlib", threshold=1024)
+
+        small, large = codec.encode({"id": 1}), codec.encode(PRODUCTS)
+
+        assert small[:4] == bytes((HEADER_MAGIC, FORMAT_VERSION, CODECS["json"].id, 0))
+        assert large[3] == COMPRESSORS["zlib"].id
+        assert len(large) < len(CacheCodec(codec="json", compression="none").encode(PRODUCTS))
+
+    def test_reader_follows_header_not_its_config(self):
+        """Test: un lecteur configuré autrement décode la valeur (déploiement progressif)"""
+        written = CacheCodec(codec="json", compression="zlib", threshold=0).encode(PRODUCTS)
+        reader = CacheCodec(codec=sorted(CODECS)[-1], compression="none")
+
+        assert reader.decode(written) == PRODUCTS
+
+    def test_legacy_json_and_unknown_header(self):
+        """Test: JSON historique lisible, en-tête inconnu rejeté"""
+        assert CacheCodec.decode(b'{"a": 1}') == {"a": 1}
+        assert CacheCodec.decode('{"a": 1}') == {"a": 1}
+        with pytest.raises(ValueError):
+            CacheCodec.decode(bytes((HEADER_MAGIC, FORMAT_VERSION, 99, 0)) + b"x")
+
+    def test_unavailable_codec(self):
+        """Test: codec demandé mais non installé"""
+        with pytest.raises(ValueError):
+            CacheCodec(codec="pickle")
@@ -0,0 +1,267 @@
+"""
+Tests pour le cache unifié (cache_manager)
+
+Tests couvrant:
+- Invalidation de namespace en O(1) (génération)
+- Valeur + tags écrits en un seul pipeline
+- Invalidation par tag et élagage des membres expirés
+- Aucun appel KEYS
+- L1 en process devant Redis, calcul single-flight, rafraîchissement anticipé
+- Copie neuve à chaque lecture, mêmes types en L1 et en L2
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+import pytest
+
+import cache_manager
+from cache_manager import CacheManager
+
+
+class FakeRedis:
+    """Sous-ensemble Redis en mémoire (string, set, zset, pipeline)"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = defaultdict(set)
+        self.zsets = defaultdict(dict)
+        self.pipelines = 0
+        self.reads = 0
+
+    def pipeline(self, transaction=False):
+        self.pipelines += 1
+        return FakePipeline(self)
+
+    def get(self, key):
+        self.reads += 1
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def delete(self, *keys):
+        count = 0
+        for key in keys:
+            count += int(key in self.values or key in self.zsets)
+            self.values.pop(key, None)
+            self.zsets.pop(key, None)
+        return count
+
+    unlink = delete
+
+    def sadd(self, key, *members):
+        self.sets[key].update(members)
+
+    def srem(self, key, *members):
+        self.sets[key].difference_update(members)
+
+    def sscan_iter(self, key, count=None):
+        return iter(list(self.sets[key]))
+
+    def zadd(self, key, mapping):
+        self.zsets[key].update(mapping)
+
+    def zrangebyscore(self, key, minimum, maximum):
+        return [member for member, score in self.zsets.get(key, {}).items() if score >= minimum]
+
+    def zremrangebyscore(self, key, minimum, maximum):
+        expired = [member for member, score in self.zsets.get(key, {}).items() if score <= maximum]
+        for member in expired:
+            del self.zsets[key][member]
+        return len(expired)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def keys(self, pattern):
+        raise AssertionError("KEYS interdit")
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(redis, monkeypatch):
+    monkeypatch.setattr(cache_manager, "CACHE_NAMESPACE_REFRESH", 0)
+    return CacheManager(redis_client=redis)
+
+
+class TestNamespaces:
+    """Tests des namespaces versionnés"""
+
+    def test_bump_hides_previous_generation(self, cache, redis):
+        """Test: une invalidation = un INCR, les anciennes clés ne sont plus lues"""
+        cache.set("profile", {"name": "A"}, namespace="user:U1")
+        cache.set("profile", {"name": "B"}, namespace="user:U2")
+
+        assert cache.invalidate_namespace("user:U1")
+
+        assert cache.get("profile", namespace="user:U1") is None
+        assert cache.get("profile", namespace="user:U2") == {"name": "B"}
+        assert redis.values["sysales:cache:ns:user:U1"] == 1
+
+    def test_generation_seen_by_other_instance(self, redis, monkeypatch):
+        """Test: une autre instance voit la nouvelle génération"""
+        monkeypatch.setattr(cache_manager, "CACHE_NAMESPACE_REFRESH", 0)
+        writer, reader = CacheManager(redis_client=redis), CacheManager(redis_client=redis)
+        writer.set("k", 1, namespace="products:M1")
+        assert reader.get("k", namespace="products:M1") == 1
+
+        writer.invalidate_namespace("products:M1")
+        assert reader.get("k", namespace="products:M1") is None
+
+
+class TestTags:
+    """Tests des tags"""
+
+    def test_value_and_tags_in_one_pipeline(self, cache, redis):
+        """Test: setex + zadd + enregistrement du tag en un seul aller-retour"""
+        cache.set("user:1", {"id": 1}, ttl=60, tags=["users", "user:1"])
+
+        assert redis.pipelines == 1
+        assert "sysales:cache:user:1" in redis.zsets["sysales:cache:tag:users"]
+        assert redis.sets["sysales:cache:tags"] == {"users", "user:1"}
+
+    def test_delete_by_tag(self, cache, redis):
+        """Test: suppression des clés du tag, tag retiré du registre"""
+        cache.set("user:1", 1, tags=["users"])
+        cache.set("user:2", 2, tags=["users"])
+
+        assert cache.delete_by_tag("users") == 2
+        assert cache.get("user:1") is None
+        assert "users" not in redis.sets["sysales:cache:tags"]
+
+    def test_prune_removes_expired_members_and_empty_tags(self, cache, redis):
+        """Test: membres expirés élagués, tags vides supprimés"""
+        cache.set("a", 1, ttl=60, tags=["live", "stale"])
+        redis.zsets["sysales:cache:tag:stale"]["sysales:cache:a"] = time.time() - 1
+        redis.zsets["sysales:cache:tag:live"]["sysales:cache:old"] = time.time() - 1
+
+        result = cache.prune_tags()
+
+        assert result == {"tags": 2, "pruned_members": 2, "dropped_tags": 1}
+        assert list(redis.zsets["sysales:cache:tag:live"]) == ["sysales:cache:a"]
+        assert redis.sets["sysales:cache:tags"] == {"live"}
+
+
+class TestTwoTier:
+    """Tests du cache à deux niveaux"""
+
+    def test_l1_hit_skips_redis(self, cache, redis):
+        """Test: deuxième lecture servie par L1, sans aller-retour Redis"""
+        compute = lambda: {"total": 3}
+        cache.fetch("stats", compute, ttl=60)
+        reads = redis.reads
+
+        assert cache.fetch("stats", compute, ttl=60) == {"total": 3}
+        assert redis.reads == reads
+        assert cache.get_stats()["namespaces"]["default"]["l1_hits"] == 1
+
+    def test_l2_hit_after_l1_eviction(self, cache):
+        """Test: L1 vidé (autre process), valeur relue depuis Redis"""
+        cache.fetch("k", lambda: 1, ttl=60, stats_name="ns")
+        cache.local.clear()
+
+        assert cache.fetch("k", lambda: 2, ttl=60, stats_name="ns") == 1
+        assert cache.get_stats()["namespaces"]["ns"]["l2_hits"] == 1
+
+    def test_concurrent_misses_share_one_computation(self, cache):
+        """Test: appels concurrents sur une clé absente, un seul calcul"""
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(1)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(cache.fetch, "hot", compute, 60) for _ in range(8)]
+            time.sleep(0.05)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert results == ["value"] * 8 and len(calls) == 1
+        assert cache.get_stats()["namespaces"]["default"]["coalesced"] == 7
+
+    def test_async_misses_share_one_computation(self, cache):
+        """Test: variante async, un seul calcul pour des coroutines concurrentes"""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        async def scenario():
+            return await asyncio.gather(*(cache.afetch("k", compute, 60) for _ in range(5)))
+
+        assert asyncio.run(scenario()) == [42] * 5
+        assert len(calls) == 1
+
+    def test_early_refresh_recomputes_before_expiry(self, cache):
+        """Test: échéance proche d'un calcul lent, recalcul anticipé"""
+        cache.fetch("k", lambda: "old", ttl=60)
+        envelope = cache.local.get("sysales:cache:k")
+        envelope["d"] = 3600  # calcul "lent": rafraîchissement quasi certain
+
+        assert cache.fetch("k", lambda: "new", ttl=60) == "new"
+        assert cache.get_stats()["namespaces"]["default"]["early_refreshes"] == 1
+
+    def test_hits_return_fresh_copies_with_l2_types(self, cache):
+        """Test: modifier une valeur lue n'altère pas le cache; L1 et L2 renvoient les mêmes types"""
+        compute = lambda: {"items": (1, 2)}
+
+        first = cache.fetch("k", compute, ttl=60)
+        first["items"].append(3)
+        l1 = cache.fetch("k", compute, ttl=60)
+        l1["items"].append(4)
+        cache.local.clear()
+        l2 = cache.fetch("k", compute, ttl=60)
+
+        assert first == {"items": [1, 2, 3]}
+        assert l1 == {"items": [1, 2, 4]}
+        assert l2 == {"items": [1, 2]}
+        assert cache.fetch("k", compute, ttl=60) is not l2
+
+    def test_delete_evicts_l1(self, cache):
+        """Test: suppression locale, L1 purgé"""
+        cache.fetch("k", lambda: 1, ttl=60, namespace="user:U1")
+        cache.delete("k", namespace="user:U1")
+
+        assert cache.fetch("k", lambda: 2, ttl=60, namespace="user:U1") == 2
+
+
+class TestFallback:
+    """Tests du fallback sans Redis"""
+
+    def test_disabled_cache_is_noop(self, monkeypatch):
+        """Test: Redis indisponible, lectures à None et écritures ignorées"""
+        monkeypatch.setattr(CacheManager, "_connect", lambda self: None)
+        cache = CacheManager()
+
+        assert cache.set("k", 1) is False
+        assert cache.get("k") is None
+        assert cache.invalidate_namespace("ns") is False
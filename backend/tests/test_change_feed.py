@@ -0,0 +1,98 @@
+"""
+Tests pour le consommateur du change feed
+
+Tests couvrant:
+- Livraison par id croissant, curseur persisté après livraison
+- Attente puis saut d'un id manquant (transaction en cours / rollback)
+- Reprise après redémarrage sans doublon
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from change_feed import ChangeFeedConsumer
+
+
+class FakeFeed:
+    """Table change_feed + curseur en mémoire"""
+
+    def __init__(self):
+        self.events = []
+        self.cursor = None
+
+    def add(self, *ids):
+        for event_id in ids:
+            self.events.append(
+                {"id": event_id, "event_type": "commission_created", "user_id": "U1", "payload": {}}
+            )
+        self.events.sort(key=lambda e: e["id"])
+
+    def consumer(self, **kwargs):
+        consumer = ChangeFeedConsumer(supabase_client=MagicMock(), batch_size=10, **kwargs)
+        consumer.fetch = lambda after_id, limit, user_id=None: [
+            e for e in self.events if e["id"] > after_id and (user_id is None or e["user_id"] == user_id)
+        ][:limit]
+        consumer.load_cursor = lambda: self.cursor if self.cursor is not None else 0
+        consumer.save_cursor = lambda cursor: setattr(self, "cursor", cursor)
+        return consumer
+
+
+@pytest.fixture
+def feed():
+    return FakeFeed()
+
+
+class TestChangeFeedConsumer:
+    """Tests du curseur"""
+
+    def test_delivers_in_order_and_persists_cursor(self, feed):
+        """Test: lot contigu livré, curseur avancé après commit"""
+        feed.add(1, 2, 3)
+        consumer = feed.consumer()
+
+        events = consumer.poll()
+        assert [e["id"] for e in events] == [1, 2, 3]
+        assert feed.cursor is None
+
+        consumer.commit(events)
+        assert feed.cursor == 3
+        assert consumer.poll() == []
+
+    def test_waits_on_gap_then_delivers_late_commit(self, feed):
+        """Test: un id manquant bloque la suite jusqu'à son commit"""
+        feed.add(1, 3)
+        consumer = feed.consumer(gap_timeout=60)
+
+        events = consumer.poll()
+        assert [e["id"] for e in events] == [1]
+        consumer.commit(events)
+        assert consumer.poll() == []
+
+        feed.add(2)
+        assert [e["id"] for e in consumer.poll()] == [2, 3]
+
+    def test_skips_gap_after_timeout(self, feed):
+        """Test: id jamais commité (rollback) sauté après le délai"""
+        feed.add(2, 3)
+        consumer = feed.consumer(gap_timeout=0)
+
+        assert [e["id"] for e in consumer.poll()] == [2, 3]
+
+    def test_resumes_after_restart_without_duplicates(self, feed):
+        """Test: un nouveau consommateur reprend au curseur persisté"""
+        feed.add(1, 2)
+        first = feed.consumer()
+        first.commit(first.poll())
+
+        feed.add(3)
+        second = feed.consumer()
+        assert [e["id"] for e in second.poll()] == [3]
+
+    def test_replay_filters_by_user(self, feed):
+        """Test: rejeu des événements manqués d'un utilisateur"""
+        feed.add(1, 2)
+        feed.events.append({"id": 3, "event_type": "payment_created", "user_id": "U2", "payload": {}})
+        consumer = feed.consumer()
+
+        assert [e["id"] for e in consumer.replay("U1", after_id=1)] == [2]
@@ -0,0 +1,126 @@
+"""
+Tests pour le pipeline d'ingestion asynchrone des clics
+
+Tests couvrant:
+- Flush par lots (insert multi-lignes)
+- Incréments de compteurs agrégés par lien
+- Backpressure (file pleine -> spill disque)
+- Spill et rejeu quand la BDD est indisponible
+- Spill par processus, rejeu idempotent (upsert sur l'ID du clic)
+"""
+
+import os
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from click_ingestion import ClickIngestionQueue
+
+
+def _click(link_id: str, n: int) -> dict:
+    return {"id": f"click-{link_id}-{n}", "link_id": link_id, "influencer_id": "inf-1"}
+
+
+class TestClickIngestionQueue:
+    """Tests de la file d'ingestion des clics"""
+
+    @pytest.fixture
+    def client(self):
+        client = MagicMock()
+        # L'upsert retourne les lignes réellement insérées
+        client.table.return_value.upsert.side_effect = lambda rows, **kwargs: MagicMock(
+            execute=MagicMock(return_value=MagicMock(data=rows))
+        )
+        return client
+
+    @pytest.fixture
+    def queue(self, client, tmp_path):
+        return ClickIngestionQueue(
+            supabase_client=client,
+            max_size=5,
+            batch_size=3,
+            flush_interval=60,
+            spill_path=str(tmp_path / "spill.jsonl"),
+        )
+
+    def test_flush_writes_one_multi_row_insert(self, queue, client):
+        """Test: Un lot = un seul upsert multi-lignes, doublons ignorés"""
+        for n in range(3):
+            queue.enqueue(_click("L1", n))
+
+        assert queue.flush() == 3
+
+        client.table.assert_called_once_with("click_logs")
+        upsert = client.table.return_value.upsert.call_args
+        assert len(upsert.args[0]) == 3
+        assert upsert.kwargs == {"on_conflict": "id", "ignore_duplicates": True}
+        assert queue.get_stats()["queue_depth"] == 0
+
+    def test_counters_aggregated_per_link(self, queue):
+        """Test: Un incrément par lien avec le delta du lot"""
+        queue.enqueue(_click("L1", 1))
+        queue.enqueue(_click("L1", 2))
+        queue.enqueue(_click("L2", 1))
+
+        with patch("click_ingestion.link_counters") as counters:
+            queue.flush()
+
+        calls = {
+            call.args[1]: call.kwargs["clicks"]
+            for call in counters.increment.call_args_list
+        }
+        assert calls == {"L1": 2, "L2": 1}
+
+    def test_overflow_spills_to_disk(self, queue):
+        """Test: File pleine -> le clic est déversé sur disque"""
+        for n in range(5):
+            assert queue.enqueue(_click("L1", n)) is True
+
+        assert queue.enqueue(_click("L1", 99)) is False
+
+        stats = queue.get_stats()
+        assert stats["overflow"] == 1
+        assert stats["spilled"] == 1
+        assert stats["spill_pending"] is True
+
+    def test_database_down_then_replay(self, queue, client):
+        """Test: Échec BDD -> spill, puis rejeu au retour de la BDD"""
+        upsert = client.table.return_value.upsert.side_effect
+        client.table.return_value.upsert.side_effect = Exception("down")
+        queue.enqueue(_click("L1", 1))
+        queue.enqueue(_click("L1", 2))
+        queue.flush()
+
+        assert queue.get_stats()["spilled"] == 2
+        assert queue.get_stats()["failed_batches"] == 1
+
+        client.table.return_value.upsert.side_effect = upsert
+        assert queue.replay_spill() == 2
+        assert queue.get_stats()["spill_pending"] is False
+
+    def test_spill_file_is_per_process(self, queue, tmp_path):
+        """Test: Chaque processus déverse dans <base>.<pid>.jsonl"""
+        assert queue.spill_path == str(tmp_path / f"spill.{os.getpid()}.jsonl")
+
+    def test_replays_dead_process_spill_but_not_live_one(self, queue, tmp_path):
+        """Test: Spill d'un worker mort rejoué, celui d'un worker vivant ignoré"""
+        dead = tmp_path / "spill.999999999.jsonl"
+        dead.write_text('{"id": "c1", "link_id": "L1"}\n')
+        live = tmp_path / f"spill.{os.getppid()}.jsonl"
+        live.write_text('{"id": "c2", "link_id": "L1"}\n')
+
+        assert queue.replay_spill() == 1
+        assert not dead.exists()
+        assert live.exists()
+
+    def test_interrupted_replay_does_not_double_count(self, queue, client):
+        """Test: Lot déjà écrit rejoué après crash, aucun incrément en double"""
+        client.table.return_value.upsert.side_effect = lambda rows, **kwargs: MagicMock(
+            execute=MagicMock(return_value=MagicMock(data=[]))
+        )
+        queue.enqueue(_click("L1", 1))
+
+        with patch("click_ingestion.link_counters") as counters:
+            queue.flush()
+
+        counters.increment.assert_not_called()
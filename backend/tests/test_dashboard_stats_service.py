@@ -0,0 +1,87 @@
+"""
+Tests pour le service de stats dashboard
+
+Tests couvrant:
+- Cache des snapshots par (rôle, utilisateur)
+- Single-flight: un seul calcul pour N requêtes concurrentes
+- Stale-while-revalidate
+- Invalidation par événement
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+import threading
+import time
+
+from dashboard_stats_service import DashboardStatsService
+
+
+class MemoryCache:
+    """CacheManager sans Redis (redis_client=None): repli mémoire du service"""
+
+    redis_client = None
+
+
+class TestDashboardStatsService:
+    """Tests du cache single-flight"""
+
+    def test_snapshot_cached_per_role_and_user(self):
+        """Test: Deuxième lecture servie depuis le cache"""
+        compute = MagicMock(return_value={"total_sales": 10})
+        service = DashboardStatsService(compute=compute, cache_backend=MemoryCache())
+
+        assert service.get("merchant", "U1") == {"total_sales": 10}
+        assert service.get("merchant", "U1") == {"total_sales": 10}
+        service.get("merchant", "U2")
+
+        assert compute.call_count == 2
+        assert service.stats["hits"] == 1
+
+    def test_concurrent_requests_single_recompute(self):
+        """Test: 20 requêtes concurrentes -> 1 calcul"""
+        calls = []
+        release = threading.Event()
+
+        def compute(role, user_id):
+            calls.append(user_id)
+            release.wait(1)
+            return {"total_users": 3}
+
+        service = DashboardStatsService(compute=compute, cache_backend=MemoryCache())
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            futures = [executor.submit(service.get, "admin", f"A{n}") for n in range(20)]
+            time.sleep(0.1)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert len(calls) == 1
+        assert all(r == {"total_users": 3} for r in results)
+
+    def test_stale_served_while_revalidating(self):
+        """Test: Snapshot périmé servi, recalcul en arrière-plan"""
+        values = iter([{"v": 1}, {"v": 2}])
+        service = DashboardStatsService(compute=lambda r, u: next(values), cache_backend=MemoryCache(), ttl=0)
+
+        assert service.get("influencer", "U1") == {"v": 1}
+        assert service.get("influencer", "U1") == {"v": 1}
+        assert service.stats["stale_served"] == 1
+
+        time.sleep(0.1)
+        assert service._local["dashboard_stats:influencer:U1"]["stats"] == {"v": 2}
+
+    def test_invalidate_tenant_drops_owner_and_admin(self):
+        """Test: Nouvelle vente -> snapshots marchand et admin invalidés"""
+        supabase = MagicMock()
+        supabase.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {"user_id": "U1"}
+        ]
+        compute = MagicMock(return_value={"total_sales": 1})
+        service = DashboardStatsService(compute=compute, cache_backend=MemoryCache(), supabase_client=supabase)
+
+        service.get("merchant", "U1")
+        service.get("admin", "A1")
+        service.invalidate_tenant(merchant_id="M1")
+
+        assert service._local == {}
+        supabase.table.assert_called_once_with("merchants")
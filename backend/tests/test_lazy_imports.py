@@ -0,0 +1,65 @@
+"""
+Tests pour les imports différés (lazy_imports)
+
+Tests couvrant:
+- Aucun import avant le premier accès
+- Configuration (on_load) appliquée une seule fois
+"""
+
+import sys
+import types
+
+from lazy_imports import lazy_import
+
+
+def _install_fake_module(monkeypatch, name):
+    loads = []
+    module = types.ModuleType(name)
+    module.Customer = "customer-api"
+
+    def fake_import(requested):
+        loads.append(requested)
+        monkeypatch.setitem(sys.modules, requested, module)
+        return module
+
+    monkeypatch.setattr("lazy_imports.importlib.import_module", fake_import)
+    return module, loads
+
+
+class TestLazyImport:
+    """Tests du proxy de module"""
+
+    def test_not_imported_until_first_access(self, monkeypatch):
+        """Test: import au premier attribut lu, pas à la déclaration"""
+        _, loads = _install_fake_module(monkeypatch, "fake_sdk")
+
+        sdk = lazy_import("fake_sdk")
+        assert loads == [] and not sdk.is_loaded
+
+        assert sdk.Customer == "customer-api"
+        assert loads == ["fake_sdk"] and sdk.is_loaded
+
+    def test_on_load_runs_once(self, monkeypatch):
+        """Test: configuration (clé API) appliquée au premier accès uniquement"""
+        module, loads = _install_fake_module(monkeypatch, "fake_sdk")
+        configured = []
+
+        def configure(loaded):
+            configured.append(loaded)
+            loaded.api_key = "sk_test"
+
+        sdk = lazy_import("fake_sdk", on_load=configure)
+        sdk.Customer
+        sdk.Customer
+
+        assert configured == [module] and loads == ["fake_sdk"]
+        assert sdk.api_key == "sk_test"
+
+    def test_setattr_forwarded_to_module(self, monkeypatch):
+        """Test: écriture d'attribut transmise au vrai module"""
+        module, _ = _install_fake_module(monkeypatch, "fake_sdk")
+
+        sdk = lazy_import("fake_sdk")
+        sdk.max_network_retries = 2
+
+        assert module.max_network_retries == 2
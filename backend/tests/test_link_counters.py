@@ -0,0 +1,73 @@
+"""
+Tests pour l'agrégation des compteurs de liens
+
+Tests couvrant:
+- Coalescence des incréments par lien
+- Une RPC atomique par table au flush
+- Réinjection des deltas en cas d'échec
+- Validation des tables / colonnes
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from link_counters import LinkCounterAggregator
+
+
+class TestLinkCounterAggregator:
+    """Tests de l'agrégateur de compteurs"""
+
+    @pytest.fixture
+    def client(self):
+        return MagicMock()
+
+    @pytest.fixture
+    def counters(self, client):
+        return LinkCounterAggregator(supabase_client=client, backend="memory")
+
+    def test_increments_are_coalesced(self, counters):
+        """Test: Plusieurs incréments d'un même lien sont combinés"""
+        for _ in range(5):
+            counters.increment("tracking_links", "L1", clicks=1)
+        counters.increment("tracking_links", "L1", conversions=1, revenue=20.5)
+
+        assert counters.get_pending("tracking_links", "L1") == {
+            "clicks": 5,
+            "conversions": 1,
+            "revenue": 20.5,
+        }
+
+    def test_flush_single_rpc_per_table(self, counters, client):
+        """Test: Un flush = une RPC par table avec tous les deltas"""
+        counters.increment("tracking_links", "L1", clicks=3)
+        counters.increment("tracking_links", "L2", clicks=1)
+        counters.increment("trackable_links", "T1", total_commission=7.5)
+
+        assert counters.flush() == 3
+
+        rpcs = {call.args[0]: call.args[1]["p_deltas"] for call in client.rpc.call_args_list}
+        assert len(rpcs["apply_tracking_link_deltas"]) == 2
+        assert rpcs["apply_trackable_link_deltas"] == [{"link_id": "T1", "total_commission": 7.5}]
+        assert counters.get_pending("tracking_links", "L1") == {}
+        assert counters.get_stats()["coalescing_percent"] == 0.0
+
+    def test_failed_flush_restores_deltas(self, counters, client):
+        """Test: Les deltas non appliqués sont réinjectés"""
+        client.rpc.return_value.execute.side_effect = Exception("db down")
+        counters.increment("tracking_links", "L1", clicks=2)
+
+        assert counters.flush() == 0
+        assert counters.get_pending("tracking_links", "L1") == {"clicks": 2}
+        assert counters.get_stats()["failed_flushes"] == 1
+
+        client.rpc.return_value.execute.side_effect = None
+        counters.increment("tracking_links", "L1", clicks=1)
+        assert counters.flush() == 1
+        assert client.rpc.call_args.args[1]["p_deltas"] == [{"link_id": "L1", "clicks": 3}]
+
+    def test_unknown_table_or_column_rejected(self, counters):
+        """Test: Table ou colonne non supportée -> ValueError"""
+        with pytest.raises(ValueError):
+            counters.increment("users", "U1", clicks=1)
+        with pytest.raises(ValueError):
+            counters.increment("tracking_links", "L1", balance=10)
@@ -0,0 +1,76 @@
+"""
+Tests pour le moteur de génération de liens en masse
+
+Tests couvrant:
+- Nombre d'allers-retours borné par tranches (IN et inserts)
+- Rapport par produit (created / existing / error)
+- Attribution groupée aux membres d'équipe
+"""
+
+import pytest
+
+from benchmarks.stub_supabase import StubSupabase
+from link_generation_engine import BulkLinkEngine
+from short_code_allocator import ShortCodeAllocator
+
+
+class TestBulkLinkEngine:
+    """Tests du moteur groupé"""
+
+    @pytest.fixture
+    def client(self):
+        client = StubSupabase(latency_ms=0)
+        client.tables["products"] = [
+            {"id": f"P{n}", "merchant_id": "M1"} for n in range(300)
+        ] + [{"id": "OTHER", "merchant_id": "M2"}]
+        client.tables["affiliate_links"] = [
+            {"id": "L0", "merchant_id": "M1", "product_id": "P0", "short_code": "OLD00000",
+             "is_active": True, "influencer_id": None}
+        ]
+        client.tables["team_members"] = [
+            {"company_id": "M1", "member_id": "U1", "status": "active"},
+            {"company_id": "M1", "member_id": "U2", "status": "active"},
+        ]
+        return client
+
+    @pytest.fixture
+    def engine(self, client):
+        allocator = ShortCodeAllocator(supabase_client=client, block_size=1000, low_watermark=0)
+        return BulkLinkEngine(client, allocator=allocator, chunk_size=100)
+
+    def test_generate_report_per_product(self, engine, client):
+        """Test: Rapport par produit et allers-retours constants"""
+        product_ids = [f"P{n}" for n in range(300)] + ["OTHER"]
+
+        report = engine.generate_for_products("M1", product_ids)
+
+        assert report["summary"] == {"requested": 301, "created": 299, "existing": 1, "errors": 1}
+        assert report["results"][0]["status"] == "existing"
+        assert report["results"][-1] == {"product_id": "OTHER", "status": "error", "error": "Not your product"}
+        # 2 tranches products IN + 2 tranches existing IN + 1 réservation de bloc + 3 tranches d'insert
+        assert client.total_round_trips == 8
+
+        codes = [r["short_code"] for r in report["results"] if r["status"] == "created"]
+        assert len(set(codes)) == 299
+
+    def test_in_lookups_are_chunked(self, client):
+        """Test: Les requêtes IN sont découpées et les résultats recombinés"""
+        allocator = ShortCodeAllocator(supabase_client=client, block_size=1000, low_watermark=0)
+        engine = BulkLinkEngine(client, allocator=allocator, chunk_size=100, in_chunk_size=50)
+        product_ids = [f"P{n}" for n in range(120)]
+
+        report = engine.generate_for_products("M1", product_ids)
+
+        assert report["summary"] == {"requested": 120, "created": 119, "existing": 1, "errors": 0}
+        # 3 tranches products IN + 3 tranches existing IN + 1 réservation de bloc + 2 tranches d'insert
+        assert client.total_round_trips == 9
+
+    def test_assign_to_members(self, engine, client):
+        """Test: Attribution groupée, membres hors équipe signalés"""
+        parent = {"id": "L0", "product_id": "P0", "commission_rate": 12.0}
+
+        report = engine.assign_to_members("M1", parent, ["U1", "U2", "U3"])
+
+        assert report["summary"]["created"] == 2
+        assert report["results"][2] == {"member_id": "U3", "status": "error", "error": "Not in team"}
+        assert all(link["metadata"]["parent_link_id"] == "L0" for link in report["links"])
@@ -0,0 +1,161 @@
+"""
+Tests pour le service de messagerie
+
+Tests couvrant:
+- Boîte de réception en une seule RPC
+- Pagination par curseur (aller-retour encode/decode)
+- Format historique (last_message imbriqué, unread_count)
+- Marqueur de lecture refusé hors conversation
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from messaging_service import MessagingService, decode_cursor, encode_cursor
+
+
+def inbox_row(n, unread=0, with_message=True):
+    return {
+        "id": f"C{n}",
+        "user1_id": "U1",
+        "user2_id": f"U{n + 10}",
+        "last_message_at": f"2026-10-{n:02d}T10:00:00",
+        "last_message_id": f"M{n}" if with_message else None,
+        "last_message_preview": f"Bonjour {n}",
+        "last_message_sender_id": f"U{n + 10}",
+        "unread_count": unread,
+    }
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+class TestMessagingInbox:
+    """Tests de la boîte de réception"""
+
+    def test_single_rpc_per_page(self, client):
+        """Test: une page = un appel RPC, aucune requête par conversation"""
+        client.rpc.return_value.execute.return_value.data = [inbox_row(3, unread=2), inbox_row(2)]
+        service = MessagingService(supabase_client=client)
+
+        page = service.get_inbox("U1", limit=20)
+
+        client.rpc.assert_called_once()
+        client.table.assert_not_called()
+        assert [c["id"] for c in page["conversations"]] == ["C3", "C2"]
+        assert page["conversations"][0]["unread_count"] == 2
+        assert page["conversations"][0]["last_message"]["content"] == "Bonjour 3"
+        assert page["next_cursor"] is None
+
+    def test_full_page_returns_cursor_for_next_page(self, client):
+        """Test: page pleine, le curseur pointe sur la dernière conversation"""
+        client.rpc.return_value.execute.return_value.data = [inbox_row(5), inbox_row(4)]
+        service = MessagingService(supabase_client=client)
+
+        page = service.get_inbox("U1", limit=2)
+        service.get_inbox("U1", limit=2, cursor=page["next_cursor"])
+
+        params = client.rpc.call_args[0][1]
+        assert params["p_before_at"] == "2026-10-04T10:00:00"
+        assert params["p_before_id"] == "C4"
+
+    def test_conversation_without_message(self, client):
+        """Test: conversation vide, last_message nul"""
+        client.rpc.return_value.execute.return_value.data = [inbox_row(1, with_message=False)]
+        page = MessagingService(supabase_client=client).get_inbox("U1")
+
+        assert page["conversations"][0]["last_message"] is None
+
+    def test_cursor_round_trip_and_invalid(self):
+        """Test: curseur opaque décodable, curseur corrompu rejeté"""
+        assert decode_cursor(encode_cursor("2026-10-01T00:00:00", "C1")) == ["2026-10-01T00:00:00", "C1"]
+        with pytest.raises(ValueError):
+            decode_cursor("pas-un-curseur")
+
+
+def message(n, sender="U2"):
+    return {"id": f"M{n:02d}", "sender_id": sender, "created_at": f"2026-10-18T10:00:{n:02d}", "content": str(n)}
+
+
+def history(client, messages, **conversation):
+    client.rpc.return_value.execute.return_value.data = {
+        "conversation": {"id": "C1", "user1_id": "U1", "user2_id": "U2", **conversation},
+        "messages": messages,
+    }
+
+
+class TestMessagingHistory:
+    """Tests de l'historique paginé et du marqueur de lecture"""
+
+    def test_latest_page_trims_oldest_extra_row(self, client):
+        """Test: limit + 1 lignes, la plus ancienne signale has_more"""
+        history(client, [message(n) for n in range(1, 5)])
+        page = MessagingService(supabase_client=client).get_messages("C1", limit=3)
+
+        assert [m["id"] for m in page["messages"]] == ["M02", "M03", "M04"]
+        assert page["has_more"] is True
+        assert page["before_cursor"] == "M02"
+        assert page["after_cursor"] == "M04"
+
+    def test_incremental_sync_trims_newest_extra_row(self, client):
+        """Test: synchronisation after, la ligne en trop est la plus récente"""
+        history(client, [message(n) for n in range(5, 9)])
+        page = MessagingService(supabase_client=client).get_messages("C1", limit=3, after="M04")
+
+        assert client.rpc.call_args[0][1]["p_after_id"] == "M04"
+        assert [m["id"] for m in page["messages"]] == ["M05", "M06", "M07"]
+        assert page["has_more"] is True
+
+    def test_sync_without_new_messages_keeps_cursor(self, client):
+        """Test: rien de nouveau, le curseur de synchronisation est conservé"""
+        history(client, [])
+        page = MessagingService(supabase_client=client).get_messages("C1", after="M09")
+
+        assert page["messages"] == [] and page["after_cursor"] == "M09"
+
+    def test_read_state_derived_from_recipient_marker(self, client):
+        """Test: lu jusqu'au marqueur du destinataire, pas de flag par ligne"""
+        history(
+            client,
+            [message(1), message(2), message(3, sender="U1")],
+            user1_last_read_message_id="M01",
+            user1_last_read_at="2026-10-18T10:00:01",
+            user2_last_read_message_id="M03",
+            user2_last_read_at="2026-10-18T10:00:03",
+        )
+        page = MessagingService(supabase_client=client).get_messages("C1")
+
+        assert [m["is_read"] for m in page["messages"]] == [True, False, True]
+
+    def test_unknown_conversation_and_conflicting_cursors(self, client):
+        """Test: conversation absente -> None, before + after refusés"""
+        client.rpc.return_value.execute.return_value.data = {"conversation": None, "messages": []}
+        service = MessagingService(supabase_client=client)
+
+        assert service.get_messages("C404") is None
+        with pytest.raises(ValueError):
+            service.get_messages("C1", before="M01", after="M02")
+
+
+class TestMessagingReadMarker:
+    """Tests du marqueur de lecture"""
+
+    def test_non_participant_gets_none(self, client):
+        """Test: appelant hors conversation -> None (404), aucun marqueur touché"""
+        client.rpc.return_value.execute.return_value.data = None
+        service = MessagingService(supabase_client=client)
+
+        assert service.mark_read("C1", "U99") is None
+        client.rpc.assert_called_once_with(
+            "mark_conversation_read", {"p_conversation_id": "C1", "p_user_id": "U99", "p_message_id": None}
+        )
+
+    def test_missing_user_never_reaches_rpc(self, client):
+        """Test: user_id absent -> None sans appel RPC (p_user_id NULL contournait la garde)"""
+        service = MessagingService(supabase_client=client)
+
+        assert service.mark_read("C1", None) is None
+        client.rpc.assert_not_called()
@@ -0,0 +1,100 @@
+"""
+Tests pour l'exécuteur de paiements concurrent
+
+Tests couvrant:
+- Concurrence bornée par provider
+- Token bucket
+- Idempotence et retries avec jitter
+- Rapport par provider
+"""
+
+import threading
+import time
+
+from payout_executor import PayoutExecutor, PayoutJob, ProviderPolicy, TokenBucket
+
+
+def _jobs(provider, count, prefix="K"):
+    return [PayoutJob(idempotency_key=f"{prefix}{n}", provider=provider, amount=50.0) for n in range(count)]
+
+
+class TestPayoutExecutor:
+    """Tests de l'exécuteur"""
+
+    def test_bounded_concurrency_per_provider(self):
+        """Test: Jamais plus de max_concurrency appels simultanés par provider"""
+        active = {"paypal": 0, "bank_transfer": 0}
+        peak = {"paypal": 0, "bank_transfer": 0}
+        lock = threading.Lock()
+
+        def handler(job):
+            with lock:
+                active[job.provider] += 1
+                peak[job.provider] = max(peak[job.provider], active[job.provider])
+            time.sleep(0.01)
+            with lock:
+                active[job.provider] -= 1
+            return True, f"TX-{job.idempotency_key}"
+
+        policies = {
+            "paypal": ProviderPolicy(max_concurrency=3, rate_per_second=1000, burst=1000),
+            "bank_transfer": ProviderPolicy(max_concurrency=2, rate_per_second=1000, burst=1000),
+        }
+        executor = PayoutExecutor({"paypal": handler, "bank_transfer": handler}, policies)
+
+        report = executor.run(_jobs("paypal", 30, "P") + _jobs("bank_transfer", 20, "B"))
+
+        assert peak == {"paypal": 3, "bank_transfer": 2}
+        assert report["providers"]["paypal"]["succeeded"] == 30
+        assert report["providers"]["bank_transfer"]["count"] == 20
+        assert report["providers"]["paypal"]["throughput_per_s"] > 0
+
+    def test_idempotency_key_executed_once(self):
+        """Test: Clé dupliquée ou déjà traitée -> un seul appel provider"""
+        calls = []
+        executor = PayoutExecutor({"paypal": lambda job: (calls.append(job.idempotency_key) or True, "TX")})
+
+        jobs = _jobs("paypal", 3) + _jobs("paypal", 3)
+        executor.run(jobs)
+        executor.run(_jobs("paypal", 3))
+
+        assert sorted(calls) == ["K0", "K1", "K2"]
+
+    def test_retry_transient_errors(self):
+        """Test: Erreur transitoire réessayée, validation non réessayée"""
+        attempts = {"K0": 0, "K1": 0}
+
+        def handler(job):
+            attempts[job.idempotency_key] += 1
+            if job.idempotency_key == "K1":
+                raise ValueError("Montant minimum")
+            if attempts["K0"] < 3:
+                raise ConnectionError("timeout")
+            return True, "TX"
+
+        policy = ProviderPolicy(max_retries=3, base_delay=0.001, rate_per_second=1000, burst=1000)
+        report = PayoutExecutor({"paypal": handler}, {"paypal": policy}).run(_jobs("paypal", 2))
+
+        outcomes = {o.job.idempotency_key: o for o in report["outcomes"]}
+        assert outcomes["K0"].success and outcomes["K0"].attempts == 3
+        assert not outcomes["K1"].success and outcomes["K1"].attempts == 1
+        assert report["providers"]["paypal"]["retries"] == 2
+
+    def test_async_handler(self):
+        """Test: Handler coroutine (paiement mobile) exécuté dans le worker"""
+
+        async def handler(job):
+            return True, "MOBILE-TX"
+
+        report = PayoutExecutor({"cashplus": handler}).run(_jobs("cashplus", 2))
+
+        assert all(o.transaction_id == "MOBILE-TX" for o in report["outcomes"])
+
+    def test_token_bucket_rate(self):
+        """Test: Débit limité au-delà du burst"""
+        bucket = TokenBucket(rate=100, capacity=5)
+        started = time.perf_counter()
+        for _ in range(15):
+            bucket.acquire()
+
+        assert time.perf_counter() - started >= 0.09
@@ -0,0 +1,136 @@
+"""
+Tests pour le chemin PostgreSQL direct (pg_fast_path)
+
+Tests couvrant:
+- Compilation des agrégats en SQL paramétré (même sémantique qu'aggregate_rows)
+- Sélection du chemin par repository (PG_FAST_PATH)
+- Repli sur PostgREST en cas d'erreur asyncpg
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+import repositories.base_repository as base_repository
+from pg_fast_path import PostgresFastPath, build_aggregate_sql, build_where
+from repositories.sale_repository import SaleRepository
+from repositories.tracking_repository import TrackingRepository
+from repositories.user_repository import UserRepository
+
+
+class FakeFastPath(PostgresFastPath):
+    """Pool asyncpg factice: enregistre les requêtes, résultats programmés"""
+
+    def __init__(self, repositories="all", result=None, error=None):
+        super().__init__(dsn="postgresql://bench", repositories=repositories)
+        self.result = result
+        self.error = error
+        self.queries = []
+
+    async def _run(self, method, sql, *args):
+        self.queries.append((method, sql, args))
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def use_fast_path(monkeypatch):
+    def install(fast_path):
+        monkeypatch.setattr(base_repository, "pg_fast_path", fast_path)
+        return fast_path
+
+    return install
+
+
+class TestSqlBuilder:
+    """Tests de la compilation SQL"""
+
+    def test_aggregate_with_filters(self):
+        """Test: SUM avec COALESCE, filtres en paramètres positionnels"""
+        sql, args = build_aggregate_sql(
+            "sales",
+            {"total": "sum:amount"},
+            [("status", "eq", "completed"), ("created_at", "gte", "2026-01-01")],
+        )
+
+        assert sql == (
+            'SELECT COALESCE(SUM("amount"), 0) AS "total" FROM "sales" '
+            'WHERE "status" = $1 AND "created_at" >= $2'
+        )
+        assert args == ["completed", "2026-01-01"]
+
+    def test_group_by_and_count_star(self):
+        """Test: GROUP BY + COUNT(*)"""
+        sql, args = build_aggregate_sql("sales", {"n": "count:*"}, [], ["status"])
+
+        assert sql == 'SELECT "status", COUNT(*) AS "n" FROM "sales" GROUP BY "status"'
+        assert args == []
+
+    def test_in_and_null_filters(self):
+        """Test: IN développé, liste vide = FALSE, None = IS NULL"""
+        where, args = build_where([("id", "in", ["a", "b"]), ("paid_at", "eq", None), ("x", "in", [])])
+
+        assert where == ' WHERE "id" IN ($1, $2) AND "paid_at" IS NULL AND FALSE'
+        assert args == ["a", "b"]
+
+    def test_rejects_unsafe_identifiers(self):
+        """Test: identifiant hors [a-z0-9_] refusé"""
+        with pytest.raises(ValueError):
+            build_aggregate_sql("sales", {"total": 'sum:amount"; DROP TABLE users; --'}, [])
+
+    def test_rejects_tables_outside_allow_list(self):
+        """Test: même liste de tables que la fonction SQL aggregate_rows"""
+        with pytest.raises(ValueError):
+            build_aggregate_sql("user_2fa", {"n": "count:*"}, [])
+
+
+class TestRepositoryFastPath:
+    """Tests de la sélection par repository"""
+
+    def test_find_by_email_uses_asyncpg_when_enabled(self, use_fast_path):
+        """Test: users activé, une requête préparée, aucun appel PostgREST"""
+        fast_path = use_fast_path(FakeFastPath("users", result={"id": "U1", "email": "a@b.ma"}))
+        client = MagicMock()
+
+        user = asyncio.run(UserRepository(client).afind_by_email("a@b.ma"))
+
+        assert user == {"id": "U1", "email": "a@b.ma"}
+        assert fast_path.queries == [
+            ("fetchrow", 'SELECT * FROM "users" WHERE "email" = $1 LIMIT 1', ("a@b.ma",))
+        ]
+        client.table.assert_not_called()
+
+    def test_disabled_repository_stays_on_postgrest(self, use_fast_path):
+        """Test: tracking non listé dans PG_FAST_PATH, chemin PostgREST"""
+        fast_path = use_fast_path(FakeFastPath("users"))
+        client = MagicMock()
+        client.table.return_value.select.return_value.eq.return_value.limit.return_value.execute.return_value.data = [
+            {"id": "L1", "unique_code": "ABC123"}
+        ]
+
+        link = asyncio.run(TrackingRepository(client).afind_by_short_code("ABC123"))
+
+        assert link["id"] == "L1"
+        assert fast_path.queries == []
+
+    def test_asyncpg_error_falls_back_to_postgrest(self, use_fast_path):
+        """Test: erreur asyncpg, même résultat via l'RPC aggregate_rows"""
+        fast_path = use_fast_path(FakeFastPath("sales", error=ConnectionError("refused")))
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value.data = [{"total": 99.5}]
+
+        total = asyncio.run(SaleRepository(client).aget_total_revenue(merchant_id="M1"))
+
+        assert total == 99.5
+        assert fast_path.stats["fallbacks"] == 1
+        client.rpc.assert_called_once()
+
+    def test_conversion_rate_via_asyncpg(self, use_fast_path):
+        """Test: GROUP BY status exécuté directement"""
+        use_fast_path(FakeFastPath("sales", result=[{"status": "completed", "n": 1}, {"status": "pending", "n": 3}]))
+
+        rate = asyncio.run(SaleRepository(MagicMock()).aget_conversion_rate(influencer_id="I1"))
+
+        assert rate == 25.0
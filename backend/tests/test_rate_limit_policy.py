@@ -0,0 +1,140 @@
+"""
+Tests pour le moteur de politiques de rate limiting
+
+Tests couvrant:
+- Résolution de la politique (exact avant préfixe, défaut API)
+- Quotas par plan (limite explicite, multiplicateur, plan en cache)
+- Portée IP des routes d'authentification
+- Repli en process des routes d'auth quand Redis est indisponible
+- En-têtes X-RateLimit-* et métriques
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from middleware.rate_limit_policy import RateLimitPolicyEngine, RoutePolicy
+
+
+@pytest.fixture
+def limiter():
+    limiter = MagicMock()
+    limiter.check_rate_limit = AsyncMock(return_value=(True, 9, 0))
+    return limiter
+
+
+def make_engine(limiter, plans=None, user_id=None):
+    resolver = MagicMock(side_effect=lambda uid: (plans or {}).get(uid))
+    engine = RateLimitPolicyEngine(limiter=limiter, plan_resolver=resolver)
+    engine.identify = lambda headers, client_ip: user_id
+    return engine, resolver
+
+
+def check(engine, path, method="GET"):
+    return asyncio.run(engine.check(method, path, {}, "10.0.0.1"))
+
+
+class TestPolicyResolution:
+    """Tests de la résolution des politiques"""
+
+    def test_exact_route_before_prefix(self, limiter):
+        """Test: route exacte prioritaire, préfixe puis défaut API"""
+        engine, _ = make_engine(limiter)
+
+        assert engine.policy_for("POST", "/api/products/upload-image").name == "product_image_upload"
+        assert engine.policy_for("GET", "/api/products/42").name == "products"
+        assert engine.policy_for("GET", "/api/campaigns").name == "api_default"
+        assert engine.policy_for("GET", "/health") is None
+
+    def test_method_filter(self):
+        """Test: politique restreinte à certaines méthodes"""
+        engine = RateLimitPolicyEngine(
+            policies=[RoutePolicy("writes", "/api/*", limit=10, methods=("POST",))], limiter=MagicMock()
+        )
+
+        assert engine.policy_for("POST", "/api/x").name == "writes"
+        assert engine.policy_for("GET", "/api/x") is None
+
+
+class TestPlanQuotas:
+    """Tests des quotas par plan"""
+
+    def test_plan_multiplier_and_cache(self, limiter):
+        """Test: quota multiplié par le plan, abonnement lu une seule fois"""
+        engine, resolver = make_engine(limiter, plans={"U1": "enterprise_large"}, user_id="U1")
+
+        decision = check(engine, "/api/campaigns")
+        check(engine, "/api/campaigns")
+
+        assert decision.plan == "enterprise_large" and decision.limit == 800
+        assert decision.identifier == "user:U1"
+        assert resolver.call_count == 1
+        assert limiter.check_rate_limit.call_args.kwargs["endpoint"] == "api_default"
+
+    def test_anonymous_blocked_without_redis(self, limiter):
+        """Test: limite explicite à 0 pour les anonymes, aucun appel Redis"""
+        engine, _ = make_engine(limiter)
+
+        decision = check(engine, "/api/ai/generate", method="POST")
+
+        assert not decision.allowed and decision.identifier == "ip:10.0.0.1"
+        limiter.check_rate_limit.assert_not_called()
+
+    def test_ip_scope_ignores_user(self, limiter):
+        """Test: login limité par IP même avec un token"""
+        engine, resolver = make_engine(limiter, user_id="U1")
+
+        decision = check(engine, "/api/auth/login", method="POST")
+
+        assert decision.identifier == "ip:10.0.0.1" and decision.limit == 5
+        resolver.assert_not_called()
+
+
+class TestRedisUnavailable:
+    """Tests du comportement sans Redis"""
+
+    def test_only_auth_policies_request_local_fallback(self, limiter):
+        """Test: login / register demandent le repli en process, pas le défaut API"""
+        engine, _ = make_engine(limiter)
+
+        check(engine, "/api/auth/login", method="POST")
+        assert limiter.check_rate_limit.call_args.kwargs["local_fallback"] is True
+        check(engine, "/api/auth/register", method="POST")
+        assert limiter.check_rate_limit.call_args.kwargs["local_fallback"] is True
+        check(engine, "/api/campaigns")
+        assert limiter.check_rate_limit.call_args.kwargs["local_fallback"] is False
+
+    def test_login_not_fail_open_when_redis_down(self):
+        """Test: Redis en panne -> login limité en process, autres routes ouvertes"""
+        import redis
+        from middleware.rate_limiting import RateLimiter
+
+        rate_limiter = RateLimiter(local_prefilter=False)
+        rate_limiter.limiter = MagicMock()
+        rate_limiter.limiter.hit.side_effect = redis.ConnectionError("redis down")
+        engine = RateLimitPolicyEngine(limiter=rate_limiter, plan_resolver=MagicMock())
+
+        logins = [check(engine, "/api/auth/login", method="POST") for _ in range(6)]
+        campaigns = [check(engine, "/api/campaigns") for _ in range(6)]
+
+        assert [d.allowed for d in logins] == [True] * 5 + [False]
+        assert all(d.allowed for d in campaigns)
+
+
+class TestHeadersAndMetrics:
+    """Tests des en-têtes et métriques"""
+
+    def test_rejection_headers_and_counters(self, limiter):
+        """Test: Retry-After sur refus, compteurs par politique et par plan"""
+        limiter.check_rate_limit.side_effect = [(True, 4, 0), (False, 0, 12)]
+        engine, _ = make_engine(limiter)
+
+        check(engine, "/api/campaigns")
+        decision = check(engine, "/api/campaigns")
+        headers = engine.headers(decision)
+
+        assert headers["Retry-After"] == "12"
+        assert headers["X-RateLimit-Remaining"] == "0"
+        assert engine.snapshot()["policies"]["api_default"] == {"allowed": 1, "rejected": 1}
+        assert engine.snapshot()["plans"]["anonymous"] == {"allowed": 1, "rejected": 1}
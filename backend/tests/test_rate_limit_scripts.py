@@ -0,0 +1,111 @@
+"""
+Tests pour le rate limiting par scripts Lua
+
+Tests couvrant:
+- Un seul appel de script par décision
+- Pré-filtre local: refus servi sans Redis jusqu'à retry_after
+- Stratégie inconnue rejetée
+- Repli en process (GCRA local) quand Redis est indisponible
+"""
+
+from unittest.mock import MagicMock
+import time
+
+import pytest
+
+from middleware.rate_limit_scripts import LocalDenyCache, LocalRateLimit, ScriptedRateLimit
+
+
+def make_limiter(results, strategy="gcra", prefilter=True):
+    client = MagicMock()
+    script = MagicMock(side_effect=results)
+    client.register_script.return_value = script
+    limiter = ScriptedRateLimit(client, strategy, LocalDenyCache() if prefilter else None)
+    return limiter, script
+
+
+class TestScriptedRateLimit:
+    """Tests de la décision scriptée"""
+
+    def test_allowed_request_is_one_script_call(self):
+        """Test: autorisation = un EVALSHA, arguments en millisecondes"""
+        limiter, script = make_limiter([[1, 99, 0]])
+
+        assert limiter.hit("k", limit=100, window=60) == (True, 99, 0)
+        script.assert_called_once_with(keys=["k"], args=[100, 60000, 1])
+
+    def test_denied_key_is_rejected_locally(self):
+        """Test: après un refus, les requêtes suivantes ne touchent pas Redis"""
+        limiter, script = make_limiter([[0, 0, 2500]])
+
+        assert limiter.hit("k", 5, 60) == (False, 0, 3)
+        allowed, remaining, retry_after = limiter.hit("k", 5, 60)
+
+        assert not allowed and 1 <= retry_after <= 3
+        assert script.call_count == 1
+        assert limiter.deny_cache.hits == 1
+
+    def test_without_prefilter_every_request_hits_redis(self):
+        """Test: pré-filtre désactivé"""
+        limiter, script = make_limiter([[0, 0, 1000], [0, 0, 900]], prefilter=False)
+
+        limiter.hit("k", 5, 60)
+        limiter.hit("k", 5, 60)
+        assert script.call_count == 2
+
+    def test_sliding_window_sends_unique_member(self):
+        """Test: sliding window, membre unique par requête"""
+        limiter, script = make_limiter([[1, 4, 0], [1, 3, 0]], strategy="sliding_window")
+
+        limiter.hit("k", 5, 60)
+        limiter.hit("k", 5, 60)
+        members = [call.kwargs["args"][3] for call in script.call_args_list]
+        assert members[0] != members[1]
+
+    def test_unknown_strategy(self):
+        """Test: stratégie inconnue"""
+        with pytest.raises(ValueError):
+            ScriptedRateLimit(MagicMock(), "fixed_window")
+
+
+class TestLocalDenyCache:
+    """Tests du pré-filtre local"""
+
+    def test_entries_expire_and_are_bounded(self):
+        """Test: échéance respectée et taille bornée (LRU)"""
+        cache = LocalDenyCache(max_size=2)
+        cache.deny("a", 0.01)
+        time.sleep(0.02)
+        assert cache.retry_after("a") is None
+
+        cache.deny("b", 60)
+        cache.deny("c", 60)
+        cache.deny("d", 60)
+        assert cache.retry_after("b") is None
+        assert cache.retry_after("d") is not None
+
+
+class TestLocalRateLimit:
+    """Tests du limiteur en process"""
+
+    def test_limit_then_retry_after(self):
+        """Test: `limit` requêtes acceptées dans la fenêtre, puis refus avec retry_after"""
+        limiter = LocalRateLimit()
+
+        decisions = [limiter.hit("ip:10.0.0.1", 5, 60) for _ in range(6)]
+
+        assert [allowed for allowed, _, _ in decisions] == [True] * 5 + [False]
+        assert decisions[0][1] == 4 and decisions[4][1] == 0
+        assert 1 <= decisions[5][2] <= 12
+        assert limiter.hit("ip:10.0.0.2", 5, 60)[0]
+
+    def test_reset_and_bounded(self):
+        """Test: reset libère la clé, nombre de clés borné"""
+        limiter = LocalRateLimit(max_size=2)
+        limiter.hit("a", 1, 60)
+        limiter.reset("a")
+        assert limiter.hit("a", 1, 60)[0]
+
+        limiter.hit("b", 1, 60)
+        limiter.hit("c", 1, 60)
+        assert list(limiter._tats) == ["b", "c"]
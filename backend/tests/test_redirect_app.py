@@ -0,0 +1,126 @@
+"""
+Tests pour le service de redirection dédié (redirect_app)
+
+Tests couvrant:
+- Redirection 302 + cookie d'attribution + clic mis en file
+- Lien introuvable ou inactif: 404 au format de server.py
+- Seules les routes de redirection et de santé sont exposées
+- Un seul miss compté par résolution à froid, invalidation à la modification
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+import redirect_app
+import tracking_service as tracking_module
+from click_ingestion import click_ingestion
+from short_code_cache import short_code_cache
+from tracking_service import COOKIE_NAME, tracking_service
+
+
+def get(path: str, **kwargs) -> httpx.Response:
+    """GET en processus (ASGITransport ne déclenche pas le lifespan)"""
+
+    async def request():
+        transport = httpx.ASGITransport(app=redirect_app.create_redirect_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://redirect") as client:
+            return await client.get(path, **kwargs)
+
+    return asyncio.run(request())
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    clicks = []
+    monkeypatch.setattr(click_ingestion, "enqueue", clicks.append)
+    return clicks
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    short_code_cache.clear()
+    yield
+    short_code_cache.clear()
+
+
+class TestRedirectService:
+    """Tests du point d'entrée /r/{short_code}"""
+
+    def test_redirects_with_attribution_cookie(self, enqueued):
+        """Test: lien en cache, 302 vers la boutique, cookie posé, clic en file"""
+        short_code_cache.put(
+            "ABC12345",
+            {"id": "L1", "influencer_id": "I1", "destination_url": "https://boutique.ma/p", "status": "active"},
+        )
+
+        response = get("/r/ABC12345", headers={"user-agent": "pytest", "referer": "https://insta.com"})
+
+        assert response.status_code == 302
+        assert response.headers["location"] == "https://boutique.ma/p"
+        assert response.headers["set-cookie"].startswith(f"{COOKIE_NAME}=")
+        assert "HttpOnly" in response.headers["set-cookie"]
+        assert len(enqueued) == 1
+        assert enqueued[0]["link_id"] == "L1"
+        assert enqueued[0]["user_agent"] == "pytest"
+
+    def test_inactive_link_returns_404(self, enqueued):
+        """Test: lien inactif, 404 sans cookie ni clic"""
+        short_code_cache.put(
+            "OFF00000",
+            {"id": "L2", "influencer_id": "I1", "destination_url": "https://boutique.ma/p", "status": "paused"},
+        )
+
+        response = get("/r/OFF00000")
+
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Lien de tracking introuvable ou inactif: OFF00000"}
+        assert "set-cookie" not in response.headers
+        assert enqueued == []
+
+    def test_only_redirect_routes_exposed(self):
+        """Test: aucun router de l'API monolithique"""
+        paths = {route.path for route in redirect_app.create_redirect_app().routes}
+
+        assert paths == {"/r/{short_code}", "/health"}
+        assert get("/api/auth/me").status_code == 404
+
+
+class TestShortCodeResolution:
+    """Tests de la résolution et de l'invalidation des codes courts"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = MagicMock()
+        monkeypatch.setattr(tracking_module, "supabase", client)
+        monkeypatch.setattr(tracking_service, "supabase", client)
+        monkeypatch.setattr(short_code_cache, "_redis", MagicMock())
+        return client
+
+    def test_cold_lookup_counts_one_miss(self, client, enqueued):
+        """Test: code absent du cache, une seule lecture BDD et un seul miss"""
+        client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {"id": "L3", "influencer_id": "I1", "destination_url": "https://boutique.ma/p", "status": "active"}
+        ]
+        misses = short_code_cache.stats["misses"]
+
+        assert get("/r/COLD0000").status_code == 302
+        assert short_code_cache.stats["misses"] == misses + 1
+        assert client.table.return_value.select.call_count == 1
+
+    def test_update_link_evicts_cached_code(self, client):
+        """Test: lien désactivé via l'API, code court retiré du cache de redirection"""
+        short_code_cache.put(
+            "LIVE0000",
+            {"id": "L4", "influencer_id": "I1", "destination_url": "https://boutique.ma/p", "status": "active"},
+        )
+        client.table.return_value.update.return_value.eq.return_value.execute.return_value.data = [
+            {"id": "L4", "short_code": "LIVE0000", "status": "paused"}
+        ]
+
+        tracking_service.update_link("L4", {"status": "paused"})
+
+        client.table.assert_called_with("tracking_links")
+        assert short_code_cache.get("LIVE0000") is None
@@ -0,0 +1,82 @@
+"""
+Tests pour les agrégats côté serveur des repositories
+
+Tests couvrant:
+- Construction de l'appel RPC aggregate_rows (filtres, group by)
+- Totaux SaleRepository / TrackingRepository sans téléchargement des lignes
+- Taux de conversion global en un seul appel
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from repositories.sale_repository import SaleRepository
+from repositories.tracking_repository import TrackingRepository
+
+
+def _client(rows):
+    client = MagicMock()
+    client.rpc.return_value.execute.return_value.data = rows
+    return client
+
+
+class TestBaseRepositoryAggregates:
+    """Tests de l'API d'agrégats"""
+
+    def test_total_revenue_pushes_filters_down(self):
+        """Test: SUM en SQL avec filtres, aucune lecture de table"""
+        client = _client([{"total": "1250.50"}])
+        repo = SaleRepository(client)
+
+        total = repo.get_total_revenue(merchant_id="M1", start_date="2026-01-01")
+
+        assert total == 1250.5
+        client.table.assert_not_called()
+        client.rpc.assert_called_once_with(
+            "aggregate_rows",
+            {
+                "p_table": "sales",
+                "p_aggregates": {"total": "sum:amount"},
+                "p_filters": [
+                    {"column": "status", "op": "eq", "value": "completed"},
+                    {"column": "merchant_id", "op": "eq", "value": "M1"},
+                    {"column": "created_at", "op": "gte", "value": "2026-01-01"},
+                ],
+                "p_group_by": [],
+            },
+        )
+
+    def test_group_by_status_conversion_rate(self):
+        """Test: Taux de conversion ventes via un GROUP BY status"""
+        client = _client([{"status": "completed", "n": 3}, {"status": "pending", "n": 1}])
+        repo = SaleRepository(client)
+
+        assert repo.get_conversion_rate(merchant_id="M1") == 75.0
+        assert client.rpc.call_args[0][1]["p_group_by"] == ["status"]
+
+    def test_overall_conversion_rate_single_call(self):
+        """Test: Clics et conversions sommés en un seul appel"""
+        client = _client([{"clicks": 200, "conversions": 5}])
+        repo = TrackingRepository(client)
+
+        assert repo.get_overall_conversion_rate(influencer_id="I1") == 2.5
+        client.rpc.assert_called_once()
+        assert client.rpc.call_args[0][1]["p_aggregates"] == {
+            "clicks": "sum:total_clicks",
+            "conversions": "sum:total_conversions",
+        }
+
+    def test_rpc_failure_returns_zero(self):
+        """Test: Erreur SQL -> 0, comme les anciennes méthodes"""
+        client = MagicMock()
+        client.rpc.side_effect = Exception("boom")
+
+        assert TrackingRepository(client).get_total_clicks() == 0
+
+    def test_unsupported_aggregate_rejected(self):
+        """Test: Fonction d'agrégat inconnue refusée avant l'appel"""
+        repo = SaleRepository(MagicMock())
+
+        with pytest.raises(ValueError):
+            repo.aggregate({"x": "median:amount"})
@@ -0,0 +1,104 @@
+"""
+Tests pour le moteur de validation des ventes en masse
+
+Tests couvrant:
+- Une RPC par tranche
+- Reprise depuis le point de contrôle avec totaux cumulés
+- Tranche en échec ignorée sans bloquer le run
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from sale_validation_engine import SaleValidationEngine
+
+
+class FakeSalesStore:
+    """Ventes pending + point de contrôle en mémoire"""
+
+    def __init__(self, count):
+        self.pending = [
+            {"id": f"S{n:03d}", "created_at": f"2026-09-01T00:00:{n % 60:02d}", "influencer_id": f"I{n % 3}",
+             "merchant_id": "M1", "commission": 2.5}
+            for n in range(count)
+        ]
+        self.checkpoint = None
+        self.rpc_calls = 0
+
+    def next_chunk(self, engine, cutoff, cursor):
+        rows = self.pending
+        if cursor:
+            rows = [r for r in rows if (r["created_at"], r["id"]) > (cursor["created_at"], cursor["id"])]
+        return sorted(rows, key=lambda r: (r["created_at"], r["id"]))[: engine.chunk_size]
+
+    def validate(self, sale_ids):
+        self.rpc_calls += 1
+        validated = [r for r in self.pending if r["id"] in sale_ids]
+        self.pending = [r for r in self.pending if r["id"] not in sale_ids]
+        return [{"sale_id": r["id"], **r} for r in validated]
+
+
+@pytest.fixture
+def store():
+    return FakeSalesStore(250)
+
+
+@pytest.fixture
+def engine(store):
+    engine = SaleValidationEngine(supabase_client=MagicMock(), chunk_size=100)
+    engine._next_chunk = lambda cutoff, cursor: store.next_chunk(engine, cutoff, cursor)
+    engine._validate_chunk = store.validate
+    engine._load_checkpoint = lambda: store.checkpoint
+    engine._save_checkpoint = lambda state: setattr(store, "checkpoint", dict(state))
+    engine._clear_checkpoint = lambda: setattr(store, "checkpoint", None)
+    return engine
+
+
+@patch("sale_validation_engine.dashboard_stats")
+class TestSaleValidationEngine:
+    """Tests du run par tranches"""
+
+    def test_chunked_run(self, dashboard_stats, engine, store):
+        """Test: 250 ventes -> 3 RPC, rapport complet"""
+        report = engine.run("2026-10-04T00:00:00")
+
+        assert store.rpc_calls == 3
+        assert report["completed"] is True
+        assert report["validated_sales"] == 250
+        assert report["total_commission"] == 625.0
+        assert report["influencers_updated"] == 3
+        assert store.checkpoint is None
+
+    def test_resume_from_checkpoint(self, dashboard_stats, engine, store):
+        """Test: Run interrompu puis repris, totaux cumulés et sans double comptage"""
+        first = engine.run("2026-10-04T00:00:00", max_chunks=1)
+        assert first["completed"] is False
+        assert store.checkpoint["validated_sales"] == 100
+
+        second = engine.run("2026-10-04T00:00:00")
+
+        assert second["resumed"] is True
+        assert second["run_id"] == first["run_id"]
+        assert second["validated_sales"] == 250
+
+        again = engine.run("2026-10-04T00:00:00")
+        assert again["validated_sales"] == 0
+
+    def test_failed_chunk_skipped(self, dashboard_stats, engine, store):
+        """Test: Une tranche en échec est comptée et le run continue"""
+        validate = store.validate
+        calls = iter([Exception("timeout"), None, None])
+
+        def flaky(sale_ids):
+            error = next(calls)
+            if error:
+                raise error
+            return validate(sale_ids)
+
+        engine._validate_chunk = flaky
+        report = engine.run("2026-10-04T00:00:00")
+
+        assert report["failed_chunks"] == 1
+        assert report["validated_sales"] == 150
+        assert len(store.pending) == 100
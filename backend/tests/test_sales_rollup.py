@@ -0,0 +1,64 @@
+"""
+Tests pour le rollup journalier des ventes
+
+Tests couvrant:
+- Lecture d'une plage en un seul appel RPC
+- Remplissage des jours sans vente
+- Réconciliation sur les derniers jours
+- Agrégat plateforme refusé sans platform_wide explicite
+"""
+
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+
+from sales_rollup import SalesRollup
+
+
+class TestSalesRollup:
+    """Tests de lecture et de réconciliation"""
+
+    def test_daily_series_single_rpc_with_zero_fill(self):
+        """Test: Une RPC, une entrée par jour, jours vides à zéro"""
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value.data = [
+            {"day": "2026-10-16", "sales_count": 3, "amount": "150.5",
+             "influencer_commission": "15.05", "platform_commission": "7.5"},
+        ]
+        rollup = SalesRollup(supabase_client=client)
+
+        series = rollup.get_daily_series(7, merchant_id="M1", end=date(2026, 10, 18))
+
+        client.rpc.assert_called_once_with(
+            "get_sales_rollup",
+            {"p_from": "2026-10-12", "p_to": "2026-10-18", "p_merchant_id": "M1", "p_influencer_id": None},
+        )
+        assert len(series) == 7
+        assert series[4]["day"] == date(2026, 10, 16)
+        assert series[4]["sales_count"] == 3
+        assert series[4]["amount"] == 150.5
+        assert series[0]["amount"] == 0
+
+    def test_unfiltered_series_requires_platform_wide(self):
+        """Test: Aucun filtre -> refusé, pas d'appel RPC (fuite plateforme)"""
+        client = MagicMock()
+        rollup = SalesRollup(supabase_client=client)
+
+        with pytest.raises(ValueError):
+            rollup.get_daily_series(7, merchant_id=None, influencer_id=None)
+
+        client.rpc.assert_not_called()
+
+    def test_reconcile_range(self):
+        """Test: Reconstruction des derniers jours"""
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value.data = 42
+        rollup = SalesRollup(supabase_client=client)
+
+        result = rollup.reconcile(days=3, end=date(2026, 10, 17))
+
+        client.rpc.assert_called_once_with(
+            "rebuild_daily_sales_rollup", {"p_from": "2026-10-15", "p_to": "2026-10-17"}
+        )
+        assert result["rows"] == 42
@@ -0,0 +1,64 @@
+"""
+Tests pour la résolution du périmètre des ventes (graphiques analytics)
+
+Tests couvrant:
+- Marchand / influenceur: filtre sur l'ID du profil, jamais None
+- Admin: toute la plateforme
+- Rôle différent ou profil absent: refus
+"""
+
+import pytest
+
+import db_helpers
+from db_helpers import get_sales_scope
+
+USERS = {
+    "u-merchant": {"id": "u-merchant", "role": "merchant"},
+    "u-influencer": {"id": "u-influencer", "role": "influencer"},
+    "u-admin": {"id": "u-admin", "role": "admin"},
+    "u-orphan": {"id": "u-orphan", "role": "merchant"},
+}
+
+
+@pytest.fixture(autouse=True)
+def profiles(monkeypatch):
+    monkeypatch.setattr(db_helpers, "get_user_by_id", USERS.get)
+    monkeypatch.setattr(
+        db_helpers, "get_merchant_by_user_id", {"u-merchant": {"id": "m-1", "user_id": "u-merchant"}}.get
+    )
+    monkeypatch.setattr(
+        db_helpers, "get_influencer_by_user_id", {"u-influencer": {"id": "i-1", "user_id": "u-influencer"}}.get
+    )
+
+
+class TestSalesScope:
+    """Tests du filtre transmis à sales_rollup"""
+
+    @pytest.mark.parametrize(
+        "user_id, role, expected",
+        [
+            ("u-merchant", "merchant", {"merchant_id": "m-1"}),
+            ("u-influencer", "influencer", {"influencer_id": "i-1"}),
+        ],
+    )
+    def test_non_admin_always_filtered_by_profile_id(self, user_id, role, expected):
+        """Test: ID du profil (merchants / influencers), pas l'ID utilisateur"""
+        scope = get_sales_scope(user_id, role)
+
+        assert scope == expected
+        assert all(value is not None for value in scope.values())
+
+    def test_admin_gets_platform(self):
+        """Test: Admin -> aucun filtre"""
+        assert get_sales_scope("u-admin", "merchant") == {}
+
+    def test_wrong_role_rejected(self):
+        """Test: Influenceur sur le graphique marchand -> PermissionError"""
+        with pytest.raises(PermissionError):
+            get_sales_scope("u-influencer", "merchant")
+
+    @pytest.mark.parametrize("user_id", ["u-orphan", "inconnu", None])
+    def test_missing_profile_rejected(self, user_id):
+        """Test: Profil ou utilisateur absent (sub manquant) -> LookupError"""
+        with pytest.raises(LookupError):
+            get_sales_scope(user_id, "merchant")
@@ -0,0 +1,59 @@
+"""
+Tests pour l'allocateur de codes courts par blocs
+
+Tests couvrant:
+- Encodage bijectif (aucune collision)
+- Réservation par blocs (une RPC par bloc)
+- Erreur explicite si la réservation échoue
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from short_code_allocator import (
+    ShortCodeAllocator,
+    ShortCodeAllocationError,
+    encode_sequence,
+    CODE_LENGTH,
+)
+
+
+class TestShortCodeAllocator:
+    """Tests de l'allocateur"""
+
+    @pytest.fixture
+    def client(self):
+        client = MagicMock()
+        starts = iter([0, 10, 20])
+        client.rpc.return_value.execute.side_effect = lambda: MagicMock(data=next(starts))
+        return client
+
+    def test_encoding_is_collision_free(self):
+        """Test: Deux numéros distincts donnent deux codes distincts"""
+        codes = {encode_sequence(n) for n in range(50000)}
+        assert len(codes) == 50000
+        assert all(len(code) == CODE_LENGTH for code in codes)
+
+    def test_one_rpc_per_block(self, client):
+        """Test: 10 codes = 1 bloc réservé"""
+        allocator = ShortCodeAllocator(supabase_client=client, block_size=10, low_watermark=0)
+
+        codes = [allocator.allocate() for _ in range(10)]
+
+        assert len(set(codes)) == 10
+        assert client.rpc.call_count == 1
+        assert allocator.get_stats()["pool_depth"] == 0
+
+        allocator.allocate()
+        assert client.rpc.call_count == 2
+        assert allocator.get_stats()["blocks_reserved"] == 2
+
+    def test_reservation_failure_raises(self):
+        """Test: Échec RPC -> ShortCodeAllocationError"""
+        client = MagicMock()
+        client.rpc.return_value.execute.side_effect = Exception("db down")
+        allocator = ShortCodeAllocator(supabase_client=client, block_size=10)
+
+        with pytest.raises(ShortCodeAllocationError):
+            allocator.allocate()
+        assert allocator.get_stats()["refill_failures"] == 1
@@ -0,0 +1,129 @@
+"""
+Tests pour le cache de résolution des codes courts
+
+Tests couvrant:
+- Hit / miss et statistiques
+- Éviction LRU
+- Expiration TTL
+- Invalidation par short_code et par link_id
+- Propagation des invalidations aux autres processus (canal Redis)
+"""
+
+from unittest.mock import MagicMock
+import json
+
+import pytest
+
+from short_code_cache import INVALIDATION_CHANNEL, ShortCodeCache
+
+
+def _link(link_id: str, status: str = "active") -> dict:
+    return {
+        "id": link_id,
+        "influencer_id": f"inf-{link_id}",
+        "destination_url": f"https://shop.ma/{link_id}",
+        "status": status,
+    }
+
+
+class TestShortCodeCache:
+    """Tests du cache LRU des codes courts"""
+
+    @pytest.fixture
+    def cache(self):
+        return ShortCodeCache(max_size=3, ttl=300, redis_client=MagicMock())
+
+    def test_miss_then_hit(self, cache):
+        """Test: Un miss puis un hit après put"""
+        assert cache.get("ABC") is None
+
+        cache.put("ABC", _link("1"))
+        entry = cache.get("ABC")
+
+        assert entry.destination_url == "https://shop.ma/1"
+        assert entry.is_active is True
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate_percent"] == 50.0
+
+    def test_lru_eviction(self, cache):
+        """Test: L'entrée la moins récemment utilisée est évincée"""
+        cache.put("A", _link("1"))
+        cache.put("B", _link("2"))
+        cache.put("C", _link("3"))
+        cache.get("A")
+        cache.put("D", _link("4"))
+
+        assert cache.get("B") is None
+        assert cache.get("A") is not None
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiration(self):
+        """Test: Une entrée expirée est traitée comme un miss"""
+        cache = ShortCodeCache(max_size=10, ttl=300, redis_client=MagicMock())
+        entry = cache.put("A", _link("1"))
+        entry.expires_at = 1.0
+
+        assert cache.get("A") is None
+        assert cache.get_stats()["expired"] == 1
+
+    def test_invalidate_by_short_code(self, cache):
+        """Test: Invalidation directe par code court"""
+        cache.put("A", _link("1"))
+
+        assert cache.invalidate("A") is True
+        assert cache.get("A") is None
+        assert cache.invalidate("A") is False
+
+    def test_invalidate_by_link_id(self, cache):
+        """Test: Invalidation via l'index inverse link_id"""
+        cache.put("A", _link("1"))
+
+        assert cache.invalidate_link("1") is True
+        assert cache.get("A") is None
+        assert cache.get_stats()["invalidations"] == 1
+
+    def test_inactive_status_is_kept(self, cache):
+        """Test: Le statut inactif est conservé pour refuser la redirection"""
+        cache.put("A", _link("1", status="inactive"))
+        assert cache.get("A").is_active is False
+
+
+class TestInvalidationPropagation:
+    """Tests de la propagation des invalidations entre processus"""
+
+    def test_invalidation_published_even_if_not_cached_locally(self):
+        """Test: l'API publie l'invalidation, même sans copie locale du lien"""
+        redis = MagicMock()
+        api = ShortCodeCache(redis_client=redis)
+
+        api.invalidate_link("L1")
+        api.invalidate("CODE1")
+
+        published = [(call.args[0], json.loads(call.args[1])) for call in redis.publish.call_args_list]
+        assert published == [(INVALIDATION_CHANNEL, {"link_id": "L1"}), (INVALIDATION_CHANNEL, {"short_code": "CODE1"})]
+
+    def test_remote_invalidation_applied_without_republishing(self):
+        """Test: message reçu par le service de redirection, copie purgée sans écho"""
+        redis = MagicMock()
+        redirect = ShortCodeCache(redis_client=redis)
+        redirect.put("CODE1", _link("L1"))
+        redirect.put("CODE2", _link("L2"))
+
+        assert redirect.apply_invalidation(json.dumps({"link_id": "L1"})) is True
+        assert redirect.apply_invalidation(json.dumps({"short_code": "CODE2"})) is True
+
+        assert redirect.get("CODE1") is None and redirect.get("CODE2") is None
+        assert redirect.get_stats()["remote_invalidations"] == 2
+        redis.publish.assert_not_called()
+
+    def test_publish_failure_still_invalidates_locally(self):
+        """Test: Redis indisponible, invalidation locale faite et erreur comptée"""
+        redis = MagicMock()
+        redis.publish.side_effect = ConnectionError("redis down")
+        cache = ShortCodeCache(redis_client=redis)
+        cache.put("CODE1", _link("L1"))
+
+        assert cache.invalidate("CODE1") is True
+        assert cache.get_stats()["publish_errors"] == 1
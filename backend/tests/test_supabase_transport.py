@@ -0,0 +1,198 @@
+"""
+Tests pour le transport Supabase (supabase_transport)
+
+Tests couvrant:
+- Budget par requête: timeouts plafonnés, échéance dépassée = pas d'appel
+- Circuit breaker: ouverture, rejet immédiat, appel d'essai, essai jamais perdu (budget / pool)
+- Métriques: requêtes, erreurs, histogramme de latence
+"""
+
+import time
+
+import pytest
+
+from supabase_transport import (
+    CircuitBreaker,
+    LatencyHistogram,
+    SupabaseCircuitOpen,
+    SupabaseDeadlineExceeded,
+    SupabaseTransport,
+    deadline,
+)
+
+
+class FakeRequest:
+    def __init__(self):
+        self.extensions = {"timeout": {"connect": 3.0, "read": 10.0, "write": 10.0, "pool": 5.0}}
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+
+
+class FakeTransport:
+    """Transport httpx factice: réponses ou exceptions programmées"""
+
+    def __init__(self, outcomes=None):
+        self.outcomes = list(outcomes or [])
+        self.requests = []
+
+    def handle_request(self, request):
+        self.requests.append(request)
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+    def close(self):
+        pass
+
+
+class TestDeadline:
+    """Tests du budget par requête"""
+
+    def test_timeouts_capped_by_remaining_budget(self):
+        """Test: le read timeout ne dépasse pas le budget restant"""
+        inner = FakeTransport()
+        transport = SupabaseTransport(transport=inner)
+
+        with deadline(0.5):
+            transport.handle_request(FakeRequest())
+
+        timeouts = inner.requests[0].extensions["timeout"]
+        assert timeouts["read"] <= 0.5 and timeouts["connect"] <= 0.5
+
+    def test_expired_deadline_skips_call(self):
+        """Test: budget épuisé, aucun appel réseau"""
+        inner = FakeTransport()
+        transport = SupabaseTransport(transport=inner)
+
+        with deadline(-1):
+            with pytest.raises(SupabaseDeadlineExceeded):
+                transport.handle_request(FakeRequest())
+
+        assert inner.requests == []
+        assert transport.get_stats()["deadline_exceeded"] == 1
+
+    def test_nested_deadline_never_extends(self):
+        """Test: une échéance imbriquée plus longue ne rallonge pas le budget"""
+        inner = FakeTransport()
+        transport = SupabaseTransport(transport=inner)
+
+        with deadline(0.2):
+            with deadline(60):
+                transport.handle_request(FakeRequest())
+
+        assert inner.requests[0].extensions["timeout"]["read"] <= 0.2
+
+    def test_no_deadline_keeps_configured_timeouts(self):
+        """Test: hors requête API (tâches Celery), timeouts inchangés"""
+        inner = FakeTransport()
+        SupabaseTransport(transport=inner).handle_request(FakeRequest())
+
+        assert inner.requests[0].extensions["timeout"]["read"] == 10.0
+
+
+class TestCircuitBreaker:
+    """Tests du circuit breaker"""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test: N échecs (réseau ou 503), appels suivants rejetés sans appel"""
+        inner = FakeTransport([ConnectionError("reset"), 503, 503])
+        transport = SupabaseTransport(transport=inner)
+        transport.circuit = CircuitBreaker(threshold=3, reset_timeout=60)
+
+        with pytest.raises(ConnectionError):
+            transport.handle_request(FakeRequest())
+        transport.handle_request(FakeRequest())
+        transport.handle_request(FakeRequest())
+
+        with pytest.raises(SupabaseCircuitOpen):
+            transport.handle_request(FakeRequest())
+        assert len(inner.requests) == 3
+        assert transport.get_stats()["circuit"]["state"] == "open"
+
+    def test_half_open_trial_closes_circuit(self):
+        """Test: après reset_timeout, un appel d'essai réussi referme le circuit"""
+        breaker = CircuitBreaker(threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        time.sleep(0.02)
+        assert breaker.allow()
+        assert not breaker.allow()  # un seul essai à la fois
+        breaker.record_success()
+        assert breaker.state == "closed" and breaker.allow()
+
+    def test_client_errors_do_not_trip(self):
+        """Test: 4xx (erreur applicative) ne comptent pas comme indisponibilité"""
+        transport = SupabaseTransport(transport=FakeTransport([404] * 10))
+        transport.circuit = CircuitBreaker(threshold=2)
+
+        for _ in range(10):
+            transport.handle_request(FakeRequest())
+        assert transport.circuit.state == "closed"
+
+    def test_half_open_trial_not_leaked_by_deadline_or_pool(self):
+        """Test: budget épuisé ou pool saturé en half_open, l'essai reste disponible"""
+        inner = FakeTransport()
+        transport = SupabaseTransport(transport=inner, max_in_flight=1)
+        transport.circuit = CircuitBreaker(threshold=1, reset_timeout=0.01)
+        transport.circuit.record_failure()
+        time.sleep(0.02)
+
+        with deadline(-1):
+            with pytest.raises(SupabaseDeadlineExceeded):
+                transport.handle_request(FakeRequest())
+
+        transport._slots.acquire()
+        with deadline(0.01):
+            with pytest.raises(SupabaseDeadlineExceeded):
+                transport.handle_request(FakeRequest())
+        transport._slots.release()
+
+        transport.handle_request(FakeRequest())
+        assert transport.circuit.state == "closed"
+        assert len(inner.requests) == 1
+
+    def test_circuit_rejection_frees_slot(self):
+        """Test: rejet par le circuit ouvert, slot et compteur in_flight rendus"""
+        transport = SupabaseTransport(transport=FakeTransport(), max_in_flight=1)
+        transport.circuit = CircuitBreaker(threshold=1, reset_timeout=60)
+        transport.circuit.record_failure()
+
+        for _ in range(3):
+            with pytest.raises(SupabaseCircuitOpen):
+                transport.handle_request(FakeRequest())
+
+        stats = transport.get_stats()
+        assert stats["in_flight"] == 0 and stats["circuit_rejected"] == 3
+        assert transport._slots.acquire(timeout=0)
+
+
+class TestMetrics:
+    """Tests des métriques exposées par /health"""
+
+    def test_stats_and_histogram(self):
+        """Test: compteurs et histogramme cumulatif"""
+        transport = SupabaseTransport(transport=FakeTransport([200, TimeoutError("read")]))
+        transport.handle_request(FakeRequest())
+        with pytest.raises(TimeoutError):
+            transport.handle_request(FakeRequest())
+
+        stats = transport.get_stats()
+        assert stats["requests"] == 2 and stats["errors"] == 1 and stats["timeouts"] == 1
+        assert stats["in_flight"] == 0 and stats["waiting"] == 0
+        assert stats["latency"]["count"] == 2
+
+    def test_histogram_percentiles(self):
+        """Test: percentiles = borne du bucket, max observé au-delà du dernier"""
+        histogram = LatencyHistogram(buckets=(10, 100))
+        for duration in (1, 2, 3, 50, 500):
+            histogram.observe(duration)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["buckets"] == {"le_10": 3, "le_100": 4, "le_inf": 5}
+        assert snapshot["p50_ms"] == 10.0
+        assert snapshot["p99_ms"] == 500.0
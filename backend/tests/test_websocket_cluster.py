@@ -0,0 +1,144 @@
+"""
+Tests pour le tier WebSocket multi-nœuds
+
+Tests couvrant:
+- Présence par nœud (connexions multiples, déconnexion)
+- Routage vers les seuls nœuds vivants de l'utilisateur
+- Livraison locale d'un message routé
+- Redis indisponible: publish_* ne lève pas, route_* lève
+"""
+
+from collections import defaultdict
+from unittest.mock import MagicMock
+import json
+
+import pytest
+
+from websocket_cluster import ClusterNode, ClusterPublisher, PresenceRegistry
+
+
+class FakeRedis:
+    """Sous-ensemble Redis en mémoire (hash, zset, publish)"""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.zsets = defaultdict(dict)
+        self.published = []
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def hincrby(self, key, field, amount):
+        self.hashes[key][field] = int(self.hashes[key].get(field, 0)) + amount
+        return self.hashes[key][field]
+
+    def hset(self, key, field, value):
+        self.hashes[key][field] = value
+
+    def hdel(self, key, field):
+        self.hashes[key].pop(field, None)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, ttl):
+        return True
+
+    def zadd(self, key, mapping):
+        self.zsets[key].update(mapping)
+
+    def zrem(self, key, member):
+        self.zsets[key].pop(member, None)
+
+    def zrangebyscore(self, key, minimum, maximum):
+        return [member for member, score in self.zsets[key].items() if score >= minimum]
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+def make_registry(redis, node_id):
+    return PresenceRegistry(redis_client=redis, node_id=node_id, ttl=60)
+
+
+class TestPresenceRouting:
+    """Tests présence + routage"""
+
+    def test_presence_counts_connections_per_node(self):
+        """Test: deux connexions puis une déconnexion gardent le nœud"""
+        redis = FakeRedis()
+        node_a = make_registry(redis, "node-a")
+        node_a.heartbeat({})
+
+        node_a.connect("U1")
+        node_a.connect("U1")
+        node_a.disconnect("U1")
+        assert node_a.nodes_for("U1") == ["node-a"]
+
+        node_a.disconnect("U1")
+        assert node_a.nodes_for("U1") == []
+
+    def test_routes_only_to_live_nodes_of_user(self):
+        """Test: publication vers les nœuds vivants détenant l'utilisateur"""
+        redis = FakeRedis()
+        node_a, node_b = make_registry(redis, "node-a"), make_registry(redis, "node-b")
+        node_a.heartbeat({"U1": 1})
+        node_b.heartbeat({"U2": 1})
+        # Nœud mort: présence restante mais heartbeat expiré
+        redis.hashes["sysales:ws:presence:U1"]["node-dead"] = 1
+        redis.zsets["sysales:ws:nodes"]["node-dead"] = 0
+
+        publisher = ClusterPublisher(make_registry(redis, "worker"))
+        assert publisher.publish_to_user("U1", "payment_created", {"amount": 10}) == 1
+        assert publisher.publish_to_user("U3", "payment_created", {}) == 0
+
+        channel, message = redis.published[0]
+        assert channel == "sysales:ws:node:node-a"
+        assert json.loads(message)["data"] == {"amount": 10}
+
+    def test_node_leave_removes_presence(self):
+        """Test: arrêt propre du nœud"""
+        redis = FakeRedis()
+        node_a = make_registry(redis, "node-a")
+        node_a.heartbeat({"U1": 2})
+        node_a.leave(["U1"])
+
+        assert node_a.nodes_for("U1") == []
+        assert "node-a" not in node_a.live_nodes()
+
+    def test_dispatch_delivers_through_local_hub(self):
+        """Test: message routé livré au hub du nœud"""
+        hub = MagicMock()
+        node = ClusterNode(hub, make_registry(FakeRedis(), "node-a"))
+
+        node.dispatch(json.dumps({"user_id": "U1", "type": "commission_created", "data": {"x": 1}, "event_id": 7}))
+        node.dispatch(json.dumps({"type": "dashboard_update", "data": {}}))
+
+        hub.publish_to_user.assert_called_once_with("U1", "commission_created", {"x": 1}, 7)
+        hub.publish_to_all.assert_called_once_with("dashboard_update", {})
+
+    def test_route_raises_when_redis_down(self):
+        """Test: route_* signale la panne, publish_* la journalise et renvoie 0 / False"""
+        registry = MagicMock()
+        registry.nodes_for.side_effect = ConnectionError("redis down")
+        registry.redis.publish.side_effect = ConnectionError("redis down")
+        publisher = ClusterPublisher(registry)
+
+        assert publisher.publish_to_user("U1", "notification_created", {}) == 0
+        assert publisher.publish_to_all("dashboard_update", {}) is False
+        with pytest.raises(ConnectionError):
+            publisher.route_to_user("U1", "notification_created", {})
+        with pytest.raises(ConnectionError):
+            publisher.route_to_all("dashboard_update", {})
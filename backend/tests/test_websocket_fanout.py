@@ -0,0 +1,156 @@
+"""
+Tests pour le fan-out WebSocket
+
+Tests couvrant:
+- Sérialisation unique partagée entre connexions
+- Un client lent ne retarde pas les autres
+- Politiques clients lents (éviction, déconnexion) et fusion
+- Rejeu limité à la connexion qui se reconnecte, ré-enregistrement
+"""
+
+import asyncio
+import json
+
+from websocket_fanout import FanoutHub, SlowConsumerPolicy
+
+
+class FakeWebSocket:
+    """Socket en mémoire, optionnellement lente"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed = False
+
+    async def send_str(self, payload):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(payload)
+
+    async def close(self):
+        self.closed = True
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestFanoutHub:
+    """Tests de diffusion"""
+
+    def test_payload_serialized_once_and_shared(self):
+        """Test: toutes les connexions reçoivent le même objet sérialisé"""
+
+        async def scenario():
+            hub = FanoutHub()
+            sockets = [FakeWebSocket() for _ in range(3)]
+            for index, ws in enumerate(sockets):
+                hub.register(f"U{index}", ws)
+
+            assert hub.publish_to_all("dashboard_update", {"n": 1}) == 3
+            await drain()
+            return sockets
+
+        sockets = asyncio.run(scenario())
+        assert all(len(ws.sent) == 1 for ws in sockets)
+        assert sockets[0].sent[0] is sockets[1].sent[0]
+        assert json.loads(sockets[0].sent[0])["type"] == "dashboard_update"
+
+    def test_slow_client_does_not_block_others(self):
+        """Test: la publication ne bloque pas sur un client lent"""
+
+        async def scenario():
+            hub = FanoutHub()
+            slow, fast = FakeWebSocket(delay=1.0), FakeWebSocket()
+            hub.register("slow", slow)
+            hub.register("fast", fast)
+
+            hub.publish_to_all("sale_created", {})
+            await drain()
+            return slow, fast, hub.snapshot()
+
+        slow, fast, snapshot = asyncio.run(asyncio.wait_for(scenario(), timeout=0.5))
+        assert len(fast.sent) == 1
+        assert slow.sent == []
+        assert snapshot["delivered"] == 1
+
+    def test_drop_oldest_bounds_queue(self):
+        """Test: file pleine, les plus anciens messages sont évincés"""
+
+        async def scenario():
+            hub = FanoutHub(max_queue=2, policy=SlowConsumerPolicy.DROP_OLDEST)
+            hub.register("U1", FakeWebSocket(delay=1.0))
+            for n in range(5):
+                hub.publish_to_user("U1", "commission_created", {"n": n})
+            return hub.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        assert snapshot["queue_depth_max"] <= 2
+        assert snapshot["dropped"] >= 2
+
+    def test_disconnect_policy_unregisters_slow_client(self):
+        """Test: politique disconnect, le client lent est fermé et retiré"""
+
+        async def scenario():
+            hub = FanoutHub(max_queue=1, policy=SlowConsumerPolicy.DISCONNECT)
+            ws = FakeWebSocket(delay=1.0)
+            hub.register("U1", ws)
+            for n in range(4):
+                hub.publish_to_user("U1", "commission_created", {"n": n})
+            await drain()
+            return hub, ws
+
+        hub, ws = asyncio.run(scenario())
+        assert ws.closed
+        assert "U1" not in hub.connections
+        assert hub.metrics.disconnected == 1
+
+    def test_coalesces_replaceable_events(self):
+        """Test: un dashboard_update en attente est remplacé par le plus récent"""
+
+        async def scenario():
+            hub = FanoutHub()
+            ws = FakeWebSocket()
+            hub.register("U1", ws)
+            for n in range(3):
+                hub.publish_to_user("U1", "dashboard_update", {"n": n})
+            await drain()
+            return hub, ws
+
+        hub, ws = asyncio.run(scenario())
+        assert [json.loads(p)["data"]["n"] for p in ws.sent] == [2]
+        assert hub.metrics.coalesced == 2
+
+    def test_replay_targets_single_connection(self):
+        """Test: le rejeu ne duplique pas les événements sur les autres sockets"""
+
+        async def scenario():
+            hub = FanoutHub()
+            already_open, reconnecting = FakeWebSocket(), FakeWebSocket()
+            hub.register("U1", already_open)
+            hub.register("U1", reconnecting)
+            hub.publish_to_connection("U1", reconnecting, "sale_created", {"n": 1}, 42)
+            await drain()
+            return already_open, reconnecting
+
+        already_open, reconnecting = asyncio.run(scenario())
+        assert already_open.sent == []
+        assert [json.loads(p)["event_id"] for p in reconnecting.sent] == [42]
+
+    def test_register_again_stops_previous_writer(self):
+        """Test: ré-enregistrer une socket arrête l'ancien writer (pas de tâche orpheline)"""
+
+        async def scenario():
+            hub = FanoutHub()
+            ws = FakeWebSocket()
+            first = hub.register("U1", ws)
+            second = hub.register("U1", ws)
+            hub.publish_to_user("U1", "sale_created", {"n": 1})
+            await drain()
+            return hub, ws, first, second
+
+        hub, ws, first, second = asyncio.run(scenario())
+        assert first.closed and first._task.done()
+        assert hub.connections["U1"][ws] is second
+        assert len(ws.sent) == 1
@@ -0,0 +1,116 @@
+"""
+Tests pour l'authentification du serveur WebSocket
+
+Tests couvrant:
+- Utilisateur dérivé du `sub` d'un JWT valide
+- Message d'auth sans token valide: refus, aucun abonnement ni rejeu
+- Redis indisponible: livraison aux connexions locales
+- Curseur du change feed stable entre redémarrages
+"""
+
+import asyncio
+import time
+
+import jwt
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import websocket_server
+from change_feed import CHANGE_FEED_CONSUMER
+from websocket_server import JWT_ALGORITHM, JWT_SECRET, authenticate_token
+
+
+def _token(sub, secret=JWT_SECRET, **claims):
+    return jwt.encode({"sub": sub, **claims}, secret, algorithm=JWT_ALGORITHM)
+
+
+def _exchange(messages):
+    """Envoie les messages sur /ws, retourne les réponses JSON jusqu'à la fermeture"""
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/ws", websocket_server.websocket_handler)
+        async with TestClient(TestServer(app)) as client:
+            ws = await client.ws_connect("/ws")
+            for message in messages:
+                await ws.send_json(message)
+            replies = [await ws.receive_json() for _ in messages]
+            await ws.close()
+            return replies
+
+    return asyncio.run(scenario())
+
+
+class TestWebSocketAuth:
+    """Tests du message d'authentification"""
+
+    def test_token_subject_is_the_user(self):
+        """Test: sub du JWT; signature invalide / expiré / absent refusés"""
+        assert authenticate_token(_token("U1")) == "U1"
+        assert authenticate_token(_token("U1", secret="autre-secret")) is None
+        assert authenticate_token(_token("U1", exp=int(time.time()) - 60)) is None
+        assert authenticate_token(None) is None
+
+    def test_client_supplied_user_id_rejected(self, monkeypatch):
+        """Test: user_id fourni sans token -> auth_error, pas de rejeu"""
+        replayed, registered = [], []
+        monkeypatch.setattr(websocket_server, "replay_missed_events", lambda *args: replayed.append(args))
+        monkeypatch.setattr(websocket_server.hub, "register", lambda user_id, ws: registered.append(user_id))
+
+        replies = _exchange([{"type": "auth", "user_id": "victime", "last_event_id": 0}])
+
+        assert replies[0]["type"] == "auth_error"
+        assert replayed == [] and registered == []
+
+    def test_valid_token_registers_subject(self, monkeypatch):
+        """Test: token valide -> abonnement au nom du sub, rejeu pour ce sub"""
+        replayed, registered = [], []
+
+        async def replay(user_id, last_event_id, *args):
+            replayed.append((user_id, last_event_id))
+
+        async def presence(user_id):
+            pass
+
+        monkeypatch.setattr(websocket_server, "replay_missed_events", replay)
+        monkeypatch.setattr(websocket_server, "register_presence", presence)
+        monkeypatch.setattr(websocket_server, "unregister_presence", presence)
+        monkeypatch.setattr(websocket_server.hub, "register", lambda user_id, ws: registered.append(user_id))
+        monkeypatch.setattr(websocket_server.hub, "unregister", lambda user_id, ws: None)
+
+        replies = _exchange([{"type": "auth", "token": _token("U1"), "user_id": "victime", "last_event_id": 7}])
+
+        assert replies[0]["type"] == "auth_success"
+        assert registered == ["U1"]
+        assert replayed == [("U1", 7)]
+
+
+class TestClusterFallback:
+    """Tests du repli local et du curseur du change feed"""
+
+    def test_broadcast_falls_back_to_local_hub(self, monkeypatch):
+        """Test: échec de publication Redis -> livraison par le hub local"""
+        delivered = []
+
+        def redis_down(*args):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(websocket_server.cluster_publisher, "route_to_user", redis_down)
+        monkeypatch.setattr(websocket_server.cluster_publisher, "route_to_all", redis_down)
+        monkeypatch.setattr(websocket_server.hub, "publish_to_user", lambda *args: delivered.append(args))
+        monkeypatch.setattr(websocket_server.hub, "publish_to_all", lambda *args: delivered.append(args))
+
+        asyncio.run(websocket_server.broadcast_to_user("U1", "new_message", {"n": 1}, 5))
+        asyncio.run(websocket_server.broadcast_to_all("dashboard_update", {}))
+
+        assert delivered == [("U1", "new_message", {"n": 1}, 5), ("dashboard_update", {})]
+
+    def test_change_feed_cursor_ignores_hostname(self, monkeypatch):
+        """Test: curseur par nœud seulement si WS_NODE_ID est configuré"""
+        monkeypatch.setattr(websocket_server, "WS_NODE_ID", "a1b2c3d4e5f6")
+        monkeypatch.setattr(websocket_server, "WS_NODE_ID_CONFIGURED", False)
+        assert websocket_server.change_feed_job_name() == CHANGE_FEED_CONSUMER
+
+        monkeypatch.setattr(websocket_server, "WS_NODE_ID", "ws-1")
+        monkeypatch.setattr(websocket_server, "WS_NODE_ID_CONFIGURED", True)
+        assert websocket_server.change_feed_job_name() == f"{CHANGE_FEED_CONSUMER}:ws-1"
@@ -3,13 +3,19 @@ Service de Tracking - Gestion des clics et attribution des ventes
 Gère les cookies, redirections et attribution des influenceurs
 """
 
-from fastapi import Request, Response
-from fastapi.responses import RedirectResponse
+from starlette.requests import Request
+from starlette.responses import Response
 from datetime import datetime, timedelta
 from supabase_client import supabase
+from async_db import execute, run_db
+from short_code_cache import short_code_cache, ResolvedLink
+from click_ingestion import click_ingestion
+from short_code_allocator import short_code_allocator, ShortCodeAllocationError
 from typing import Optional, Dict
+import asyncio
 import hashlib
 import secrets
+import uuid
 import logging
 
 logger = logging.getLogger(__name__)
@@ -91,12 +97,20 @@ class TrackingService:
             }
         """
         try:
-            # 1. Créer l'entrée tracking_link
+            # 1. Code court pré-alloué (aucune vérification d'unicité nécessaire)
+            try:
+                short_code = short_code_allocator.allocate()
+            except ShortCodeAllocationError:
+                # Repli: ancien mécanisme aléatoire + vérification en BDD
+                short_code = self.generate_unique_short_code(None)
+
+            # 2. Créer l'entrée tracking_link en un seul INSERT
             link_data = {
                 "influencer_id": influencer_id,
                 "product_id": product_id,
                 "campaign_id": campaign_id,
                 "destination_url": merchant_url,
+                "short_code": short_code,
                 "clicks": 0,
                 "conversions": 0,
                 "revenue": 0.0,
@@ -104,18 +118,10 @@ class TrackingService:
                 "created_at": datetime.now().isoformat(),
             }
 
-            result = supabase.table("tracking_links").insert(link_data).execute()
+            result = await execute(supabase.table("tracking_links").insert(link_data))
             link_id = result.data[0]["id"]
 
-            # 2. Générer un code court unique avec retry logic
-            short_code = self.generate_unique_short_code(link_id)
-
-            # 3. Mettre à jour avec le short_code
-            supabase.table("tracking_links").update({"short_code": short_code}).eq(
-                "id", link_id
-            ).execute()
-
-            # 4. Construire l'URL de tracking
+            # 3. Construire l'URL de tracking
             tracking_url = f"http://localhost:8000/r/{short_code}"
             # En production: https://tracknow.io/r/{short_code}
 
@@ -133,6 +139,34 @@ class TrackingService:
             logger.error(f"Erreur création lien: {e}")
             return {"success": False, "error": str(e)}
 
+    def update_link(self, link_id: str, changes: Dict) -> Optional[Dict]:
+        """
+        Modifie un lien tracké (statut, destination_url...)
+
+        Seul chemin d'écriture de tracking_links après création: le code
+        court est retiré du cache de redirection de tous les processus.
+        Une modification faite hors de l'API (console SQL) n'est vue
+        qu'après SHORT_CODE_CACHE_TTL.
+
+        Returns:
+            Lien mis à jour, None si introuvable
+        """
+        result = (
+            self.supabase.table("tracking_links")
+            .update(changes)
+            .eq("id", link_id)
+            .execute()
+        )
+        if not result.data:
+            return None
+
+        link = result.data[0]
+        if link.get("short_code"):
+            short_code_cache.invalidate(link["short_code"])
+        else:
+            short_code_cache.invalidate_link(link_id)
+        return link
+
     # ============================================
     # 2. TRACKING DES CLICS
     # ============================================
@@ -152,19 +186,15 @@ class TrackingService:
             URL de destination ou None si lien invalide
         """
         try:
-            # 1. Récupérer le lien depuis la BDD
-            link_result = (
-                supabase.table("tracking_links").select("*").eq("short_code", short_code).execute()
-            )
+            # 1. Résoudre le lien (cache LRU en mémoire, BDD hors boucle si miss)
+            link = short_code_cache.get(short_code) or await run_db(self._load_short_code, short_code)
 
-            if not link_result.data:
+            if not link:
                 logger.warning(f"⚠️ Lien introuvable: {short_code}")
                 return None
 
-            link = link_result.data[0]
-
             # Vérifier que le lien est actif
-            if link.get("status") != "active":
+            if not link.is_active:
                 logger.warning(f"⚠️ Lien inactif: {short_code}")
                 return None
 
@@ -173,28 +203,25 @@ class TrackingService:
             user_agent = request.headers.get("user-agent", "unknown")
             referer = request.headers.get("referer", "")
 
-            # 3. Enregistrer le clic dans la table click_logs
+            # 3. Mettre le clic en file d'ingestion (écrit par lots en arrière-plan)
+            # L'ID est généré côté serveur: pas besoin de relire la ligne insérée
+            click_id = str(uuid.uuid4())
             click_data = {
-                "link_id": link["id"],
-                "influencer_id": link["influencer_id"],
+                "id": click_id,
+                "link_id": link.id,
+                "influencer_id": link.influencer_id,
                 "ip_address": client_ip,
                 "user_agent": user_agent,
                 "referer": referer,
                 "clicked_at": datetime.now().isoformat(),
             }
 
-            click_result = supabase.table("click_logs").insert(click_data).execute()
-            click_id = click_result.data[0]["id"]
-
-            # 4. Incrémenter le compteur de clics
-            new_clicks = int(link.get("clicks", 0)) + 1
-            supabase.table("tracking_links").update(
-                {"clicks": new_clicks, "last_click_at": datetime.now().isoformat()}
-            ).eq("id", link["id"]).execute()
+            # 4. Le flusher insère click_logs et incrémente tracking_links.clicks
+            click_ingestion.enqueue(click_data)
 
             # 5. Créer le cookie d'attribution (expire dans 30 jours)
             cookie_value = self._generate_attribution_cookie(
-                link_id=link["id"], influencer_id=link["influencer_id"], click_id=click_id
+                link_id=link.id, influencer_id=link.influencer_id, click_id=click_id
             )
 
             response.set_cookie(
@@ -208,12 +235,35 @@ class TrackingService:
             logger.info(f"🖱️ Clic tracké: {short_code} → Cookie: {cookie_value[:20]}...")
 
             # 6. Retourner l'URL de destination
-            return link["destination_url"]
+            return link.destination_url
 
         except Exception as e:
             logger.error(f"Erreur tracking clic: {e}")
             return None
 
+    def resolve_short_code(self, short_code: str) -> Optional[ResolvedLink]:
+        """
+        Résout un code court en lien (destination, statut, id, influenceur)
+
+        Les liens chauds sont servis depuis le cache sans aller-retour BDD;
+        sur un miss, seules les colonnes utiles à la redirection sont lues.
+        """
+        return short_code_cache.get(short_code) or self._load_short_code(short_code)
+
+    def _load_short_code(self, short_code: str) -> Optional[ResolvedLink]:
+        """Lecture BDD d'un code court absent du cache, puis mise en cache"""
+        link_result = (
+            supabase.table("tracking_links")
+            .select("id, influencer_id, destination_url, status")
+            .eq("short_code", short_code)
+            .execute()
+        )
+
+        if not link_result.data:
+            return None
+
+        return short_code_cache.put(short_code, link_result.data[0])
+
     def _generate_attribution_cookie(self, link_id: str, influencer_id: str, click_id: str) -> str:
         """
         Génère la valeur du cookie d'attribution
@@ -299,8 +349,12 @@ class TrackingService:
     async def get_link_stats(self, link_id: str) -> Dict:
         """Récupère les statistiques d'un lien"""
         try:
-            # Lien principal
-            link = supabase.table("tracking_links").select("*").eq("id", link_id).execute()
+            # Lien, clics (IP) et conversions: trois requêtes indépendantes, en parallèle
+            link, clicks, sales = await asyncio.gather(
+                execute(supabase.table("tracking_links").select("*").eq("id", link_id)),
+                execute(supabase.table("click_logs").select("ip_address").eq("link_id", link_id)),
+                execute(supabase.table("sales").select("*").eq("link_id", link_id)),
+            )
 
             if not link.data:
                 return {"error": "Lien introuvable"}
@@ -308,13 +362,9 @@ class TrackingService:
             link_data = link.data[0]
 
             # Clics uniques (par IP)
-            clicks = (
-                supabase.table("click_logs").select("ip_address").eq("link_id", link_id).execute()
-            )
             unique_ips = set([c["ip_address"] for c in clicks.data]) if clicks.data else set()
 
             # Conversions
-            sales = supabase.table("sales").select("*").eq("link_id", link_id).execute()
             total_revenue = (
                 sum([float(s.get("amount", 0)) for s in sales.data]) if sales.data else 0
             )
@@ -5,6 +5,10 @@ Supporte Shopify, WooCommerce, Stripe, etc.
 
 from fastapi import Request, HTTPException
 from supabase_client import supabase
+from async_db import execute, run_db
+from link_counters import link_counters
+from dashboard_stats_service import dashboard_stats
+from websocket_cluster import cluster_publisher
 from datetime import datetime
 from typing import Dict, Optional
 import hmac
@@ -112,8 +116,13 @@ class WebhookService:
                 "created_at": datetime.now().isoformat(),
             }
 
-            sale_result = supabase.table("sales").insert(sale_data).execute()
+            sale_result = await execute(supabase.table("sales").insert(sale_data))
             sale_id = sale_result.data[0]["id"]
+            await run_db(
+                dashboard_stats.invalidate_tenant,
+                merchant_id=sale_data.get("merchant_id"),
+                influencer_id=sale_data.get("influencer_id"),
+            )
 
             # 9. Incrémenter les conversions du lien
             if attribution.get("link_id"):
@@ -223,7 +232,7 @@ class WebhookService:
         """Récupère l'attribution depuis un short_code"""
         try:
             link = (
-                supabase.table("tracking_links").select("*").eq("short_code", short_code).execute()
+                await execute(supabase.table("tracking_links").select("*").eq("short_code", short_code))
             )
 
             if not link.data:
@@ -291,8 +300,13 @@ class WebhookService:
                 "created_at": datetime.now().isoformat(),
             }
 
-            sale_result = supabase.table("sales").insert(sale_data).execute()
+            sale_result = await execute(supabase.table("sales").insert(sale_data))
             sale_id = sale_result.data[0]["id"]
+            await run_db(
+                dashboard_stats.invalidate_tenant,
+                merchant_id=sale_data.get("merchant_id"),
+                influencer_id=sale_data.get("influencer_id"),
+            )
 
             await self._log_webhook(
                 source="woocommerce",
@@ -450,8 +464,13 @@ class WebhookService:
                 "created_at": datetime.now().isoformat(),
             }
 
-            sale_result = supabase.table("sales").insert(sale_data).execute()
+            sale_result = await execute(supabase.table("sales").insert(sale_data))
             sale_id = sale_result.data[0]["id"]
+            await run_db(
+                dashboard_stats.invalidate_tenant,
+                merchant_id=sale_data.get("merchant_id"),
+                influencer_id=sale_data.get("influencer_id"),
+            )
 
             # Incrémenter les conversions du lien
             if attribution.get("link_id"):
@@ -588,10 +607,9 @@ class WebhookService:
             # Chercher dans la table influencers
             # Vous devez avoir une colonne tiktok_creator_id
             result = (
-                supabase.table("influencers")
+                await execute(supabase.table("influencers")
                 .select("*")
-                .eq("tiktok_creator_id", tiktok_creator_id)
-                .execute()
+                .eq("tiktok_creator_id", tiktok_creator_id))
             )
 
             return result.data[0] if result.data else None
@@ -605,28 +623,15 @@ class WebhookService:
     async def _get_merchant(self, merchant_id: str) -> Dict:
         """Récupère les infos d'un merchant"""
         try:
-            result = supabase.table("merchants").select("*").eq("id", merchant_id).execute()
+            result = await execute(supabase.table("merchants").select("*").eq("id", merchant_id))
             return result.data[0] if result.data else {}
         except:
             return {}
 
     async def _increment_link_conversion(self, link_id: str, revenue: float):
-        """Incrémente les conversions d'un lien"""
+        """Incrémente les conversions d'un lien (agrégé puis appliqué atomiquement)"""
         try:
-            link = (
-                supabase.table("tracking_links")
-                .select("conversions, revenue")
-                .eq("id", link_id)
-                .execute()
-            )
-
-            if link.data:
-                current_conversions = int(link.data[0].get("conversions", 0))
-                current_revenue = float(link.data[0].get("revenue", 0))
-
-                supabase.table("tracking_links").update(
-                    {"conversions": current_conversions + 1, "revenue": current_revenue + revenue}
-                ).eq("id", link_id).execute()
+            link_counters.increment("tracking_links", link_id, conversions=1, revenue=revenue)
         except Exception as e:
             logger.error(f"Erreur incrémentation conversion: {e}")
 
@@ -635,7 +640,7 @@ class WebhookService:
         try:
             # Récupérer le user_id de l'influenceur
             influencer = (
-                supabase.table("influencers").select("user_id").eq("id", influencer_id).execute()
+                await execute(supabase.table("influencers").select("user_id").eq("id", influencer_id))
             )
 
             if not influencer.data:
@@ -654,7 +659,10 @@ class WebhookService:
                 "created_at": datetime.now().isoformat(),
             }
 
-            supabase.table("notifications").insert(notification_data).execute()
+            await execute(supabase.table("notifications").insert(notification_data))
+
+            # Temps réel: livrée par le nœud WebSocket de l'influenceur
+            await run_db(cluster_publisher.publish_to_user, user_id, "notification_created", notification_data)
 
             logger.info(f"📧 Notification envoyée à influenceur {influencer_id}")
 
@@ -687,7 +695,7 @@ class WebhookService:
                 "received_at": datetime.now().isoformat(),
             }
 
-            result = supabase.table("webhook_logs").insert(log_data).execute()
+            result = await execute(supabase.table("webhook_logs").insert(log_data))
             return result.data[0] if result.data else {}
 
         except Exception as e:
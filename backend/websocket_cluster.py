@@ -0,0 +1,235 @@
+"""
+Tier WebSocket multi-nœuds
+Registre de présence Redis (user_id -> nœuds où il est connecté) et un canal
+de routage par nœud: n'importe quel worker backend (paiements, webhooks,
+messagerie) publie vers un utilisateur, le message est livré par le ou les
+nœuds qui détiennent ses connexions. Un nœud qui ne bat plus (heartbeat)
+est ignoré, ses entrées expirent d'elles-mêmes
+"""
+
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import json
+import os
+import socket
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+WS_NODE_ID = os.getenv("WS_NODE_ID", socket.gethostname())
+# Identifiant fixé par la configuration: stable entre redémarrages, contrairement
+# au hostname d'un conteneur recréé
+WS_NODE_ID_CONFIGURED = bool(os.getenv("WS_NODE_ID"))
+WS_PRESENCE_TTL = int(os.getenv("WS_PRESENCE_TTL", 60))
+
+PRESENCE_KEY = "sysales:ws:presence:{user_id}"
+NODES_KEY = "sysales:ws:nodes"
+NODE_CHANNEL = "sysales:ws:node:{node_id}"
+BROADCAST_CHANNEL = "sysales:ws:broadcast"
+
+
+class PresenceRegistry:
+    """
+    Présence des utilisateurs par nœud
+
+    - presence:{user_id}: hash node_id -> nombre de connexions
+    - nodes: zset node_id -> dernier heartbeat (nœuds vivants)
+    """
+
+    def __init__(self, redis_client=None, node_id: str = WS_NODE_ID, ttl: int = WS_PRESENCE_TTL):
+        self._redis = redis_client
+        self.node_id = node_id
+        self.ttl = ttl
+
+    @property
+    def redis(self):
+        """Client Redis (import paresseux)"""
+        if self._redis is None:
+            import redis
+
+            self._redis = redis.from_url(REDIS_URL, decode_responses=True)
+        return self._redis
+
+    def connect(self, user_id: str):
+        key = PRESENCE_KEY.format(user_id=user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hincrby(key, self.node_id, 1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def disconnect(self, user_id: str):
+        key = PRESENCE_KEY.format(user_id=user_id)
+        if self.redis.hincrby(key, self.node_id, -1) <= 0:
+            self.redis.hdel(key, self.node_id)
+
+    def heartbeat(self, connections: Dict[str, int]):
+        """Marque le nœud vivant et réaffirme ses compteurs (auto-correction)"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(NODES_KEY, {self.node_id: time.time()})
+        for user_id, count in connections.items():
+            key = PRESENCE_KEY.format(user_id=user_id)
+            pipe.hset(key, self.node_id, count)
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def leave(self, user_ids: Iterable[str]):
+        """Arrêt propre du nœud: retrait de toutes ses entrées"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(NODES_KEY, self.node_id)
+        for user_id in user_ids:
+            pipe.hdel(PRESENCE_KEY.format(user_id=user_id), self.node_id)
+        pipe.execute()
+
+    def live_nodes(self) -> List[str]:
+        return self.redis.zrangebyscore(NODES_KEY, time.time() - self.ttl, "+inf")
+
+    def nodes_for(self, user_id: str) -> List[str]:
+        """Nœuds vivants détenant au moins une connexion de l'utilisateur"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(PRESENCE_KEY.format(user_id=user_id))
+        pipe.zrangebyscore(NODES_KEY, time.time() - self.ttl, "+inf")
+        presence, live = pipe.execute()
+
+        live = set(live)
+        return [node for node, count in presence.items() if int(count) > 0 and node in live]
+
+
+class ClusterPublisher:
+    """Publication vers un utilisateur, où qu'il soit connecté (synchrone)"""
+
+    def __init__(self, registry: Optional[PresenceRegistry] = None):
+        self.registry = registry or PresenceRegistry()
+
+    def route_to_user(self, user_id: str, event_type: str, data: dict, event_id: Optional[int] = None) -> int:
+        """
+        Route l'événement vers les nœuds de l'utilisateur
+
+        Returns:
+            Nombre de nœuds destinataires (0 si l'utilisateur est hors ligne)
+
+        Raises:
+            Exception: Redis indisponible (l'appelant choisit son repli)
+        """
+        nodes = self.registry.nodes_for(str(user_id))
+        if not nodes:
+            return 0
+
+        message = json.dumps(
+            {"user_id": str(user_id), "type": event_type, "data": data, "event_id": event_id},
+            default=str,
+        )
+        pipe = self.registry.redis.pipeline(transaction=False)
+        for node in nodes:
+            pipe.publish(NODE_CHANNEL.format(node_id=node), message)
+        pipe.execute()
+        return len(nodes)
+
+    def route_to_all(self, event_type: str, data: dict):
+        """Diffusion à toutes les connexions de tous les nœuds (lève si Redis est indisponible)"""
+        message = json.dumps({"type": event_type, "data": data}, default=str)
+        self.registry.redis.publish(BROADCAST_CHANNEL, message)
+
+    def publish_to_user(self, user_id: str, event_type: str, data: dict, event_id: Optional[int] = None) -> int:
+        """Comme route_to_user, sans lever (workers backend): 0 en cas d'échec"""
+        try:
+            return self.route_to_user(user_id, event_type, data, event_id)
+        except Exception as e:
+            logger.error(f"❌ Routage WebSocket vers {user_id} échoué: {e}")
+            return 0
+
+    def publish_to_all(self, event_type: str, data: dict) -> bool:
+        """Comme route_to_all, sans lever (workers backend)"""
+        try:
+            self.route_to_all(event_type, data)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Diffusion WebSocket échouée: {e}")
+            return False
+
+
+class ClusterNode:
+    """
+    Côté serveur WebSocket: écoute le canal du nœud et le canal de diffusion,
+    livre via le hub local et entretient la présence (heartbeat)
+    """
+
+    def __init__(self, hub, registry: Optional[PresenceRegistry] = None):
+        self.hub = hub
+        self.registry = registry or PresenceRegistry()
+
+    @property
+    def node_id(self) -> str:
+        return self.registry.node_id
+
+    async def connect(self, user_id: str):
+        await self._call(self.registry.connect, user_id)
+
+    async def disconnect(self, user_id: str):
+        await self._call(self.registry.disconnect, user_id)
+
+    def dispatch(self, raw: str):
+        """Livre localement un message reçu d'un autre worker / nœud"""
+        message = json.loads(raw)
+        if message.get("user_id"):
+            self.hub.publish_to_user(
+                message["user_id"], message["type"], message.get("data") or {}, message.get("event_id")
+            )
+        else:
+            self.hub.publish_to_all(message["type"], message.get("data") or {})
+
+    async def run(self):
+        """Abonnement pub/sub + heartbeat, reconnexion automatique"""
+        import redis.asyncio as aioredis
+
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        try:
+            while True:
+                client = aioredis.from_url(REDIS_URL, decode_responses=True)
+                pubsub = client.pubsub()
+                try:
+                    await pubsub.subscribe(NODE_CHANNEL.format(node_id=self.node_id), BROADCAST_CHANNEL)
+                    logger.info(f"✅ Nœud WebSocket {self.node_id} abonné au routage")
+
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            self.dispatch(message["data"])
+                        except Exception as e:
+                            logger.error(f"❌ Message de routage invalide: {e}")
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"⚠️ Routage WebSocket interrompu: {e}")
+                    await asyncio.sleep(1)
+                finally:
+                    await pubsub.close()
+                    await client.close()
+        finally:
+            heartbeat.cancel()
+            try:
+                await self._call(self.registry.leave, list(self.hub.connections))
+            except Exception as e:
+                logger.warning(f"⚠️ Retrait du nœud {self.node_id} échoué: {e}")
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                connections = {user_id: len(writers) for user_id, writers in self.hub.connections.items()}
+                await self._call(self.registry.heartbeat, connections)
+            except Exception as e:
+                logger.warning(f"⚠️ Heartbeat WebSocket échoué: {e}")
+            await asyncio.sleep(max(self.registry.ttl / 3, 1))
+
+    @staticmethod
+    async def _call(func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+
+# Instance globale pour les workers backend
+cluster_publisher = ClusterPublisher()
@@ -0,0 +1,284 @@
+"""
+Fan-out WebSocket non bloquant
+Chaque événement est sérialisé une seule fois puis partagé par toutes les
+connexions destinataires. Chaque connexion a sa file d'envoi bornée et sa
+propre tâche d'écriture: un client lent ne retarde plus les autres. Politique
+configurable pour les clients lents (éviction des plus anciens messages,
+rejet des nouveaux ou déconnexion) et fusion des événements remplaçables
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional
+import asyncio
+import json
+import os
+import statistics
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 256))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", 10))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+# Événements dont seul le dernier compte: un nouvel envoi remplace celui en attente
+COALESCED_EVENT_TYPES = {"dashboard_update"}
+
+
+class SlowConsumerPolicy:
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEW = "drop_new"
+    DISCONNECT = "disconnect"
+
+
+@dataclass
+class OutboundMessage:
+    """Message sérialisé une fois, partagé entre toutes les files"""
+
+    payload: str
+    coalesce_key: Optional[str] = None
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class FanoutMetrics:
+    """Compteurs et latences (fenêtre glissante) du fan-out"""
+
+    def __init__(self, window: int = 10000):
+        self.latencies_ms: Deque[float] = deque(maxlen=window)
+        self.published = 0
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.disconnected = 0
+
+    def observe_delivery(self, message: OutboundMessage):
+        self.delivered += 1
+        self.latencies_ms.append((time.monotonic() - message.created_at) * 1000)
+
+    def latency_snapshot(self) -> Dict:
+        latencies = sorted(self.latencies_ms)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+        return {
+            "latency_p50_ms": round(statistics.median(latencies), 2) if latencies else 0.0,
+            "latency_p95_ms": percentile(0.95),
+            "latency_p99_ms": percentile(0.99),
+        }
+
+
+class ConnectionWriter:
+    """File d'envoi bornée + tâche d'écriture d'une connexion"""
+
+    def __init__(
+        self,
+        ws,
+        user_id: str,
+        metrics: FanoutMetrics,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT,
+    ):
+        self.ws = ws
+        self.user_id = user_id
+        self.metrics = metrics
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+
+        self.closed = False
+        self._queue: Deque[OutboundMessage] = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, message: OutboundMessage) -> bool:
+        """Ajoute un message sans jamais bloquer; False si refusé"""
+        if self.closed:
+            return False
+
+        if message.coalesce_key:
+            for index, pending in enumerate(self._queue):
+                if pending.coalesce_key == message.coalesce_key:
+                    self._queue[index] = message
+                    self.metrics.coalesced += 1
+                    return True
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                logger.warning(f"⚠️ Client lent déconnecté: {self.user_id} ({self.depth} messages en attente)")
+                self.metrics.disconnected += 1
+                self.close()
+                return False
+            self.metrics.dropped += 1
+            if self.policy == SlowConsumerPolicy.DROP_NEW:
+                return False
+            self._queue.popleft()
+
+        self._queue.append(message)
+        self.metrics.enqueued += 1
+        self._ready.set()
+        return True
+
+    async def _run(self):
+        while not self.closed:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            message = self._queue.popleft()
+            try:
+                await asyncio.wait_for(self.ws.send_str(message.payload), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Envoi WebSocket échoué pour {self.user_id}: {e}")
+                self.close()
+                break
+
+            self.metrics.observe_delivery(message)
+
+    def stop(self):
+        """Arrête la tâche d'écriture (la socket reste gérée par son handler)"""
+        self.closed = True
+        self._queue.clear()
+        self._ready.set()
+
+    def close(self):
+        """Arrête l'écriture et ferme la socket (sans attendre)"""
+        if self.closed:
+            return
+        self.stop()
+        if not self.ws.closed:
+            asyncio.ensure_future(self.ws.close())
+
+
+class FanoutHub:
+    """Registre des connexions par utilisateur et diffusion des événements"""
+
+    def __init__(
+        self,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT,
+    ):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+
+        self.metrics = FanoutMetrics()
+        self.connections: Dict[str, Dict[Any, ConnectionWriter]] = {}
+
+    def register(self, user_id: str, ws) -> ConnectionWriter:
+        # Socket déjà enregistrée: l'ancien writer est arrêté avant d'être remplacé
+        previous = self.connections.get(user_id, {}).get(ws)
+        if previous:
+            previous.stop()
+
+        writer = ConnectionWriter(
+            ws,
+            user_id,
+            self.metrics,
+            max_queue=self.max_queue,
+            policy=self.policy,
+            send_timeout=self.send_timeout,
+        )
+        self.connections.setdefault(user_id, {})[ws] = writer
+        writer.start()
+        return writer
+
+    def unregister(self, user_id: str, ws):
+        writers = self.connections.get(user_id)
+        if not writers:
+            return
+
+        writer = writers.pop(ws, None)
+        if writer:
+            writer.stop()
+        if not writers:
+            del self.connections[user_id]
+
+    @staticmethod
+    def build_message(event_type: str, data: dict, event_id: Optional[int] = None) -> OutboundMessage:
+        """Sérialise l'événement une seule fois"""
+        message = {"type": event_type, "data": data, "timestamp": datetime.now().isoformat()}
+        if event_id is not None:
+            message["event_id"] = event_id
+
+        return OutboundMessage(
+            payload=json.dumps(message, default=str),
+            coalesce_key=event_type if event_type in COALESCED_EVENT_TYPES else None,
+        )
+
+    def publish_to_user(self, user_id: str, event_type: str, data: dict, event_id: Optional[int] = None) -> int:
+        """Met l'événement en file pour toutes les connexions de l'utilisateur"""
+        if user_id not in self.connections:
+            return 0
+        return self._publish(self.connections[user_id].values(), self.build_message(event_type, data, event_id))
+
+    def publish_to_connection(
+        self, user_id: str, ws, event_type: str, data: dict, event_id: Optional[int] = None
+    ) -> int:
+        """Met l'événement en file pour une seule connexion (rejeu après reconnexion)"""
+        writer = self.connections.get(user_id, {}).get(ws)
+        if not writer:
+            return 0
+        return self._publish([writer], self.build_message(event_type, data, event_id))
+
+    def publish_to_all(self, event_type: str, data: dict) -> int:
+        """Met l'événement en file pour toutes les connexions"""
+        writers = [writer for writers in self.connections.values() for writer in writers.values()]
+        return self._publish(writers, self.build_message(event_type, data))
+
+    def _publish(self, writers: Iterable[ConnectionWriter], message: OutboundMessage) -> int:
+        self.metrics.published += 1
+        enqueued = 0
+        for writer in list(writers):
+            if writer.enqueue(message):
+                enqueued += 1
+            elif writer.closed:
+                self.unregister(writer.user_id, writer.ws)
+        return enqueued
+
+    def snapshot(self) -> Dict:
+        """Métriques: connexions, profondeur des files, débit et latences"""
+        depths: List[int] = [
+            writer.depth for writers in self.connections.values() for writer in writers.values()
+        ]
+        metrics = self.metrics
+        return {
+            "users": len(self.connections),
+            "connections": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths) if depths else 0,
+            "queue_capacity": self.max_queue,
+            "slow_consumer_policy": self.policy,
+            "published": metrics.published,
+            "enqueued": metrics.enqueued,
+            "delivered": metrics.delivered,
+            "dropped": metrics.dropped,
+            "coalesced": metrics.coalesced,
+            "disconnected": metrics.disconnected,
+            **metrics.latency_snapshot(),
+        }
+
+    async def close_all(self):
+        for writers in list(self.connections.values()):
+            for writer in list(writers.values()):
+                writer.close()
+        self.connections.clear()
@@ -5,14 +5,47 @@ Handles commission alerts, payment status updates, and live dashboard updates
 
 import asyncio
 import json
+import os
 from datetime import datetime
-from typing import Dict, Set
+from typing import Optional
 from aiohttp import web, WSMsgType
 import aiohttp_cors
-from supabase_client import get_supabase
+import jwt
+from change_feed import CHANGE_FEED_CONSUMER, ChangeFeedConsumer
+from websocket_cluster import WS_NODE_ID, WS_NODE_ID_CONFIGURED, ClusterNode, cluster_publisher
+from websocket_fanout import FanoutHub
 
-# Connected clients by user_id
-connected_clients: Dict[str, Set[web.WebSocketResponse]] = {}
+# Same secret / algorithm as the API tokens (auth.py)
+JWT_SECRET = os.getenv("JWT_SECRET", "fallback-secret-please-set-env-variable")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+# Close code sent when the auth message carries no valid token
+WS_CLOSE_UNAUTHORIZED = 4401
+
+# Connected clients by user_id (one bounded send queue + writer task per socket)
+hub = FanoutHub()
+
+# Redis presence + node routing channel (multi-node deployments)
+cluster = ClusterNode(hub)
+
+
+def change_feed_job_name() -> str:
+    """Checkpoint name of this node's change feed cursor
+
+    A per-node cursor needs an explicit, stable WS_NODE_ID: the hostname
+    default changes whenever a container is recreated, which would orphan
+    the checkpoint and skip the events published during the restart.
+    Without one, nodes share a single cursor (clients still catch up with
+    last_event_id on reconnect).
+    """
+    if WS_NODE_ID_CONFIGURED:
+        return f"{CHANGE_FEED_CONSUMER}:{WS_NODE_ID}"
+    return CHANGE_FEED_CONSUMER
+
+
+# Change feed consumer: reads the feed with a persisted cursor (job_checkpoints)
+# and delivers to this node's local connections
+change_feed = ChangeFeedConsumer(job_name=change_feed_job_name())
 
 
 # Event types
@@ -23,6 +56,8 @@ class EventTypes:
     PAYMENT_STATUS_CHANGED = "payment_status_changed"
     SALE_CREATED = "sale_created"
     DASHBOARD_UPDATE = "dashboard_update"
+    NOTIFICATION_CREATED = "notification_created"
+    NEW_MESSAGE = "new_message"
 
 
 async def websocket_handler(request):
@@ -38,24 +73,37 @@ async def websocket_handler(request):
                 try:
                     data = json.loads(msg.data)
 
-                    # Handle authentication
+                    # Handle authentication: the user is the JWT subject,
+                    # never an id supplied by the client
                     if data.get("type") == "auth":
-                        user_id = data.get("user_id")
-                        if user_id:
-                            if user_id not in connected_clients:
-                                connected_clients[user_id] = set()
-                            connected_clients[user_id].add(ws)
-
-                            # Send confirmation
+                        authenticated_id = authenticate_token(data.get("token"))
+                        if not authenticated_id or (user_id and authenticated_id != user_id):
                             await ws.send_json(
-                                {
-                                    "type": "auth_success",
-                                    "message": "Authenticated successfully",
-                                    "timestamp": datetime.now().isoformat(),
-                                }
+                                {"type": "auth_error", "message": "Invalid or expired token"}
                             )
+                            await ws.close(code=WS_CLOSE_UNAUTHORIZED, message=b"Unauthorized")
+                            break
+
+                        if user_id is None:
+                            user_id = authenticated_id
+                            hub.register(user_id, ws)
+                            await register_presence(user_id)
                             print(f"User {user_id} connected")
 
+                        # Send confirmation
+                        await ws.send_json(
+                            {
+                                "type": "auth_success",
+                                "message": "Authenticated successfully",
+                                "timestamp": datetime.now().isoformat(),
+                            }
+                        )
+
+                        # Replay events missed since the client's last event
+                        last_event_id = data.get("last_event_id")
+                        if last_event_id is not None:
+                            await replay_missed_events(user_id, int(last_event_id), ws)
+
                     # Handle ping/pong for keepalive
                     elif data.get("type") == "ping":
                         await ws.send_json(
@@ -70,110 +118,100 @@ async def websocket_handler(request):
 
     finally:
         # Clean up on disconnect
-        if user_id and user_id in connected_clients:
-            connected_clients[user_id].discard(ws)
-            if not connected_clients[user_id]:
-                del connected_clients[user_id]
+        if user_id:
+            hub.unregister(user_id, ws)
+            await unregister_presence(user_id)
             print(f"User {user_id} disconnected")
 
     return ws
 
 
-async def broadcast_to_user(user_id: str, event_type: str, data: dict):
-    """Send event to specific user"""
-    if user_id not in connected_clients:
-        return
+def authenticate_token(token: Optional[str]) -> Optional[str]:
+    """Verify an API JWT and return its subject (user id), None if invalid or expired"""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    subject = payload.get("sub")
+    return str(subject) if subject else None
 
-    message = {"type": event_type, "data": data, "timestamp": datetime.now().isoformat()}
 
-    # Send to all connections for this user
-    disconnected = set()
-    for ws in connected_clients[user_id]:
-        try:
-            await ws.send_json(message)
-        except Exception as e:
-            print(f"Error sending to user {user_id}: {e}")
-            disconnected.add(ws)
+async def register_presence(user_id: str):
+    """Record that user_id is connected to this node"""
+    try:
+        await cluster.connect(user_id)
+    except Exception as e:
+        print(f"Error registering presence for user {user_id}: {e}")
 
-    # Clean up disconnected clients
-    for ws in disconnected:
-        connected_clients[user_id].discard(ws)
 
+async def unregister_presence(user_id: str):
+    try:
+        await cluster.disconnect(user_id)
+    except Exception as e:
+        print(f"Error removing presence for user {user_id}: {e}")
 
-async def broadcast_to_all(event_type: str, data: dict):
-    """Send event to all connected users"""
-    message = {"type": event_type, "data": data, "timestamp": datetime.now().isoformat()}
 
-    for user_id in list(connected_clients.keys()):
-        disconnected = set()
-        for ws in connected_clients[user_id]:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to user {user_id}: {e}")
-                disconnected.add(ws)
+async def replay_missed_events(user_id: str, last_event_id: int, ws):
+    """Queue change feed events with id > last_event_id for the reconnecting socket only
 
-        # Clean up disconnected clients
-        for ws in disconnected:
-            connected_clients[user_id].discard(ws)
+    The user's other open sockets already received these events live.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        events = await loop.run_in_executor(None, change_feed.replay, user_id, last_event_id)
+    except Exception as e:
+        print(f"Error replaying events for user {user_id}: {e}")
+        return
 
+    for event in events:
+        hub.publish_to_connection(user_id, ws, event["event_type"], event["payload"], event["id"])
 
-async def listen_to_database_changes():
-    """Listen to Supabase realtime changes (simulated with polling)"""
-    supabase = get_supabase()
-    last_check = datetime.now()
-
-    while True:
-        try:
-            # Check for new commissions
-            response = (
-                supabase.table("commissions")
-                .select("*")
-                .gte("created_at", last_check.isoformat())
-                .execute()
-            )
 
-            for commission in response.data:
-                affiliate_id = commission.get("affiliate_id")
-                if affiliate_id:
-                    await broadcast_to_user(
-                        str(affiliate_id),
-                        EventTypes.COMMISSION_CREATED,
-                        {
-                            "commission_id": commission["id"],
-                            "amount": commission["amount"],
-                            "sale_id": commission["sale_id"],
-                        },
-                    )
-
-            # Check for payment status changes
-            response = (
-                supabase.table("payments")
-                .select("*")
-                .gte("updated_at", last_check.isoformat())
-                .execute()
-            )
+async def broadcast_to_user(
+    user_id: str, event_type: str, data: dict, event_id: Optional[int] = None
+):
+    """Send event to specific user, on whichever node they are connected
+
+    If Redis is unavailable the event still reaches the user's sockets on this node.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            None, cluster_publisher.route_to_user, user_id, event_type, data, event_id
+        )
+    except Exception as e:
+        print(f"Cluster routing failed for user {user_id}, delivering locally: {e}")
+        hub.publish_to_user(user_id, event_type, data, event_id)
+
+
+async def broadcast_to_all(event_type: str, data: dict):
+    """Send event to all connected users on every node (local delivery if Redis is down)"""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, cluster_publisher.route_to_all, event_type, data)
+    except Exception as e:
+        print(f"Cluster broadcast failed, delivering locally: {e}")
+        hub.publish_to_all(event_type, data)
 
-            for payment in response.data:
-                affiliate_id = payment.get("affiliate_id")
-                if affiliate_id:
-                    await broadcast_to_user(
-                        str(affiliate_id),
-                        EventTypes.PAYMENT_STATUS_CHANGED,
-                        {
-                            "payment_id": payment["id"],
-                            "status": payment["status"],
-                            "amount": payment["amount"],
-                        },
-                    )
 
-            last_check = datetime.now()
+async def metrics_handler(request):
+    """Fan-out metrics: connections, queue depth, broadcast latency"""
+    return web.json_response({"node_id": WS_NODE_ID, **hub.snapshot()})
 
-        except Exception as e:
-            print(f"Error listening to database: {e}")
 
-        # Check every 5 seconds
-        await asyncio.sleep(5)
+async def deliver_change_event(event: dict):
+    """Deliver a change feed event to the recipient's connections on this node"""
+    if event.get("user_id"):
+        hub.publish_to_user(
+            str(event["user_id"]), event["event_type"], event.get("payload") or {}, event["id"]
+        )
+
+
+async def listen_to_database_changes():
+    """Consume the change feed outbox (written by triggers in the same transaction)"""
+    await change_feed.run(deliver_change_event)
 
 
 async def init_app():
@@ -192,6 +230,7 @@ async def init_app():
 
     # Add WebSocket route
     app.router.add_get("/ws", websocket_handler)
+    app.router.add_get("/metrics", metrics_handler)
 
     # Configure CORS on all routes
     for route in list(app.router.routes()):
@@ -200,23 +239,30 @@ async def init_app():
     # Start database listener
     app["db_listener"] = asyncio.create_task(listen_to_database_changes())
 
+    # Start cross-node routing listener
+    app["cluster_listener"] = asyncio.create_task(cluster.run())
+
     return app
 
 
 async def cleanup(app):
     """Cleanup on shutdown"""
-    if "db_listener" in app:
-        app["db_listener"].cancel()
-        try:
-            await app["db_listener"]
-        except asyncio.CancelledError:
-            pass
+    for task_name in ("db_listener", "cluster_listener"):
+        if task_name in app:
+            app[task_name].cancel()
+            try:
+                await app[task_name]
+            except asyncio.CancelledError:
+                pass
 
     # Close all WebSocket connections
-    for user_id in list(connected_clients.keys()):
-        for ws in connected_clients[user_id]:
-            await ws.close()
+    await hub.close_all()
 
 
 if __name__ == "__main__":
-    app = web.run_app(init_app(), host="localhost", port=8080, shutdown_timeout=60.0)
+    app = web.run_app(
+        init_app(),
+        host=os.getenv("WS_HOST", "localhost"),
+        port=int(os.getenv("WS_PORT", 8080)),
+        shutdown_timeout=60.0,
+    )
@@ -0,0 +1,137 @@
+-- =============================================================================
+-- Migration: Server-side aggregates for repositories
+-- Description: Generic SUM / COUNT / AVG / MIN / MAX with optional GROUP BY,
+--              filters pushed down into the WHERE clause. Used by
+--              BaseRepository.aggregate() so totals no longer download every
+--              matching row to sum them in Python.
+--              Identifiers are quoted with %I and values with %L; only a fixed
+--              set of tables, functions and operators is accepted.
+--              SECURITY INVOKER, EXECUTE granted to service_role only: the
+--              function is not reachable through PostgREST with the anon key.
+-- Date: 2026-10-18
+-- =============================================================================
+
+-- p_aggregates: {"alias": "func:column"}, func in sum|count|count_distinct|avg|min|max
+--               ("count:*" pour COUNT(*))
+-- p_filters:    [{"column": "...", "op": "eq|neq|gt|gte|lt|lte|in|is", "value": ...}]
+-- p_group_by:   colonnes de regroupement (optionnel)
+-- Retour:       tableau JSON, une ligne par groupe (une seule ligne sans GROUP BY)
+
+CREATE OR REPLACE FUNCTION aggregate_rows(
+    p_table TEXT,
+    p_aggregates JSONB,
+    p_filters JSONB DEFAULT '[]'::JSONB,
+    p_group_by TEXT[] DEFAULT '{}'
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_select TEXT[] := '{}';
+    v_where TEXT[] := '{}';
+    v_group TEXT[] := '{}';
+    v_alias TEXT;
+    v_spec TEXT;
+    v_func TEXT;
+    v_column TEXT;
+    v_expr TEXT;
+    v_filter JSONB;
+    v_op TEXT;
+    v_sql TEXT;
+    v_result JSONB;
+BEGIN
+    -- Tables des repositories qui utilisent BaseRepository.aggregate()
+    IF p_table IS NULL OR p_table NOT IN ('sales', 'trackable_links', 'products', 'users') THEN
+        RAISE EXCEPTION 'Table not allowed: %', p_table;
+    END IF;
+
+    -- Colonnes de regroupement
+    FOREACH v_column IN ARRAY COALESCE(p_group_by, '{}') LOOP
+        v_group := v_group || format('%I', v_column);
+        v_select := v_select || format('%I', v_column);
+    END LOOP;
+
+    -- Agrégats
+    FOR v_alias, v_spec IN SELECT key, value #>> '{}' FROM jsonb_each(p_aggregates) LOOP
+        v_func := lower(split_part(v_spec, ':', 1));
+        v_column := split_part(v_spec, ':', 2);
+
+        IF v_func = 'count' AND v_column IN ('', '*') THEN
+            v_expr := 'COUNT(*)';
+        ELSIF v_func = 'count_distinct' THEN
+            v_expr := format('COUNT(DISTINCT %I)', v_column);
+        ELSIF v_func IN ('sum', 'avg') THEN
+            v_expr := format('COALESCE(%s(%I), 0)', upper(v_func), v_column);
+        ELSIF v_func IN ('count', 'min', 'max') THEN
+            v_expr := format('%s(%I)', upper(v_func), v_column);
+        ELSE
+            RAISE EXCEPTION 'Unsupported aggregate: %', v_spec;
+        END IF;
+
+        v_select := v_select || format('%s AS %I', v_expr, v_alias);
+    END LOOP;
+
+    IF array_length(v_select, 1) IS NULL THEN
+        RAISE EXCEPTION 'No aggregate requested';
+    END IF;
+
+    -- Filtres (valeurs passées en littéraux, converties vers le type de la colonne)
+    FOR v_filter IN SELECT * FROM jsonb_array_elements(COALESCE(p_filters, '[]'::JSONB)) LOOP
+        v_column := v_filter->>'column';
+        v_op := lower(COALESCE(v_filter->>'op', 'eq'));
+
+        IF v_op = 'in' THEN
+            IF jsonb_array_length(v_filter->'value') = 0 THEN
+                v_where := array_append(v_where, 'FALSE');
+            ELSE
+                v_where := v_where || format(
+                    '%I IN (%s)',
+                    v_column,
+                    (SELECT string_agg(format('%L', item), ', ')
+                     FROM jsonb_array_elements_text(v_filter->'value') AS item)
+                );
+            END IF;
+        ELSIF v_op = 'is' OR jsonb_typeof(v_filter->'value') = 'null' THEN
+            v_where := v_where || format(
+                '%I IS %s',
+                v_column,
+                CASE WHEN v_op = 'neq' THEN 'NOT NULL' ELSE 'NULL' END
+            );
+        ELSIF v_op NOT IN ('eq', 'neq', 'gt', 'gte', 'lt', 'lte') THEN
+            RAISE EXCEPTION 'Unsupported operator: %', v_op;
+        ELSE
+            v_where := v_where || format(
+                '%I %s %L',
+                v_column,
+                CASE v_op
+                    WHEN 'eq' THEN '='
+                    WHEN 'neq' THEN '<>'
+                    WHEN 'gt' THEN '>'
+                    WHEN 'gte' THEN '>='
+                    WHEN 'lt' THEN '<'
+                    WHEN 'lte' THEN '<='
+                END,
+                v_filter->>'value'
+            );
+        END IF;
+    END LOOP;
+
+    v_sql := format('SELECT %s FROM %I', array_to_string(v_select, ', '), p_table);
+
+    IF array_length(v_where, 1) IS NOT NULL THEN
+        v_sql := v_sql || ' WHERE ' || array_to_string(v_where, ' AND ');
+    END IF;
+
+    IF array_length(v_group, 1) IS NOT NULL THEN
+        v_sql := v_sql || ' GROUP BY ' || array_to_string(v_group, ', ');
+    END IF;
+
+    EXECUTE format('SELECT COALESCE(jsonb_agg(to_jsonb(q)), ''[]''::JSONB) FROM (%s) q', v_sql)
+    INTO v_result;
+
+    RETURN v_result;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY INVOKER;
+
+-- Les fonctions sont exécutables par PUBLIC par défaut, et Supabase accorde
+-- aussi EXECUTE à anon / authenticated sur le schéma public
+REVOKE ALL ON FUNCTION aggregate_rows(TEXT, JSONB, JSONB, TEXT[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION aggregate_rows(TEXT, JSONB, JSONB, TEXT[]) TO service_role;
@@ -0,0 +1,87 @@
+-- =============================================================================
+-- Migration: Set-based validation of pending sales
+-- Description: Validates a chunk of sales in one transaction: one status
+--              UPDATE, one multi-row commission INSERT, and per-influencer /
+--              per-link commission deltas aggregated and applied in a single
+--              UPDATE each. Only sales still 'pending' are touched, so
+--              re-running a chunk is a no-op (idempotent).
+-- Date: 2026-10-18
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION validate_sales_batch(
+    p_sale_ids UUID[]
+)
+RETURNS TABLE (
+    sale_id UUID,
+    influencer_id UUID,
+    merchant_id UUID,
+    link_id UUID,
+    commission DECIMAL
+) AS $$
+    WITH validated AS (
+        UPDATE sales AS s
+        SET
+            status = 'completed',
+            payment_status = 'pending',
+            payment_processed_at = NULL
+        WHERE s.id = ANY(p_sale_ids)
+          AND s.status = 'pending'
+        RETURNING
+            s.id,
+            s.influencer_id,
+            s.merchant_id,
+            s.link_id,
+            COALESCE(s.influencer_commission, 0) AS commission
+    ),
+    new_commissions AS (
+        INSERT INTO commissions (sale_id, influencer_id, amount, currency, status, approved_at)
+        SELECT v.id, v.influencer_id, v.commission, 'EUR', 'approved', NOW()
+        FROM validated v
+        WHERE NOT EXISTS (SELECT 1 FROM commissions c WHERE c.sale_id = v.id)
+        RETURNING 1
+    ),
+    balances AS (
+        UPDATE influencers AS i
+        SET
+            balance = COALESCE(i.balance, 0) + d.delta,
+            total_earnings = COALESCE(i.total_earnings, 0) + d.delta,
+            updated_at = NOW()
+        FROM (
+            SELECT v.influencer_id, SUM(v.commission) AS delta
+            FROM validated v
+            WHERE v.influencer_id IS NOT NULL
+            GROUP BY v.influencer_id
+        ) AS d
+        WHERE i.id = d.influencer_id
+        RETURNING 1
+    ),
+    links AS (
+        UPDATE trackable_links AS l
+        SET total_commission = COALESCE(l.total_commission, 0) + d.delta
+        FROM (
+            SELECT v.link_id, SUM(v.commission) AS delta
+            FROM validated v
+            WHERE v.link_id IS NOT NULL
+            GROUP BY v.link_id
+        ) AS d
+        WHERE l.id = d.link_id
+        RETURNING 1
+    )
+    SELECT v.id, v.influencer_id, v.merchant_id, v.link_id, v.commission
+    FROM validated v;
+$$ LANGUAGE sql;
+
+
+-- =============================================================================
+-- Job checkpoints
+-- Description: Resumable state of long-running batch jobs (cursor + running
+--              totals), one row per job.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+    job_name VARCHAR(100) PRIMARY KEY,
+    state JSONB NOT NULL DEFAULT '{}'::JSONB,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_pending_created ON sales(created_at, id) WHERE status = 'pending';
@@ -0,0 +1,125 @@
+-- =============================================================================
+-- Migration: Change feed outbox for real-time notifications
+-- Description: Commission, payout and sale changes append an event to
+--              change_feed in the same transaction (triggers), including
+--              the set-based validate_sales_batch RPC. The WebSocket server
+--              consumes the feed by monotonic id (never by wall clock) and
+--              persists its cursor in job_checkpoints, so delivery resumes
+--              after a restart without gaps or duplicates.
+-- Date: 2026-10-18
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS change_feed (
+    id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,
+    user_id TEXT,
+    payload JSONB NOT NULL DEFAULT '{}'::JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rattrapage par client (reprise après reconnexion)
+CREATE INDEX IF NOT EXISTS idx_change_feed_user_id ON change_feed(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_change_feed_created_at ON change_feed(created_at);
+
+
+-- Destinataire: user_id de la ligne, sinon propriétaire de l'influenceur
+-- (TEXT: payouts.user_id est TEXT ou UUID selon les schémas déployés)
+CREATE OR REPLACE FUNCTION change_feed_recipient(p_row JSONB)
+RETURNS TEXT AS $$
+    SELECT COALESCE(
+        p_row->>'user_id',
+        (SELECT i.user_id::TEXT FROM influencers i WHERE i.id::TEXT = p_row->>'influencer_id')
+    );
+$$ LANGUAGE sql STABLE;
+
+
+-- =============================================================================
+-- Triggers
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION change_feed_commissions()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row JSONB := to_jsonb(NEW);
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO change_feed (event_type, user_id, payload)
+    VALUES (
+        CASE WHEN TG_OP = 'INSERT' THEN 'commission_created' ELSE 'commission_updated' END,
+        change_feed_recipient(v_row),
+        jsonb_build_object(
+            'commission_id', NEW.id,
+            'sale_id', v_row->'sale_id',
+            'amount', v_row->'amount',
+            'status', v_row->'status'
+        )
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_change_feed_commissions ON commissions;
+
+CREATE TRIGGER trg_change_feed_commissions
+    AFTER INSERT OR UPDATE OF status ON commissions
+    FOR EACH ROW
+    EXECUTE FUNCTION change_feed_commissions();
+
+
+CREATE OR REPLACE FUNCTION change_feed_payouts()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row JSONB := to_jsonb(NEW);
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO change_feed (event_type, user_id, payload)
+    VALUES (
+        CASE WHEN TG_OP = 'INSERT' THEN 'payment_created' ELSE 'payment_status_changed' END,
+        change_feed_recipient(v_row),
+        jsonb_build_object(
+            'payment_id', NEW.id,
+            'status', v_row->'status',
+            'amount', v_row->'amount'
+        )
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_change_feed_payouts ON payouts;
+
+CREATE TRIGGER trg_change_feed_payouts
+    AFTER INSERT OR UPDATE OF status ON payouts
+    FOR EACH ROW
+    EXECUTE FUNCTION change_feed_payouts();
+
+
+CREATE OR REPLACE FUNCTION change_feed_sales()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO change_feed (event_type, user_id, payload)
+    VALUES (
+        'sale_created',
+        change_feed_recipient(to_jsonb(NEW)),
+        jsonb_build_object(
+            'sale_id', NEW.id,
+            'amount', NEW.amount,
+            'commission', NEW.influencer_commission
+        )
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_change_feed_sales ON sales;
+
+CREATE TRIGGER trg_change_feed_sales
+    AFTER INSERT ON sales
+    FOR EACH ROW
+    EXECUTE FUNCTION change_feed_sales();
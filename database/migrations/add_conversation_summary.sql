@@ -0,0 +1,164 @@
+-- =============================================================================
+-- Migration: Conversation summary (inbox in one query)
+-- Description: Denormalizes the last message and per-participant unread
+--              counters onto conversations. They are maintained by triggers
+--              on messages: the insert trigger covers send_message, and a
+--              statement-level update trigger covers mark-read.
+--              get_conversation_inbox returns a page of the inbox with keyset
+--              pagination on (last_message_at, id), replacing 2N+2 queries.
+-- Date: 2026-10-18
+-- =============================================================================
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_id UUID;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_preview TEXT;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_sender_id UUID;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user1_unread_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user2_unread_count INTEGER NOT NULL DEFAULT 0;
+
+-- Pagination par clé de la boîte de réception (un index par participant)
+CREATE INDEX IF NOT EXISTS idx_conversations_user1_inbox ON conversations(user1_id, last_message_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_user2_inbox ON conversations(user2_id, last_message_at DESC, id DESC);
+
+
+-- =============================================================================
+-- Envoi: dernier message + non-lus du destinataire
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION update_conversation_last_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations
+    SET
+        last_message_at = GREATEST(COALESCE(last_message_at, NEW.created_at), NEW.created_at),
+        last_message_id = CASE WHEN NEW.created_at >= COALESCE(last_message_at, NEW.created_at)
+                               THEN NEW.id ELSE last_message_id END,
+        last_message_preview = CASE WHEN NEW.created_at >= COALESCE(last_message_at, NEW.created_at)
+                                    THEN LEFT(NEW.content, 200) ELSE last_message_preview END,
+        last_message_sender_id = CASE WHEN NEW.created_at >= COALESCE(last_message_at, NEW.created_at)
+                                      THEN NEW.sender_id ELSE last_message_sender_id END,
+        user1_unread_count = user1_unread_count
+            + CASE WHEN NEW.sender_id <> user1_id AND NOT COALESCE(NEW.is_read, FALSE) THEN 1 ELSE 0 END,
+        user2_unread_count = user2_unread_count
+            + CASE WHEN NEW.sender_id <> user2_id AND NOT COALESCE(NEW.is_read, FALSE) THEN 1 ELSE 0 END,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = NEW.conversation_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_conversation_last_message ON messages;
+
+CREATE TRIGGER trigger_update_conversation_last_message
+    AFTER INSERT ON messages
+    FOR EACH ROW
+    EXECUTE FUNCTION update_conversation_last_message();
+
+
+-- =============================================================================
+-- Lecture: décrément agrégé par conversation (une mise à jour par requête)
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION update_conversation_unread_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations AS c
+    SET
+        user1_unread_count = GREATEST(0, c.user1_unread_count - d.user1_read),
+        user2_unread_count = GREATEST(0, c.user2_unread_count - d.user2_read)
+    FROM (
+        SELECT
+            n.conversation_id,
+            COUNT(*) FILTER (WHERE n.sender_id <> cv.user1_id) AS user1_read,
+            COUNT(*) FILTER (WHERE n.sender_id <> cv.user2_id) AS user2_read
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN conversations cv ON cv.id = n.conversation_id
+        WHERE n.is_read AND NOT COALESCE(o.is_read, FALSE)
+        GROUP BY n.conversation_id
+    ) AS d
+    WHERE c.id = d.conversation_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_conversation_unread_counts ON messages;
+
+CREATE TRIGGER trigger_update_conversation_unread_counts
+    AFTER UPDATE ON messages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_conversation_unread_counts();
+
+
+-- =============================================================================
+-- Boîte de réception: une page, une requête
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION get_conversation_inbox(
+    p_user_id UUID,
+    p_limit INTEGER DEFAULT 20,
+    p_before_at TIMESTAMP DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL
+)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(to_jsonb(page) - 'sort_at' ORDER BY page.sort_at DESC, page.id DESC), '[]'::JSONB)
+    FROM (
+        SELECT *
+        FROM (
+            (
+                SELECT c.*, c.user1_unread_count AS unread_count, c.last_message_at AS sort_at
+                FROM conversations c
+                WHERE c.user1_id = p_user_id
+                  AND (p_before_at IS NULL OR (c.last_message_at, c.id) < (p_before_at, p_before_id))
+                ORDER BY c.last_message_at DESC, c.id DESC
+                LIMIT p_limit
+            )
+            UNION ALL
+            (
+                SELECT c.*, c.user2_unread_count AS unread_count, c.last_message_at AS sort_at
+                FROM conversations c
+                WHERE c.user2_id = p_user_id
+                  AND c.user1_id <> p_user_id
+                  AND (p_before_at IS NULL OR (c.last_message_at, c.id) < (p_before_at, p_before_id))
+                ORDER BY c.last_message_at DESC, c.id DESC
+                LIMIT p_limit
+            )
+        ) AS inbox
+        ORDER BY inbox.sort_at DESC, inbox.id DESC
+        LIMIT p_limit
+    ) AS page;
+$$ LANGUAGE sql STABLE;
+
+
+-- =============================================================================
+-- Initialisation des conversations existantes
+-- =============================================================================
+
+UPDATE conversations AS c
+SET
+    last_message_id = m.id,
+    last_message_preview = LEFT(m.content, 200),
+    last_message_sender_id = m.sender_id,
+    last_message_at = m.created_at
+FROM (
+    SELECT DISTINCT ON (conversation_id) conversation_id, id, content, sender_id, created_at
+    FROM messages
+    ORDER BY conversation_id, created_at DESC, id DESC
+) AS m
+WHERE c.id = m.conversation_id;
+
+UPDATE conversations AS c
+SET
+    user1_unread_count = COALESCE(u.user1_unread, 0),
+    user2_unread_count = COALESCE(u.user2_unread, 0)
+FROM (
+    SELECT
+        m.conversation_id,
+        COUNT(*) FILTER (WHERE m.sender_id <> cv.user1_id) AS user1_unread,
+        COUNT(*) FILTER (WHERE m.sender_id <> cv.user2_id) AS user2_unread
+    FROM messages m
+    JOIN conversations cv ON cv.id = m.conversation_id
+    WHERE NOT COALESCE(m.is_read, FALSE)
+    GROUP BY m.conversation_id
+) AS u
+WHERE c.id = u.conversation_id;
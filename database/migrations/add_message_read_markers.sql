@@ -0,0 +1,184 @@
+-- =============================================================================
+-- Migration: Keyset message history and per-participant read markers
+-- Description: Conversations store one read marker per participant
+--              (last read message id + its created_at) instead of flagging
+--              every message row. mark_conversation_read only moves the
+--              marker forward and recounts unread messages after it.
+--              get_conversation_messages returns one page of history
+--              ordered by (created_at, id): the latest page, older than a
+--              message (before), or newer than a message (after, used for
+--              incremental sync).
+-- Date: 2026-10-18
+-- =============================================================================
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user1_last_read_message_id UUID;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user1_last_read_at TIMESTAMP;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user2_last_read_message_id UUID;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user2_last_read_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_keyset ON messages(conversation_id, created_at, id);
+
+
+-- =============================================================================
+-- Page d'historique
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION get_conversation_messages(
+    p_conversation_id UUID,
+    p_limit INTEGER DEFAULT 50,
+    p_before_id UUID DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL
+)
+RETURNS JSONB AS $$
+    WITH anchor AS (
+        SELECT m.created_at, m.id
+        FROM messages m
+        WHERE m.conversation_id = p_conversation_id
+          AND m.id = COALESCE(p_before_id, p_after_id)
+    ),
+    page AS (
+        -- Incrémental: messages postérieurs au curseur, du plus ancien au plus récent
+        (
+            SELECT m.*
+            FROM messages m, anchor a
+            WHERE p_after_id IS NOT NULL
+              AND m.conversation_id = p_conversation_id
+              AND (m.created_at, m.id) > (a.created_at, a.id)
+            ORDER BY m.created_at, m.id
+            LIMIT p_limit + 1
+        )
+        UNION ALL
+        -- Dernière page ou page antérieure au curseur, du plus récent au plus ancien
+        (
+            SELECT m.*
+            FROM messages m
+            WHERE p_after_id IS NULL
+              AND m.conversation_id = p_conversation_id
+              AND (
+                  p_before_id IS NULL
+                  OR (m.created_at, m.id) < (SELECT a.created_at, a.id FROM anchor a)
+              )
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT p_limit + 1
+        )
+    )
+    SELECT jsonb_build_object(
+        'conversation', (SELECT to_jsonb(c) FROM conversations c WHERE c.id = p_conversation_id),
+        'messages', COALESCE(
+            (SELECT jsonb_agg(to_jsonb(p) ORDER BY p.created_at, p.id) FROM page p),
+            '[]'::JSONB
+        )
+    );
+$$ LANGUAGE sql STABLE;
+
+
+-- =============================================================================
+-- Marqueur de lecture
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION mark_conversation_read(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_message_id UUID DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_conv conversations%ROWTYPE;
+    v_slot TEXT;
+    v_message_id UUID;
+    v_message_at TIMESTAMP;
+    v_marker_id UUID;
+    v_marker_at TIMESTAMP;
+    v_unread INTEGER;
+BEGIN
+    SELECT * INTO v_conv FROM conversations WHERE id = p_conversation_id FOR UPDATE;
+    -- p_user_id NULL: NOT IN vaudrait NULL et laisserait passer l'appel
+    IF NOT FOUND OR p_user_id IS NULL OR p_user_id NOT IN (v_conv.user1_id, v_conv.user2_id) THEN
+        RETURN NULL;
+    END IF;
+
+    -- Place du participant, choisie explicitement (jamais par défaut)
+    IF v_conv.user1_id IS NOT DISTINCT FROM p_user_id THEN
+        v_slot := 'user1';
+    ELSIF v_conv.user2_id IS NOT DISTINCT FROM p_user_id THEN
+        v_slot := 'user2';
+    ELSE
+        RAISE EXCEPTION 'User % is not a participant of conversation %', p_user_id, p_conversation_id;
+    END IF;
+
+    -- Message lu: celui demandé, sinon le plus récent
+    SELECT m.id, m.created_at INTO v_message_id, v_message_at
+    FROM messages m
+    WHERE m.conversation_id = p_conversation_id
+      AND (p_message_id IS NULL OR m.id = p_message_id)
+    ORDER BY m.created_at DESC, m.id DESC
+    LIMIT 1;
+
+    IF v_message_id IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    IF v_slot = 'user1' THEN
+        v_marker_id := v_conv.user1_last_read_message_id;
+        v_marker_at := v_conv.user1_last_read_at;
+    ELSE
+        v_marker_id := v_conv.user2_last_read_message_id;
+        v_marker_at := v_conv.user2_last_read_at;
+    END IF;
+
+    -- Le marqueur n'avance que vers l'avant
+    IF v_marker_at IS NOT NULL AND (v_message_at, v_message_id) <= (v_marker_at, v_marker_id) THEN
+        RETURN CASE WHEN v_slot = 'user1'
+                    THEN v_conv.user1_unread_count ELSE v_conv.user2_unread_count END;
+    END IF;
+
+    SELECT COUNT(*) INTO v_unread
+    FROM messages m
+    WHERE m.conversation_id = p_conversation_id
+      AND m.sender_id <> p_user_id
+      AND (m.created_at, m.id) > (v_message_at, v_message_id);
+
+    IF v_slot = 'user1' THEN
+        UPDATE conversations
+        SET user1_last_read_message_id = v_message_id,
+            user1_last_read_at = v_message_at,
+            user1_unread_count = v_unread
+        WHERE id = p_conversation_id;
+    ELSE
+        UPDATE conversations
+        SET user2_last_read_message_id = v_message_id,
+            user2_last_read_at = v_message_at,
+            user2_unread_count = v_unread
+        WHERE id = p_conversation_id;
+    END IF;
+
+    RETURN v_unread;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- =============================================================================
+-- Initialisation: marqueur sur le dernier message reçu déjà lu
+-- =============================================================================
+
+UPDATE conversations AS c
+SET user1_last_read_message_id = r.id, user1_last_read_at = r.created_at
+FROM (
+    SELECT DISTINCT ON (m.conversation_id) m.conversation_id, m.id, m.created_at
+    FROM messages m
+    JOIN conversations cv ON cv.id = m.conversation_id
+    WHERE m.is_read AND m.sender_id <> cv.user1_id
+    ORDER BY m.conversation_id, m.created_at DESC, m.id DESC
+) AS r
+WHERE c.id = r.conversation_id AND c.user1_last_read_message_id IS NULL;
+
+UPDATE conversations AS c
+SET user2_last_read_message_id = r.id, user2_last_read_at = r.created_at
+FROM (
+    SELECT DISTINCT ON (m.conversation_id) m.conversation_id, m.id, m.created_at
+    FROM messages m
+    JOIN conversations cv ON cv.id = m.conversation_id
+    WHERE m.is_read AND m.sender_id <> cv.user2_id
+    ORDER BY m.conversation_id, m.created_at DESC, m.id DESC
+) AS r
+WHERE c.id = r.conversation_id AND c.user2_last_read_message_id IS NULL;
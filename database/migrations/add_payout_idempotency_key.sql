@@ -0,0 +1,14 @@
+-- =============================================================================
+-- Migration: Payout idempotency keys
+-- Description: One automatic payout per influencer and per run date. The
+--              concurrent payout executor inserts payouts with
+--              ON CONFLICT (idempotency_key) DO NOTHING, so a re-run never
+--              creates (or pays) the same payout twice.
+-- Date: 2026-10-18
+-- =============================================================================
+
+ALTER TABLE payouts ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(255);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payouts_idempotency_key ON payouts(idempotency_key);
+
+CREATE INDEX IF NOT EXISTS idx_payouts_influencer_status ON payouts(influencer_id, status);
@@ -0,0 +1,42 @@
+-- =============================================================================
+-- Migration: Short-code block allocator
+-- Description: Hands out disjoint ranges of sequence numbers to API workers.
+--              Each worker encodes its numbers into collision-free short codes
+--              locally, so link creation is a single INSERT with no
+--              uniqueness-check round-trips.
+-- Date: 2026-10-18
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS short_code_allocator (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    next_value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO short_code_allocator (id, next_value)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
+
+
+CREATE OR REPLACE FUNCTION reserve_short_code_block(
+    p_block_size INTEGER DEFAULT 1000
+)
+RETURNS BIGINT AS $$
+DECLARE
+    v_start BIGINT;
+BEGIN
+    IF p_block_size <= 0 OR p_block_size > 100000 THEN
+        RAISE EXCEPTION 'Taille de bloc invalide: %', p_block_size;
+    END IF;
+
+    -- Le verrou de ligne sérialise les réservations concurrentes
+    UPDATE short_code_allocator
+    SET
+        next_value = next_value + p_block_size,
+        updated_at = NOW()
+    WHERE id = 1
+    RETURNING next_value - p_block_size INTO v_start;
+
+    RETURN v_start;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,89 @@
+-- =============================================================================
+-- Migration: Atomic counters for tracking links
+-- Description: Increments tracking_links.clicks server-side so the redirect
+--              path no longer needs to read the link row before updating it.
+--              p_delta allows a single aggregated increment per link.
+-- Date: 2026-10-18
+-- =============================================================================
+
+DROP FUNCTION IF EXISTS increment_tracking_link_clicks(UUID);
+
+CREATE OR REPLACE FUNCTION increment_tracking_link_clicks(
+    p_link_id UUID,
+    p_delta INTEGER DEFAULT 1
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE tracking_links
+    SET
+        clicks = COALESCE(clicks, 0) + p_delta,
+        last_click_at = NOW()
+    WHERE id = p_link_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- =============================================================================
+-- Batched counter deltas
+-- Description: Applies aggregated per-link deltas in a single atomic UPDATE.
+--              p_deltas is a JSON array of objects, e.g.
+--              [{"link_id": "...", "clicks": 12, "conversions": 1, "revenue": 49.9}]
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION apply_tracking_link_deltas(
+    p_deltas JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_updated INTEGER;
+BEGIN
+    UPDATE tracking_links AS t
+    SET
+        clicks = COALESCE(t.clicks, 0) + COALESCE(d.clicks, 0)::INTEGER,
+        conversions = COALESCE(t.conversions, 0) + COALESCE(d.conversions, 0)::INTEGER,
+        revenue = COALESCE(t.revenue, 0) + COALESCE(d.revenue, 0),
+        last_click_at = CASE
+            WHEN COALESCE(d.clicks, 0) > 0 THEN NOW()
+            ELSE t.last_click_at
+        END
+    FROM jsonb_to_recordset(p_deltas) AS d(
+        link_id UUID,
+        clicks NUMERIC,
+        conversions NUMERIC,
+        revenue NUMERIC
+    )
+    WHERE t.id = d.link_id;
+
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION apply_trackable_link_deltas(
+    p_deltas JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_updated INTEGER;
+BEGIN
+    UPDATE trackable_links AS t
+    SET
+        total_clicks = COALESCE(t.total_clicks, 0) + COALESCE(d.total_clicks, 0)::INTEGER,
+        total_conversions = COALESCE(t.total_conversions, 0) + COALESCE(d.total_conversions, 0)::INTEGER,
+        total_revenue = COALESCE(t.total_revenue, 0) + COALESCE(d.total_revenue, 0),
+        total_commission = COALESCE(t.total_commission, 0) + COALESCE(d.total_commission, 0),
+        updated_at = NOW()
+    FROM jsonb_to_recordset(p_deltas) AS d(
+        link_id UUID,
+        total_clicks NUMERIC,
+        total_conversions NUMERIC,
+        total_revenue NUMERIC,
+        total_commission NUMERIC
+    )
+    WHERE t.id = d.link_id;
+
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
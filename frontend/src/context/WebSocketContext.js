@@ -50,8 +50,9 @@ export const WebSocketProvider = ({ children }) => {
 
   // Authenticate when user is available
   useEffect(() => {
-    if (user && ws.isConnected) {
-      ws.authenticate(user.id);
+    const token = localStorage.getItem('token');
+    if (user && token && ws.isConnected) {
+      ws.authenticate(token);
     }
   }, [user, ws.isConnected, ws]);
 